@@ -21,16 +21,12 @@ def create_app(config_class=Config):
         from datetime import datetime
         import locale
         from flask_login import current_user
-        from app.models import Teacher, FinanceJournal, FinanceJournalStatus, FinancePeriod
-        from app.routes.teacher import build_teacher_sidebar_groups
         from app.utils.roles import get_active_role, role_label
-        from app.utils.tenant import resolve_tenant_id
-        from app.utils.tenant_branding import build_tenant_brand
+        from app.utils.tenant_context import get_tenant_context
         from app.utils.tenant_modules import (
             PACKAGE_FULL,
             PACKAGE_RUMAH_QURAN,
             PACKAGE_SEKOLAH,
-            get_tenant_package,
         )
         from app.utils.timezone import local_now, local_today
         try:
@@ -38,6 +34,7 @@ def create_app(config_class=Config):
             locale.setlocale(locale.LC_TIME, 'id_ID.utf8')
         except:
             pass
+        tenant_context = get_tenant_context()
         active_role = get_active_role(current_user) if current_user.is_authenticated else None
         teacher_sidebar_groups = []
         user_role_labels = []
@@ -46,28 +43,20 @@ def create_app(config_class=Config):
         finance_has_open_period_today = True
         finance_current_period_status = None
         if current_user.is_authenticated:
-            tenant_id = resolve_tenant_id(current_user, fallback_default=False)
-            tenant_package = get_tenant_package(tenant_id)
+            tenant_id = tenant_context.tenant_id
+            tenant_package = tenant_context.package
             user_roles = sorted(list(current_user.all_roles()), key=lambda role: role.value)
             user_role_labels = [role_label(role) for role in user_roles]
             if current_user.has_role('tata_usaha') and tenant_id is not None:
-                finance_draft_journal_count = FinanceJournal.query.filter_by(
-                    tenant_id=tenant_id,
-                    status=FinanceJournalStatus.DRAFT,
-                ).count()
-                period_today = FinancePeriod.query.filter(
-                    FinancePeriod.tenant_id == tenant_id,
-                    FinancePeriod.start_date <= local_today(),
-                    FinancePeriod.end_date >= local_today(),
-                ).first()
+                finance_draft_journal_count = tenant_context.finance_draft_journal_count
+                period_today = tenant_context.finance_period_today
                 finance_current_period_status = period_today.status.value if period_today else None
                 finance_has_open_period_today = bool(
                     period_today and period_today.status.value == "OPEN"
                 )
         if current_user.is_authenticated and current_user.has_role('teacher'):
-            teacher = Teacher.query.filter_by(user_id=current_user.id, is_deleted=False).first()
-            teacher_sidebar_groups = build_teacher_sidebar_groups(teacher)
-        tenant_brand = build_tenant_brand()
+            teacher_sidebar_groups = tenant_context.teacher_sidebar_groups
+        tenant_brand = tenant_context.brand
         return {
             'datetime': datetime,
             'local_now': local_now,
@@ -97,32 +86,15 @@ def create_app(config_class=Config):
     def load_user(user_id):
         return models.User.query.get(int(user_id))
 
-    # 4b. Global Soft Delete Filter (hindari data is_deleted muncul tanpa sengaja)
-
-    @event.listens_for(db.session, "do_orm_execute")
-    def _add_soft_delete_filter(execute_state):
-        if not execute_state.is_select:
-            return
-        if execute_state.execution_options.get("include_deleted", False):
-            return
-        execute_state.statement = execute_state.statement.options(
-            with_loader_criteria(
-                models.BaseModel,
-                lambda cls: cls.is_deleted.is_(False),
-                include_aliases=True,
-            )
-        )
+    # 4b. Listener sesi global (soft delete, denormalisasi tenant, invalidasi cache, sinkron mobile)
+    _register_session_events()
 
     @app.before_request
     def _enforce_tenant_module_access():
         from flask import request, flash, redirect, url_for, session
         from flask_login import current_user, logout_user
-        from app.utils.tenant import is_user_tenant_active, resolve_tenant_id
-        from app.utils.tenant_modules import (
-            endpoint_allowed_for_package,
-            get_tenant_package,
-            role_allowed_for_package,
-        )
+        from app.utils.tenant_context import get_tenant_context
+        from app.utils.tenant_modules import endpoint_allowed_for_package, role_allowed_for_package
 
         if not current_user.is_authenticated:
             return None
@@ -130,14 +102,14 @@ def create_app(config_class=Config):
         if current_user.has_role("super_admin"):
             return None
 
-        if not is_user_tenant_active(current_user):
+        tenant_context = get_tenant_context()
+        if not tenant_context.is_tenant_active:
             flash('Tenant akun ini tidak aktif. Silakan hubungi admin.', 'danger')
             session.pop('active_role', None)
             logout_user()
             return redirect(url_for('auth.login'))
 
-        tenant_id = resolve_tenant_id(current_user, fallback_default=False)
-        package = get_tenant_package(tenant_id)
+        package = tenant_context.package
 
         user_roles = list(current_user.all_roles())
         has_allowed_role = not user_roles or any(
@@ -178,4 +150,74 @@ def create_app(config_class=Config):
     app.register_blueprint(boarding_bp)
     app.register_blueprint(api_bp, url_prefix='/api/v1')
 
+    # 6. CLI: `flask jobs worker` untuk antrean background job
+    from app.scripts.job_worker import jobs_cli
+
+    app.cli.add_command(jobs_cli)
+
     return app
+
+
+_session_events_registered = False
+
+
+def _register_session_events():
+    """
+    Listener db.session berlaku untuk seluruh proses, bukan per app; dipasang sekali saja
+    agar create_app yang dipanggil berulang (mis. di test) tidak menumpuk filter yang sama.
+    """
+    global _session_events_registered
+    if _session_events_registered:
+        return
+    _session_events_registered = True
+    from app import models
+
+    # Global Soft Delete Filter (hindari data is_deleted muncul tanpa sengaja)
+    @event.listens_for(db.session, "do_orm_execute")
+    def _add_soft_delete_filter(execute_state):
+        if not execute_state.is_select:
+            return
+        if execute_state.execution_options.get("include_deleted", False):
+            return
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                models.BaseModel,
+                lambda cls: cls.is_deleted.is_(False),
+                include_aliases=True,
+            )
+        )
+
+    @event.listens_for(db.session, "before_flush")
+    def _fill_denormalized_tenant_ids(session, flush_context, instances):
+        from app.utils.tenant import assign_denormalized_tenant_ids
+
+        assign_denormalized_tenant_ids(session)
+
+    @event.listens_for(db.session, "after_flush")
+    def _invalidate_cached_snapshots(session, flush_context):
+        from app.services.dashboard_metrics_service import invalidate_daily_metrics_for_session
+        from app.services.mobile_sync_service import track_sync_rows_for_session
+        from app.utils.tenant_context import invalidate_tenant_snapshots_for_session
+
+        invalidate_tenant_snapshots_for_session(session)
+        invalidate_daily_metrics_for_session(session)
+        track_sync_rows_for_session(session)
+
+    @event.listens_for(db.session, "before_commit")
+    def _touch_late_sync_rows(session):
+        from app.services.mobile_sync_service import touch_late_sync_rows
+
+        touch_late_sync_rows(session)
+
+    @event.listens_for(db.session, "after_commit")
+    def _finalize_gapless_journal_numbers(session):
+        from app.services.journal_number_service import finalize_session_journal_numbers
+
+        finalize_session_journal_numbers(session)
+
+    @event.listens_for(db.session, "after_commit")
+    @event.listens_for(db.session, "after_rollback")
+    def _discard_sync_rows(session):
+        from app.services.mobile_sync_service import discard_sync_rows
+
+        discard_sync_rows(session)
@@ -197,3 +197,12 @@ class PaymentForm(FlaskForm):
     ], validators=[DataRequired()])
     notes = TextAreaField('Catatan (Opsional)')
     submit = SubmitField('Proses Pembayaran')
+
+
+class MultiPaymentForm(FlaskForm):
+    """Satu kwitansi untuk beberapa tagihan; nominal per tagihan dikirim sebagai amount_<invoice_id>."""
+    method = SelectField('Metode Pembayaran', choices=[
+        ('TUNAI', 'Tunai / Cash'),
+        ('TRANSFER', 'Transfer Bank')
+    ], validators=[DataRequired()])
+    submit = SubmitField('Bayar Tagihan Terpilih')
@@ -1,6 +1,7 @@
 from app.extensions import db
 from datetime import datetime
 import enum
+import json
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.utils.timezone import local_today, utc_now_naive
@@ -303,6 +304,13 @@ class FinanceCashBankTransactionStatus(enum.Enum):
     VOID = "VOID"
 
 
+class BackgroundJobStatus(enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
 # ==========================================
 # 2. ASSOCIATION TABLES
 # ==========================================
@@ -345,12 +353,118 @@ class AuditLog(db.Model):
 
 
 class NotificationQueue(BaseModel):
+    """
+    Antrean kiriman notifikasi. Untuk push (channel='push') satu baris = satu batch token
+    perangkat (maks. 500) dari satu sumber, dikirim worker lewat app/utils/push_notifications.py.
+    """
     __tablename__ = 'notification_queues'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     target_contact = db.Column(db.String(50))
     message = db.Column(db.Text)
     status = db.Column(db.String(20), default='PENDING')
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True, index=True)
+    channel = db.Column(db.String(20), nullable=True)
+    source_type = db.Column(db.String(40), nullable=True)
+    source_id = db.Column(db.Integer, nullable=True)
+    title = db.Column(db.String(150), nullable=True)
+    payload_json = db.Column(db.Text, nullable=True)
+    tokens_json = db.Column(db.Text, nullable=True)
+    token_count = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    invalid_count = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_notification_queues_source_status', 'source_type', 'source_id', 'status'),
+    )
+
+
+class BackgroundJob(db.Model):
+    """
+    Antrean pekerjaan panjang (import, penerbitan tagihan, push, ekstraksi dokumen).
+    Dieksekusi oleh `flask jobs worker`; lihat app/services/job_queue_service.py.
+    """
+    __tablename__ = 'background_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True, index=True)
+    job_type = db.Column(db.String(80), nullable=False)
+    status = db.Column(db.Enum(BackgroundJobStatus, name='backgroundjobstatus'), default=BackgroundJobStatus.QUEUED, nullable=False)
+    payload_json = db.Column(db.Text, nullable=True)
+    input_blob = db.Column(db.LargeBinary, nullable=True)
+    input_filename = db.Column(db.String(255), nullable=True)
+    result_json = db.Column(db.Text, nullable=True)
+    output_blob = db.Column(db.LargeBinary, nullable=True)
+    output_filename = db.Column(db.String(255), nullable=True)
+    output_mimetype = db.Column(db.String(100), nullable=True)
+    error_log = db.Column(db.Text, nullable=True)
+    progress_current = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=utc_now_naive, nullable=False)
+    updated_at = db.Column(db.DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_background_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    @property
+    def payload(self):
+        return json.loads(self.payload_json) if self.payload_json else {}
+
+    @property
+    def result(self):
+        return json.loads(self.result_json) if self.result_json else {}
+
+    @property
+    def is_finished(self):
+        return self.status in (BackgroundJobStatus.SUCCEEDED, BackgroundJobStatus.FAILED)
+
+    @property
+    def progress_percent(self):
+        if self.status == BackgroundJobStatus.SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, int(self.progress_current * 100 / self.progress_total))
+
+    @property
+    def has_output(self):
+        return self.status == BackgroundJobStatus.SUCCEEDED and bool(self.output_filename)
+
+
+class TenantDailyMetric(db.Model):
+    """
+    Rollup harian per tenant untuk dashboard pimpinan (absensi per status, pembayaran, pendapatan/beban).
+    Diisi oleh app/services/dashboard_metrics_service.py; hari yang belum ada dihitung saat dibutuhkan.
+    """
+    __tablename__ = 'tenant_daily_metrics'
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    metric_date = db.Column(db.Date, nullable=False)
+    attendance_hadir = db.Column(db.Integer, nullable=False, default=0)
+    attendance_sakit = db.Column(db.Integer, nullable=False, default=0)
+    attendance_izin = db.Column(db.Integer, nullable=False, default=0)
+    attendance_alpa = db.Column(db.Integer, nullable=False, default=0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    payment_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    revenue_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    expense_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'metric_date', name='uq_tenant_daily_metrics_key'),
+    )
 
 
 class Announcement(BaseModel):
@@ -596,11 +710,30 @@ class MobileRateLimitBucket(db.Model):
     action_name = db.Column(db.String(50), nullable=False, index=True)
     scope_key = db.Column(db.String(255), nullable=False, index=True)
     count = db.Column(db.Integer, nullable=False, default=0)
+    # Hitungan window sebelumnya, untuk perkiraan sliding window.
+    previous_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     window_ends_at = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=utc_now_naive, nullable=False)
     updated_at = db.Column(db.DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False)
 
 
+class MobileIdempotencyKey(db.Model):
+    """Hasil kiriman mobile per idempotency key, agar kiriman ulang (offline/retry) tidak diproses dua kali."""
+    __tablename__ = 'mobile_idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    idempotency_key = db.Column(db.String(100), nullable=False)
+    scope = db.Column(db.String(50), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    result_json = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=utc_now_naive, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_mobile_idempotency_user_key'),
+    )
+
+
 class MobileDeviceToken(BaseModel):
     __tablename__ = 'mobile_device_tokens'
 
@@ -1046,9 +1179,18 @@ class Schedule(BaseModel):
     teacher = db.relationship('Teacher', backref='teaching_schedules')
 
 
+ATTENDANCE_PARTICIPANT_COLUMNS = {
+    ParticipantType.STUDENT: 'student_id',
+    ParticipantType.PARENT_MAJLIS: 'parent_id',
+    ParticipantType.EXTERNAL_MAJLIS: 'majlis_participant_id',
+}
+
+
 class Attendance(BaseModel):
     __tablename__ = 'attendances'
     id = db.Column(db.Integer, primary_key=True)
+    # Denormalisasi dari siswa/guru agar filter tenant tidak perlu join Student -> User.
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True)
 
     # Foreign Keys - Support untuk majlis ta'lim
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=True)
@@ -1073,6 +1215,20 @@ class Attendance(BaseModel):
     __table_args__ = (
         db.Index('idx_attendance_date_class', 'date', 'class_id'),
         db.Index('idx_attendance_participant_date', 'participant_type', 'date'),
+        db.Index('idx_attendance_tenant_date', 'tenant_id', 'date'),
+        # Satu absensi per peserta per kelas per tanggal; kolom peserta berbeda per participant_type.
+        *(
+            db.Index(
+                f'uq_attendance_{participant_type.name.lower()}_class_date',
+                'class_id',
+                'date',
+                participant_column,
+                unique=True,
+                sqlite_where=db.text(f"participant_type = '{participant_type.name}'"),
+                postgresql_where=db.text(f"participant_type = '{participant_type.name}'"),
+            )
+            for participant_type, participant_column in ATTENDANCE_PARTICIPANT_COLUMNS.items()
+        ),
     )
 
 
@@ -1133,6 +1289,7 @@ class Grade(BaseModel):
     """
     __tablename__ = 'grades'
     id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=True)
     majlis_participant_id = db.Column(db.Integer, db.ForeignKey('majlis_participants.id'), nullable=True)
     participant_type = db.Column(db.Enum(ParticipantType, name='participanttype'), default=ParticipantType.STUDENT, nullable=False)
@@ -1151,6 +1308,10 @@ class Grade(BaseModel):
     academic_year = db.relationship('AcademicYear', backref='grades')
     majlis_participant = db.relationship('MajlisParticipant', backref='grades')
 
+    __table_args__ = (
+        db.Index('idx_grade_tenant_year_subject', 'tenant_id', 'academic_year_id', 'subject_id'),
+    )
+
 
 class GradeWeight(BaseModel):
     """
@@ -1513,6 +1674,8 @@ class FinanceSetting(BaseModel):
     default_registration_revenue_account_id = db.Column(db.Integer, db.ForeignKey('finance_accounts.id'), nullable=True)
     default_savings_liability_account_id = db.Column(db.Integer, db.ForeignKey('finance_accounts.id'), nullable=True)
     default_donation_revenue_account_id = db.Column(db.Integer, db.ForeignKey('finance_accounts.id'), nullable=True)
+    # Nomor jurnal final diberikan setelah commit agar tidak ada celah (lebih lambat dari mode blok).
+    gapless_journal_numbers = db.Column(db.Boolean, default=False, nullable=False)
 
     default_cash_bank_account = db.relationship('FinanceCashBankAccount', foreign_keys=[default_cash_bank_account_id], backref='finance_settings_default')
     default_spp_revenue_account = db.relationship('FinanceAccount', foreign_keys=[default_spp_revenue_account_id], backref='finance_settings_spp_revenue')
@@ -1579,6 +1742,27 @@ class FinanceJournalLine(BaseModel):
 
     __table_args__ = (
         db.CheckConstraint('amount > 0', name='ck_finance_journal_lines_amount_positive'),
+        db.Index('ix_finance_journal_lines_tenant_reference', 'tenant_id', 'reference_type', 'reference_id'),
+    )
+
+
+class FinanceAccountDailyBalance(db.Model):
+    """
+    Ringkasan mutasi jurnal POSTED per tenant, akun, dan tanggal.
+    Dipelihara oleh finance_posting_service agar laporan tidak perlu memindai semua baris jurnal.
+    """
+    __tablename__ = 'finance_account_daily_balances'
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('finance_accounts.id'), nullable=False)
+    balance_date = db.Column(db.Date, nullable=False)
+    debit_total = db.Column(db.BigInteger, nullable=False, default=0)
+    credit_total = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'account_id', 'balance_date', name='uq_finance_account_daily_balances_key'),
+        db.Index('ix_finance_account_daily_balances_tenant_date', 'tenant_id', 'balance_date'),
     )
 
 
@@ -1625,6 +1809,7 @@ class FeeType(BaseModel):
 class Invoice(BaseModel):
     __tablename__ = 'invoices'
     id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True)
     invoice_number = db.Column(db.String(50), unique=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'))
     fee_type_id = db.Column(db.Integer, db.ForeignKey('fee_types.id'))
@@ -1636,15 +1821,26 @@ class Invoice(BaseModel):
     fee_type = db.relationship('FeeType', backref='invoices')
     transactions = db.relationship('Transaction', backref='invoice', lazy=True)
 
+    __table_args__ = (
+        db.Index('idx_invoice_tenant_status_due', 'tenant_id', 'status', 'due_date'),
+    )
+
 
 class Transaction(BaseModel):
     __tablename__ = 'transactions'
     id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'))
     amount = db.Column(db.Integer)
     method = db.Column(db.String(30))
     date = db.Column(db.DateTime, default=utc_now_naive)
     pic_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # Transaksi yang dibayar dalam satu kwitansi kasir berbagi nomor yang sama.
+    receipt_no = db.Column(db.String(30), nullable=True, index=True)
+
+    __table_args__ = (
+        db.Index('idx_transaction_tenant_date', 'tenant_id', 'date'),
+    )
 
 
 class StudentSavingsAccount(BaseModel):
@@ -1,24 +1,26 @@
 from datetime import datetime, timedelta, date
 from collections import defaultdict
-import csv
 import json
 import os
 import re
 import uuid
 from urllib.parse import urlsplit
-from io import BytesIO, StringIO, TextIOWrapper
-from flask import Blueprint, Response, current_app, jsonify, render_template, redirect, url_for, flash, request
+from flask import Blueprint, current_app, g, has_request_context, jsonify, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
-from sqlalchemy import func, or_, and_
-from openpyxl import Workbook, load_workbook
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
 from app.extensions import db
 from app.decorators import role_required
 from app.services.majlis_enrollment_service import ensure_majlis_participant_acceptance, list_active_majlis_participants
 from app.services.credential_security_service import set_user_password_and_invalidate_tokens
+from app.services.student_directory_service import (
+    allowed_student_categories,
+    normalize_student_search,
+    student_directory_page,
+)
 from app.services.rumah_quran_service import (
-    apply_rumah_quran_student_filter,
     assign_student_rumah_quran_class,
     ensure_rumah_quran_program_group,
     get_student_rumah_quran_classroom,
@@ -27,7 +29,6 @@ from app.services.rumah_quran_service import (
     list_rumah_quran_students_for_class,
 )
 from app.services.bahasa_service import (
-    apply_bahasa_student_filter,
     assign_student_bahasa_class,
     ensure_bahasa_program_group,
     get_student_bahasa_classroom,
@@ -54,13 +55,30 @@ from app.services.ppdb_config_service import (
     list_active_ppdb_form_fields,
 )
 from app.routes.ppdb_config_views import ppdb_form_builder_view, ppdb_settings_view
+from app.routes.main import redirect_to_job
+from app.routes.teacher import render_grade_recap_page
 from app.services.finance_posting_service import (
     create_cash_bank_transaction,
-    post_invoice_payment,
     post_journal,
-    post_savings_transaction,
     reverse_journal,
 )
+from app.services.finance_reconciliation_service import (
+    RETRY_SOURCE_LABELS,
+    unposted_invoice_payment_transactions,
+    unposted_savings_transactions,
+)
+from app.services.job_queue_service import enqueue_job
+from app.services.dashboard_metrics_service import leadership_dashboard_payload, leadership_period
+from app.services.finance_report_service import (
+    financial_position_report,
+    income_statement_report,
+    iter_ledger_entries,
+    ledger_entries_query,
+    ledger_opening_totals,
+    ledger_report,
+    posted_lines_query,
+    trial_balance_report,
+)
 from app.services.grade_formula_service import (
     REPORT_ADJUSTMENT_SOURCE_ACADEMIC,
     REPORT_ADJUSTMENT_SOURCE_TAHFIDZ,
@@ -79,6 +97,7 @@ from app.services.report_template_service import (
     resolve_report_template_profile,
 )
 from app.utils.timezone import local_day_bounds_utc_naive, local_now, local_today
+from app.utils.exports import csv_stream_response, xlsx_stream_response
 from app.forms import StudentForm, FeeTypeForm  # Pastikan Anda punya form untuk Guru/Mapel nanti
 from app.models import (
     # Base & Enums
@@ -95,7 +114,6 @@ from app.models import (
     FinanceCashBankAccount, FinanceCashBankAccountType,
     FinanceCashBankTransaction, FinanceCashBankTransactionType,
     FinanceJournal, FinanceJournalLine, FinanceJournalStatus, FinanceJournalSourceType, FinanceEntrySide,
-    SavingsTransactionType, SavingsTransactionStatus, StudentSavingsTransaction,
     # Student Related
     StudentClassHistory, Attendance, BoardingAttendance, Grade, ReportCard, ReportScoreAdjustment, StudentAttitude,
     Violation, BehaviorReport, TahfidzRecord, TahfidzSummary, RecitationRecord, TahfidzEvaluation,
@@ -110,19 +128,20 @@ from app.models import (
     AppConfig
 )
 from app.utils.nis import generate_nip, generate_nis
+from app.utils.uploads import UploadLimitError, check_upload_size, iter_upload_rows, upload_size
 from app.utils.roles import validate_role_combination, role_label, ROLE_PRIORITY
 from app.utils.money import to_rupiah_int
 from app.utils.invoice import generate_invoice_number
 from app.utils.tenant_modules import (
     PACKAGE_FULL,
-    PACKAGE_RUMAH_QURAN,
     PACKAGE_SEKOLAH,
     PACKAGE_OPTIONS,
     TENANT_PACKAGE_KEY,
-    get_tenant_package,
     normalize_tenant_package,
 )
+from app.utils.tenant_context import get_cached_tenant_package, invalidate_tenant_snapshot
 from app.utils.tenant import (
+    active_student_exists,
     classroom_in_tenant,
     resolve_tenant_id,
     scoped_classrooms_query,
@@ -361,46 +380,6 @@ def _parse_iso_date(value):
         return None
 
 
-def _iter_upload_rows(file):
-    def _normalize_cell(value):
-        if value is None:
-            return ''
-        if isinstance(value, datetime):
-            return value.date().isoformat()
-        if isinstance(value, date):
-            return value.isoformat()
-        if isinstance(value, float):
-            if value.is_integer():
-                return str(int(value))
-            return str(value).strip()
-        if isinstance(value, int):
-            return str(value)
-        return str(value).strip()
-
-    filename = (file.filename or "").lower()
-    if filename.endswith('.xlsx'):
-        workbook = load_workbook(file, data_only=True)
-        sheet = workbook.active
-        rows = list(sheet.iter_rows(values_only=True))
-        if not rows:
-            return []
-        headers = [str(cell).strip() if cell is not None else '' for cell in rows[0]]
-        parsed = []
-        for idx, row in enumerate(rows[1:], start=2):
-            row_data = {}
-            for col_idx, header in enumerate(headers):
-                value = row[col_idx] if col_idx < len(row) else None
-                row_data[header] = _normalize_cell(value)
-            parsed.append((idx, row_data))
-        return parsed
-
-    wrapper = TextIOWrapper(file.stream, encoding='utf-8-sig')
-    reader = csv.DictReader(wrapper)
-    return [(idx, {k: (v.strip() if isinstance(v, str) else '' if v is None else str(v).strip())
-                   for k, v in row.items()})
-            for idx, row in enumerate(reader, start=2)]
-
-
 # =========================================================
 # 1. DASHBOARD & KONFIGURASI SISTEM
 # =========================================================
@@ -437,14 +416,12 @@ def dashboard():
     income_today = (
         db.session.query(func.sum(Transaction.amount))
         .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Transaction.tenant_id == tenant_id,
             Transaction.date >= start_utc,
             Transaction.date < end_utc,
             Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Invoice.student_id),
         )
         .scalar()
         or 0
@@ -457,426 +434,6 @@ def dashboard():
                            income_today=income_today)  # <--- JANGAN LUPA INI
 
 
-def _format_chart_date(day):
-    return day.strftime('%d/%m')
-
-
-def _shift_month(month_start, offset):
-    month_index = month_start.month - 1 + offset
-    year = month_start.year + month_index // 12
-    month = month_index % 12 + 1
-    return date(year, month, 1)
-
-
-def _next_month(month_start):
-    return _shift_month(month_start, 1)
-
-
-def _leadership_period(raw_period):
-    today = local_today()
-    options = {
-        '7d': ('7 Hari', today - timedelta(days=6), today),
-        '14d': ('14 Hari', today - timedelta(days=13), today),
-        '30d': ('30 Hari', today - timedelta(days=29), today),
-        '90d': ('90 Hari', today - timedelta(days=89), today),
-        'month': ('Bulan Ini', date(today.year, today.month, 1), today),
-        'year': ('Tahun Ini', date(today.year, 1, 1), today),
-    }
-    key = raw_period if raw_period in options else '14d'
-    label, start_date, end_date = options[key]
-    return key, label, start_date, end_date, [{'key': item_key, 'label': item[0]} for item_key, item in options.items()]
-
-
-def _date_series(start_date, end_date):
-    days = (end_date - start_date).days
-    return [start_date + timedelta(days=offset) for offset in range(days + 1)]
-
-
-def _month_series(start_date, end_date):
-    cursor = date(start_date.year, start_date.month, 1)
-    end_month = date(end_date.year, end_date.month, 1)
-    months = []
-    while cursor <= end_month:
-        months.append(cursor)
-        cursor = _next_month(cursor)
-    return months
-
-
-def _finance_amount_for_categories(tenant_id, start_date, end_date, categories):
-    rows = (
-        db.session.query(
-            FinanceAccount.category,
-            FinanceJournalLine.entry_side,
-            func.sum(FinanceJournalLine.amount),
-        )
-        .join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
-        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
-        .filter(
-            FinanceJournalLine.tenant_id == tenant_id,
-            FinanceJournal.tenant_id == tenant_id,
-            FinanceJournal.status == FinanceJournalStatus.POSTED,
-            FinanceJournal.journal_date >= start_date,
-            FinanceJournal.journal_date <= end_date,
-            FinanceAccount.category.in_(categories),
-        )
-        .group_by(FinanceAccount.category, FinanceJournalLine.entry_side)
-        .all()
-    )
-    totals = {category: {'debit': 0, 'credit': 0} for category in categories}
-    for category, entry_side, amount in rows:
-        key = 'debit' if entry_side == FinanceEntrySide.DEBIT else 'credit'
-        totals[category][key] += int(amount or 0)
-    return totals
-
-
-def _leadership_analytics_payload(tenant_id, period_key='14d'):
-    today = local_today()
-    period_key, period_label, period_start, period_end, period_options = _leadership_period(period_key)
-    start_utc, end_utc = local_day_bounds_utc_naive()
-
-    total_students = (
-        Student.query.join(User, Student.user_id == User.id)
-        .filter(Student.is_deleted.is_(False), User.tenant_id == tenant_id)
-        .count()
-    )
-    total_teachers = (
-        Teacher.query.join(User, Teacher.user_id == User.id)
-        .filter(Teacher.is_deleted.is_(False), User.tenant_id == tenant_id)
-        .count()
-    )
-    total_staff = (
-        Staff.query.join(User, Staff.user_id == User.id)
-        .filter(Staff.is_deleted.is_(False), User.tenant_id == tenant_id)
-        .count()
-    )
-
-    income_today = (
-        db.session.query(func.sum(Transaction.amount))
-        .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Transaction.date >= start_utc,
-            Transaction.date < end_utc,
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .scalar()
-        or 0
-    )
-    receivable_total = (
-        db.session.query(func.sum(Invoice.total_amount - Invoice.paid_amount))
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-            Invoice.status != PaymentStatus.PAID,
-        )
-        .scalar()
-        or 0
-    )
-
-    finance_totals = _finance_amount_for_categories(
-        tenant_id,
-        period_start,
-        period_end,
-        [FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE],
-    )
-    monthly_revenue = (
-        finance_totals[FinanceAccountCategory.REVENUE]['credit']
-        - finance_totals[FinanceAccountCategory.REVENUE]['debit']
-    )
-    monthly_expense = (
-        finance_totals[FinanceAccountCategory.EXPENSE]['debit']
-        - finance_totals[FinanceAccountCategory.EXPENSE]['credit']
-    )
-
-    attendance_counts = {
-        status.value: Attendance.query.join(Student, Student.id == Attendance.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Attendance.date == today,
-            Attendance.status == status,
-            Attendance.student_id.isnot(None),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .count()
-        for status in AttendanceStatus
-    }
-    attendance_total = sum(attendance_counts.values())
-    attendance_present = attendance_counts.get(AttendanceStatus.HADIR.value, 0)
-    attendance_rate = round((attendance_present / attendance_total) * 100, 1) if attendance_total else 0
-
-    attendance_trend_rows = (
-        db.session.query(Attendance.date, Attendance.status, func.count(Attendance.id))
-        .join(Student, Student.id == Attendance.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Attendance.date >= period_start,
-            Attendance.date <= period_end,
-            Attendance.student_id.isnot(None),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .group_by(Attendance.date, Attendance.status)
-        .all()
-    )
-    attendance_by_day = {}
-    for day, status, count in attendance_trend_rows:
-        day_key = day.isoformat()
-        attendance_by_day.setdefault(day_key, {'total': 0, 'present': 0})
-        attendance_by_day[day_key]['total'] += int(count or 0)
-        if status == AttendanceStatus.HADIR:
-            attendance_by_day[day_key]['present'] += int(count or 0)
-    attendance_trend = []
-    for day in _date_series(period_start, period_end):
-        day_data = attendance_by_day.get(day.isoformat(), {'total': 0, 'present': 0})
-        rate = round((day_data['present'] / day_data['total']) * 100, 1) if day_data['total'] else 0
-        attendance_trend.append({
-            'label': _format_chart_date(day),
-            'present': day_data['present'],
-            'total': day_data['total'],
-            'rate': rate,
-        })
-
-    payment_rows = (
-        db.session.query(func.date(Transaction.date), func.sum(Transaction.amount))
-        .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Transaction.date >= datetime.combine(period_start, datetime.min.time()),
-            Transaction.date < datetime.combine(period_end + timedelta(days=1), datetime.min.time()),
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .group_by(func.date(Transaction.date))
-        .all()
-    )
-    payments_by_day = {str(day): int(amount or 0) for day, amount in payment_rows}
-    payment_trend = []
-    for day in _date_series(period_start, period_end):
-        payment_trend.append({
-            'label': _format_chart_date(day),
-            'amount': payments_by_day.get(day.isoformat(), 0),
-        })
-
-    finance_trend = []
-    for trend_month_start in _month_series(period_start, period_end):
-        trend_month_end = min(_next_month(trend_month_start) - timedelta(days=1), period_end)
-        trend_totals = _finance_amount_for_categories(
-            tenant_id,
-            max(trend_month_start, period_start),
-            min(trend_month_end, today),
-            [FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE],
-        )
-        revenue = (
-            trend_totals[FinanceAccountCategory.REVENUE]['credit']
-            - trend_totals[FinanceAccountCategory.REVENUE]['debit']
-        )
-        expense = (
-            trend_totals[FinanceAccountCategory.EXPENSE]['debit']
-            - trend_totals[FinanceAccountCategory.EXPENSE]['credit']
-        )
-        finance_trend.append({
-            'label': trend_month_start.strftime('%b %Y'),
-            'revenue': int(revenue),
-            'expense': int(expense),
-            'surplus': int(revenue - expense),
-        })
-
-    invoice_status_rows = (
-        db.session.query(
-            Invoice.status,
-            func.count(Invoice.id),
-            func.sum(Invoice.total_amount),
-            func.sum(Invoice.paid_amount),
-        )
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .group_by(Invoice.status)
-        .all()
-    )
-    invoice_status = []
-    for status, count, total_amount, paid_amount in invoice_status_rows:
-        total_amount = int(total_amount or 0)
-        paid_amount = int(paid_amount or 0)
-        invoice_status.append({
-            'label': status.value if status else '-',
-            'count': int(count or 0),
-            'total_amount': total_amount,
-            'paid_amount': paid_amount,
-            'outstanding_amount': max(total_amount - paid_amount, 0),
-        })
-
-    class_overview = []
-    for class_room in scoped_classrooms_query(tenant_id).order_by(ClassRoom.name.asc()).limit(8).all():
-        student_count = (
-            Student.query.join(User, Student.user_id == User.id)
-            .filter(
-                Student.current_class_id == class_room.id,
-                Student.is_deleted.is_(False),
-                User.tenant_id == tenant_id,
-            )
-            .count()
-        )
-        today_attendance = (
-            Attendance.query.join(Student, Student.id == Attendance.student_id)
-            .join(User, User.id == Student.user_id)
-            .filter(
-                Attendance.class_id == class_room.id,
-                Attendance.date == today,
-                Attendance.student_id.isnot(None),
-                Student.is_deleted.is_(False),
-                User.tenant_id == tenant_id,
-            )
-            .count()
-        )
-        class_overview.append({
-            'name': class_room.name,
-            'student_count': student_count,
-            'attendance_count': today_attendance,
-        })
-
-    ppdb_pending = StudentCandidate.query.filter_by(
-        tenant_id=tenant_id,
-        status=RegistrationStatus.PENDING,
-    ).count()
-    behavior_open = (
-        BehaviorReport.query.join(Student, Student.id == BehaviorReport.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            BehaviorReport.is_resolved.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .count()
-    )
-    behavior_rows = (
-        db.session.query(BehaviorReport.report_type, func.count(BehaviorReport.id))
-        .join(Student, Student.id == BehaviorReport.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            BehaviorReport.report_date >= period_start,
-            BehaviorReport.report_date <= period_end,
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .group_by(BehaviorReport.report_type)
-        .all()
-    )
-    behavior_summary = [
-        {
-            'label': report_type.value if report_type else '-',
-            'count': int(count or 0),
-        }
-        for report_type, count in behavior_rows
-    ]
-    ppdb_status_rows = (
-        db.session.query(StudentCandidate.status, func.count(StudentCandidate.id))
-        .filter(
-            StudentCandidate.tenant_id == tenant_id,
-            StudentCandidate.created_at >= datetime.combine(period_start, datetime.min.time()),
-            StudentCandidate.created_at < datetime.combine(period_end + timedelta(days=1), datetime.min.time()),
-        )
-        .group_by(StudentCandidate.status)
-        .all()
-    )
-    ppdb_status = [
-        {
-            'label': status.value if status else '-',
-            'count': int(count or 0),
-        }
-        for status, count in ppdb_status_rows
-    ]
-    draft_journals = FinanceJournal.query.filter_by(
-        tenant_id=tenant_id,
-        status=FinanceJournalStatus.DRAFT,
-    ).count()
-    period_today = FinancePeriod.query.filter(
-        FinancePeriod.tenant_id == tenant_id,
-        FinancePeriod.start_date <= today,
-        FinancePeriod.end_date >= today,
-    ).first()
-
-    recent_payments = (
-        Transaction.query.join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .order_by(Transaction.date.desc(), Transaction.id.desc())
-        .limit(5)
-        .all()
-    )
-
-    return {
-        'generated_at': local_now().strftime('%d/%m/%Y %H:%M:%S'),
-        'period': {
-            'key': period_key,
-            'label': period_label,
-            'start_date': period_start.isoformat(),
-            'end_date': period_end.isoformat(),
-            'options': period_options,
-        },
-        'cards': {
-            'students': total_students,
-            'teachers_staff': total_teachers + total_staff,
-            'attendance_rate': attendance_rate,
-            'income_today': int(income_today or 0),
-            'receivable_total': int(receivable_total or 0),
-            'monthly_surplus': int(monthly_revenue - monthly_expense),
-        },
-        'finance': {
-            'monthly_revenue': int(monthly_revenue),
-            'monthly_expense': int(monthly_expense),
-            'monthly_surplus': int(monthly_revenue - monthly_expense),
-            'draft_journals': draft_journals,
-            'period_status': period_today.status.value if period_today else 'BELUM ADA',
-        },
-        'attendance': {
-            'counts': attendance_counts,
-            'total': attendance_total,
-            'rate': attendance_rate,
-        },
-        'payment_trend': payment_trend,
-        'attendance_trend': attendance_trend,
-        'finance_trend': finance_trend,
-        'invoice_status': invoice_status,
-        'class_overview': class_overview,
-        'behavior_summary': behavior_summary,
-        'ppdb_status': ppdb_status,
-        'alerts': {
-            'ppdb_pending': ppdb_pending,
-            'behavior_open': behavior_open,
-            'draft_journals': draft_journals,
-            'period_status': period_today.status.value if period_today else 'BELUM ADA',
-        },
-        'recent_payments': [
-            {
-                'student': payment.invoice.student.full_name if payment.invoice and payment.invoice.student else '-',
-                'amount': int(payment.amount or 0),
-                'method': payment.method or '-',
-                'date': payment.date.strftime('%d/%m/%Y %H:%M') if payment.date else '-',
-            }
-            for payment in recent_payments
-        ],
-    }
-
-
 @admin_bp.route('/dashboard/pimpinan')
 @login_required
 @role_required(UserRole.PIMPINAN)
@@ -885,7 +442,7 @@ def leadership_dashboard():
     if tenant_id is None:
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('main.dashboard'))
-    payload = _leadership_analytics_payload(tenant_id, request.args.get('period'))
+    payload = leadership_dashboard_payload(tenant_id, request.args.get('period'))
     return render_template('admin/leadership_dashboard.html', analytics=payload)
 
 
@@ -896,7 +453,7 @@ def leadership_dashboard_data():
     tenant_id = _current_tenant_id()
     if tenant_id is None:
         return jsonify({'error': 'Tenant default tidak ditemukan.'}), 404
-    return jsonify(_leadership_analytics_payload(tenant_id, request.args.get('period')))
+    return jsonify(leadership_dashboard_payload(tenant_id, request.args.get('period')))
 
 
 def _leadership_detail_dates():
@@ -904,7 +461,7 @@ def _leadership_detail_dates():
     end_date = _parse_iso_date(request.args.get('end_date'))
     if start_date and end_date:
         return start_date, end_date
-    _, _, period_start, period_end, _ = _leadership_period(request.args.get('period'))
+    _, _, period_start, period_end, _ = leadership_period(request.args.get('period'))
     return start_date or period_start, end_date or period_end
 
 
@@ -924,14 +481,12 @@ def _leadership_attendance_detail(tenant_id, start_date, end_date):
     class_rows = (
         db.session.query(ClassRoom.id, ClassRoom.name, Attendance.status, func.count(Attendance.id))
         .join(Attendance, Attendance.class_id == ClassRoom.id)
-        .join(Student, Student.id == Attendance.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Attendance.tenant_id == tenant_id,
             Attendance.date >= start_date,
             Attendance.date <= end_date,
             Attendance.student_id.isnot(None),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Attendance.student_id),
         )
         .group_by(ClassRoom.id, ClassRoom.name, Attendance.status)
         .order_by(ClassRoom.name.asc(), Attendance.status.asc())
@@ -994,14 +549,12 @@ def _leadership_attendance_detail(tenant_id, start_date, end_date):
         row['total'] += int(count or 0)
 
     recent_records = (
-        Attendance.query.join(Student, Student.id == Attendance.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
+        Attendance.query.filter(
+            Attendance.tenant_id == tenant_id,
             Attendance.date >= start_date,
             Attendance.date <= end_date,
             Attendance.student_id.isnot(None),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Attendance.student_id),
         )
         .order_by(Attendance.date.desc(), Attendance.id.desc())
         .limit(100)
@@ -1023,15 +576,14 @@ def _leadership_attendance_detail(tenant_id, start_date, end_date):
                 Attendance.notes,
             )
             .join(Student, Student.id == Attendance.student_id)
-            .join(User, User.id == Student.user_id)
             .join(ClassRoom, ClassRoom.id == Attendance.class_id)
             .filter(
+                Attendance.tenant_id == tenant_id,
                 Attendance.date >= start_date,
                 Attendance.date <= end_date,
                 Attendance.status == status_filter,
                 Attendance.student_id.isnot(None),
                 Student.is_deleted.is_(False),
-                User.tenant_id == tenant_id,
             )
         )
         if selected_class:
@@ -1117,14 +669,12 @@ def _leadership_finance_detail(tenant_id, start_date, end_date):
     payment_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
     transactions = (
         Transaction.query.join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Transaction.tenant_id == tenant_id,
             Transaction.date >= payment_start,
             Transaction.date < payment_end,
             Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Invoice.student_id),
         )
         .order_by(Transaction.date.desc(), Transaction.id.desc())
         .limit(100)
@@ -1137,12 +687,10 @@ def _leadership_finance_detail(tenant_id, start_date, end_date):
             func.sum(Invoice.total_amount),
             func.sum(Invoice.paid_amount),
         )
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Invoice.tenant_id == tenant_id,
             Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Invoice.student_id),
         )
         .group_by(Invoice.status)
         .all()
@@ -1163,12 +711,7 @@ def _leadership_finance_detail(tenant_id, start_date, end_date):
         status_filter = _enum_from_request(PaymentStatus, request.args.get('status'))
         query = (
             Invoice.query.join(Student, Student.id == Invoice.student_id)
-            .join(User, User.id == Student.user_id)
-            .filter(
-                Invoice.is_deleted.is_(False),
-                Student.is_deleted.is_(False),
-                User.tenant_id == tenant_id,
-            )
+            .filter(Invoice.tenant_id == tenant_id, Invoice.is_deleted.is_(False), Student.is_deleted.is_(False))
         )
         if status_filter:
             query = query.filter(Invoice.status == status_filter)
@@ -1182,7 +725,7 @@ def _leadership_finance_detail(tenant_id, start_date, end_date):
         account = FinanceAccount.query.filter_by(id=account_id, tenant_id=tenant_id).first() if account_id else None
         if account:
             rows = (
-                _posted_finance_lines_query(tenant_id, start_date, end_date)
+                posted_lines_query(tenant_id, start_date, end_date)
                 .filter(FinanceJournalLine.account_id == account.id)
                 .order_by(FinanceJournal.journal_date.desc(), FinanceJournalLine.id.desc())
                 .limit(300)
@@ -1436,6 +979,7 @@ def manage_app_config():
                 'Nama Mudir yang dicetak pada tanda tangan raport.',
             )
             db.session.commit()
+            invalidate_tenant_snapshot(tenant_id)
             flash('Format raport tenant berhasil disimpan.', 'success')
             return redirect(url_for('admin.manage_app_config'))
 
@@ -1467,6 +1011,7 @@ def manage_app_config():
                 _upsert_tenant_config(tenant_id, BRAND_LOGO_KEY, logo_path, 'Path logo tenant di folder static.')
 
             db.session.commit()
+            invalidate_tenant_snapshot(tenant_id)
             flash('Branding lembaga tersimpan.', 'success')
             return redirect(url_for('admin.manage_app_config'))
 
@@ -1483,6 +1028,7 @@ def manage_app_config():
             db.session.add(new_config)
 
         db.session.commit()
+        invalidate_tenant_snapshot(tenant_id)
         flash('Konfigurasi tersimpan.', 'success')
         return redirect(url_for('admin.manage_app_config'))
 
@@ -1775,7 +1321,7 @@ def _create_report_score_adjustment(student, class_room, academic_year, subject,
 @login_required
 @role_required(UserRole.ADMIN)
 def report_score_adjustment_template():
-    return _xlsx_response(
+    return xlsx_stream_response(
         'template_adjustment_nilai_raport.xlsx',
         'Adjustment Nilai',
         [
@@ -1819,6 +1365,29 @@ def report_score_adjustment_template():
     )
 
 
+@admin_bp.route('/akademik/leger-nilai')
+@login_required
+@role_required(UserRole.ADMIN, UserRole.PIMPINAN)
+def grade_recap():
+    tenant_id = _current_tenant_id()
+    if tenant_id is None:
+        flash('Tenant default tidak ditemukan.', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    class_options = scoped_classrooms_query(tenant_id).order_by(ClassRoom.name.asc()).all()
+    if not class_options:
+        flash('Belum ada kelas untuk ditampilkan di leger nilai.', 'warning')
+        return redirect(url_for('main.dashboard'))
+    selected_class_id = request.args.get('class_id', type=int) or class_options[0].id
+    selected_class = next((item for item in class_options if item.id == selected_class_id), class_options[0])
+    return render_grade_recap_page(
+        selected_class,
+        tenant_id=tenant_id,
+        template_name='admin/academic/grade_recap.html',
+        class_options=class_options,
+    )
+
+
 @admin_bp.route('/akademik/adjustment-raport', methods=['GET', 'POST'])
 @login_required
 @role_required(UserRole.ADMIN)
@@ -1873,88 +1442,90 @@ def manage_report_score_adjustments():
             created = 0
             skipped = 0
             errors = []
-            for idx, row in _iter_upload_rows(file):
-                if not any((value or '').strip() for value in row.values()):
-                    continue
-
-                student, error = _resolve_adjustment_student(row, tenant_id)
-                if error:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: {error}')
-                    continue
-
-                academic_year, error = _resolve_adjustment_academic_year(row)
-                if error:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: {error}')
-                    continue
-
-                class_room, error = _resolve_adjustment_class(row, tenant_id, student)
-                if error:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: {error}')
-                    continue
-
-                source_type = normalize_report_adjustment_source(
-                    _row_value(row, 'jenis_nilai', 'source_type', 'tipe_nilai') or REPORT_ADJUSTMENT_SOURCE_ACADEMIC
-                )
-                if not source_type:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: Jenis nilai harus ACADEMIC, TAHFIDZ, atau TAHFIDZ_EVALUATION.')
-                    continue
+            try:
+                for idx, row in iter_upload_rows(file):
+                    student, error = _resolve_adjustment_student(row, tenant_id)
+                    if error:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: {error}')
+                        continue
 
-                if source_type == REPORT_ADJUSTMENT_SOURCE_ACADEMIC:
-                    subject, error = _resolve_adjustment_subject(row)
+                    academic_year, error = _resolve_adjustment_academic_year(row)
                     if error:
                         skipped += 1
                         errors.append(f'Baris {idx}: {error}')
                         continue
-                else:
-                    subject = None
-
-                adjusted_score_raw = _row_value(row, 'nilai_adjustment', 'adjusted_score', 'nilai', 'nilai_akhir')
-                approval_reference = _row_value(row, 'nomor_dokumen', 'approval_reference', 'dokumen', 'no_dokumen')
-                reason = _row_value(row, 'alasan', 'reason', 'keterangan')
-
-                if not approval_reference or not reason:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: Nomor dokumen dan alasan wajib diisi.')
-                    continue
-
-                try:
-                    adjusted_score = round(float(adjusted_score_raw.replace(',', '.')), 2)
-                except (AttributeError, ValueError):
-                    skipped += 1
-                    errors.append(f'Baris {idx}: Nilai adjustment harus berupa angka.')
-                    continue
-                if adjusted_score < 0 or adjusted_score > 100:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: Nilai adjustment harus berada pada rentang 0 sampai 100.')
-                    continue
-
-                try:
-                    with db.session.begin_nested():
-                        _create_report_score_adjustment(
-                            student=student,
-                            class_room=class_room,
-                            academic_year=academic_year,
-                            subject=subject,
-                            adjusted_score=adjusted_score,
-                            approval_reference=approval_reference,
-                            reason=reason,
-                            tenant_id=tenant_id,
-                            source_type=source_type,
-                        )
-                        created += 1
-                except Exception as exc:
-                    skipped += 1
-                    errors.append(f'Baris {idx}: {exc}')
 
-            db.session.commit()
-            flash(f'Upload adjustment selesai. Berhasil: {created}, Dilewati: {skipped}.', 'success')
-            if errors:
-                flash('Contoh error: ' + '; '.join(errors[:5]), 'warning')
-            return redirect(url_for('admin.manage_report_score_adjustments'))
+                    class_room, error = _resolve_adjustment_class(row, tenant_id, student)
+                    if error:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: {error}')
+                        continue
+
+                    source_type = normalize_report_adjustment_source(
+                        _row_value(row, 'jenis_nilai', 'source_type', 'tipe_nilai') or REPORT_ADJUSTMENT_SOURCE_ACADEMIC
+                    )
+                    if not source_type:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: Jenis nilai harus ACADEMIC, TAHFIDZ, atau TAHFIDZ_EVALUATION.')
+                        continue
+
+                    if source_type == REPORT_ADJUSTMENT_SOURCE_ACADEMIC:
+                        subject, error = _resolve_adjustment_subject(row)
+                        if error:
+                            skipped += 1
+                            errors.append(f'Baris {idx}: {error}')
+                            continue
+                    else:
+                        subject = None
+
+                    adjusted_score_raw = _row_value(row, 'nilai_adjustment', 'adjusted_score', 'nilai', 'nilai_akhir')
+                    approval_reference = _row_value(row, 'nomor_dokumen', 'approval_reference', 'dokumen', 'no_dokumen')
+                    reason = _row_value(row, 'alasan', 'reason', 'keterangan')
+
+                    if not approval_reference or not reason:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: Nomor dokumen dan alasan wajib diisi.')
+                        continue
+
+                    try:
+                        adjusted_score = round(float(adjusted_score_raw.replace(',', '.')), 2)
+                    except (AttributeError, ValueError):
+                        skipped += 1
+                        errors.append(f'Baris {idx}: Nilai adjustment harus berupa angka.')
+                        continue
+                    if adjusted_score < 0 or adjusted_score > 100:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: Nilai adjustment harus berada pada rentang 0 sampai 100.')
+                        continue
+
+                    try:
+                        with db.session.begin_nested():
+                            _create_report_score_adjustment(
+                                student=student,
+                                class_room=class_room,
+                                academic_year=academic_year,
+                                subject=subject,
+                                adjusted_score=adjusted_score,
+                                approval_reference=approval_reference,
+                                reason=reason,
+                                tenant_id=tenant_id,
+                                source_type=source_type,
+                            )
+                            created += 1
+                    except Exception as exc:
+                        skipped += 1
+                        errors.append(f'Baris {idx}: {exc}')
+            except UploadLimitError as exc:
+                db.session.rollback()
+                flash(str(exc), 'warning')
+                return redirect(url_for('admin.manage_report_score_adjustments'))
+
+            db.session.commit()
+            flash(f'Upload adjustment selesai. Berhasil: {created}, Dilewati: {skipped}.', 'success')
+            if errors:
+                flash('Contoh error: ' + '; '.join(errors[:5]), 'warning')
+            return redirect(url_for('admin.manage_report_score_adjustments'))
 
         student_id = request.form.get('student_id', type=int)
         class_id = request.form.get('class_id', type=int) or None
@@ -2097,6 +1668,7 @@ def manage_tenants():
             if logo_path:
                 _upsert_tenant_config(tenant.id, BRAND_LOGO_KEY, logo_path, 'Path logo tenant di folder static.')
             db.session.commit()
+            invalidate_tenant_snapshot(tenant.id)
             flash(f'Tenant baru "{code}" berhasil dibuat.', 'success')
             return redirect(url_for('admin.manage_tenants'))
 
@@ -2203,6 +1775,7 @@ def manage_tenants():
             _upsert_tenant_config(tenant.id, BRAND_LOGO_KEY, logo_path, 'Path logo tenant di folder static.')
 
         db.session.commit()
+        invalidate_tenant_snapshot(tenant.id)
         flash(f'Konfigurasi tenant "{tenant.code}" berhasil diperbarui.', 'success')
         return redirect(url_for('admin.manage_tenants'))
 
@@ -2588,67 +2161,26 @@ def upload_teachers():
         flash('Format file harus CSV atau XLSX.', 'warning')
         return redirect(url_for('admin.manage_teachers'))
 
-    created = 0
-    skipped = 0
-    errors = []
     tenant_id = _current_tenant_id()
-
     if tenant_id is None:
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('admin.manage_teachers'))
 
-    for idx, row in _iter_upload_rows(file):
-        nip = (row.get('nip') or row.get('NIP') or '').strip()
-        full_name = (row.get('full_name') or row.get('nama') or row.get('nama_lengkap') or '').strip()
-        specialty = (row.get('specialty') or row.get('mapel') or '').strip()
-        phone = (row.get('phone') or row.get('no_hp') or row.get('whatsapp') or '').strip()
-        password = (row.get('password') or '').strip() or "guru123"
-
-        if not nip or not full_name:
-            skipped += 1
-            errors.append(f'Baris {idx}: NIP dan Nama wajib diisi.')
-            continue
-
-        existing_user = User.query.filter_by(username=nip).first()
-        if existing_user:
-            skipped += 1
-            if existing_user.tenant_id != tenant_id:
-                errors.append(f'Baris {idx}: NIP {nip} sudah dipakai tenant lain.')
-            else:
-                errors.append(f'Baris {idx}: NIP {nip} sudah terdaftar.')
-            continue
-
-        try:
-            with db.session.begin_nested():
-                user = User(
-                    tenant_id=tenant_id,
-                    username=nip,
-                    email=f"{nip}@sekolah.id",
-                    password_hash=generate_password_hash(password),
-                    role=UserRole.GURU,
-                    must_change_password=True
-                )
-                db.session.add(user)
-                db.session.flush()
-
-                teacher = Teacher(
-                    user_id=user.id,
-                    nip=nip,
-                    full_name=full_name,
-                    phone=phone,
-                    specialty=specialty
-                )
-                db.session.add(teacher)
-                created += 1
-        except Exception as exc:
-            skipped += 1
-            errors.append(f'Baris {idx}: {exc}')
+    try:
+        check_upload_size(upload_size(file))
+    except UploadLimitError as exc:
+        flash(str(exc), 'warning')
+        return redirect(url_for('admin.manage_teachers'))
 
-    db.session.commit()
-    flash(f'Upload guru selesai. Berhasil: {created}, Dilewati: {skipped}.', 'success')
-    if errors:
-        flash('Contoh error: ' + '; '.join(errors[:3]), 'warning')
-    return redirect(url_for('admin.manage_teachers'))
+    job = enqueue_job(
+        'import_teachers',
+        tenant_id=tenant_id,
+        created_by_user_id=current_user.id,
+        payload={'return_url': url_for('admin.manage_teachers')},
+        input_blob=file.read(),
+        input_filename=secure_filename(file.filename) or file.filename,
+    )
+    return redirect_to_job(job, 'Upload guru sedang diproses.')
 
 
 @admin_bp.route('/sdm/guru/edit/<int:id>', methods=['GET', 'POST'])
@@ -3310,103 +2842,22 @@ def list_students():
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('main.dashboard'))
 
-    query = (request.args.get('q') or '').strip()
+    query = normalize_student_search(request.args.get('q'))
     query_majlis = (request.args.get('q_majlis') or '').strip()
     active_category = (request.args.get('category') or 'all').strip().lower()
-    package = get_tenant_package(tenant_id)
-    if package == PACKAGE_SEKOLAH:
-        allowed_categories = {'all', 'sbq_sd', 'sbq_smp', 'sbq_sma', 'bahasa'}
-    elif package == PACKAGE_RUMAH_QURAN:
-        allowed_categories = {'all', 'reguler', 'takhosus', 'bahasa'}
-    else:
-        allowed_categories = {'all', 'sbq_sd', 'sbq_smp', 'sbq_sma', 'bahasa', 'reguler', 'takhosus'}
-    if active_category not in allowed_categories:
+    package = get_cached_tenant_package(tenant_id)
+    if active_category not in allowed_student_categories(package):
         active_category = 'all'
     if package == PACKAGE_SEKOLAH:
         query_majlis = ''
 
-    students_query = (
-        Student.query.join(User, Student.user_id == User.id)
-        .filter(
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .outerjoin(ClassRoom, Student.current_class_id == ClassRoom.id)
+    page = student_directory_page(
+        tenant_id,
+        search=query,
+        category=active_category,
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
     )
-
-    if query:
-        students_query = students_query.outerjoin(Parent, Student.parent_id == Parent.id).filter(
-            db.or_(
-                Student.full_name.ilike(f'%{query}%'),
-                Student.nis.ilike(f'%{query}%'),
-                Parent.full_name.ilike(f'%{query}%'),
-                Parent.phone.ilike(f'%{query}%'),
-                ClassRoom.name.ilike(f'%{query}%')
-            )
-        )
-
-    if active_category == 'sbq_sd':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SD
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%sd%'),
-                        ClassRoom.grade_level.in_([1, 2, 3, 4, 5, 6])
-                    )
-                )
-            )
-        )
-    elif active_category == 'sbq_smp':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SMP
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%smp%'),
-                        ClassRoom.grade_level.in_([7, 8, 9])
-                    )
-                )
-            )
-        )
-    elif active_category == 'sbq_sma':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SMA
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%sma%'),
-                        ClassRoom.grade_level.in_([10, 11, 12])
-                    )
-                )
-            )
-        )
-    elif active_category == 'reguler':
-        students_query = apply_rumah_quran_student_filter(students_query, track='reguler')
-    elif active_category == 'takhosus':
-        students_query = apply_rumah_quran_student_filter(students_query, track='takhosus')
-    elif active_category == 'bahasa':
-        students_query = apply_bahasa_student_filter(students_query)
-
-    students = students_query.order_by(Student.id.desc()).all()
-    bahasa_class_map = {}
-    if active_category == 'bahasa':
-        bahasa_class_map = {
-            student.id: get_student_bahasa_classroom(student)
-            for student in students
-        }
     majlis_participants = (
         []
         if package == PACKAGE_SEKOLAH
@@ -3415,8 +2866,9 @@ def list_students():
 
     return render_template(
         'student/list_students.html',
-        students=students,
-        bahasa_class_map=bahasa_class_map,
+        students=page.students,
+        page=page,
+        bahasa_class_map=page.bahasa_class_map,
         majlis_participants=majlis_participants,
         query=query,
         query_majlis=query_majlis,
@@ -3437,144 +2889,29 @@ def upload_students():
         flash('Format file harus CSV atau XLSX.', 'warning')
         return redirect(url_for('admin.list_students'))
 
-    created = 0
-    skipped = 0
-    errors = []
     tenant_id = _current_tenant_id()
-
     if tenant_id is None:
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('admin.list_students'))
 
-    for idx, row in _iter_upload_rows(file):
-        nis = (row.get('nis') or row.get('NIS') or '').strip()
-        full_name = (row.get('full_name') or row.get('nama') or row.get('nama_lengkap') or '').strip()
-        gender_raw = (row.get('gender') or row.get('jk') or row.get('jenis_kelamin') or '').strip().upper()
-        class_name = (row.get('class') or row.get('kelas') or row.get('class_name') or '').strip()
-        place_of_birth = (row.get('place_of_birth') or row.get('tempat_lahir') or '').strip()
-        date_of_birth = (row.get('date_of_birth') or row.get('tanggal_lahir') or '').strip()
-        address = (row.get('address') or row.get('alamat') or '').strip()
-        email = (row.get('email') or '').strip()
-        parent_name = (row.get('parent_name') or row.get('nama_wali') or '').strip()
-        parent_phone = (row.get('parent_phone') or row.get('no_wa') or row.get('no_hp_wali') or '').strip()
-        parent_job = (row.get('parent_job') or row.get('pekerjaan_wali') or '').strip()
-
-        if not full_name:
-            skipped += 1
-            errors.append(f'Baris {idx}: Nama wajib diisi.')
-            continue
-
-        if not parent_phone:
-            skipped += 1
-            errors.append(f'Baris {idx}: Nomor HP wali wajib diisi.')
-            continue
-
-        if not nis:
-            nis = generate_nis()
-
-        existing_student_user = User.query.filter_by(username=nis).first()
-        if existing_student_user:
-            skipped += 1
-            if existing_student_user.tenant_id != tenant_id:
-                errors.append(f'Baris {idx}: NIS {nis} sudah dipakai tenant lain.')
-            else:
-                errors.append(f'Baris {idx}: NIS {nis} sudah terdaftar.')
-            continue
-
-        if gender_raw not in {'L', 'P'}:
-            skipped += 1
-            errors.append(f'Baris {idx}: Gender harus L atau P.')
-            continue
-
-        try:
-            dob = datetime.strptime(date_of_birth, '%Y-%m-%d').date()
-        except ValueError:
-            skipped += 1
-            errors.append(f'Baris {idx}: Tanggal lahir harus YYYY-MM-DD.')
-            continue
-
-        class_id = None
-        if class_name:
-            class_room = scoped_classrooms_query(tenant_id).filter(ClassRoom.name == class_name).first()
-            if class_room:
-                class_id = class_room.id
-
-        try:
-            with db.session.begin_nested():
-                student_user = User(
-                    tenant_id=tenant_id,
-                    username=nis,
-                    email=email or f"{nis}@sekolah.id",
-                    role=UserRole.SISWA
-                )
-                student_user.set_password("123456")
-                db.session.add(student_user)
-                db.session.flush()
-
-                new_student = Student(
-                    user_id=student_user.id,
-                    nis=nis,
-                    full_name=full_name,
-                    gender=Gender[gender_raw],
-                    place_of_birth=place_of_birth,
-                    date_of_birth=dob,
-                    current_class_id=class_id,
-                    address=address
-                )
-                db.session.add(new_student)
-
-                parent_user = User.query.filter_by(username=parent_phone).first()
-                if not parent_user:
-                    parent_user = User(
-                        tenant_id=tenant_id,
-                        username=parent_phone,
-                        email=f"{parent_phone}@wali.sekolah.id",
-                        role=UserRole.WALI_MURID
-                    )
-                    parent_user.set_password(parent_phone)
-                    db.session.add(parent_user)
-                    db.session.flush()
-                elif parent_user.tenant_id != tenant_id:
-                    raise ValueError('Nomor HP wali sudah terdaftar pada tenant lain.')
-
-                if parent_user.tenant_id is None:
-                    parent_user.tenant_id = tenant_id
-
-                if not parent_user.has_role(UserRole.WALI_MURID):
-                    db.session.add(UserRoleAssignment(user_id=parent_user.id, role=UserRole.WALI_MURID))
-
-                if parent_user.role == UserRole.ADMIN:
-                    raise ValueError('Akun admin tidak boleh dipakai sebagai wali murid.')
-
-                if parent_user.role != UserRole.WALI_MURID:
-                    parent_user.role = UserRole.WALI_MURID
-
-                db.session.flush()
-
-                parent_profile = parent_user.parent_profile
-                if not parent_profile:
-                    parent_profile = Parent(
-                        user_id=parent_user.id,
-                        full_name=parent_name or "Wali Murid",
-                        phone=parent_phone,
-                        job=parent_job,
-                        address=address
-                    )
-                    db.session.add(parent_profile)
-                    db.session.flush()
-
-                new_student.parent_id = parent_profile.id
-
-                created += 1
-        except Exception as exc:
-            skipped += 1
-            errors.append(f'Baris {idx}: {exc}')
+    try:
+        check_upload_size(upload_size(file))
+    except UploadLimitError as exc:
+        flash(str(exc), 'warning')
+        return redirect(url_for('admin.list_students'))
 
-    db.session.commit()
-    flash(f'Upload siswa selesai. Berhasil: {created}, Dilewati: {skipped}.', 'success')
-    if errors:
-        flash('Contoh error: ' + '; '.join(errors[:3]), 'warning')
-    return redirect(url_for('admin.list_students'))
+    validate_only = request.form.get('validate_only') == '1'
+    job = enqueue_job(
+        'import_students',
+        tenant_id=tenant_id,
+        created_by_user_id=current_user.id,
+        payload={'return_url': url_for('admin.list_students'), 'validate_only': validate_only},
+        input_blob=file.read(),
+        input_filename=secure_filename(file.filename) or file.filename,
+    )
+    if validate_only:
+        return redirect_to_job(job, 'Validasi file siswa sedang diproses.')
+    return redirect_to_job(job, 'Upload siswa sedang diproses.')
 
 
 @admin_bp.route('/student/hapus/<int:id>')
@@ -3715,6 +3052,7 @@ def manage_finance_settings():
             settings.default_registration_revenue_account_id = request.form.get('default_registration_revenue_account_id', type=int) or None
             settings.default_savings_liability_account_id = request.form.get('default_savings_liability_account_id', type=int) or None
             settings.default_donation_revenue_account_id = request.form.get('default_donation_revenue_account_id', type=int) or None
+            settings.gapless_journal_numbers = bool(request.form.get('gapless_journal_numbers'))
 
             if settings.default_cash_bank_account_id:
                 cash_bank = FinanceCashBankAccount.query.filter_by(
@@ -4090,22 +3428,7 @@ def finance_journals():
     end_date = _parse_iso_date(request.args.get('end_date'))
     query_text = (request.args.get('q') or '').strip()
 
-    journals_query = FinanceJournal.query.filter_by(tenant_id=tenant_id)
-    if status_filter and status_filter in FinanceJournalStatus.__members__:
-        journals_query = journals_query.filter(FinanceJournal.status == FinanceJournalStatus[status_filter])
-    if source_filter and source_filter in FinanceJournalSourceType.__members__:
-        journals_query = journals_query.filter(FinanceJournal.source_type == FinanceJournalSourceType[source_filter])
-    if start_date:
-        journals_query = journals_query.filter(FinanceJournal.journal_date >= start_date)
-    if end_date:
-        journals_query = journals_query.filter(FinanceJournal.journal_date <= end_date)
-    if query_text:
-        journals_query = journals_query.filter(
-            or_(
-                FinanceJournal.journal_no.ilike(f'%{query_text}%'),
-                FinanceJournal.description.ilike(f'%{query_text}%'),
-            )
-        )
+    journals_query = _filter_finance_journals_from_request(FinanceJournal.query.filter_by(tenant_id=tenant_id))
 
     journals = journals_query.order_by(
         FinanceJournal.journal_date.desc(),
@@ -4125,22 +3448,17 @@ def finance_journals():
     )
 
 
-@admin_bp.route('/keuangan/jurnal/export')
-@login_required
-@role_required(UserRole.TU)
-def finance_journals_export():
-    tenant_id = _current_tenant_id()
-    if tenant_id is None:
-        flash('Tenant default tidak ditemukan.', 'danger')
-        return redirect(url_for('main.dashboard'))
+FINANCE_JOURNAL_EXPORT_HEADER = ['Tanggal', 'No Jurnal', 'Status', 'Source Type', 'Source ID', 'Deskripsi', 'Dibuat Oleh', 'Disetujui Oleh', 'Posted At']
+FINANCE_EXPORT_BATCH_SIZE = 500
 
+
+def _filter_finance_journals_from_request(journals_query):
     status_filter = (request.args.get('status') or '').strip().upper()
     source_filter = (request.args.get('source_type') or '').strip().upper()
     start_date = _parse_iso_date(request.args.get('start_date'))
     end_date = _parse_iso_date(request.args.get('end_date'))
     query_text = (request.args.get('q') or '').strip()
 
-    journals_query = FinanceJournal.query.filter_by(tenant_id=tenant_id)
     if status_filter and status_filter in FinanceJournalStatus.__members__:
         journals_query = journals_query.filter(FinanceJournal.status == FinanceJournalStatus[status_filter])
     if source_filter and source_filter in FinanceJournalSourceType.__members__:
@@ -4156,26 +3474,61 @@ def finance_journals_export():
                 FinanceJournal.description.ilike(f'%{query_text}%'),
             )
         )
+    return journals_query
 
-    journals = journals_query.order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc()).all()
-    rows = [
-        [
-            journal.journal_date,
-            journal.journal_no,
-            journal.status.value,
-            journal.source_type.value if journal.source_type else '',
-            journal.source_id or '',
-            journal.description or '',
-            journal.created_by.full_name if journal.created_by else '',
-            journal.approved_by.full_name if journal.approved_by else '',
-            journal.posted_at.strftime('%Y-%m-%d %H:%M:%S') if journal.posted_at else '',
+
+def _finance_journal_export_rows(tenant_id):
+    created_by = aliased(User)
+    approved_by = aliased(User)
+    journals_query = (
+        db.session.query(
+            FinanceJournal.journal_date,
+            FinanceJournal.journal_no,
+            FinanceJournal.status,
+            FinanceJournal.source_type,
+            FinanceJournal.source_id,
+            FinanceJournal.description,
+            created_by.username,
+            approved_by.username,
+            FinanceJournal.posted_at,
+        )
+        .outerjoin(created_by, created_by.id == FinanceJournal.created_by_user_id)
+        .outerjoin(approved_by, approved_by.id == FinanceJournal.approved_by_user_id)
+        .filter(FinanceJournal.tenant_id == tenant_id)
+    )
+    journals_query = _filter_finance_journals_from_request(journals_query)
+    rows = (
+        journals_query
+        .order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc())
+        .yield_per(FINANCE_EXPORT_BATCH_SIZE)
+    )
+    for journal_date, journal_no, status, source_type, source_id, description, created_by_name, approved_by_name, posted_at in rows:
+        yield [
+            journal_date,
+            journal_no,
+            status.value,
+            source_type.value if source_type else '',
+            source_id or '',
+            description or '',
+            created_by_name or '',
+            approved_by_name or '',
+            posted_at.strftime('%Y-%m-%d %H:%M:%S') if posted_at else '',
         ]
-        for journal in journals
-    ]
-    return _csv_response(
+
+
+@admin_bp.route('/keuangan/jurnal/export')
+@login_required
+@role_required(UserRole.TU)
+def finance_journals_export():
+    tenant_id = _current_tenant_id()
+    if tenant_id is None:
+        flash('Tenant default tidak ditemukan.', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    return csv_stream_response(
         'finance_jurnal_umum.csv',
-        ['Tanggal', 'No Jurnal', 'Status', 'Source Type', 'Source ID', 'Deskripsi', 'Dibuat Oleh', 'Disetujui Oleh', 'Posted At'],
-        rows,
+        FINANCE_JOURNAL_EXPORT_HEADER,
+        _finance_journal_export_rows(tenant_id),
     )
 
 
@@ -4188,48 +3541,11 @@ def finance_journals_export_xlsx():
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('main.dashboard'))
 
-    status_filter = (request.args.get('status') or '').strip().upper()
-    source_filter = (request.args.get('source_type') or '').strip().upper()
-    start_date = _parse_iso_date(request.args.get('start_date'))
-    end_date = _parse_iso_date(request.args.get('end_date'))
-    query_text = (request.args.get('q') or '').strip()
-
-    journals_query = FinanceJournal.query.filter_by(tenant_id=tenant_id)
-    if status_filter and status_filter in FinanceJournalStatus.__members__:
-        journals_query = journals_query.filter(FinanceJournal.status == FinanceJournalStatus[status_filter])
-    if source_filter and source_filter in FinanceJournalSourceType.__members__:
-        journals_query = journals_query.filter(FinanceJournal.source_type == FinanceJournalSourceType[source_filter])
-    if start_date:
-        journals_query = journals_query.filter(FinanceJournal.journal_date >= start_date)
-    if end_date:
-        journals_query = journals_query.filter(FinanceJournal.journal_date <= end_date)
-    if query_text:
-        journals_query = journals_query.filter(
-            or_(
-                FinanceJournal.journal_no.ilike(f'%{query_text}%'),
-                FinanceJournal.description.ilike(f'%{query_text}%'),
-            )
-        )
-
-    rows = [
-        [
-            journal.journal_date,
-            journal.journal_no,
-            journal.status.value,
-            journal.source_type.value if journal.source_type else '',
-            journal.source_id or '',
-            journal.description or '',
-            journal.created_by.full_name if journal.created_by else '',
-            journal.approved_by.full_name if journal.approved_by else '',
-            journal.posted_at.strftime('%Y-%m-%d %H:%M:%S') if journal.posted_at else '',
-        ]
-        for journal in journals_query.order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc()).all()
-    ]
-    return _xlsx_response(
+    return xlsx_stream_response(
         'finance_jurnal_umum.xlsx',
         'Jurnal Umum',
-        ['Tanggal', 'No Jurnal', 'Status', 'Source Type', 'Source ID', 'Deskripsi', 'Dibuat Oleh', 'Disetujui Oleh', 'Posted At'],
-        rows,
+        FINANCE_JOURNAL_EXPORT_HEADER,
+        _finance_journal_export_rows(tenant_id),
     )
 
 
@@ -4319,57 +3635,6 @@ def _default_report_dates():
     return date(today.year, today.month, 1), today
 
 
-def _posted_finance_lines_query(tenant_id, start_date, end_date):
-    query = (
-        FinanceJournalLine.query
-        .join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
-        .filter(
-            FinanceJournalLine.tenant_id == tenant_id,
-            FinanceJournal.tenant_id == tenant_id,
-            FinanceJournal.status == FinanceJournalStatus.POSTED,
-        )
-    )
-    if start_date:
-        query = query.filter(FinanceJournal.journal_date >= start_date)
-    if end_date:
-        query = query.filter(FinanceJournal.journal_date <= end_date)
-    return query
-
-
-def _csv_response(filename, header, rows):
-    output = StringIO()
-    output.write('\ufeff')
-    writer = csv.writer(output)
-    writer.writerow(header)
-    writer.writerows(rows)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv; charset=utf-8',
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
-    )
-
-
-def _xlsx_response(filename, sheet_title, header, rows):
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = sheet_title[:31]
-    worksheet.append(header)
-    for row in rows:
-        worksheet.append(row)
-    for column_cells in worksheet.columns:
-        max_length = max(len(str(cell.value or '')) for cell in column_cells)
-        worksheet.column_dimensions[column_cells[0].column_letter].width = min(max(max_length + 2, 12), 40)
-
-    output = BytesIO()
-    workbook.save(output)
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
-    )
-
-
 def _report_signers_from_request():
     return [
         {
@@ -4383,207 +3648,32 @@ def _report_signers_from_request():
     ]
 
 
+def _finance_report_once(report_name, builder, *args):
+    """Hitung laporan sekali per request untuk kombinasi parameter yang sama (halaman, export, print)."""
+    if not has_request_context():
+        return builder(*args)
+    reports = g.setdefault('_finance_reports', {})
+    key = (report_name,) + args
+    if key not in reports:
+        reports[key] = builder(*args)
+    return reports[key]
+
+
 def _trial_balance_data(tenant_id, start_date, end_date):
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'ending_debit': 0,
-            'ending_credit': 0,
-        }
-        for account in FinanceAccount.query.filter_by(tenant_id=tenant_id).order_by(FinanceAccount.code.asc()).all()
-    }
-    for line in _posted_finance_lines_query(tenant_id, start_date, end_date).all():
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
-
-    report_rows = []
-    total_debit = 0
-    total_credit = 0
-    for row in rows_by_account_id.values():
-        balance = row['debit_total'] - row['credit_total']
-        if balance > 0:
-            row['ending_debit'] = balance
-            total_debit += balance
-        elif balance < 0:
-            row['ending_credit'] = abs(balance)
-            total_credit += abs(balance)
-        if row['debit_total'] or row['credit_total']:
-            report_rows.append(row)
-    return report_rows, total_debit, total_credit
+    return _finance_report_once('trial_balance', trial_balance_report, tenant_id, start_date, end_date)
 
 
 def _income_statement_data(tenant_id, start_date, end_date):
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'amount': 0,
-        }
-        for account in FinanceAccount.query.filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-        ).order_by(FinanceAccount.code.asc()).all()
-    }
-    lines = (
-        _posted_finance_lines_query(tenant_id, start_date, end_date)
-        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
-        .filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-        )
-        .all()
-    )
-    for line in lines:
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
-
-    revenue_rows = []
-    expense_rows = []
-    total_revenue = 0
-    total_expense = 0
-    for row in rows_by_account_id.values():
-        account = row['account']
-        if account.category == FinanceAccountCategory.REVENUE:
-            row['amount'] = row['credit_total'] - row['debit_total']
-            if row['amount']:
-                total_revenue += row['amount']
-                revenue_rows.append(row)
-        elif account.category == FinanceAccountCategory.EXPENSE:
-            row['amount'] = row['debit_total'] - row['credit_total']
-            if row['amount']:
-                total_expense += row['amount']
-                expense_rows.append(row)
-    return revenue_rows, expense_rows, total_revenue, total_expense, total_revenue - total_expense
+    return _finance_report_once('income_statement', income_statement_report, tenant_id, start_date, end_date)
 
 
 def _financial_position_data(tenant_id, as_of_date):
-    balance_categories = [
-        FinanceAccountCategory.ASSET,
-        FinanceAccountCategory.LIABILITY,
-        FinanceAccountCategory.EQUITY,
-    ]
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'amount': 0,
-        }
-        for account in FinanceAccount.query.filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_(balance_categories),
-        ).order_by(FinanceAccount.code.asc()).all()
-    }
-
-    lines = (
-        _posted_finance_lines_query(tenant_id, None, as_of_date)
-        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
-        .filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_(balance_categories),
-        )
-        .all()
-    )
-    for line in lines:
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
-
-    asset_rows = []
-    liability_rows = []
-    equity_rows = []
-    total_assets = 0
-    total_liabilities = 0
-    total_equity = 0
-    for row in rows_by_account_id.values():
-        account = row['account']
-        if account.category == FinanceAccountCategory.ASSET:
-            row['amount'] = row['debit_total'] - row['credit_total']
-            if row['amount']:
-                total_assets += row['amount']
-                asset_rows.append(row)
-        elif account.category == FinanceAccountCategory.LIABILITY:
-            row['amount'] = row['credit_total'] - row['debit_total']
-            if row['amount']:
-                total_liabilities += row['amount']
-                liability_rows.append(row)
-        elif account.category == FinanceAccountCategory.EQUITY:
-            row['amount'] = row['credit_total'] - row['debit_total']
-            if row['amount']:
-                total_equity += row['amount']
-                equity_rows.append(row)
-
     _, _, _, _, net_income = _income_statement_data(tenant_id, None, as_of_date)
-    if net_income:
-        total_equity += net_income
-        equity_rows.append({
-            'account': None,
-            'code': 'LR-BERJALAN',
-            'name': 'Laba/Rugi Berjalan',
-            'amount': net_income,
-        })
-
-    return {
-        'asset_rows': asset_rows,
-        'liability_rows': liability_rows,
-        'equity_rows': equity_rows,
-        'total_assets': total_assets,
-        'total_liabilities': total_liabilities,
-        'total_equity': total_equity,
-        'net_income': net_income,
-        'total_liabilities_equity': total_liabilities + total_equity,
-    }
+    return _finance_report_once('financial_position', financial_position_report, tenant_id, as_of_date, net_income)
 
 
 def _ledger_data(tenant_id, selected_account, start_date, end_date):
-    opening_debit = 0
-    opening_credit = 0
-    for line in _posted_finance_lines_query(tenant_id, None, start_date - timedelta(days=1)).filter(
-        FinanceJournalLine.account_id == selected_account.id,
-    ).all():
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            opening_debit += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            opening_credit += amount
-
-    running_balance = opening_debit - opening_credit
-    ledger_rows = []
-    period_lines = (
-        _posted_finance_lines_query(tenant_id, start_date, end_date)
-        .filter(FinanceJournalLine.account_id == selected_account.id)
-        .order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc(), FinanceJournalLine.id.asc())
-        .all()
-    )
-    for line in period_lines:
-        debit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.DEBIT else 0
-        credit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.CREDIT else 0
-        running_balance += debit - credit
-        ledger_rows.append({'line': line, 'debit': debit, 'credit': credit, 'balance': running_balance})
-
-    closing_debit = running_balance if running_balance >= 0 else 0
-    closing_credit = abs(running_balance) if running_balance < 0 else 0
-    return opening_debit, opening_credit, ledger_rows, closing_debit, closing_credit
+    return _finance_report_once('ledger', ledger_report, tenant_id, selected_account, start_date, end_date)
 
 
 @admin_bp.route('/keuangan/laporan/neraca-saldo')
@@ -4599,44 +3689,7 @@ def finance_trial_balance():
     start_date = _parse_iso_date(request.args.get('start_date')) or default_start
     end_date = _parse_iso_date(request.args.get('end_date')) or default_end
 
-    accounts = FinanceAccount.query.filter_by(
-        tenant_id=tenant_id,
-    ).order_by(FinanceAccount.code.asc()).all()
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'ending_debit': 0,
-            'ending_credit': 0,
-        }
-        for account in accounts
-    }
-
-    lines = _posted_finance_lines_query(tenant_id, start_date, end_date).all()
-    for line in lines:
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
-
-    report_rows = []
-    total_debit = 0
-    total_credit = 0
-    for row in rows_by_account_id.values():
-        balance = row['debit_total'] - row['credit_total']
-        if balance > 0:
-            row['ending_debit'] = balance
-            total_debit += balance
-        elif balance < 0:
-            row['ending_credit'] = abs(balance)
-            total_credit += abs(balance)
-        if row['debit_total'] or row['credit_total']:
-            report_rows.append(row)
+    report_rows, total_debit, total_credit = _trial_balance_data(tenant_id, start_date, end_date)
 
     return render_template(
         'admin/finance/trial_balance.html',
@@ -4661,47 +3714,13 @@ def finance_trial_balance_export():
     start_date = _parse_iso_date(request.args.get('start_date')) or default_start
     end_date = _parse_iso_date(request.args.get('end_date')) or default_end
 
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'ending_debit': 0,
-            'ending_credit': 0,
-        }
-        for account in FinanceAccount.query.filter_by(tenant_id=tenant_id).order_by(FinanceAccount.code.asc()).all()
-    }
-
-    for line in _posted_finance_lines_query(tenant_id, start_date, end_date).all():
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
+    report_rows, _, _ = _trial_balance_data(tenant_id, start_date, end_date)
+    rows = [
+        [start_date, end_date, row['account'].code, row['account'].name, row['account'].category.value, row['ending_debit'], row['ending_credit']]
+        for row in report_rows
+    ]
 
-    rows = []
-    for row in rows_by_account_id.values():
-        balance = row['debit_total'] - row['credit_total']
-        if balance > 0:
-            row['ending_debit'] = balance
-        elif balance < 0:
-            row['ending_credit'] = abs(balance)
-        if row['debit_total'] or row['credit_total']:
-            account = row['account']
-            rows.append([
-                start_date,
-                end_date,
-                account.code,
-                account.name,
-                account.category.value,
-                row['ending_debit'],
-                row['ending_credit'],
-            ])
-
-    return _csv_response(
+    return csv_stream_response(
         'finance_neraca_saldo.csv',
         ['Mulai', 'Selesai', 'Kode Akun', 'Nama Akun', 'Kategori', 'Debit', 'Credit'],
         rows,
@@ -4724,7 +3743,7 @@ def finance_trial_balance_export_xlsx():
         [start_date, end_date, row['account'].code, row['account'].name, row['account'].category.value, row['ending_debit'], row['ending_credit']]
         for row in report_rows
     ]
-    return _xlsx_response(
+    return xlsx_stream_response(
         'finance_neraca_saldo.xlsx',
         'Neraca Saldo',
         ['Mulai', 'Selesai', 'Kode Akun', 'Nama Akun', 'Kategori', 'Debit', 'Credit'],
@@ -4788,40 +3807,10 @@ def finance_general_ledger():
     ledger_rows = []
     closing_debit = 0
     closing_credit = 0
-
     if selected_account:
-        opening_lines = _posted_finance_lines_query(tenant_id, None, start_date - timedelta(days=1)).filter(
-            FinanceJournalLine.account_id == selected_account.id,
-        ).all()
-        for line in opening_lines:
-            amount = int(line.amount or 0)
-            if line.entry_side == FinanceEntrySide.DEBIT:
-                opening_debit += amount
-            elif line.entry_side == FinanceEntrySide.CREDIT:
-                opening_credit += amount
-
-        running_balance = opening_debit - opening_credit
-        period_lines = (
-            _posted_finance_lines_query(tenant_id, start_date, end_date)
-            .filter(FinanceJournalLine.account_id == selected_account.id)
-            .order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc(), FinanceJournalLine.id.asc())
-            .all()
+        opening_debit, opening_credit, ledger_rows, closing_debit, closing_credit = _ledger_data(
+            tenant_id, selected_account, start_date, end_date
         )
-        for line in period_lines:
-            debit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.DEBIT else 0
-            credit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.CREDIT else 0
-            running_balance += debit - credit
-            ledger_rows.append({
-                'line': line,
-                'debit': debit,
-                'credit': credit,
-                'balance': running_balance,
-            })
-
-        if running_balance >= 0:
-            closing_debit = running_balance
-        else:
-            closing_credit = abs(running_balance)
 
     return render_template(
         'admin/finance/general_ledger.html',
@@ -4838,6 +3827,31 @@ def finance_general_ledger():
     )
 
 
+LEDGER_EXPORT_HEADER = ['Mulai', 'Selesai', 'Kode Akun', 'Nama Akun', 'Tanggal', 'No Jurnal', 'Debit', 'Credit', 'Saldo', 'Deskripsi']
+
+
+def _ledger_export_rows(tenant_id, selected_account, start_date, end_date):
+    opening_debit, opening_credit = ledger_opening_totals(tenant_id, selected_account.id, start_date)
+    yield [start_date, end_date, selected_account.code, selected_account.name, 'SALDO AWAL', '', opening_debit, opening_credit, opening_debit - opening_credit, '']
+    entries = iter_ledger_entries(
+        ledger_entries_query(tenant_id, selected_account.id, start_date, end_date).yield_per(FINANCE_EXPORT_BATCH_SIZE),
+        opening_debit - opening_credit,
+    )
+    for entry in entries:
+        yield [
+            start_date,
+            end_date,
+            selected_account.code,
+            selected_account.name,
+            entry.journal_date,
+            entry.journal_no,
+            entry.debit,
+            entry.credit,
+            entry.balance,
+            entry.description or entry.memo,
+        ]
+
+
 @admin_bp.route('/keuangan/laporan/buku-besar/export')
 @login_required
 @role_required(UserRole.TU)
@@ -4860,47 +3874,10 @@ def finance_general_ledger_export():
         flash('Pilih akun buku besar sebelum export.', 'warning')
         return redirect(url_for('admin.finance_general_ledger', start_date=start_date, end_date=end_date))
 
-    opening_debit = 0
-    opening_credit = 0
-    for line in _posted_finance_lines_query(tenant_id, None, start_date - timedelta(days=1)).filter(
-        FinanceJournalLine.account_id == selected_account.id,
-    ).all():
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            opening_debit += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            opening_credit += amount
-
-    rows = [[start_date, end_date, selected_account.code, selected_account.name, 'SALDO AWAL', '', opening_debit, opening_credit, opening_debit - opening_credit, '']]
-    running_balance = opening_debit - opening_credit
-    period_lines = (
-        _posted_finance_lines_query(tenant_id, start_date, end_date)
-        .filter(FinanceJournalLine.account_id == selected_account.id)
-        .order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc(), FinanceJournalLine.id.asc())
-        .all()
-    )
-    for line in period_lines:
-        debit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.DEBIT else 0
-        credit = int(line.amount or 0) if line.entry_side == FinanceEntrySide.CREDIT else 0
-        running_balance += debit - credit
-        journal = line.journal
-        rows.append([
-            start_date,
-            end_date,
-            selected_account.code,
-            selected_account.name,
-            journal.journal_date if journal else '',
-            journal.journal_no if journal else '',
-            debit,
-            credit,
-            running_balance,
-            journal.description if journal else line.memo or '',
-        ])
-
-    return _csv_response(
+    return csv_stream_response(
         f'finance_buku_besar_{selected_account.code}.csv',
-        ['Mulai', 'Selesai', 'Kode Akun', 'Nama Akun', 'Tanggal', 'No Jurnal', 'Debit', 'Credit', 'Saldo', 'Deskripsi'],
-        rows,
+        LEDGER_EXPORT_HEADER,
+        _ledger_export_rows(tenant_id, selected_account, start_date, end_date),
     )
 
 
@@ -4921,27 +3898,11 @@ def finance_general_ledger_export_xlsx():
         flash('Pilih akun buku besar sebelum export.', 'warning')
         return redirect(url_for('admin.finance_general_ledger', start_date=start_date, end_date=end_date))
 
-    opening_debit, opening_credit, ledger_rows, _, _ = _ledger_data(tenant_id, selected_account, start_date, end_date)
-    rows = [[start_date, end_date, selected_account.code, selected_account.name, 'SALDO AWAL', '', opening_debit, opening_credit, opening_debit - opening_credit, '']]
-    for row in ledger_rows:
-        journal = row['line'].journal
-        rows.append([
-            start_date,
-            end_date,
-            selected_account.code,
-            selected_account.name,
-            journal.journal_date if journal else '',
-            journal.journal_no if journal else '',
-            row['debit'],
-            row['credit'],
-            row['balance'],
-            journal.description if journal else row['line'].memo or '',
-        ])
-    return _xlsx_response(
+    return xlsx_stream_response(
         f'finance_buku_besar_{selected_account.code}.xlsx',
         'Buku Besar',
-        ['Mulai', 'Selesai', 'Kode Akun', 'Nama Akun', 'Tanggal', 'No Jurnal', 'Debit', 'Credit', 'Saldo', 'Deskripsi'],
-        rows,
+        LEDGER_EXPORT_HEADER,
+        _ledger_export_rows(tenant_id, selected_account, start_date, end_date),
     )
 
 
@@ -4991,55 +3952,9 @@ def finance_income_statement():
     start_date = _parse_iso_date(request.args.get('start_date')) or default_start
     end_date = _parse_iso_date(request.args.get('end_date')) or default_end
 
-    accounts = FinanceAccount.query.filter(
-        FinanceAccount.tenant_id == tenant_id,
-        FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-    ).order_by(FinanceAccount.code.asc()).all()
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-            'amount': 0,
-        }
-        for account in accounts
-    }
-
-    lines = (
-        _posted_finance_lines_query(tenant_id, start_date, end_date)
-        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
-        .filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-        )
-        .all()
+    revenue_rows, expense_rows, total_revenue, total_expense, net_income = _income_statement_data(
+        tenant_id, start_date, end_date
     )
-    for line in lines:
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
-
-    revenue_rows = []
-    expense_rows = []
-    total_revenue = 0
-    total_expense = 0
-    for row in rows_by_account_id.values():
-        account = row['account']
-        if account.category == FinanceAccountCategory.REVENUE:
-            row['amount'] = row['credit_total'] - row['debit_total']
-            if row['amount']:
-                total_revenue += row['amount']
-                revenue_rows.append(row)
-        elif account.category == FinanceAccountCategory.EXPENSE:
-            row['amount'] = row['debit_total'] - row['credit_total']
-            if row['amount']:
-                total_expense += row['amount']
-                expense_rows.append(row)
 
     return render_template(
         'admin/finance/income_statement.html',
@@ -5049,10 +3964,22 @@ def finance_income_statement():
         expense_rows=expense_rows,
         total_revenue=total_revenue,
         total_expense=total_expense,
-        net_income=total_revenue - total_expense,
+        net_income=net_income,
     )
 
 
+def _income_statement_export_rows(revenue_rows, expense_rows, total_revenue, total_expense, net_income, start_date, end_date):
+    rows = []
+    for row in revenue_rows:
+        rows.append([start_date, end_date, 'Pendapatan', row['account'].code, row['account'].name, row['amount']])
+    for row in expense_rows:
+        rows.append([start_date, end_date, 'Beban', row['account'].code, row['account'].name, row['amount']])
+    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Pendapatan', total_revenue])
+    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Beban', total_expense])
+    rows.append([start_date, end_date, 'Ringkasan', '', 'Laba/Rugi Bersih', net_income])
+    return rows
+
+
 @admin_bp.route('/keuangan/laporan/laba-rugi/export')
 @login_required
 @role_required(UserRole.TU)
@@ -5066,58 +3993,12 @@ def finance_income_statement_export():
     start_date = _parse_iso_date(request.args.get('start_date')) or default_start
     end_date = _parse_iso_date(request.args.get('end_date')) or default_end
 
-    rows_by_account_id = {
-        account.id: {
-            'account': account,
-            'debit_total': 0,
-            'credit_total': 0,
-        }
-        for account in FinanceAccount.query.filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-        ).order_by(FinanceAccount.code.asc()).all()
-    }
-
-    lines = (
-        _posted_finance_lines_query(tenant_id, start_date, end_date)
-        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
-        .filter(
-            FinanceAccount.tenant_id == tenant_id,
-            FinanceAccount.category.in_([FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE]),
-        )
-        .all()
+    revenue_rows, expense_rows, total_revenue, total_expense, net_income = _income_statement_data(
+        tenant_id, start_date, end_date
     )
-    for line in lines:
-        row = rows_by_account_id.get(line.account_id)
-        if not row:
-            continue
-        amount = int(line.amount or 0)
-        if line.entry_side == FinanceEntrySide.DEBIT:
-            row['debit_total'] += amount
-        elif line.entry_side == FinanceEntrySide.CREDIT:
-            row['credit_total'] += amount
+    rows = _income_statement_export_rows(revenue_rows, expense_rows, total_revenue, total_expense, net_income, start_date, end_date)
 
-    rows = []
-    total_revenue = 0
-    total_expense = 0
-    for row in rows_by_account_id.values():
-        account = row['account']
-        if account.category == FinanceAccountCategory.REVENUE:
-            amount = row['credit_total'] - row['debit_total']
-            section = 'Pendapatan'
-            total_revenue += amount
-        else:
-            amount = row['debit_total'] - row['credit_total']
-            section = 'Beban'
-            total_expense += amount
-        if amount:
-            rows.append([start_date, end_date, section, account.code, account.name, amount])
-
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Pendapatan', total_revenue])
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Beban', total_expense])
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Laba/Rugi Bersih', total_revenue - total_expense])
-
-    return _csv_response(
+    return csv_stream_response(
         'finance_laba_rugi.csv',
         ['Mulai', 'Selesai', 'Bagian', 'Kode Akun', 'Nama Akun', 'Nominal'],
         rows,
@@ -5138,19 +4019,11 @@ def finance_income_statement_export_xlsx():
     revenue_rows, expense_rows, total_revenue, total_expense, net_income = _income_statement_data(
         tenant_id, start_date, end_date
     )
-    rows = []
-    for row in revenue_rows:
-        rows.append([start_date, end_date, 'Pendapatan', row['account'].code, row['account'].name, row['amount']])
-    for row in expense_rows:
-        rows.append([start_date, end_date, 'Beban', row['account'].code, row['account'].name, row['amount']])
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Pendapatan', total_revenue])
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Total Beban', total_expense])
-    rows.append([start_date, end_date, 'Ringkasan', '', 'Laba/Rugi Bersih', net_income])
-    return _xlsx_response(
+    return xlsx_stream_response(
         'finance_laba_rugi.xlsx',
         'Laba Rugi',
         ['Mulai', 'Selesai', 'Bagian', 'Kode Akun', 'Nama Akun', 'Nominal'],
-        rows,
+        _income_statement_export_rows(revenue_rows, expense_rows, total_revenue, total_expense, net_income, start_date, end_date),
     )
 
 
@@ -5230,7 +4103,7 @@ def finance_financial_position_export():
         return redirect(url_for('main.dashboard'))
     as_of_date = _parse_iso_date(request.args.get('as_of_date')) or local_today()
     report = _financial_position_data(tenant_id, as_of_date)
-    return _csv_response(
+    return csv_stream_response(
         'finance_posisi_keuangan.csv',
         ['Tanggal Posisi', 'Bagian', 'Kode Akun', 'Nama Akun', 'Nominal'],
         _financial_position_export_rows(report, as_of_date),
@@ -5247,7 +4120,7 @@ def finance_financial_position_export_xlsx():
         return redirect(url_for('main.dashboard'))
     as_of_date = _parse_iso_date(request.args.get('as_of_date')) or local_today()
     report = _financial_position_data(tenant_id, as_of_date)
-    return _xlsx_response(
+    return xlsx_stream_response(
         'finance_posisi_keuangan.xlsx',
         'Posisi Keuangan',
         ['Tanggal Posisi', 'Bagian', 'Kode Akun', 'Nama Akun', 'Nominal'],
@@ -5273,58 +4146,6 @@ def finance_financial_position_print():
     )
 
 
-def _unposted_invoice_payment_transactions(tenant_id):
-    posted_payment_ids = db.session.query(FinanceJournal.source_id).filter(
-        FinanceJournal.tenant_id == tenant_id,
-        FinanceJournal.source_type == FinanceJournalSourceType.INVOICE_PAYMENT,
-        FinanceJournal.status == FinanceJournalStatus.POSTED,
-    )
-    return (
-        Transaction.query
-        .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
-        .filter(
-            User.tenant_id == tenant_id,
-            Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            ~Transaction.id.in_(posted_payment_ids),
-        )
-        .order_by(Transaction.date.desc(), Transaction.id.desc())
-    )
-
-
-def _unposted_savings_transactions(tenant_id):
-    posted_deposit_ids = db.session.query(FinanceJournal.source_id).filter(
-        FinanceJournal.tenant_id == tenant_id,
-        FinanceJournal.source_type == FinanceJournalSourceType.SAVINGS_DEPOSIT,
-        FinanceJournal.status == FinanceJournalStatus.POSTED,
-    )
-    posted_withdrawal_ids = db.session.query(FinanceJournal.source_id).filter(
-        FinanceJournal.tenant_id == tenant_id,
-        FinanceJournal.source_type == FinanceJournalSourceType.SAVINGS_WITHDRAWAL,
-        FinanceJournal.status == FinanceJournalStatus.POSTED,
-    )
-    return (
-        StudentSavingsTransaction.query
-        .filter(
-            StudentSavingsTransaction.tenant_id == tenant_id,
-            StudentSavingsTransaction.status == SavingsTransactionStatus.APPROVED,
-            or_(
-                and_(
-                    StudentSavingsTransaction.transaction_type == SavingsTransactionType.DEPOSIT,
-                    ~StudentSavingsTransaction.id.in_(posted_deposit_ids),
-                ),
-                and_(
-                    StudentSavingsTransaction.transaction_type == SavingsTransactionType.WITHDRAWAL,
-                    ~StudentSavingsTransaction.id.in_(posted_withdrawal_ids),
-                ),
-            ),
-        )
-        .order_by(StudentSavingsTransaction.approved_at.desc(), StudentSavingsTransaction.id.desc())
-    )
-
-
 @admin_bp.route('/keuangan/rekonsiliasi')
 @login_required
 @role_required(UserRole.TU)
@@ -5341,8 +4162,8 @@ def finance_reconciliation():
         FinancePeriod.end_date >= current_day,
     ).first()
 
-    invoice_unposted = _unposted_invoice_payment_transactions(tenant_id).limit(50).all()
-    savings_unposted = _unposted_savings_transactions(tenant_id).limit(50).all()
+    invoice_unposted = unposted_invoice_payment_transactions(tenant_id).limit(50).all()
+    savings_unposted = unposted_savings_transactions(tenant_id).limit(50).all()
     draft_journals = FinanceJournal.query.filter_by(
         tenant_id=tenant_id,
         status=FinanceJournalStatus.DRAFT,
@@ -5384,22 +4205,16 @@ def finance_reconciliation_retry_draft_all():
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('admin.finance_reconciliation'))
 
-    drafts = FinanceJournal.query.filter_by(
+    job = enqueue_job(
+        'finance_retry_draft_journals',
         tenant_id=tenant_id,
-        status=FinanceJournalStatus.DRAFT,
-    ).order_by(FinanceJournal.id.asc()).all()
-    success = 0
-    failed = 0
-    for journal in drafts:
-        try:
-            post_journal(tenant_id=tenant_id, journal_id=journal.id, actor_user_id=current_user.id)
-            db.session.commit()
-            success += 1
-        except Exception:
-            db.session.rollback()
-            failed += 1
-    flash(f'Retry posting draft selesai. Berhasil: {success}, gagal: {failed}.', 'info')
-    return redirect(url_for('admin.finance_reconciliation'))
+        created_by_user_id=current_user.id,
+        payload={
+            'actor_user_id': current_user.id,
+            'return_url': url_for('admin.finance_reconciliation'),
+        },
+    )
+    return redirect_to_job(job, 'Retry posting draft sedang diproses.')
 
 
 @admin_bp.route('/keuangan/rekonsiliasi/retry-sources', methods=['POST'])
@@ -5412,37 +4227,21 @@ def finance_reconciliation_retry_sources():
         return redirect(url_for('admin.finance_reconciliation'))
 
     source = (request.form.get('source') or '').strip().lower()
-    success = 0
-    failed = 0
-
-    if source == 'invoice':
-        for trx in _unposted_invoice_payment_transactions(tenant_id).limit(200).all():
-            try:
-                post_invoice_payment(tenant_id=tenant_id, transaction_id=trx.id, actor_user_id=current_user.id)
-                success += 1
-            except Exception:
-                db.session.rollback()
-                failed += 1
-        flash(f'Retry sumber pembayaran selesai. Berhasil: {success}, gagal: {failed}.', 'info')
+    if source not in RETRY_SOURCE_LABELS:
+        flash('Sumber retry tidak valid.', 'warning')
         return redirect(url_for('admin.finance_reconciliation'))
 
-    if source == 'savings':
-        for savings_trx in _unposted_savings_transactions(tenant_id).limit(200).all():
-            try:
-                post_savings_transaction(
-                    tenant_id=tenant_id,
-                    savings_transaction_id=savings_trx.id,
-                    actor_user_id=current_user.id
-                )
-                success += 1
-            except Exception:
-                db.session.rollback()
-                failed += 1
-        flash(f'Retry sumber tabungan selesai. Berhasil: {success}, gagal: {failed}.', 'info')
-        return redirect(url_for('admin.finance_reconciliation'))
-
-    flash('Sumber retry tidak valid.', 'warning')
-    return redirect(url_for('admin.finance_reconciliation'))
+    job = enqueue_job(
+        'finance_retry_sources',
+        tenant_id=tenant_id,
+        created_by_user_id=current_user.id,
+        payload={
+            'source': source,
+            'actor_user_id': current_user.id,
+            'return_url': url_for('admin.finance_reconciliation'),
+        },
+    )
+    return redirect_to_job(job, f'Retry sumber {RETRY_SOURCE_LABELS[source]} sedang diproses.')
 
 
 @admin_bp.route('/keuangan/master-biaya', methods=['GET', 'POST'])
@@ -5547,8 +4346,7 @@ def edit_fee_type(fee_id):
 def generate_invoices(fee_id):
     """
     Admin berhak menerbitkan tagihan untuk seluruh siswa berdasarkan FeeType.
-    Menggunakan logika yang sama seperti modul TU dengan guard agar tidak error
-    jika relasi student_candidate belum tersedia.
+    Biaya RQDF hanya untuk siswa kelas RQDF Sore (dan sebaliknya) bila kelasnya diketahui.
     """
     tenant_id = _current_tenant_id()
     if tenant_id is None:
@@ -5556,56 +4354,17 @@ def generate_invoices(fee_id):
         return redirect(url_for('admin.manage_fee_types'))
 
     fee = FeeType.query.filter_by(id=fee_id, tenant_id=tenant_id).first_or_404()
-    students = (
-        Student.query.join(User, Student.user_id == User.id)
-        .filter(
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .all()
+    job = enqueue_job(
+        'generate_invoices',
+        tenant_id=tenant_id,
+        created_by_user_id=current_user.id,
+        payload={
+            'fee_id': fee.id,
+            'enforce_program_rule': True,
+            'return_url': url_for('admin.manage_fee_types'),
+        },
     )
-
-    count_success = 0
-    due_date_default = local_now() + timedelta(days=10)
-    is_monthly_fee = "SPP" in fee.name.upper() or "BULAN" in fee.name.upper()
-
-    try:
-        for student in students:
-            candidate = getattr(student, "student_candidate", None)
-
-            if candidate:
-                if "RQDF" in fee.name.upper() and candidate.program_type.name != 'RQDF_SORE':
-                    continue
-                if "RQDF" not in fee.name.upper() and candidate.program_type.name == 'RQDF_SORE':
-                    continue
-
-            if Invoice.query.filter_by(student_id=student.id, fee_type_id=fee.id, is_deleted=False).first():
-                continue
-
-            nominal_final = fee.amount
-            if is_monthly_fee and student.custom_spp_fee is not None:
-                nominal_final = student.custom_spp_fee
-            elif candidate and candidate.scholarship_category.name != 'NON_BEASISWA':
-                nominal_final = fee.amount * 0.5
-
-            new_inv = Invoice(
-                invoice_number=generate_invoice_number(fee.id, student.id, tenant_id=tenant_id),
-                student_id=student.id,
-                fee_type_id=fee.id,
-                total_amount=to_rupiah_int(nominal_final),
-                status=PaymentStatus.UNPAID,
-                due_date=due_date_default
-            )
-            db.session.add(new_inv)
-            count_success += 1
-
-        db.session.commit()
-        flash(f'Berhasil menerbitkan {count_success} tagihan baru.', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Error: {str(e)}', 'danger')
-
-    return redirect(url_for('admin.manage_fee_types'))
+    return redirect_to_job(job, f'Penerbitan tagihan {fee.name} sedang diproses.')
 
 
 
@@ -5820,6 +4579,7 @@ def accept_candidate(candidate_id):
                 db.session.flush()
 
             new_inv = Invoice(
+                tenant_id=tenant_id,
                 invoice_number=generate_invoice_number(
                     fee_type.id,
                     siswa_baru.id,
@@ -2,10 +2,12 @@ from flask import Blueprint
 
 from app.extensions import csrf
 
+from .attendance import register_attendance_routes
 from .auth import register_auth_routes
 from .boarding import register_boarding_routes
 from .majlis import register_majlis_routes
 from .parent import register_parent_routes
+from .sync import register_sync_routes
 from .teacher import register_teacher_routes
 
 
@@ -17,3 +19,5 @@ register_boarding_routes(api_bp)
 register_parent_routes(api_bp)
 register_teacher_routes(api_bp)
 register_majlis_routes(api_bp)
+register_sync_routes(api_bp)
+register_attendance_routes(api_bp)
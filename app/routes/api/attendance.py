@@ -0,0 +1,221 @@
+from datetime import datetime
+
+from flask import g, request
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import AcademicYear, BoardingDormitory, Teacher, UserRole
+from app.routes.teacher import _teacher_can_access_attendance_class
+from app.services.attendance_write_service import (
+    AttendanceSheetError,
+    save_boarding_attendance_sheet,
+    save_class_attendance_sheet,
+)
+from app.services.mobile_idempotency_service import (
+    load_idempotency_records,
+    normalize_idempotency_key,
+    record_idempotent_result,
+    request_fingerprint,
+    stored_result,
+)
+from app.services.pesantren_service import list_students_for_dormitory
+from app.utils.tenant import resolve_tenant_id, scoped_dormitories_query
+from app.utils.tenant_context import get_tenant_snapshot
+from app.utils.tenant_modules import CAPABILITY_BOARDING, CAPABILITY_TEACHER, capabilities_for_package
+
+from .boarding import _effective_schedules_for
+from .common import api_error, api_success, mobile_auth_required
+from .teacher import _class_participants_for_api
+
+
+MAX_ATTENDANCE_BATCH_SHEETS = 50
+IDEMPOTENCY_SCOPE = "attendance_sheet"
+SHEET_TYPE_CLASS = "class"
+SHEET_TYPE_BOARDING = "boarding"
+
+
+def _parse_sheet_date(raw_value):
+    try:
+        return datetime.strptime(str(raw_value or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _parse_int(raw_value):
+    try:
+        return int(raw_value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _AttendanceBatch:
+    """Konteks satu request batch: profil guru, tahun ajaran aktif, dan asrama dimuat sekali."""
+
+    def __init__(self, user):
+        self.user = user
+        self.tenant_id = resolve_tenant_id(user)
+        snapshot = get_tenant_snapshot(self.tenant_id)
+        self.capabilities = capabilities_for_package(snapshot.package) if snapshot else frozenset()
+        self._teacher = None
+        self._active_year = None
+        self._dormitories = None
+
+    @property
+    def teacher(self):
+        if self._teacher is None:
+            self._teacher = Teacher.query.filter_by(user_id=self.user.id).first() or False
+        return self._teacher or None
+
+    @property
+    def active_year_id(self):
+        if self._active_year is None:
+            self._active_year = AcademicYear.query.filter_by(is_active=True).first() or False
+        return self._active_year.id if self._active_year else None
+
+    @property
+    def dormitories(self):
+        if self._dormitories is None:
+            self._dormitories = {
+                item.id: item
+                for item in scoped_dormitories_query(self.tenant_id)
+                .filter(BoardingDormitory.guardian_user_id == self.user.id)
+                .all()
+            }
+        return self._dormitories
+
+    def save(self, sheet):
+        sheet_type = str(sheet.get("type") or "").strip().lower()
+        attendance_date = _parse_sheet_date(sheet.get("date"))
+        if attendance_date is None:
+            raise AttendanceSheetError("Format tanggal tidak valid.")
+        records = sheet.get("records")
+        if not isinstance(records, list) or not records:
+            raise AttendanceSheetError("Data absensi belum diisi.")
+        if sheet_type == SHEET_TYPE_CLASS:
+            return self._save_class(sheet, attendance_date, records)
+        if sheet_type == SHEET_TYPE_BOARDING:
+            return self._save_boarding(sheet, attendance_date, records)
+        raise AttendanceSheetError("Jenis lembar absensi tidak dikenal.")
+
+    def _save_class(self, sheet, attendance_date, records):
+        if not self.user.has_role(UserRole.GURU) or CAPABILITY_TEACHER not in self.capabilities:
+            raise AttendanceSheetError("Akses absensi kelas tidak diizinkan.")
+        teacher = self.teacher
+        class_id = _parse_int(sheet.get("class_id"))
+        if teacher is None or not class_id or not _teacher_can_access_attendance_class(teacher, class_id):
+            raise AttendanceSheetError("Kelas tidak valid atau tidak dapat diakses.")
+
+        _, _, participants = _class_participants_for_api(self.user, class_id)
+        result = save_class_attendance_sheet(
+            tenant_id=self.user.tenant_id,
+            teacher_id=teacher.id,
+            class_id=class_id,
+            attendance_date=attendance_date,
+            participants={item["key"]: item for item in participants},
+            records=records,
+            academic_year_id=self.active_year_id,
+        )
+        if result.saved <= 0:
+            raise AttendanceSheetError("Tidak ada data absensi valid untuk disimpan.")
+        return result
+
+    def _save_boarding(self, sheet, attendance_date, records):
+        if not self.user.has_role(UserRole.WALI_ASRAMA) or CAPABILITY_BOARDING not in self.capabilities:
+            raise AttendanceSheetError("Akses absensi asrama tidak diizinkan.")
+        dormitory = self.dormitories.get(_parse_int(sheet.get("dormitory_id")))
+        if dormitory is None:
+            raise AttendanceSheetError("Anda tidak memiliki akses ke asrama tersebut.")
+        schedule_id = _parse_int(sheet.get("schedule_id"))
+        if not any(item.id == schedule_id for item in _effective_schedules_for(dormitory.id, attendance_date)):
+            raise AttendanceSheetError("Jadwal kegiatan tidak valid untuk tanggal ini.")
+
+        students = list_students_for_dormitory(dormitory.id, tenant_id=self.tenant_id)
+        return save_boarding_attendance_sheet(
+            dormitory_id=dormitory.id,
+            schedule_id=schedule_id,
+            attendance_date=attendance_date,
+            student_ids={student.id for student in students},
+            records=records,
+            recorded_by_user_id=self.user.id,
+        )
+
+
+def _sheet_result(key, status, *, saved=None, message=None):
+    counts = saved.as_dict() if saved is not None else {"saved": 0, "changed": 0, "unchanged": 0}
+    return {"idempotency_key": key, "status": status, **counts, "message": message}
+
+
+def _replayed_or_conflict(record, key, fingerprint):
+    if record.request_hash != fingerprint:
+        return _sheet_result(key, "rejected", message="idempotency_key sudah dipakai untuk data absensi lain.")
+    return {**stored_result(record), "status": "replayed"}
+
+
+def register_attendance_routes(api_bp):
+    @api_bp.post("/attendance/batch")
+    @mobile_auth_required(UserRole.GURU, UserRole.WALI_ASRAMA)
+    def attendance_batch_submit():
+        """
+        Kirim banyak lembar absensi (kelas/asrama) sekaligus, mis. setelah guru kembali online.
+        Setiap lembar punya idempotency_key; kiriman ulang dengan key yang sama tidak diproses dua kali.
+        """
+        user = g.mobile_user
+        payload = request.get_json(silent=True) or {}
+        sheets = payload.get("sheets")
+        if not isinstance(sheets, list) or not sheets:
+            return api_error("invalid_request", "Data lembar absensi belum diisi.", 400)
+        if len(sheets) > MAX_ATTENDANCE_BATCH_SHEETS:
+            return api_error(
+                "validation_error",
+                f"Maksimal {MAX_ATTENDANCE_BATCH_SHEETS} lembar absensi per kiriman.",
+                422,
+            )
+
+        keys = [normalize_idempotency_key(sheet.get("idempotency_key")) if isinstance(sheet, dict) else None
+                for sheet in sheets]
+        known = load_idempotency_records(user.id, keys)
+        batch = _AttendanceBatch(user)
+        results = []
+
+        for sheet, key in zip(sheets, keys):
+            if key is None:
+                results.append(_sheet_result(None, "rejected", message="idempotency_key wajib diisi (maks. 100 karakter)."))
+                continue
+            fingerprint = request_fingerprint(sheet)
+            if key in known:
+                results.append(_replayed_or_conflict(known[key], key, fingerprint))
+                continue
+
+            savepoint = db.session.begin_nested()
+            try:
+                saved = batch.save(sheet)
+                result = _sheet_result(
+                    key,
+                    "saved",
+                    saved=saved,
+                    message=f"{saved.saved} peserta tersimpan ({saved.changed} berubah).",
+                )
+                known[key] = record_idempotent_result(user.id, key, IDEMPOTENCY_SCOPE, fingerprint, result)
+                savepoint.commit()
+            except AttendanceSheetError as exc:
+                savepoint.rollback()
+                result = _sheet_result(key, "rejected", message=str(exc))
+            except IntegrityError:
+                # Kiriman paralel dengan key yang sama sudah lebih dulu tersimpan.
+                savepoint.rollback()
+                record = load_idempotency_records(user.id, [key]).get(key)
+                if record is None:
+                    raise
+                known[key] = record
+                result = _replayed_or_conflict(record, key, fingerprint)
+            results.append(result)
+
+        db.session.commit()
+        return api_success(
+            {
+                "results": results,
+                "saved_sheets": sum(1 for item in results if item["status"] == "saved"),
+                "replayed_sheets": sum(1 for item in results if item["status"] == "replayed"),
+                "rejected_sheets": sum(1 for item in results if item["status"] == "rejected"),
+            }
+        )
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 
 from flask import g, request
+from sqlalchemy import or_, select
 
+from app.services.attendance_write_service import AttendanceSheetError, save_boarding_attendance_sheet
 from app.services.finance_posting_service import post_savings_transaction
 from app.extensions import db
 from app.models import (
@@ -9,8 +11,10 @@ from app.models import (
     BoardingActivitySchedule,
     BoardingAttendance,
     BoardingDormitory,
+    BoardingGuardian,
     BoardingHoliday,
     EnrollmentStatus,
+    GroupMembership,
     Program,
     ProgramEnrollment,
     SavingsTransactionStatus,
@@ -20,12 +24,14 @@ from app.models import (
     StudentSavingsTransaction,
     User,
     UserRole,
+    boarding_schedule_dormitories,
 )
 from app.services.pesantren_service import list_students_for_dormitory
 from app.utils.tenant import resolve_tenant_id, scoped_dormitories_query
 from app.utils.timezone import local_today, utc_now_naive
 
 from .common import api_error, api_success, fmt_date, fmt_time, mobile_auth_required
+from .versioning import RowsVersion, conditional_api, tenant_user_ids
 
 
 DAYS = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
@@ -184,9 +190,44 @@ def _savings_student_payload(student, account=None):
     }
 
 
+def _boarding_dashboard_versions(user):
+    """Stamp asrama dibatasi ke asrama milik wali asrama ini, bukan seluruh tabel lintas tenant."""
+    tenant_id = resolve_tenant_id(user)
+    today = local_today()
+    dormitory_ids = select(BoardingDormitory.id).where(BoardingDormitory.guardian_user_id == user.id).correlate(None)
+    linked_schedule_ids = (
+        select(boarding_schedule_dormitories.c.schedule_id)
+        .where(boarding_schedule_dormitories.c.dormitory_id.in_(dormitory_ids))
+        .correlate(None)
+    )
+    return [
+        today,
+        RowsVersion(BoardingGuardian, BoardingGuardian.user_id == user.id),
+        RowsVersion(BoardingDormitory, BoardingDormitory.guardian_user_id == user.id),
+        RowsVersion(ProgramEnrollment, ProgramEnrollment.tenant_id == tenant_id),
+        RowsVersion(GroupMembership, GroupMembership.tenant_id == tenant_id),
+        RowsVersion(Student, Student.user_id.in_(tenant_user_ids(tenant_id))),
+        RowsVersion(
+            BoardingAttendance,
+            BoardingAttendance.date == today,
+            BoardingAttendance.dormitory_id.in_(dormitory_ids),
+        ),
+        RowsVersion(
+            BoardingActivitySchedule,
+            or_(
+                BoardingActivitySchedule.dormitory_id.in_(dormitory_ids),
+                BoardingActivitySchedule.id.in_(linked_schedule_ids),
+            ),
+        ),
+        RowsVersion(boarding_schedule_dormitories, boarding_schedule_dormitories.c.dormitory_id.in_(dormitory_ids)),
+        RowsVersion(BoardingHoliday, BoardingHoliday.date == today),
+    ]
+
+
 def register_boarding_routes(api_bp):
     @api_bp.get("/boarding/dashboard")
     @mobile_auth_required(UserRole.WALI_ASRAMA, capability="boarding")
+    @conditional_api(_boarding_dashboard_versions)
     def boarding_dashboard():
         user = g.mobile_user
         tenant_id = resolve_tenant_id(user)
@@ -336,45 +377,21 @@ def register_boarding_routes(api_bp):
             return api_error("validation_error", "Jadwal kegiatan tidak valid untuk tanggal ini.", 422)
 
         students = list_students_for_dormitory(dormitory.id, tenant_id=tenant_id)
-        student_ids = {student.id for student in students}
-        saved = 0
-
-        for row in records:
-            if not isinstance(row, dict):
-                continue
-            student_id = _safe_int(row.get("student_id"))
-            status_raw = str(row.get("status") or "").strip().upper()
-            if student_id not in student_ids or not status_raw:
-                continue
-            if status_raw not in AttendanceStatus.__members__:
-                return api_error("validation_error", f"Status absensi tidak valid: {status_raw}.", 422)
-
-            notes = str(row.get("notes") or "").strip() or None
-            existing = BoardingAttendance.query.filter_by(
-                date=selected_date,
+        try:
+            result = save_boarding_attendance_sheet(
+                dormitory_id=dormitory.id,
                 schedule_id=schedule.id,
-                student_id=student_id,
-            ).first()
-            if existing:
-                existing.status = AttendanceStatus[status_raw]
-                existing.notes = notes
-                existing.attendance_by_user_id = user.id
-            else:
-                db.session.add(
-                    BoardingAttendance(
-                        dormitory_id=dormitory.id,
-                        schedule_id=schedule.id,
-                        student_id=student_id,
-                        attendance_by_user_id=user.id,
-                        date=selected_date,
-                        status=AttendanceStatus[status_raw],
-                        notes=notes,
-                    )
-                )
-            saved += 1
+                attendance_date=selected_date,
+                student_ids={student.id for student in students},
+                records=records,
+                recorded_by_user_id=user.id,
+            )
+        except AttendanceSheetError as exc:
+            db.session.rollback()
+            return api_error("validation_error", str(exc), 422)
 
         db.session.commit()
-        return api_success({"saved": saved}, message=f"Absensi asrama tersimpan ({saved} santri).")
+        return api_success(result.as_dict(), message=f"Absensi asrama tersimpan ({result.saved} santri).")
 
     @api_bp.get("/boarding/savings")
     @mobile_auth_required(UserRole.WALI_ASRAMA, capability="boarding")
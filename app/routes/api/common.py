@@ -2,14 +2,16 @@ from datetime import datetime
 from functools import wraps
 
 from flask import g, jsonify, request
+from sqlalchemy.orm import selectinload
 
 from app.models import ClassRoom, Student, User
 from app.services.credential_security_service import validate_mobile_token_version
 from app.services.formal_service import get_student_formal_classroom
 from app.utils.mobile_api_auth import TOKEN_TYPE_ACCESS, decode_mobile_token
 from app.utils.roles import get_default_role
-from app.utils.tenant import is_user_tenant_active, resolve_tenant_id, scoped_classrooms_query
-from app.utils.tenant_modules import tenant_has_capability
+from app.utils.tenant import resolve_tenant_id, scoped_classrooms_query
+from app.utils.tenant_context import get_tenant_snapshot
+from app.utils.tenant_modules import capabilities_for_package
 
 
 DAY_NAMES = {
@@ -173,21 +175,26 @@ def mobile_auth_required(*roles, capability=None):
 
             user_id = payload.get("uid")
             token_tenant_id = payload.get("tid")
-            user = User.query.filter_by(id=user_id).first()
+            user = (
+                User.query.options(selectinload(User.role_assignments))
+                .filter_by(id=user_id)
+                .first()
+            )
             if user is None:
                 return api_error("unauthorized", "User tidak ditemukan.", 401)
             if token_tenant_id is not None and user.tenant_id != token_tenant_id:
                 return api_error("unauthorized", "Token tidak valid untuk tenant ini.", 401)
             if not validate_mobile_token_version(payload, user):
                 return api_error("unauthorized", "Sesi sudah tidak berlaku. Silakan login ulang.", 401)
-            if not is_user_tenant_active(user):
+            # Status & paket tenant dibaca dari snapshot cache, bukan query per request.
+            tenant = get_tenant_snapshot(resolve_tenant_id(user, fallback_default=False))
+            if tenant is None or not tenant.is_active:
                 return api_error("tenant_inactive", "Tenant akun tidak aktif.", 403)
 
             if roles and not user.has_role(*roles):
                 return api_error("forbidden", "Akses role tidak diizinkan.", 403)
             if capability and not user.has_role("super_admin"):
-                tenant_id = resolve_tenant_id(user, fallback_default=False)
-                if not tenant_has_capability(tenant_id, capability):
+                if capability not in capabilities_for_package(tenant.package):
                     return api_error(
                         "capability_disabled",
                         "Modul ini tidak aktif untuk tenant Anda.",
@@ -5,9 +5,14 @@ from app.models import (
     Attendance,
     AttendanceStatus,
     ClassRoom,
+    GroupMembership,
     Invoice,
+    MajlisParticipant,
+    Parent,
     ParticipantType,
     PaymentStatus,
+    ProgramEnrollment,
+    ProgramGroup,
     ProgramType,
     RecitationRecord,
     Schedule,
@@ -32,6 +37,7 @@ from .common import (
     fmt_time,
     mobile_auth_required,
 )
+from .versioning import RowsVersion, announcement_versions, conditional_api, tenant_class_ids
 
 
 def resolve_majlis_context(user):
@@ -78,9 +84,25 @@ def majlis_announcements_query(user, profile, parent_profile, show_all=False):
     )
 
 
+def _majlis_announcement_versions(user):
+    if (request.args.get("mark_as_read") or "").strip() in {"1", "true", "yes"}:
+        return None
+    tenant_id = user.tenant_id
+    return [
+        RowsVersion(MajlisParticipant, MajlisParticipant.user_id == user.id),
+        RowsVersion(Parent, Parent.user_id == user.id),
+        RowsVersion(ClassRoom, ClassRoom.id.in_(tenant_class_ids(tenant_id))),
+        RowsVersion(ProgramGroup, ProgramGroup.tenant_id == tenant_id),
+        RowsVersion(ProgramEnrollment, ProgramEnrollment.tenant_id == tenant_id),
+        RowsVersion(GroupMembership, GroupMembership.tenant_id == tenant_id),
+        *announcement_versions(user),
+    ]
+
+
 def register_majlis_routes(api_bp):
     @api_bp.get("/majlis/announcements")
     @mobile_auth_required(UserRole.MAJLIS_PARTICIPANT, UserRole.WALI_MURID, capability="majlis")
+    @conditional_api(_majlis_announcement_versions)
     def majlis_announcements():
         user = g.mobile_user
         profile, parent_profile, _ = resolve_majlis_context(user)
@@ -4,6 +4,7 @@ import os
 import uuid
 
 from flask import g, request
+from sqlalchemy import select
 from werkzeug.utils import secure_filename
 
 from app.models import (
@@ -13,12 +14,18 @@ from app.models import (
     BehaviorReport,
     BoardingAttendance,
     ClassRoom,
+    FeeType,
     Grade,
+    GroupMembership,
     Invoice,
+    Parent,
     ParticipantType,
     PaymentStatus,
+    ProgramEnrollment,
+    ProgramGroup,
     RecitationRecord,
     Schedule,
+    Student,
     StudentSavingsAccount,
     StudentSavingsTransaction,
     SavingsTransactionStatus,
@@ -51,6 +58,7 @@ from .common import (
     parent_children_for_tenant,
     serialize_child,
 )
+from .versioning import RowsVersion, announcement_versions, conditional_api, tenant_class_ids
 
 
 def _student_payload(user, student):
@@ -112,6 +120,57 @@ def _resolve_child_class(user, student):
     return active_class, active_class_id
 
 
+def _parent_children_ids(user):
+    return (
+        select(Student.id)
+        .join(Parent, Parent.id == Student.parent_id)
+        .where(Parent.user_id == user.id)
+        .correlate(None)
+    )
+
+
+def _parent_structure_versions(user):
+    """Profil wali, daftar anak, dan struktur kelas/program yang dipakai serialize_child."""
+    tenant_id = resolve_tenant_id(user, fallback_default=False)
+    return [
+        RowsVersion(Parent, Parent.user_id == user.id),
+        RowsVersion(Student, Student.id.in_(_parent_children_ids(user))),
+        RowsVersion(ClassRoom, ClassRoom.id.in_(tenant_class_ids(tenant_id))),
+        RowsVersion(ProgramGroup, ProgramGroup.tenant_id == tenant_id),
+        RowsVersion(ProgramEnrollment, ProgramEnrollment.tenant_id == tenant_id),
+        RowsVersion(GroupMembership, GroupMembership.tenant_id == tenant_id),
+    ]
+
+
+def _parent_dashboard_versions(user):
+    children_ids = _parent_children_ids(user)
+    return [
+        *_parent_structure_versions(user),
+        *[
+            RowsVersion(model, model.student_id.in_(children_ids))
+            for model in (Invoice, Violation, TahfidzSummary, Attendance, TahfidzRecord, RecitationRecord, TahfidzEvaluation)
+        ],
+        *_parent_announcement_versions(user),
+    ]
+
+
+def _parent_announcement_versions(user):
+    children_user_ids = select(Student.user_id).where(Student.id.in_(_parent_children_ids(user))).correlate(None)
+    return announcement_versions(user, extra_user_ids=children_user_ids)
+
+
+def _parent_child_announcement_versions(user, child_id):
+    return [*_parent_structure_versions(user), *_parent_announcement_versions(user)]
+
+
+def _parent_child_finance_versions(user, child_id):
+    return [
+        *_parent_structure_versions(user),
+        RowsVersion(Invoice, Invoice.student_id == child_id),
+        RowsVersion(FeeType, FeeType.tenant_id == resolve_tenant_id(user, fallback_default=False)),
+    ]
+
+
 def _calculate_weighted_final(type_averages, tenant_id=None, academic_year_id=None, subject_id=None, student_id=None, class_id=None):
     return calculate_weighted_final(
         type_averages,
@@ -257,6 +316,7 @@ def register_parent_routes(api_bp):
 
     @api_bp.get("/parent/dashboard")
     @mobile_auth_required(UserRole.WALI_MURID)
+    @conditional_api(_parent_dashboard_versions)
     def parent_dashboard():
         user, parent, children, error_response = _resolve_parent_children_context()
         if error_response is not None:
@@ -415,6 +475,7 @@ def register_parent_routes(api_bp):
 
     @api_bp.get("/parent/children/<int:child_id>/announcements")
     @mobile_auth_required(UserRole.WALI_MURID)
+    @conditional_api(_parent_child_announcement_versions)
     def parent_child_announcements(child_id):
         user, _, children, error_response = _resolve_parent_children_context()
         if error_response is not None:
@@ -449,6 +510,7 @@ def register_parent_routes(api_bp):
 
     @api_bp.get("/parent/children/<int:child_id>/finance")
     @mobile_auth_required(UserRole.WALI_MURID)
+    @conditional_api(_parent_child_finance_versions)
     def parent_child_finance(child_id):
         user, _, children, error_response = _resolve_parent_children_context()
         if error_response is not None:
@@ -0,0 +1,21 @@
+from flask import g, request
+
+from app.models import UserRole
+from app.services.mobile_sync_service import SyncCursorError, build_sync_changes
+
+from .common import api_error, api_success, mobile_auth_required
+
+
+def register_sync_routes(api_bp):
+    @api_bp.get("/sync")
+    @mobile_auth_required(UserRole.WALI_MURID, UserRole.SISWA)
+    def sync_changes():
+        try:
+            payload = build_sync_changes(
+                g.mobile_user,
+                cursor_token=(request.args.get("cursor") or "").strip() or None,
+                limit=request.args.get("limit", type=int),
+            )
+        except SyncCursorError as exc:
+            return api_error("invalid_cursor", str(exc), 400)
+        return api_success(payload)
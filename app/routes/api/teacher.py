@@ -3,6 +3,7 @@ from collections import defaultdict
 from datetime import datetime
 
 from flask import current_app, g, request
+from sqlalchemy import select
 
 from app.extensions import db
 from app.models import (
@@ -13,14 +14,21 @@ from app.models import (
     BehaviorReport,
     BehaviorReportType,
     BoardingAttendance,
+    ClassRoom,
     EvaluationPeriod,
     Grade,
     GradeType,
+    GroupMembership,
+    MajlisParticipant,
     MajlisSubject,
     ParticipantType,
+    ProgramEnrollment,
+    ProgramGroup,
     RecitationRecord,
     RecitationSource,
     Schedule,
+    StaffAssignment,
+    Student,
     Subject,
     TahfidzEvaluation,
     TahfidzRecord,
@@ -29,7 +37,8 @@ from app.models import (
     Teacher,
     UserRole,
 )
-from app.services.grade_formula_service import calculate_weighted_final
+from app.services.attendance_write_service import save_class_attendance_sheet
+from app.services.grade_formula_service import GradeFormulaResolver, calculate_weighted_final
 from app.routes.teacher import (
     _behavior_indicator_items,
     _behavior_matrix_for_student,
@@ -66,6 +75,37 @@ from .common import (
     participant_name_from_record,
     user_display_name,
 )
+from .versioning import RowsVersion, announcement_versions, conditional_api, tenant_class_ids, tenant_user_ids
+
+
+def _teacher_dashboard_versions(user):
+    """Kelas/assignment/peserta dipantau per tenant; mapel dan setoran per guru; absensi asrama hari ini."""
+    tenant_id = user.tenant_id
+    today = local_today()
+    teacher_ids = select(Teacher.id).where(Teacher.user_id == user.id).correlate(None)
+    return [
+        today,
+        RowsVersion(Teacher, Teacher.user_id == user.id),
+        RowsVersion(Schedule, Schedule.teacher_id.in_(teacher_ids)),
+        RowsVersion(StaffAssignment, StaffAssignment.tenant_id == tenant_id),
+        RowsVersion(ClassRoom, ClassRoom.id.in_(tenant_class_ids(tenant_id))),
+        RowsVersion(ProgramGroup, ProgramGroup.tenant_id == tenant_id),
+        RowsVersion(ProgramEnrollment, ProgramEnrollment.tenant_id == tenant_id),
+        RowsVersion(GroupMembership, GroupMembership.tenant_id == tenant_id),
+        RowsVersion(Student, Student.user_id.in_(tenant_user_ids(tenant_id))),
+        RowsVersion(MajlisParticipant, MajlisParticipant.user_id.in_(tenant_user_ids(tenant_id))),
+        RowsVersion(Subject, Subject.id.in_(select(Schedule.subject_id).where(Schedule.teacher_id.in_(teacher_ids)))),
+        RowsVersion(
+            MajlisSubject,
+            MajlisSubject.id.in_(select(Schedule.majlis_subject_id).where(Schedule.teacher_id.in_(teacher_ids))),
+        ),
+        *[
+            RowsVersion(model, model.teacher_id.in_(teacher_ids))
+            for model in (TahfidzRecord, RecitationRecord, TahfidzEvaluation)
+        ],
+        RowsVersion(BoardingAttendance, BoardingAttendance.date == today),
+        *announcement_versions(user),
+    ]
 
 
 def _teacher_from_mobile_user():
@@ -118,7 +158,15 @@ def _bool_value(raw_value):
     return str(raw_value or "").strip().lower() in {"1", "true", "yes", "on"}
 
 
-def _calculate_weighted_final(type_averages, tenant_id=None, academic_year_id=None, subject_id=None, student_id=None, class_id=None):
+def _calculate_weighted_final(
+    type_averages,
+    tenant_id=None,
+    academic_year_id=None,
+    subject_id=None,
+    student_id=None,
+    class_id=None,
+    resolver=None,
+):
     return calculate_weighted_final(
         type_averages,
         tenant_id=tenant_id,
@@ -126,6 +174,7 @@ def _calculate_weighted_final(type_averages, tenant_id=None, academic_year_id=No
         subject_id=subject_id,
         student_id=student_id,
         class_id=class_id,
+        resolver=resolver,
     )
 
 
@@ -265,7 +314,16 @@ def _grade_subject_name(row):
     return "-"
 
 
-def _academic_report_payload(rows, include_history=False, history_limit=120, tenant_id=None, student_id=None, class_id=None):
+def _academic_report_payload(
+    rows,
+    include_history=False,
+    history_limit=120,
+    tenant_id=None,
+    student_id=None,
+    class_id=None,
+    resolver=None,
+):
+    resolver = resolver or GradeFormulaResolver(tenant_id)
     grouped = {}
     summary_rows = []
     history_rows = []
@@ -318,6 +376,7 @@ def _academic_report_payload(rows, include_history=False, history_limit=120, ten
                     subject_id=subject_data["subject_id"],
                     student_id=student_id,
                     class_id=class_id,
+                    resolver=resolver,
                 ),
             }
         )
@@ -572,6 +631,7 @@ def _resolve_report_period(raw_period_type, raw_academic_year_id, raw_year_name)
 def register_teacher_routes(api_bp):
     @api_bp.get("/teacher/dashboard")
     @mobile_auth_required(UserRole.GURU, capability="teacher")
+    @conditional_api(_teacher_dashboard_versions)
     def teacher_dashboard():
         user, teacher = _teacher_from_mobile_user()
         if teacher is None:
@@ -934,6 +994,7 @@ def register_teacher_routes(api_bp):
             participant = participant_map[participant_key]
             db.session.add(
                 Grade(
+                    tenant_id=user.tenant_id,
                     student_id=participant.get("student_id"),
                     majlis_participant_id=participant.get("majlis_participant_id"),
                     participant_type=participant.get("participant_type"),
@@ -1033,53 +1094,25 @@ def register_teacher_routes(api_bp):
             return api_error("invalid_request", "Data absensi belum diisi.", 400)
 
         _, _, participants = _class_participants_for_api(user, class_id)
-        participant_map = {item["key"]: item for item in participants}
         active_year = AcademicYear.query.filter_by(is_active=True).first()
-        saved_count = 0
-
-        for row in raw_records:
-            if not isinstance(row, dict):
-                continue
-            participant_key = (row.get("participant_key") or "").strip()
-            if participant_key not in participant_map:
-                continue
-            status_key = (row.get("status") or "").strip().upper()
-            if status_key not in {item.name for item in AttendanceStatus}:
-                continue
-            participant = participant_map[participant_key]
-            existing = Attendance.query.filter_by(
-                student_id=participant.get("student_id"),
-                majlis_participant_id=participant.get("majlis_participant_id"),
-                participant_type=participant.get("participant_type"),
-                class_id=class_id,
-                date=attendance_date,
-            ).first()
-            if existing:
-                existing.status = AttendanceStatus[status_key]
-                existing.notes = (row.get("notes") or "").strip()
-                if active_year:
-                    existing.academic_year_id = active_year.id
-            else:
-                db.session.add(
-                    Attendance(
-                        student_id=participant.get("student_id"),
-                        majlis_participant_id=participant.get("majlis_participant_id"),
-                        participant_type=participant.get("participant_type"),
-                        class_id=class_id,
-                        teacher_id=teacher.id,
-                        academic_year_id=active_year.id if active_year else None,
-                        date=attendance_date,
-                        status=AttendanceStatus[status_key],
-                        notes=(row.get("notes") or "").strip(),
-                    )
-                )
-            saved_count += 1
+        result = save_class_attendance_sheet(
+            tenant_id=user.tenant_id,
+            teacher_id=teacher.id,
+            class_id=class_id,
+            attendance_date=attendance_date,
+            participants={item["key"]: item for item in participants},
+            records=raw_records,
+            academic_year_id=active_year.id if active_year else None,
+        )
 
-        if saved_count <= 0:
+        if result.saved <= 0:
             return api_error("invalid_request", "Tidak ada data absensi valid untuk disimpan.", 400)
 
         db.session.commit()
-        return api_success({"saved_count": saved_count}, message="Absensi berhasil disimpan.")
+        return api_success(
+            {"saved_count": result.saved, "changed_count": result.changed, "unchanged_count": result.unchanged},
+            message="Absensi berhasil disimpan.",
+        )
 
     @api_bp.get("/teacher/input-tahfidz")
     @mobile_auth_required(UserRole.GURU, capability="teacher")
@@ -1955,6 +1988,8 @@ def register_teacher_routes(api_bp):
             selected_student = students[0]
             selected_student_id = selected_student.id
 
+        formula = GradeFormulaResolver(user.tenant_id)
+        formula.preload_adjustments(student_ids, selected_year_ids)
         students_payload = []
         for row in students:
             academic_report = _academic_report_payload(
@@ -1963,6 +1998,7 @@ def register_teacher_routes(api_bp):
                 tenant_id=user.tenant_id,
                 student_id=row.id,
                 class_id=selected_class.id,
+                resolver=formula,
             )
             attendance_report = _attendance_report_payload(attendance_rows_by_student.get(row.id, []), include_history=False)
             behavior_summary = _behavior_summary_from_indicator_rows(behavior_rows_by_student.get(row.id, []))
@@ -2000,6 +2036,7 @@ def register_teacher_routes(api_bp):
                 tenant_id=user.tenant_id,
                 student_id=selected_student.id,
                 class_id=selected_class.id,
+                resolver=formula,
             )
             attendance_report = _attendance_report_payload(
                 selected_attendance_rows,
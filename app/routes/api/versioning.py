@@ -0,0 +1,145 @@
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import and_, func, or_, select
+
+from app.extensions import db
+from app.models import Announcement, AnnouncementRead, ClassRoom, ProgramGroup, User
+from app.utils.announcements import announcement_role_values
+from app.utils.tenant import resolve_tenant_id
+
+
+# Naikkan jika bentuk payload API berubah agar ETag lama di aplikasi mobile tidak cocok lagi.
+API_ETAG_VERSION = "1"
+
+
+class RowsVersion:
+    """
+    Penanda versi murah untuk sekumpulan baris: jumlah baris + updated_at terakhir.
+    Baris soft-delete ikut dihitung agar penghapusan juga mengubah versi.
+    """
+
+    def __init__(self, source, *criteria):
+        self.source = source
+        self.criteria = criteria
+
+    def columns(self):
+        table = getattr(self.source, "__table__", self.source)
+        count = select(func.count()).select_from(table).where(*self.criteria).scalar_subquery()
+        latest_column = table.c.get("updated_at")
+        if latest_column is None:
+            return [count]
+        latest = select(func.max(latest_column)).select_from(table).where(*self.criteria).scalar_subquery()
+        return [count, latest]
+
+
+def tenant_user_ids(tenant_id):
+    return select(User.id).where(User.tenant_id == tenant_id).correlate(None)
+
+
+def tenant_class_ids(tenant_id):
+    """Kelas milik tenant lewat program group-nya, sama dengan scoped_classrooms_query."""
+    return (
+        select(ClassRoom.id)
+        .join(ProgramGroup, ProgramGroup.id == ClassRoom.program_group_id)
+        .where(ProgramGroup.tenant_id == tenant_id)
+        .correlate(None)
+    )
+
+
+def announcement_versions(user, extra_user_ids=None):
+    """
+    Pengumuman yang dapat menjangkau user: sasaran ALL/PROGRAM, ROLE miliknya, kelas di tenant-nya,
+    atau ditujukan ke dirinya (dan extra_user_ids, mis. user anak untuk wali murid).
+    """
+    tenant_id = resolve_tenant_id(user, fallback_default=False)
+    target_users = Announcement.target_user_id == user.id
+    if extra_user_ids is not None:
+        target_users = or_(target_users, Announcement.target_user_id.in_(extra_user_ids))
+    audience = or_(
+        Announcement.target_scope.in_(("ALL", "PROGRAM")),
+        and_(Announcement.target_scope == "ROLE", Announcement.target_role.in_(announcement_role_values(user))),
+        and_(Announcement.target_scope == "CLASS", Announcement.target_class_id.in_(tenant_class_ids(tenant_id))),
+        and_(Announcement.target_scope == "USER", target_users),
+    )
+    return [
+        RowsVersion(Announcement, audience),
+        RowsVersion(AnnouncementRead, AnnouncementRead.user_id == user.id),
+    ]
+
+
+def _stamp_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def resolve_version_parts(parts):
+    """Semua RowsVersion dihitung dalam satu SELECT berisi scalar subquery."""
+    part_columns = [part.columns() if isinstance(part, RowsVersion) else None for part in parts]
+    columns = [column for item in part_columns if item for column in item]
+
+    row = ()
+    if columns:
+        row = db.session.execute(select(*columns).execution_options(include_deleted=True)).one()
+
+    values = []
+    position = 0
+    for part, item in zip(parts, part_columns):
+        if item is None:
+            values.append(part)
+            continue
+        values.extend(row[position:position + len(item)])
+        position += len(item)
+    return [_stamp_value(value) for value in values]
+
+
+def compute_api_etag(parts):
+    user = g.mobile_user
+    material = "|".join(
+        [
+            API_ETAG_VERSION,
+            current_app.config.get("SECRET_KEY") or "",
+            request.full_path,
+            str(user.id),
+            str(getattr(user, "token_version", None) or 0),
+            *resolve_version_parts(parts),
+        ]
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:40]
+
+
+def _set_validators(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_api(version_loader):
+    """
+    Conditional GET untuk endpoint mobile. `version_loader(user, **view_args)` mengembalikan
+    daftar penanda versi (RowsVersion atau nilai biasa); None = lewati ETag untuk request ini.
+    Jika If-None-Match cocok, 304 dikirim tanpa membangun payload.
+    Dipasang di bawah @mobile_auth_required.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapped(*args, **kwargs):
+            parts = version_loader(g.mobile_user, **kwargs)
+            if parts is None:
+                return fn(*args, **kwargs)
+
+            etag = compute_api_etag(parts)
+            if request.if_none_match.contains_weak(etag):
+                return _set_validators(current_app.response_class(status=304), etag)
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -10,6 +10,7 @@ from app.decorators import role_required
 from app.utils.timezone import APP_TIMEZONE, local_today, local_day_bounds_utc_naive
 from app.utils.tenant import resolve_tenant_id, scoped_dormitories_query
 from app.extensions import db
+from app.services.attendance_write_service import AttendanceSheetError, save_boarding_attendance_sheet
 from app.services.pesantren_service import list_students_for_dormitory, sync_student_dormitory_membership
 from app.services.finance_posting_service import post_savings_transaction
 from app.models import (
@@ -860,37 +861,37 @@ def input_attendance():
             flash('Jadwal kegiatan pada tanggal tersebut belum dipilih.', 'warning')
             return redirect(url_for('boarding.input_attendance', dormitory_id=selected_dormitory_id, date=selected_date))
 
-        saved = 0
-        for student in students:
-            status_raw = (request.form.get(f'status_{student.id}') or '').strip()
-            if not status_raw:
-                continue
-
-            notes = (request.form.get(f'notes_{student.id}') or '').strip() or None
-            existing = BoardingAttendance.query.filter_by(
-                date=schedule_date,
+        try:
+            result = save_boarding_attendance_sheet(
+                dormitory_id=selected_dormitory.id,
                 schedule_id=selected_schedule.id,
-                student_id=student.id,
-            ).first()
-
-            if existing:
-                existing.status = AttendanceStatus[status_raw]
-                existing.notes = notes
-                existing.attendance_by_user_id = current_user.id
-            else:
-                db.session.add(BoardingAttendance(
-                    dormitory_id=selected_dormitory.id,
-                    schedule_id=selected_schedule.id,
-                    student_id=student.id,
-                    attendance_by_user_id=current_user.id,
-                    date=schedule_date,
-                    status=AttendanceStatus[status_raw],
-                    notes=notes,
-                ))
-            saved += 1
+                attendance_date=schedule_date,
+                student_ids={student.id for student in students},
+                records=[
+                    {
+                        'student_id': student.id,
+                        'status': request.form.get(f'status_{student.id}'),
+                        'notes': request.form.get(f'notes_{student.id}'),
+                    }
+                    for student in students
+                ],
+                recorded_by_user_id=current_user.id,
+            )
+        except AttendanceSheetError as exc:
+            db.session.rollback()
+            flash(str(exc), 'warning')
+            return redirect(url_for(
+                'boarding.input_attendance',
+                dormitory_id=selected_dormitory_id,
+                date=selected_date,
+                schedule_id=selected_schedule.id,
+            ))
 
         db.session.commit()
-        flash(f'Absensi boarding tersimpan ({saved} siswa).', 'success')
+        flash(
+            f'Absensi boarding tersimpan ({result.saved} siswa, {result.changed} berubah, {result.unchanged} tetap).',
+            'success',
+        )
         return redirect(url_for(
             'boarding.input_attendance',
             dormitory_id=selected_dormitory_id,
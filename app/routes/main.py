@@ -1,4 +1,5 @@
 from datetime import datetime
+import io
 import json
 from flask import (
     Blueprint,
@@ -8,6 +9,9 @@ from flask import (
     flash,
     current_app,
     request,
+    abort,
+    jsonify,
+    send_file,
 )
 from flask_login import (
     login_required,
@@ -18,6 +22,7 @@ from sqlalchemy import and_, or_
 from app.extensions import db
 from app.forms import PPDBForm
 from app.decorators import role_required
+from app.services.job_queue_service import job_status_payload, job_visible_to
 from app.services.majlis_enrollment_service import resolve_majlis_classroom
 from app.services.ppdb_config_service import (
     find_matching_ppdb_path,
@@ -57,10 +62,12 @@ from app.models import (
     AppConfig,
     Tenant,
     TenantStatus,
+    BackgroundJob,
 )
 from app.utils.announcements import get_announcements_for_dashboard, mark_announcements_as_read
 from app.utils.roles import get_active_role, set_active_role
-from app.utils.tenant_modules import get_tenant_package, role_allowed_for_package
+from app.utils.tenant_context import get_tenant_context
+from app.utils.tenant_modules import role_allowed_for_package
 
 main_bp = Blueprint('main', __name__)
 
@@ -222,8 +229,7 @@ def dashboard():
     """
 
     active_role = get_active_role(current_user)
-    tenant_id = resolve_tenant_id(current_user, fallback_default=False)
-    package = get_tenant_package(tenant_id)
+    package = get_tenant_context().package
 
     if active_role and not role_allowed_for_package(active_role, package):
         fallback_role = None
@@ -280,6 +286,55 @@ def dashboard():
     return render_template('index.html')
 
 
+def redirect_to_job(job, message=None):
+    """Arahkan user ke halaman progres background job setelah job diantrekan."""
+    if message:
+        flash(message, 'info')
+    return redirect(url_for('main.job_status', job_id=job.id))
+
+
+def _visible_job_or_404(job_id):
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or not job_visible_to(job, current_user):
+        abort(404)
+    return job
+
+
+@main_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = _visible_job_or_404(job_id)
+    status = job_status_payload(job)
+    return render_template(
+        'jobs/status.html',
+        job=job,
+        status=status,
+        result=job.result,
+        return_url=job.payload.get('return_url') or url_for('main.dashboard'),
+    )
+
+
+@main_bp.route('/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = _visible_job_or_404(job_id)
+    if not job.has_output or job.output_blob is None:
+        abort(404)
+    return send_file(
+        io.BytesIO(job.output_blob),
+        mimetype=job.output_mimetype or 'application/octet-stream',
+        as_attachment=True,
+        download_name=job.output_filename,
+    )
+
+
+@main_bp.route('/jobs/<int:job_id>/status.json')
+@login_required
+def job_status_json(job_id):
+    job = _visible_job_or_404(job_id)
+    return jsonify(job_status_payload(job))
+
+
 @main_bp.route('/majlis/dashboard')
 @login_required
 @role_required(UserRole.MAJLIS_PARTICIPANT, UserRole.WALI_MURID)
@@ -1,15 +1,16 @@
-﻿from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+﻿from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import json
 import re
 from urllib.parse import urlsplit
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 from itsdangerous import URLSafeSerializer, BadSignature
 from app.extensions import db
 from app.decorators import role_required
-from app.forms import PaymentForm, StudentForm  # Pastikan import ini ada
+from app.forms import MultiPaymentForm, PaymentForm, StudentForm  # Pastikan import ini ada
 from app.services.majlis_enrollment_service import (
     assign_majlis_class,
     ensure_majlis_participant_acceptance,
@@ -17,18 +18,23 @@ from app.services.majlis_enrollment_service import (
     sync_majlis_participant_profile,
 )
 from app.services.rumah_quran_service import (
-    apply_rumah_quran_student_filter,
     assign_student_rumah_quran_class,
     get_student_rumah_quran_classroom,
     list_rumah_quran_classes,
 )
 from app.services.bahasa_service import (
-    apply_bahasa_student_filter,
     assign_student_bahasa_class,
     get_student_bahasa_classroom,
     list_bahasa_classes,
 )
 from app.services.formal_service import sync_student_formal_class_membership
+from app.services.student_directory_service import (
+    allowed_student_categories,
+    normalize_student_search,
+    student_autocomplete,
+    student_directory_page,
+    student_search_clause,
+)
 from app.services.ppdb_fee_service import build_candidate_fee_drafts
 from app.services.ppdb_config_service import (
     create_default_ppdb_period,
@@ -41,12 +47,15 @@ from app.services.ppdb_config_service import (
     seed_default_ppdb_paths,
     seed_default_tenant_programs,
 )
-from app.services.finance_posting_service import post_invoice_payment
+from app.services.cashier_payment_service import CashierPaymentError, record_cashier_payment
+from app.services.invoice_generation_service import generate_fee_invoices, targeted_students_query
+from app.services.job_queue_service import enqueue_job
+from app.routes.main import redirect_to_job
 from app.models import (
     UserRole, User, Student, Parent, Staff, ClassRoom, Gender,
     Invoice, Transaction, PaymentStatus, FeeType, Tenant, AppConfig,
-    StudentCandidate, RegistrationStatus, ProgramType, EducationLevel, ScholarshipCategory,
-    MajlisParticipant, ClassType, Announcement, ProgramGroup,
+    StudentCandidate, RegistrationStatus, ProgramType, ScholarshipCategory,
+    MajlisParticipant, ClassType, Announcement,
     PpdbDocumentRequirement, PpdbFieldType, PpdbFormField,
     PpdbFeeItem, PpdbFormSection, PpdbPath, PpdbPeriod, PpdbPeriodStatus, TenantProgram
 )
@@ -56,12 +65,15 @@ from app.utils.roles import get_active_role
 from app.utils.money import to_rupiah_int
 from app.utils.invoice import generate_invoice_number
 from app.utils.timezone import local_day_bounds_utc_naive, local_now
-from app.utils.tenant import classroom_in_tenant, resolve_tenant_id, scoped_classrooms_query
-from app.utils.tenant_modules import PACKAGE_RUMAH_QURAN, PACKAGE_SEKOLAH, get_tenant_package
+from app.utils.tenant import active_student_exists, classroom_in_tenant, resolve_tenant_id, scoped_classrooms_query
+from app.utils.tenant_context import get_cached_tenant_package
+from app.utils.tenant_modules import PACKAGE_SEKOLAH
 from app.utils.push_notifications import notify_announcement_created
 
 staff_bp = Blueprint('staff', __name__)
 
+_CASHIER_SEARCH_LIMIT = 50
+
 _RECEIPT_PAPER_OPTIONS = (
     {
         'key': 'a4',
@@ -246,14 +258,12 @@ def dashboard():
     pemasukan_hari_ini = (
         db.session.query(func.sum(Transaction.amount))
         .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Transaction.tenant_id == tenant_id,
             Transaction.date >= start_utc,
             Transaction.date < end_utc,
             Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Invoice.student_id),
         )
         .scalar()
         or 0
@@ -264,14 +274,12 @@ def dashboard():
             func.sum(Transaction.amount),
         )
         .join(Invoice, Invoice.id == Transaction.invoice_id)
-        .join(Student, Student.id == Invoice.student_id)
-        .join(User, User.id == Student.user_id)
         .filter(
+            Transaction.tenant_id == tenant_id,
             Transaction.date >= start_utc,
             Transaction.date < end_utc,
             Invoice.is_deleted.is_(False),
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
+            active_student_exists(Invoice.student_id),
         )
         .group_by(Transaction.method)
         .all()
@@ -299,7 +307,7 @@ def cashier_search():
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('staff.dashboard'))
 
-    query = request.args.get('q')
+    query = normalize_student_search(request.args.get('q'))
     students = []
     students_due_map = {}
     if query:
@@ -308,9 +316,10 @@ def cashier_search():
             .filter(
                 Student.is_deleted.is_(False),
                 User.tenant_id == tenant_id,
-                (Student.full_name.ilike(f'%{query}%')) |
-                (Student.nis.ilike(f'%{query}%'))
+                student_search_clause(query, include_parent=False, include_class=False),
             )
+            .order_by(Student.full_name.asc(), Student.id.asc())
+            .limit(_CASHIER_SEARCH_LIMIT)
             .all()
         )
 
@@ -343,6 +352,37 @@ def cashier_search():
     )
 
 
+def _cashier_payment_allocations(student_id):
+    """(alokasi [(invoice_id, nominal)], metode, pesan_error) dari form kasir satu/multi tagihan."""
+    invoice_ids = []
+    for token in request.form.getlist('invoice_token'):
+        invoice_id, signed_student_id = _verify_cashier_invoice(token.strip())
+        if not invoice_id or signed_student_id != student_id:
+            current_app.logger.warning(
+                "Cashier token mismatch user_id=%s route_student_id=%s signed_student_id=%s invoice_id=%s ip=%s",
+                getattr(current_user, 'id', None), student_id, signed_student_id, invoice_id, request.remote_addr
+            )
+            return None, None, 'Invoice tidak valid atau tidak sesuai siswa.'
+        invoice_ids.append(invoice_id)
+    if not invoice_ids:
+        return None, None, 'Pilih minimal satu tagihan untuk dibayar.'
+
+    if request.form.get('action') == 'settle_multiple':
+        form = MultiPaymentForm()
+        if not form.validate_on_submit():
+            return None, None, 'Input pembayaran tidak valid.'
+        allocations = [
+            (invoice_id, _parse_rupiah_input(request.form.get(f'amount_{invoice_id}'), 0))
+            for invoice_id in invoice_ids
+        ]
+        return allocations, form.method.data, None
+
+    form = PaymentForm()
+    if len(invoice_ids) != 1 or not form.validate_on_submit():
+        return None, None, 'Input pembayaran tidak valid.'
+    return [(invoice_ids[0], to_rupiah_int(form.amount.data))], form.method.data, None
+
+
 @staff_bp.route('/kasir/bayar/<int:student_id>', methods=['GET', 'POST'])
 @login_required
 @role_required(UserRole.TU)
@@ -361,11 +401,46 @@ def cashier_pay(student_id):
         )
         .first_or_404()
     )
-    unpaid_invoices = Invoice.query.filter(
-        Invoice.student_id == student.id,
-        Invoice.is_deleted.is_(False),
-        Invoice.status != PaymentStatus.PAID
-    ).all()
+
+    if request.method == 'POST':
+        allocations, method, error = _cashier_payment_allocations(student.id)
+        if error:
+            flash(error, 'danger')
+            return redirect(url_for('staff.cashier_pay', student_id=student.id))
+        try:
+            # Pembayaran + jurnal dalam satu transaksi; satu commit per kwitansi.
+            result = record_cashier_payment(
+                tenant_id=tenant_id,
+                student_id=student.id,
+                allocations=allocations,
+                method=method,
+                actor_user_id=current_user.id,
+            )
+        except CashierPaymentError as exc:
+            db.session.rollback()
+            flash(str(exc), 'danger')
+            return redirect(url_for('staff.cashier_pay', student_id=student.id))
+        db.session.commit()
+
+        if result.posting_error:
+            flash(
+                'Pembayaran tersimpan, tetapi jurnal finance belum terposting otomatis. '
+                'Silakan cek menu rekonsiliasi posting.',
+                'warning'
+            )
+        flash(f'Pembayaran Rp {result.total_amount:,.0f} diterima!', 'success')
+        return redirect(url_for('staff.cashier_pay', student_id=student.id, trx=result.primary_transaction.id))
+
+    unpaid_invoices = (
+        Invoice.query.options(joinedload(Invoice.fee_type))
+        .filter(
+            Invoice.student_id == student.id,
+            Invoice.is_deleted.is_(False),
+            Invoice.status != PaymentStatus.PAID
+        )
+        .order_by(Invoice.due_date.asc(), Invoice.id.asc())
+        .all()
+    )
     transactions = (
         Transaction.query.join(Invoice, Invoice.id == Transaction.invoice_id)
         .filter(Invoice.student_id == student.id, Invoice.is_deleted.is_(False))
@@ -375,6 +450,14 @@ def cashier_pay(student_id):
     )
     selected_trx_id = request.args.get('trx', type=int)
     highlighted_transaction = next((trx for trx in transactions if trx.id == selected_trx_id), None)
+    highlighted_total = 0
+    if highlighted_transaction:
+        highlighted_total = sum(
+            to_rupiah_int(trx.amount)
+            for trx in transactions
+            if trx.id == highlighted_transaction.id
+            or (highlighted_transaction.receipt_no and trx.receipt_no == highlighted_transaction.receipt_no)
+        )
     invoice_tokens = {inv.id: _sign_cashier_invoice(inv.id, student.id) for inv in unpaid_invoices}
     invoice_summary = (
         db.session.query(
@@ -391,89 +474,6 @@ def cashier_pay(student_id):
     student_total_paid = to_rupiah_int(invoice_summary.paid_amount if invoice_summary else 0)
     student_total_due = max(0, student_total_billed - student_total_paid)
 
-    form = PaymentForm()
-
-    if request.method == 'POST':
-        invoice_token = request.form.get('invoice_token', '').strip()
-        invoice_id, signed_student_id = _verify_cashier_invoice(invoice_token)
-        if not invoice_id or signed_student_id != student.id:
-            current_app.logger.warning(
-                "Cashier token mismatch user_id=%s route_student_id=%s signed_student_id=%s invoice_id=%s ip=%s",
-                getattr(current_user, 'id', None), student.id, signed_student_id, invoice_id, request.remote_addr
-            )
-            flash('Invoice tidak valid atau tidak sesuai siswa.', 'danger')
-            return redirect(url_for('staff.cashier_pay', student_id=student.id))
-
-        if not form.validate_on_submit():
-            flash('Input pembayaran tidak valid.', 'danger')
-            return redirect(url_for('staff.cashier_pay', student_id=student.id))
-
-        # Lock invoice saat proses pembayaran untuk mengurangi risiko update paralel.
-        invoice = Invoice.query.filter(
-            Invoice.id == invoice_id,
-            Invoice.student_id == student.id,
-            Invoice.is_deleted.is_(False),
-            Invoice.status != PaymentStatus.PAID
-        ).with_for_update().first()
-
-        if not invoice:
-            current_app.logger.warning(
-                "Cashier invoice mismatch user_id=%s route_student_id=%s invoice_id=%s ip=%s",
-                getattr(current_user, 'id', None), student.id, invoice_id, request.remote_addr
-            )
-            flash('Invoice tidak ditemukan atau tidak sesuai dengan siswa ini.', 'danger')
-            return redirect(url_for('staff.cashier_pay', student_id=student.id))
-
-        bayar = to_rupiah_int(form.amount.data)
-        total_tagihan = to_rupiah_int(invoice.total_amount)
-        sudah_bayar = to_rupiah_int(invoice.paid_amount)
-        sisa_tagihan = max(0, total_tagihan - sudah_bayar)
-
-        if bayar <= 0:
-            flash('Jumlah pembayaran harus lebih dari 0.', 'danger')
-        elif bayar > sisa_tagihan:
-            flash(f'Gagal! Pembayaran melebihi sisa (Maks: {sisa_tagihan})', 'danger')
-        else:
-            # Catat Transaksi
-            trx = Transaction(
-                invoice_id=invoice.id,
-                amount=bayar,
-                method=form.method.data,
-                pic_id=current_user.id,
-            )
-            db.session.add(trx)
-
-            # Update Invoice
-            invoice.paid_amount = sudah_bayar + bayar
-            if invoice.paid_amount >= total_tagihan:
-                invoice.paid_amount = total_tagihan
-                invoice.status = PaymentStatus.PAID
-            elif invoice.paid_amount > 0:
-                invoice.status = PaymentStatus.PARTIAL
-            else:
-                invoice.status = PaymentStatus.UNPAID
-
-            db.session.commit()
-            try:
-                post_invoice_payment(
-                    tenant_id=tenant_id,
-                    transaction_id=trx.id,
-                    actor_user_id=current_user.id,
-                )
-            except Exception:
-                current_app.logger.exception(
-                    "Gagal auto-post jurnal pembayaran kasir tenant_id=%s transaction_id=%s",
-                    tenant_id,
-                    trx.id,
-                )
-                flash(
-                    'Pembayaran tersimpan, tetapi jurnal finance belum terposting otomatis. '
-                    'Silakan cek menu rekonsiliasi posting.',
-                    'warning'
-                )
-            flash(f'Pembayaran Rp {bayar:,.0f} diterima!', 'success')
-            return redirect(url_for('staff.cashier_pay', student_id=student.id, trx=trx.id))
-
     return render_template(
         'staff/cashier_payment.html',
         student=student,
@@ -481,10 +481,12 @@ def cashier_pay(student_id):
         invoice_tokens=invoice_tokens,
         transactions=transactions,
         highlighted_transaction=highlighted_transaction,
+        highlighted_total=highlighted_total,
         student_total_billed=student_total_billed,
         student_total_paid=student_total_paid,
         student_total_due=student_total_due,
-        form=form
+        form=PaymentForm(),
+        multi_form=MultiPaymentForm(),
     )
 
 
@@ -511,6 +513,17 @@ def cashier_receipt(transaction_id):
     )
     invoice = transaction.invoice
     student = invoice.student
+    receipt_transactions = [transaction]
+    if transaction.receipt_no:
+        receipt_transactions = (
+            Transaction.query.options(joinedload(Transaction.invoice).joinedload(Invoice.fee_type))
+            .filter(
+                Transaction.tenant_id == tenant_id,
+                Transaction.receipt_no == transaction.receipt_no,
+            )
+            .order_by(Transaction.id.asc())
+            .all()
+        )
 
     payment_pic = User.query.filter_by(id=transaction.pic_id, tenant_id=tenant_id).first()
     sisa_tagihan = max(0, to_rupiah_int(invoice.total_amount) - to_rupiah_int(invoice.paid_amount))
@@ -520,6 +533,8 @@ def cashier_receipt(transaction_id):
     return render_template(
         'staff/cashier_receipt.html',
         transaction=transaction,
+        receipt_transactions=receipt_transactions,
+        receipt_total=sum(to_rupiah_int(trx.amount) for trx in receipt_transactions),
         invoice=invoice,
         student=student,
         payment_pic=payment_pic,
@@ -566,36 +581,7 @@ def _parse_invoice_target(source):
 
 
 def _targeted_students(target, tenant_id):
-    students_query = Student.query.join(User, Student.user_id == User.id).filter(
-        Student.is_deleted.is_(False),
-        User.tenant_id == tenant_id,
-    )
-
-    if target['target_scope'] == 'PROGRAM':
-        program_enum = ProgramType[target['target_program_type']]
-        students_query = students_query.join(
-            ClassRoom, Student.current_class_id == ClassRoom.id
-        ).filter(
-            ClassRoom.is_deleted.is_(False),
-            ClassRoom.program_type == program_enum
-        )
-    elif target['target_scope'] == 'CLASS':
-        students_query = students_query.join(
-            ClassRoom,
-            Student.current_class_id == ClassRoom.id,
-        ).join(
-            ProgramGroup,
-            ClassRoom.program_group_id == ProgramGroup.id,
-        ).filter(
-            Student.current_class_id == target['target_class_id'],
-            ClassRoom.is_deleted.is_(False),
-            ProgramGroup.tenant_id == tenant_id,
-            ProgramGroup.is_deleted.is_(False),
-        )
-    elif target['target_scope'] == 'STUDENT':
-        students_query = students_query.filter(Student.id == target['target_student_id'])
-
-    return students_query.order_by(Student.full_name.asc()).all()
+    return targeted_students_query(tenant_id, target).order_by(Student.full_name.asc()).all()
 
 
 def _send_invoices_redirect_params(source, target):
@@ -624,61 +610,36 @@ def generate_invoices(fee_id):
         flash(error_message, 'warning')
         return redirect(url_for('staff.send_invoices'))
 
-    students = _targeted_students(target, tenant_id)
-    if not students:
-        flash('Tidak ada siswa sesuai target pengiriman tagihan.', 'warning')
-        return redirect(url_for('staff.send_invoices', **_send_invoices_redirect_params(request.form, target)))
-
-    total_target = len(students)
-    count_success = 0
-    skipped_duplicate = 0
-    due_date_default = local_now() + timedelta(days=10)
-    is_monthly_fee = "SPP" in fee.name.upper() or "BULAN" in fee.name.upper()
+    return_url = url_for('staff.send_invoices', **_send_invoices_redirect_params(request.form, target))
+    if request.form.get('dry_run') != '1':
+        job = enqueue_job(
+            'generate_invoices',
+            tenant_id=tenant_id,
+            created_by_user_id=current_user.id,
+            payload={'fee_id': fee.id, 'target': target, 'return_url': return_url},
+        )
+        return redirect_to_job(job, f'Penerbitan tagihan {fee.name} sedang diproses.')
 
     try:
-        for student in students:
-            candidate = getattr(student, "student_candidate", None)
-
-            # Cek duplikat hanya pada invoice aktif.
-            if Invoice.query.filter_by(student_id=student.id, fee_type_id=fee.id, is_deleted=False).first():
-                skipped_duplicate += 1
-                continue
-
-            nominal_final = fee.amount
-            if is_monthly_fee and student.custom_spp_fee is not None:
-                nominal_final = student.custom_spp_fee
-            elif candidate and candidate.scholarship_category.name != 'NON_BEASISWA':
-                nominal_final = fee.amount * 0.5
-
-            new_inv = Invoice(
-                invoice_number=generate_invoice_number(fee.id, student.id, tenant_id=tenant_id),
-                student_id=student.id,
-                fee_type_id=fee.id,
-                total_amount=to_rupiah_int(nominal_final),
-                status=PaymentStatus.UNPAID,
-                due_date=due_date_default
-            )
-            db.session.add(new_inv)
-            count_success += 1
-
-        db.session.commit()
-        if count_success == 0 and skipped_duplicate > 0:
-            flash(
-                f'Tidak ada tagihan baru. Target {total_target} siswa, seluruhnya sudah punya tagihan aktif untuk biaya ini.',
-                'warning'
-            )
-        elif skipped_duplicate > 0:
+        result = generate_fee_invoices(
+            tenant_id=tenant_id,
+            fee=fee,
+            student_query=targeted_students_query(tenant_id, target),
+            dry_run=True,
+        )
+        if result.total_target == 0:
+            flash('Tidak ada siswa sesuai target pengiriman tagihan.', 'warning')
+        else:
             flash(
-                f'Berhasil menerbitkan {count_success} tagihan baru. Dilewati karena duplikat: {skipped_duplicate}.',
-                'warning'
+                f'Pratinjau: {result.created} tagihan baru akan diterbitkan dari target {result.total_target} siswa. '
+                f'Dilewati karena duplikat: {result.skipped_duplicate}.',
+                'info'
             )
-        else:
-            flash(f'Berhasil menerbitkan {count_success} tagihan baru.', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error: {str(e)}', 'danger')
 
-    return redirect(url_for('staff.send_invoices', **_send_invoices_redirect_params(request.form, target)))
+    return redirect(return_url)
 
 
 @staff_bp.route('/tagihan/hapus/<int:fee_id>', methods=['POST'])
@@ -761,18 +722,22 @@ def send_invoices():
     fees = fees_query.order_by(FeeType.id.desc()).all()
     fee_options = FeeType.query.filter(FeeType.tenant_id == tenant_id).order_by(FeeType.name.asc()).all()
     classes = scoped_classrooms_query(tenant_id).order_by(ClassRoom.name.asc()).all()
-    students = (
-        Student.query.join(User, Student.user_id == User.id)
-        .filter(Student.is_deleted.is_(False), User.tenant_id == tenant_id)
-        .order_by(Student.full_name.asc())
-        .all()
-    )
+    selected_student = None
+    if target['target_scope'] == 'STUDENT' and target['target_student_id']:
+        selected_student = (
+            Student.query.join(User, Student.user_id == User.id)
+            .filter(
+                Student.id == target['target_student_id'],
+                Student.is_deleted.is_(False),
+                User.tenant_id == tenant_id,
+            )
+            .first()
+        )
 
     class_ids = {class_room.id for class_room in classes}
-    student_ids = {student.id for student in students}
     if target['target_scope'] == 'CLASS' and target['target_class_id'] not in class_ids:
         target['target_class_id'] = None
-    if target['target_scope'] == 'STUDENT' and target['target_student_id'] not in student_ids:
+    if target['target_scope'] == 'STUDENT' and selected_student is None:
         target['target_student_id'] = None
 
     target_label = 'Semua siswa'
@@ -785,9 +750,8 @@ def send_invoices():
         else:
             target_label = 'Kelas belum dipilih'
     elif target['target_scope'] == 'STUDENT':
-        if target['target_student_id']:
-            selected_student = next((student for student in students if student.id == target['target_student_id']), None)
-            target_label = f"{selected_student.full_name} ({selected_student.nis})" if selected_student else 'Siswa belum dipilih'
+        if selected_student:
+            target_label = f"{selected_student.full_name} ({selected_student.nis})"
         else:
             target_label = 'Siswa belum dipilih'
 
@@ -797,7 +761,7 @@ def send_invoices():
         fee_options=fee_options,
         selected_fee_id=selected_fee_id,
         classes=classes,
-        students=students,
+        selected_student=selected_student,
         program_labels=_program_labels(),
         target_label=target_label,
         target_scope=target['target_scope'],
@@ -957,103 +921,22 @@ def list_students():
         flash('Tenant default tidak ditemukan.', 'danger')
         return redirect(url_for('main.dashboard'))
 
-    query = (request.args.get('q') or '').strip()
+    query = normalize_student_search(request.args.get('q'))
     query_majlis = (request.args.get('q_majlis') or '').strip()
     active_category = (request.args.get('category') or 'all').strip().lower()
-    package = get_tenant_package(tenant_id)
-    if package == PACKAGE_SEKOLAH:
-        allowed_categories = {'all', 'sbq_sd', 'sbq_smp', 'sbq_sma', 'bahasa'}
-    elif package == PACKAGE_RUMAH_QURAN:
-        allowed_categories = {'all', 'reguler', 'takhosus', 'bahasa'}
-    else:
-        allowed_categories = {'all', 'sbq_sd', 'sbq_smp', 'sbq_sma', 'bahasa', 'reguler', 'takhosus'}
-    if active_category not in allowed_categories:
+    package = get_cached_tenant_package(tenant_id)
+    if active_category not in allowed_student_categories(package):
         active_category = 'all'
     if package == PACKAGE_SEKOLAH:
         query_majlis = ''
 
-    students_query = (
-        Student.query.join(User, Student.user_id == User.id)
-        .filter(
-            Student.is_deleted.is_(False),
-            User.tenant_id == tenant_id,
-        )
-        .outerjoin(ClassRoom, Student.current_class_id == ClassRoom.id)
+    page = student_directory_page(
+        tenant_id,
+        search=query,
+        category=active_category,
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
     )
-
-    if query:
-        students_query = students_query.outerjoin(Parent, Student.parent_id == Parent.id).filter(
-            db.or_(
-                Student.full_name.ilike(f'%{query}%'),
-                Student.nis.ilike(f'%{query}%'),
-                Parent.full_name.ilike(f'%{query}%'),
-                Parent.phone.ilike(f'%{query}%'),
-                ClassRoom.name.ilike(f'%{query}%')
-            )
-        )
-
-    if active_category == 'sbq_sd':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SD
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%sd%'),
-                        ClassRoom.grade_level.in_([1, 2, 3, 4, 5, 6])
-                    )
-                )
-            )
-        )
-    elif active_category == 'sbq_smp':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SMP
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%smp%'),
-                        ClassRoom.grade_level.in_([7, 8, 9])
-                    )
-                )
-            )
-        )
-    elif active_category == 'sbq_sma':
-        students_query = students_query.filter(
-            or_(
-                and_(
-                    ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
-                    ClassRoom.education_level == EducationLevel.SMA
-                ),
-                and_(
-                    ClassRoom.program_type.is_(None),
-                    or_(
-                        ClassRoom.name.ilike('%sma%'),
-                        ClassRoom.grade_level.in_([10, 11, 12])
-                    )
-                )
-            )
-        )
-    elif active_category == 'reguler':
-        students_query = apply_rumah_quran_student_filter(students_query, track='reguler')
-    elif active_category == 'takhosus':
-        students_query = apply_rumah_quran_student_filter(students_query, track='takhosus')
-    elif active_category == 'bahasa':
-        students_query = apply_bahasa_student_filter(students_query)
-
-    students = students_query.order_by(Student.id.desc()).all()
-    bahasa_class_map = {}
-    if active_category == 'bahasa':
-        bahasa_class_map = {
-            student.id: get_student_bahasa_classroom(student)
-            for student in students
-        }
     majlis_participants = (
         []
         if package == PACKAGE_SEKOLAH
@@ -1062,8 +945,9 @@ def list_students():
 
     return render_template(
         'student/list_students.html',
-        students=students,
-        bahasa_class_map=bahasa_class_map,
+        students=page.students,
+        page=page,
+        bahasa_class_map=page.bahasa_class_map,
         majlis_participants=majlis_participants,
         query=query,
         query_majlis=query_majlis,
@@ -1071,6 +955,20 @@ def list_students():
     )
 
 
+@staff_bp.route('/siswa/autocomplete')
+@login_required
+@role_required(UserRole.TU, UserRole.ADMIN)
+def student_autocomplete_json():
+    tenant_id = _current_tenant_id()
+    if tenant_id is None:
+        return jsonify({'results': [], 'pagination': {'more': False, 'after': None}})
+    return jsonify(student_autocomplete(
+        tenant_id,
+        request.args.get('q'),
+        after=request.args.get('after', type=int),
+    ))
+
+
 @staff_bp.route('/majlis/penempatan-kelas', methods=['GET', 'POST'])
 @login_required
 @role_required(UserRole.TU)
@@ -1479,6 +1377,7 @@ def accept_candidate(candidate_id):
                 db.session.flush()
 
             new_inv = Invoice(
+                tenant_id=tenant_id,
                 invoice_number=generate_invoice_number(
                     fee_type.id,
                     siswa_baru.id,
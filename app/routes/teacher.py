@@ -1,11 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from collections import defaultdict
+import copy
+import io
 import json
 import os
 import uuid
+import zipfile
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload
 from app.models import (
     Teacher, Student, ClassRoom, TahfidzRecord, TahfidzSummary, RecitationRecord,
     TahfidzEvaluation, TahfidzType, RecitationSource, ParticipantType, Grade,
@@ -21,18 +26,20 @@ from app.services.rumah_quran_service import (
     is_rumah_quran_classroom,
     list_rumah_quran_students_for_class,
 )
+from app.services.attendance_write_service import save_class_attendance_sheet
 from app.services.bahasa_service import get_student_bahasa_classroom, is_bahasa_classroom, list_bahasa_students_for_class
 from app.services.formal_service import get_student_formal_classroom, is_formal_classroom, list_formal_students_for_class
 from app.services.grade_formula_service import (
     REPORT_ADJUSTMENT_SOURCE_TAHFIDZ,
     REPORT_ADJUSTMENT_SOURCE_TAHFIDZ_EVALUATION,
-    calculate_report_final_detail,
+    GradeFormulaResolver,
     calculate_weighted_final,
-    resolve_report_score_adjustment,
 )
 from app.services.staff_assignment_service import (
+    TEACHER_ASSIGNMENT_CACHE,
     list_teacher_homeroom_classes_from_assignments,
     list_teacher_subject_classes_from_assignments,
+    teacher_assignment_version,
 )
 from app.services.online_meeting_service import (
     MEETING_PROVIDER_EXTERNAL,
@@ -45,15 +52,20 @@ from app.services.ai_assistant_service import (
     ai_provider_status,
     allowed_document,
     build_ai_prompt,
-    extract_document_text,
     generate_ai_assistant_output,
 )
+from app.services.job_queue_service import enqueue_job
+from app.routes.main import redirect_to_job
+from app.services.grade_recap_service import build_class_grade_recap, grade_recap_xlsx_header, grade_recap_xlsx_rows
+from app.services.report_batch_service import ReportBatchData
 from app.services.report_template_service import (
     report_template_for,
     resolve_report_mudir_name,
     resolve_report_template_profile,
 )
 from app.utils.announcements import get_announcements_for_dashboard, mark_announcements_as_read
+from app.utils.cache import app_cache
+from app.utils.exports import xlsx_stream_response
 from app.utils.push_notifications import notify_announcement_created
 from app.utils.tenant import classroom_in_tenant, resolve_tenant_id, scoped_classrooms_query
 from app.utils.tenant_branding import build_tenant_brand
@@ -185,12 +197,23 @@ def _dedupe_classes(classes):
     return list(deduped.values())
 
 
+def _teacher_visible_class_ids(teacher, class_ids):
+    class_ids = {class_id for class_id in class_ids if class_id}
+    if not class_ids:
+        return set()
+    rows = (
+        _teacher_scoped_classrooms_query(teacher)
+        .filter(ClassRoom.id.in_(class_ids))
+        .with_entities(ClassRoom.id)
+        .all()
+    )
+    return {row[0] for row in rows}
+
+
 def _get_teacher_homeroom_classes(teacher):
-    classes = [
-        class_room
-        for class_room in list_teacher_homeroom_classes_from_assignments(teacher)
-        if _classroom_visible_for_teacher(teacher, class_room)
-    ]
+    assigned_classes = list_teacher_homeroom_classes_from_assignments(teacher)
+    visible_ids = _teacher_visible_class_ids(teacher, [class_room.id for class_room in assigned_classes])
+    classes = [class_room for class_room in assigned_classes if class_room.id in visible_ids]
     if classes:
         return sorted(_dedupe_classes(classes), key=lambda item: item.name or "")
     return (
@@ -262,11 +285,22 @@ def _collect_teacher_assignment_summary(teacher):
 
     teaching_assignments = []
     seen_assignments = set()
-    all_teacher_schedules = Schedule.query.filter_by(teacher_id=teacher.id, is_deleted=False).all()
+    all_teacher_schedules = (
+        Schedule.query
+        .options(
+            joinedload(Schedule.class_room),
+            joinedload(Schedule.subject),
+            joinedload(Schedule.majlis_subject),
+        )
+        .filter_by(teacher_id=teacher.id, is_deleted=False)
+        .order_by(Schedule.id.asc())
+        .all()
+    )
+    visible_class_ids = _teacher_visible_class_ids(teacher, [sch.class_id for sch in all_teacher_schedules])
     for sch in all_teacher_schedules:
         if not sch.class_room:
             continue
-        if not _classroom_visible_for_teacher(teacher, sch.class_room):
+        if sch.class_room.id not in visible_class_ids:
             continue
         if is_rumah_quran_classroom(sch.class_room):
             continue
@@ -305,9 +339,17 @@ def _collect_teacher_assignment_summary(teacher):
 
 
 def build_teacher_sidebar_groups(teacher):
+    """Sidebar guru dari cache per worker; kunci versinya dari database sehingga semua worker ikut membangun ulang."""
     if not teacher:
         return []
 
+    cache = app_cache(TEACHER_ASSIGNMENT_CACHE, "TEACHER_SIDEBAR_CACHE_TTL_SECONDS", default_ttl_seconds=60)
+    cache_key = (teacher.id, teacher_assignment_version(teacher))
+    sidebar_groups = cache.get_or_set(cache_key, lambda: _build_teacher_sidebar_groups(teacher))
+    return copy.deepcopy(sidebar_groups)
+
+
+def _build_teacher_sidebar_groups(teacher):
     assignment_groups, _ = _collect_teacher_assignment_summary(teacher)
     group_items = {
         'formal': [
@@ -450,24 +492,17 @@ def ai_assistant():
                 extraction_status='PENDING',
             )
 
-            try:
-                document.extracted_text = extract_document_text(file_path)
-                document.extraction_status = 'COMPLETED'
-                if not (document.extracted_text or '').strip():
-                    document.extraction_status = 'FAILED'
-                    document.extraction_error = 'Dokumen tidak berisi teks yang bisa diekstrak.'
-            except Exception as exc:
-                document.extraction_status = 'FAILED'
-                document.extraction_error = str(exc)
-
             db.session.add(document)
             db.session.commit()
 
-            if document.extraction_status == 'COMPLETED':
-                flash('Dokumen berhasil diupload dan teks berhasil diekstrak.', 'success')
-            else:
-                flash(f'Dokumen tersimpan, tetapi ekstraksi teks gagal: {document.extraction_error}', 'warning')
-            return redirect(url_for('teacher.ai_assistant', document_id=document.id))
+            return_url = url_for('teacher.ai_assistant', document_id=document.id)
+            job = enqueue_job(
+                'ai_document_extraction',
+                tenant_id=tenant_id,
+                created_by_user_id=current_user.id,
+                payload={'document_id': document.id, 'return_url': return_url},
+            )
+            return redirect_to_job(job, 'Dokumen berhasil diupload. Teks sedang diekstrak.')
 
         if action == 'generate_output':
             document_id = request.form.get('document_id', type=int)
@@ -1052,20 +1087,24 @@ def _behavior_matrix_for_student(
     start_date=None,
     end_date=None,
     history_limit=120,
+    meeting_dates=None,
+    behavior_rows=None,
 ):
     indicator_items = _behavior_indicator_items()
     indicator_map = {row['key']: row for row in indicator_items}
-    meeting_dates = _class_meeting_dates(class_id, academic_year_ids=academic_year_ids, start_date=start_date, end_date=end_date)
+    if meeting_dates is None:
+        meeting_dates = _class_meeting_dates(class_id, academic_year_ids=academic_year_ids, start_date=start_date, end_date=end_date)
 
-    query = BehaviorReport.query.filter(
-        BehaviorReport.is_deleted.is_(False),
-        BehaviorReport.student_id == student_id,
-    )
-    if start_date:
-        query = query.filter(BehaviorReport.report_date >= start_date)
-    if end_date:
-        query = query.filter(BehaviorReport.report_date <= end_date)
-    behavior_rows = query.order_by(BehaviorReport.report_date.desc(), BehaviorReport.created_at.desc()).all()
+    if behavior_rows is None:
+        query = BehaviorReport.query.filter(
+            BehaviorReport.is_deleted.is_(False),
+            BehaviorReport.student_id == student_id,
+        )
+        if start_date:
+            query = query.filter(BehaviorReport.report_date >= start_date)
+        if end_date:
+            query = query.filter(BehaviorReport.report_date <= end_date)
+        behavior_rows = query.order_by(BehaviorReport.report_date.desc(), BehaviorReport.created_at.desc()).all()
 
     if not meeting_dates:
         meeting_dates = sorted({row.report_date for row in behavior_rows if row.report_date})
@@ -1156,7 +1195,16 @@ def _grade_subject_name(row):
     return '-'
 
 
-def _academic_report_payload_for_homeroom(rows, include_history=False, history_limit=120, tenant_id=None, student_id=None, class_id=None):
+def _academic_report_payload_for_homeroom(
+    rows,
+    include_history=False,
+    history_limit=120,
+    tenant_id=None,
+    student_id=None,
+    class_id=None,
+    resolver=None,
+):
+    resolver = resolver or GradeFormulaResolver(tenant_id)
     grouped = {}
     summary_rows = []
     history_rows = []
@@ -1193,9 +1241,8 @@ def _academic_report_payload_for_homeroom(rows, include_history=False, history_l
             if scores:
                 type_averages[type_name] = round(sum(scores) / len(scores), 2)
                 type_counts[type_name] = len(scores)
-        final_detail = calculate_report_final_detail(
+        final_detail = resolver.final_detail(
             type_averages,
-            tenant_id=tenant_id,
             academic_year_id=subject_data['academic_year_id'],
             subject_id=subject_data['subject_id'],
             student_id=student_id,
@@ -1240,8 +1287,10 @@ def _class_grade_subject_ids(class_room):
     return subject_ids, majlis_subject_ids
 
 
-def _filter_grade_rows_for_class(rows, class_room, fallback_all=False):
-    subject_ids, majlis_subject_ids = _class_grade_subject_ids(class_room)
+def _filter_grade_rows_for_class(rows, class_room, fallback_all=False, class_subject_ids=None):
+    if class_subject_ids is None:
+        class_subject_ids = _class_grade_subject_ids(class_room)
+    subject_ids, majlis_subject_ids = class_subject_ids
     if not subject_ids and not majlis_subject_ids:
         return list(rows or []) if fallback_all else []
     return [
@@ -1477,10 +1526,18 @@ def _behavior_summary_from_indicator_rows(rows):
     }
 
 
-def _quran_adjusted_summary(source_type, scores, count, tenant_id=None, student_id=None, academic_year_id=None, class_id=None):
+def _quran_adjusted_summary(
+    source_type,
+    scores,
+    count,
+    tenant_id=None,
+    student_id=None,
+    academic_year_id=None,
+    class_id=None,
+    resolver=None,
+):
     average_score = round(sum(scores) / len(scores), 2) if scores else 0
-    adjustment = resolve_report_score_adjustment(
-        tenant_id=tenant_id,
+    adjustment = (resolver or GradeFormulaResolver(tenant_id)).adjustment(
         student_id=student_id,
         academic_year_id=academic_year_id,
         class_id=class_id,
@@ -1513,7 +1570,9 @@ def _quran_report_payload_for_homeroom(
     student_id=None,
     academic_year_id=None,
     class_id=None,
+    resolver=None,
 ):
+    resolver = resolver or GradeFormulaResolver(tenant_id)
     tahfidz_scores = [float(item.score or 0) for item in tahfidz_rows]
     recitation_scores = [float(item.score or 0) for item in recitation_rows]
     evaluation_scores = [float(item.score or 0) for item in evaluation_rows]
@@ -1580,6 +1639,7 @@ def _quran_report_payload_for_homeroom(
             student_id=student_id,
             academic_year_id=academic_year_id,
             class_id=class_id,
+            resolver=resolver,
         ),
         'recitation_summary': {
             'count': len(recitation_rows),
@@ -1593,6 +1653,7 @@ def _quran_report_payload_for_homeroom(
             student_id=student_id,
             academic_year_id=academic_year_id,
             class_id=class_id,
+            resolver=resolver,
         ),
         'tahfidz_history': tahfidz_history,
         'recitation_history': recitation_history,
@@ -2009,6 +2070,7 @@ def input_grades():
                 continue
 
             db.session.add(Grade(
+                tenant_id=current_user.tenant_id,
                 student_id=participant['student_id'],
                 majlis_participant_id=participant['majlis_participant_id'],
                 participant_type=participant['participant_type'],
@@ -3517,6 +3579,8 @@ def homeroom_students():
             behavior_rows_by_student[row.student_id].append(row)
 
     tenant_id = _teacher_tenant_id(teacher)
+    formula = GradeFormulaResolver(tenant_id)
+    formula.preload_adjustments(student_ids, selected_year_ids)
     student_report_rows = []
     for row in students:
         academic_report = _academic_report_payload_for_homeroom(
@@ -3525,6 +3589,7 @@ def homeroom_students():
             tenant_id=tenant_id,
             student_id=row.id,
             class_id=selected_class.id,
+            resolver=formula,
         )
         attendance_report = _attendance_report_payload_for_homeroom(
             attendance_rows_by_student.get(row.id, []),
@@ -3828,6 +3893,173 @@ def calculate_student_grades(student_id):
                          active_year=active_year)
 
 
+class _StudentReportBatch:
+    """
+    Raport untuk sekelompok siswa pada satu periode. Periode, profil template, identitas
+    tenant, dan seluruh data nilai/tahfidz/absensi/perilaku dimuat sekali (ReportBatchData);
+    payload per siswa lalu dihitung di memori.
+    """
+
+    def __init__(self, teacher, students, period_type_raw=None, academic_year_id_raw=None, year_name_raw=None):
+        self.teacher = teacher
+        self.period_scope = _resolve_homeroom_report_period(
+            period_type_raw=period_type_raw or 'SEMESTER',
+            academic_year_id_raw=academic_year_id_raw,
+            year_name_raw=year_name_raw or '',
+        )
+        self.tenant_id = _teacher_tenant_id(teacher)
+        self.data = ReportBatchData(
+            students,
+            tenant_id=self.tenant_id,
+            academic_year_ids=self.period_scope['academic_year_ids'] or [],
+            start_date=self.period_scope['start_date'],
+            end_date=self.period_scope['end_date'],
+            period_key=_report_period_key(self.period_scope),
+        )
+        # Bobot nilai dan adjustment raport seluruh siswa dimuat sekali untuk semua mapel.
+        self.formula = GradeFormulaResolver(self.tenant_id)
+        self.formula.preload_adjustments(
+            [student.id for student in self.data.students],
+            self.period_scope['academic_year_ids'] or [],
+        )
+        self.report_profile = resolve_report_template_profile(self.tenant_id)
+        self.mudir_name = resolve_report_mudir_name(self.tenant_id, self.report_profile)
+        self.tenant_brand = build_tenant_brand(getattr(getattr(teacher, 'user', None), 'tenant', None))
+        self.tenant_brand['report_logo_url'] = (
+            url_for('static', filename='img/rqdf-logo.png')
+            if self.tenant_brand.get('logo_static') == 'img/logo-rqdf-white.png'
+            else self.tenant_brand.get('logo_url')
+        )
+
+    @property
+    def students(self):
+        return self.data.students
+
+    def payload_for(self, student, global_note=''):
+        data = self.data
+        teacher = self.teacher
+        tenant_id = self.tenant_id
+        period_scope = self.period_scope
+        academic_year = period_scope['selected_academic_year']
+        selected_year_ids = period_scope['academic_year_ids'] or []
+        start_date = period_scope['start_date']
+        end_date = period_scope['end_date']
+
+        classrooms = data.classrooms.get(student.id) or {}
+        formal_class = classrooms.get('formal')
+        tahfidz_class = classrooms.get('tahfidz')
+        bahasa_class = classrooms.get('bahasa')
+        program_classes = [item for item in [formal_class, tahfidz_class, bahasa_class] if item is not None]
+        program_class_ids = sorted({item.id for item in program_classes})
+
+        grade_rows = data.grades.get(student.id, [])
+        bahasa_grade_rows = _filter_grade_rows_for_class(
+            grade_rows, bahasa_class, fallback_all=False, class_subject_ids=data.subject_ids_for(bahasa_class),
+        )
+        bahasa_grade_ids = {row.id for row in bahasa_grade_rows}
+        formal_grade_rows = _filter_grade_rows_for_class(
+            grade_rows, formal_class, fallback_all=True, class_subject_ids=data.subject_ids_for(formal_class),
+        )
+        if bahasa_grade_ids:
+            formal_grade_rows = [row for row in formal_grade_rows if row.id not in bahasa_grade_ids]
+
+        formal_report = _academic_report_payload_for_homeroom(
+            formal_grade_rows,
+            tenant_id=tenant_id,
+            student_id=student.id,
+            class_id=formal_class.id if formal_class else None,
+            resolver=self.formula,
+        )
+        bahasa_report = _academic_report_payload_for_homeroom(
+            bahasa_grade_rows,
+            tenant_id=tenant_id,
+            student_id=student.id,
+            class_id=bahasa_class.id if bahasa_class else None,
+            resolver=self.formula,
+        )
+
+        tahfidz_rows = data.tahfidz_records.get(student.id, [])
+        recitation_rows = data.recitation_records.get(student.id, [])
+        evaluation_rows = data.evaluations.get(student.id, [])
+        tahfidz_report = _quran_report_payload_for_homeroom(
+            tahfidz_rows,
+            recitation_rows,
+            evaluation_rows,
+            tenant_id=tenant_id,
+            student_id=student.id,
+            academic_year_id=academic_year.id if academic_year else None,
+            class_id=tahfidz_class.id if tahfidz_class else None,
+            resolver=self.formula,
+        )
+
+        attendance_rows = data.attendances.get(student.id, [])
+        if program_class_ids:
+            attendance_rows = [row for row in attendance_rows if row.class_id in program_class_ids]
+        attendance_report = _attendance_report_payload_for_homeroom(attendance_rows, include_history=True, history_limit=300)
+
+        behavior_class_id = (
+            formal_class.id if formal_class else (program_class_ids[0] if program_class_ids else student.current_class_id)
+        )
+        behavior_report = _behavior_matrix_for_student(
+            student_id=student.id,
+            class_id=behavior_class_id,
+            academic_year_ids=selected_year_ids,
+            start_date=start_date,
+            end_date=end_date,
+            history_limit=300,
+            meeting_dates=data.meeting_dates_for(behavior_class_id),
+            behavior_rows=data.behavior_reports.get(student.id, []),
+        )
+        finalization = data.finalizations.get(student.id)
+        behavior_report = _apply_report_behavior_overrides(
+            behavior_report,
+            _report_behavior_overrides(finalization),
+        )
+        saved_homeroom_note = (finalization.homeroom_note or '').strip() if finalization else ''
+
+        report_sections = {
+            'formal': bool(formal_class or formal_report['summary_rows']),
+            'tahfidz': bool(tahfidz_class or tahfidz_rows or recitation_rows or evaluation_rows),
+            'bahasa': bool(bahasa_class or bahasa_report['summary_rows']),
+            'lampiran': True,
+        }
+        parent_name = (
+            student.parent.full_name
+            if student.parent and student.parent.full_name
+            else '-'
+        )
+        rqdf_report = {
+            'academic_rows': _rqdf_academic_rows(formal_report, attendance_report),
+            'tahfidz': _rqdf_tahfidz_report_payload(tahfidz_report, bahasa_report),
+            'parent_name': parent_name,
+        }
+
+        return {
+            'student': student,
+            'teacher': teacher,
+            'academic_year': academic_year,
+            'period_scope': period_scope,
+            'formal_class': formal_class,
+            'tahfidz_class': tahfidz_class,
+            'bahasa_class': bahasa_class,
+            'formal_report': formal_report,
+            'bahasa_report': bahasa_report,
+            'tahfidz_report': tahfidz_report,
+            'attendance': attendance_report,
+            'behavior': behavior_report,
+            'report_sections': report_sections,
+            'report_profile': self.report_profile,
+            'tenant_brand': self.tenant_brand,
+            'rqdf_report': rqdf_report,
+            'parent_name': parent_name,
+            'mudir_name': self.mudir_name,
+            'global_note': (global_note or '').strip() or saved_homeroom_note,
+            'report_date_label': local_today().strftime('%d/%m/%Y'),
+            'report_signature_date_label': _indonesian_month_year(end_date or local_today()),
+            'predicate_fn': _report_predicate,
+        }
+
+
 def _build_student_report_payload(
     teacher,
     student,
@@ -3836,165 +4068,162 @@ def _build_student_report_payload(
     year_name_raw=None,
     global_note='',
 ):
-    period_scope = _resolve_homeroom_report_period(
-        period_type_raw=period_type_raw or 'SEMESTER',
+    batch = _StudentReportBatch(
+        teacher,
+        [student],
+        period_type_raw=period_type_raw,
         academic_year_id_raw=academic_year_id_raw,
-        year_name_raw=year_name_raw or '',
+        year_name_raw=year_name_raw,
     )
-    academic_year = period_scope['selected_academic_year']
-    selected_year_ids = period_scope['academic_year_ids'] or []
-    start_date = period_scope['start_date']
-    end_date = period_scope['end_date']
-    tenant_id = _teacher_tenant_id(teacher)
+    return batch.payload_for(student, global_note=global_note)
 
-    formal_class = get_student_formal_classroom(student)
-    tahfidz_class = get_student_rumah_quran_classroom(student)
-    bahasa_class = get_student_bahasa_classroom(student)
-    program_classes = [item for item in [formal_class, tahfidz_class, bahasa_class] if item is not None]
-    program_class_ids = sorted({item.id for item in program_classes})
 
-    grade_query = Grade.query.filter(
-        Grade.is_deleted.is_(False),
-        Grade.participant_type == ParticipantType.STUDENT,
-        Grade.student_id == student.id,
-    )
-    if selected_year_ids:
-        grade_query = grade_query.filter(Grade.academic_year_id.in_(selected_year_ids))
-    else:
-        grade_query = grade_query.filter(False)
-    grade_rows = grade_query.order_by(Grade.created_at.desc(), Grade.id.desc()).all()
+REPORT_PACKAGE_SECTIONS = ('formal', 'tahfidz', 'bahasa', 'lampiran')
 
-    bahasa_grade_rows = _filter_grade_rows_for_class(grade_rows, bahasa_class, fallback_all=False)
-    bahasa_grade_ids = {row.id for row in bahasa_grade_rows}
-    formal_grade_rows = _filter_grade_rows_for_class(grade_rows, formal_class, fallback_all=True)
-    if bahasa_grade_ids:
-        formal_grade_rows = [row for row in formal_grade_rows if row.id not in bahasa_grade_ids]
 
-    formal_report = _academic_report_payload_for_homeroom(
-        formal_grade_rows,
-        tenant_id=tenant_id,
-        student_id=student.id,
-        class_id=formal_class.id if formal_class else None,
-    )
-    bahasa_report = _academic_report_payload_for_homeroom(
-        bahasa_grade_rows,
-        tenant_id=tenant_id,
-        student_id=student.id,
-        class_id=bahasa_class.id if bahasa_class else None,
-    )
+def _requested_report_sections(include_values):
+    requested_sections = []
+    for include_value in include_values or []:
+        requested_sections.extend(item.strip() for item in include_value.split(',') if item.strip())
+    return requested_sections or list(REPORT_PACKAGE_SECTIONS)
+
+
+def _available_report_sections(payload, requested_sections):
+    include_sections = []
+    for section in requested_sections:
+        section_key = (section or '').strip().lower()
+        if section_key in REPORT_PACKAGE_SECTIONS and section_key not in include_sections:
+            if payload['report_sections'].get(section_key):
+                include_sections.append(section_key)
+    return include_sections
+
 
-    tahfidz_query = TahfidzRecord.query.filter(
-        TahfidzRecord.is_deleted.is_(False),
-        TahfidzRecord.participant_type == ParticipantType.STUDENT,
-        TahfidzRecord.student_id == student.id,
+def _report_file_stem(value):
+    return secure_filename(value or '') or 'raport'
+
+
+def render_class_report_batch(
+    teacher,
+    class_room,
+    *,
+    period_type=None,
+    academic_year_id=None,
+    year_name=None,
+    global_note='',
+    include=None,
+    output_format='html',
+    progress=None,
+):
+    """
+    Raport seluruh siswa satu kelas. Data dimuat sekali lewat _StudentReportBatch, lalu dirender
+    menjadi satu dokumen cetak (html) atau ZIP berisi satu file per siswa (zip).
+    """
+    students, _ = _get_class_participants(class_room.id, tenant_id=_teacher_tenant_id(teacher))
+    batch = _StudentReportBatch(
+        teacher,
+        students,
+        period_type_raw=period_type,
+        academic_year_id_raw=academic_year_id,
+        year_name_raw=year_name,
     )
-    recitation_query = RecitationRecord.query.filter(
-        RecitationRecord.is_deleted.is_(False),
-        RecitationRecord.participant_type == ParticipantType.STUDENT,
-        RecitationRecord.student_id == student.id,
+    requested_sections = _requested_report_sections(include)
+    documents = []
+    for index, student in enumerate(batch.students, start=1):
+        payload = batch.payload_for(student, global_note=global_note)
+        include_sections = _available_report_sections(payload, requested_sections)
+        if include_sections:
+            documents.append((student, payload, include_sections))
+        if progress is not None:
+            progress(index, len(batch.students))
+
+    file_stem = f"raport_{_report_file_stem(class_room.name)}"
+    if output_format == 'zip':
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for student, payload, include_sections in documents:
+                html = render_template('teacher/print_report_package.html', **payload, include_sections=include_sections)
+                name = _report_file_stem(f"{student.nis or student.id}_{student.full_name}")
+                archive.writestr(f"{name}.html", html)
+        return {
+            'filename': f"{file_stem}.zip",
+            'mimetype': 'application/zip',
+            'content': buffer.getvalue(),
+            'count': len(documents),
+        }
+
+    report_bodies = [
+        Markup(render_template('teacher/report_parts/_package_body.html', **payload, include_sections=include_sections))
+        for _, payload, include_sections in documents
+    ]
+    html = render_template(
+        'teacher/print_report_batch.html',
+        class_room=class_room,
+        report_profile=batch.report_profile,
+        report_bodies=report_bodies,
     )
-    evaluation_query = TahfidzEvaluation.query.filter(
-        TahfidzEvaluation.is_deleted.is_(False),
-        TahfidzEvaluation.participant_type == ParticipantType.STUDENT,
-        TahfidzEvaluation.student_id == student.id,
+    return {
+        'filename': f"{file_stem}.html",
+        'mimetype': 'text/html',
+        'content': html.encode('utf-8'),
+        'count': len(documents),
+    }
+
+
+def render_grade_recap_page(class_room, *, tenant_id, template_name, **context):
+    """Leger nilai satu kelas untuk periode dari query string; `export=xlsx` mengirim file."""
+    period_scope = _resolve_homeroom_report_period(
+        period_type_raw=(request.args.get('period_type') or 'SEMESTER').strip().upper(),
+        academic_year_id_raw=request.args.get('academic_year_id', type=int),
+        year_name_raw=(request.args.get('year_name') or '').strip(),
     )
-    if start_date:
-        tahfidz_query = tahfidz_query.filter(TahfidzRecord.date >= datetime.combine(start_date, datetime.min.time()))
-        recitation_query = recitation_query.filter(RecitationRecord.date >= datetime.combine(start_date, datetime.min.time()))
-        evaluation_query = evaluation_query.filter(TahfidzEvaluation.date >= datetime.combine(start_date, datetime.min.time()))
-    if end_date:
-        tahfidz_query = tahfidz_query.filter(TahfidzRecord.date <= datetime.combine(end_date, datetime.max.time()))
-        recitation_query = recitation_query.filter(RecitationRecord.date <= datetime.combine(end_date, datetime.max.time()))
-        evaluation_query = evaluation_query.filter(TahfidzEvaluation.date <= datetime.combine(end_date, datetime.max.time()))
-    tahfidz_rows = tahfidz_query.order_by(TahfidzRecord.date.asc(), TahfidzRecord.id.asc()).all()
-    recitation_rows = recitation_query.order_by(RecitationRecord.date.asc(), RecitationRecord.id.asc()).all()
-    evaluation_rows = evaluation_query.order_by(TahfidzEvaluation.date.asc(), TahfidzEvaluation.id.asc()).all()
-    tahfidz_report = _quran_report_payload_for_homeroom(
-        tahfidz_rows,
-        recitation_rows,
-        evaluation_rows,
+    students, _ = _get_class_participants(class_room.id, tenant_id=tenant_id)
+    schedule_subject_ids, _ = _class_grade_subject_ids(class_room)
+    recap = build_class_grade_recap(
+        sorted(students, key=lambda row: row.full_name or ''),
         tenant_id=tenant_id,
-        student_id=student.id,
-        academic_year_id=academic_year.id if academic_year else None,
-        class_id=tahfidz_class.id if tahfidz_class else None,
+        academic_year_ids=period_scope['academic_year_ids'] or [],
+        class_id=class_room.id,
+        subject_ids=schedule_subject_ids or None,
     )
 
-    attendance_query = Attendance.query.filter(
-        Attendance.is_deleted.is_(False),
-        Attendance.participant_type == ParticipantType.STUDENT,
-        Attendance.student_id == student.id,
-    )
-    if selected_year_ids:
-        attendance_query = attendance_query.filter(Attendance.academic_year_id.in_(selected_year_ids))
-    if program_class_ids:
-        attendance_query = attendance_query.filter(Attendance.class_id.in_(program_class_ids))
-    attendance_rows = attendance_query.order_by(Attendance.date.desc(), Attendance.created_at.desc()).all()
-    attendance_report = _attendance_report_payload_for_homeroom(attendance_rows, include_history=True, history_limit=300)
+    if (request.args.get('export') or '').strip().lower() == 'xlsx':
+        return xlsx_stream_response(
+            f"leger_nilai_{_report_file_stem(class_room.name)}.xlsx",
+            f"Leger {class_room.name}",
+            grade_recap_xlsx_header(recap),
+            grade_recap_xlsx_rows(recap),
+        )
 
-    behavior_report = _behavior_matrix_for_student(
-        student_id=student.id,
-        class_id=formal_class.id if formal_class else (program_class_ids[0] if program_class_ids else student.current_class_id),
-        academic_year_ids=selected_year_ids,
-        start_date=start_date,
-        end_date=end_date,
-        history_limit=300,
-    )
-    finalization = _report_finalization(tenant_id, student.id, period_scope)
-    behavior_report = _apply_report_behavior_overrides(
-        behavior_report,
-        _report_behavior_overrides(finalization),
+    return render_template(
+        template_name,
+        class_room=class_room,
+        recap=recap,
+        period_options=period_scope['period_options'],
+        selected_period_type=period_scope['period_type'],
+        selected_academic_year=period_scope['selected_academic_year'],
+        selected_year_name=period_scope['selected_year_name'],
+        **context,
     )
-    saved_homeroom_note = (finalization.homeroom_note or '').strip() if finalization else ''
 
-    report_sections = {
-        'formal': bool(formal_class or formal_report['summary_rows']),
-        'tahfidz': bool(tahfidz_class or tahfidz_rows or recitation_rows or evaluation_rows),
-        'bahasa': bool(bahasa_class or bahasa_report['summary_rows']),
-        'lampiran': True,
-    }
-    report_profile = resolve_report_template_profile(tenant_id)
-    parent_name = (
-        student.parent.full_name
-        if student.parent and student.parent.full_name
-        else '-'
-    )
-    mudir_name = resolve_report_mudir_name(tenant_id, report_profile)
-    tenant_brand = build_tenant_brand(getattr(getattr(teacher, 'user', None), 'tenant', None))
-    tenant_brand['report_logo_url'] = (
-        url_for('static', filename='img/rqdf-logo.png')
-        if tenant_brand.get('logo_static') == 'img/logo-rqdf-white.png'
-        else tenant_brand.get('logo_url')
-    )
-    rqdf_report = {
-        'academic_rows': _rqdf_academic_rows(formal_report, attendance_report),
-        'tahfidz': _rqdf_tahfidz_report_payload(tahfidz_report, bahasa_report),
-        'parent_name': parent_name,
-    }
 
-    return {
-        'student': student,
-        'teacher': teacher,
-        'academic_year': academic_year,
-        'period_scope': period_scope,
-        'formal_class': formal_class,
-        'tahfidz_class': tahfidz_class,
-        'bahasa_class': bahasa_class,
-        'formal_report': formal_report,
-        'bahasa_report': bahasa_report,
-        'tahfidz_report': tahfidz_report,
-        'attendance': attendance_report,
-        'behavior': behavior_report,
-        'report_sections': report_sections,
-        'report_profile': report_profile,
-        'tenant_brand': tenant_brand,
-        'rqdf_report': rqdf_report,
-        'parent_name': parent_name,
-        'mudir_name': mudir_name,
-        'global_note': (global_note or '').strip() or saved_homeroom_note,
-        'report_date_label': local_today().strftime('%d/%m/%Y'),
-        'report_signature_date_label': _indonesian_month_year(end_date or local_today()),
-        'predicate_fn': _report_predicate,
-    }
+@teacher_bp.route('/leger-nilai')
+@login_required
+@role_required(UserRole.GURU)
+def grade_recap():
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first_or_404()
+    homeroom_classes = _get_teacher_homeroom_classes(teacher)
+    if not homeroom_classes:
+        flash("Leger nilai hanya tersedia untuk wali kelas.", "warning")
+        return redirect(url_for('teacher.dashboard'))
+
+    selected_class_id = request.args.get('class_id', type=int) or homeroom_classes[0].id
+    selected_class = next((item for item in homeroom_classes if item.id == selected_class_id), homeroom_classes[0])
+    return render_grade_recap_page(
+        selected_class,
+        tenant_id=_teacher_tenant_id(teacher),
+        template_name='teacher/grade_recap.html',
+        class_options=homeroom_classes,
+    )
 
 
 def _student_report_payload_from_request(student_id):
@@ -4047,20 +4276,7 @@ def print_report_package(student_id):
     if response:
         return response
 
-    requested_sections = []
-    for include_value in request.args.getlist('include'):
-        requested_sections.extend(item.strip() for item in include_value.split(',') if item.strip())
-    if not requested_sections:
-        requested_sections = ['formal', 'tahfidz', 'bahasa', 'lampiran']
-
-    allowed_sections = {'formal', 'tahfidz', 'bahasa', 'lampiran'}
-    include_sections = []
-    for section in requested_sections:
-        section_key = (section or '').strip().lower()
-        if section_key in allowed_sections and section_key not in include_sections:
-            if payload['report_sections'].get(section_key):
-                include_sections.append(section_key)
-
+    include_sections = _available_report_sections(payload, _requested_report_sections(request.args.getlist('include')))
     if not include_sections:
         flash("Tidak ada bagian raport yang tersedia untuk dicetak.", "warning")
         return redirect(url_for('teacher.homeroom_students'))
@@ -4072,6 +4288,56 @@ def print_report_package(student_id):
     )
 
 
+@teacher_bp.route('/cetak-raport/kelas/<int:class_id>')
+@login_required
+@role_required(UserRole.GURU)
+def print_class_reports(class_id):
+    teacher = Teacher.query.filter_by(user_id=current_user.id).first_or_404()
+    class_room = next(
+        (item for item in _get_teacher_homeroom_classes(teacher) if item.id == class_id),
+        None,
+    )
+    if class_room is None:
+        flash("Hanya wali kelas yang dapat mencetak raport kelas ini.", "danger")
+        return redirect(url_for('teacher.homeroom_students'))
+
+    output_format = 'zip' if (request.args.get('format') or '').strip().lower() == 'zip' else 'html'
+    options = {
+        'period_type': (request.args.get('period_type') or 'SEMESTER').strip().upper(),
+        'academic_year_id': request.args.get('academic_year_id', type=int),
+        'year_name': (request.args.get('year_name') or '').strip(),
+        'global_note': request.args.get('global_note') or '',
+        'include': request.args.getlist('include'),
+    }
+    if request.args.get('background'):
+        job = enqueue_job(
+            'print_report_batch',
+            tenant_id=_teacher_tenant_id(teacher),
+            created_by_user_id=current_user.id,
+            payload={
+                'teacher_id': teacher.id,
+                'class_id': class_room.id,
+                'output_format': output_format,
+                'options': options,
+                'return_url': url_for('teacher.homeroom_students', class_id=class_room.id),
+            },
+        )
+        return redirect_to_job(job, f'Raport kelas {class_room.name} sedang disiapkan.')
+
+    output = render_class_report_batch(teacher, class_room, output_format=output_format, **options)
+    if not output['count']:
+        flash("Tidak ada raport yang tersedia untuk dicetak di kelas ini.", "warning")
+        return redirect(url_for('teacher.homeroom_students', class_id=class_room.id))
+    if output_format == 'zip':
+        return send_file(
+            io.BytesIO(output['content']),
+            mimetype=output['mimetype'],
+            as_attachment=True,
+            download_name=output['filename'],
+        )
+    return output['content'].decode('utf-8')
+
+
 @teacher_bp.route('/cetak-raport/formal/<int:student_id>')
 @login_required
 @role_required(UserRole.GURU)
@@ -4299,42 +4565,24 @@ def input_attendance():
             return redirect(url_for('teacher.input_attendance', class_id=selected_class_id, date=selected_date))
         
         active_year = AcademicYear.query.filter_by(is_active=True).first()
-        
-        for participant in participants:
-            status_key = f"status_{participant['key']}"
-            status = request.form.get(status_key)
-            notes_key = f"notes_{participant['key']}"
-            notes = request.form.get(notes_key, '')
-            
-            if status:
-                # Cek apakah sudah ada record
-                existing = Attendance.query.filter_by(
-                    student_id=participant['student_id'],
-                    majlis_participant_id=participant['majlis_participant_id'],
-                    participant_type=participant['participant_type'],
-                    class_id=selected_class_id,
-                    date=date_obj,
-                ).first()
-                
-                if existing:
-                    existing.status = AttendanceStatus[status]
-                    existing.notes = notes
-                else:
-                    new_attendance = Attendance(
-                        student_id=participant['student_id'],
-                        majlis_participant_id=participant['majlis_participant_id'],
-                        participant_type=participant['participant_type'],
-                        class_id=selected_class_id,
-                        teacher_id=teacher.id,
-                        academic_year_id=active_year.id if active_year else None,
-                        date=date_obj,
-                        status=AttendanceStatus[status],
-                        notes=notes
-                    )
-                    db.session.add(new_attendance)
-        
+        result = save_class_attendance_sheet(
+            tenant_id=current_user.tenant_id,
+            teacher_id=teacher.id,
+            class_id=selected_class_id,
+            attendance_date=date_obj,
+            participants={participant['key']: participant for participant in participants},
+            records=[
+                {
+                    'participant_key': participant['key'],
+                    'status': request.form.get(f"status_{participant['key']}"),
+                    'notes': request.form.get(f"notes_{participant['key']}", ''),
+                }
+                for participant in participants
+            ],
+            academic_year_id=active_year.id if active_year else None,
+        )
         db.session.commit()
-        flash('Absensi berhasil disimpan!', 'success')
+        flash(f'Absensi berhasil disimpan! ({result.changed} berubah, {result.unchanged} tetap)', 'success')
         return redirect(url_for('teacher.input_attendance', 
                               class_id=selected_class_id, 
                               date=date_str))
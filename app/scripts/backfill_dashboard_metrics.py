@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.models import Tenant
+from app.services.dashboard_metrics_service import backfill_daily_metrics
+from app.utils.timezone import local_today
+
+
+def _select_tenants(tenant_ids: list[int] | None):
+    if tenant_ids:
+        return Tenant.query.filter(Tenant.id.in_(tenant_ids), Tenant.is_deleted.is_(False)).order_by(Tenant.id.asc()).all()
+    return Tenant.query.filter(Tenant.is_deleted.is_(False)).order_by(Tenant.id.asc()).all()
+
+
+def run(
+    tenant_ids: list[int] | None = None,
+    days: int = 400,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    missing_only: bool = False,
+):
+    app = create_app()
+    with app.app_context():
+        end_date = end_date or local_today()
+        start_date = start_date or (end_date - timedelta(days=max(days, 1) - 1))
+        tenants = _select_tenants(tenant_ids)
+        total_rows = 0
+        for tenant in tenants:
+            row_count = backfill_daily_metrics(tenant.id, start_date, end_date, missing_only=missing_only)
+            total_rows += row_count
+            print(f"[backfill] tenant={tenant.id} days={row_count}")
+
+        print(
+            "Dashboard metrics backfill done:",
+            f"tenants={len(tenants)}",
+            f"range={start_date.isoformat()}..{end_date.isoformat()}",
+            f"rows={total_rows}",
+        )
+        return total_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Isi/hitung ulang rollup harian dashboard pimpinan (tenant_daily_metrics)")
+    parser.add_argument("--tenant-id", dest="tenant_ids", action="append", type=int, help="Optional tenant id (can repeat).")
+    parser.add_argument("--days", type=int, default=400, help="Jumlah hari ke belakang dari hari ini (default 400).")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None, help="Tanggal awal YYYY-MM-DD (menimpa --days).")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Tanggal akhir YYYY-MM-DD (default hari ini).")
+    parser.add_argument(
+        "--missing-only",
+        action="store_true",
+        help="Hanya isi hari yang belum tersimpan atau sudah diinvalidasi (cocok untuk cron berkala).",
+    )
+    args = parser.parse_args()
+    run(
+        tenant_ids=args.tenant_ids,
+        days=args.days,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        missing_only=args.missing_only,
+    )
@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import func, select, update
+
+from app import create_app
+from app.extensions import db
+from app.models import Attendance, Grade, Invoice, MajlisParticipant, Parent, Student, Teacher, Transaction, User
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _owner_tenant(owner_model, owner_column):
+    """Scalar subquery tenant pemilik (siswa/guru/peserta) lewat akun User-nya."""
+    return (
+        select(User.tenant_id)
+        .join(owner_model, owner_model.user_id == User.id)
+        .where(owner_model.id == owner_column)
+        .scalar_subquery()
+    )
+
+
+def _tenant_expressions():
+    # Urutan penting: transaksi mengambil tenant dari invoice yang sudah terisi.
+    return {
+        "invoices": (Invoice, _owner_tenant(Student, Invoice.student_id)),
+        "transactions": (
+            Transaction,
+            func.coalesce(
+                select(Invoice.tenant_id).where(Invoice.id == Transaction.invoice_id).scalar_subquery(),
+                select(User.tenant_id).where(User.id == Transaction.pic_id).scalar_subquery(),
+            ),
+        ),
+        "attendances": (
+            Attendance,
+            func.coalesce(
+                _owner_tenant(Student, Attendance.student_id),
+                _owner_tenant(MajlisParticipant, Attendance.majlis_participant_id),
+                _owner_tenant(Parent, Attendance.parent_id),
+                _owner_tenant(Teacher, Attendance.teacher_id),
+            ),
+        ),
+        "grades": (
+            Grade,
+            func.coalesce(
+                _owner_tenant(Student, Grade.student_id),
+                _owner_tenant(MajlisParticipant, Grade.majlis_participant_id),
+                _owner_tenant(Teacher, Grade.teacher_id),
+            ),
+        ),
+    }
+
+
+def backfill_tenant_ids(tables=None, chunk_size=DEFAULT_CHUNK_SIZE, commit=True):
+    """
+    Isi tenant_id yang masih NULL per rentang id (`chunk_size` baris per UPDATE + commit),
+    agar tabel besar tidak terkunci dalam satu transaksi panjang. Mengembalikan {tabel: baris}.
+    """
+    chunk_size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+    stats = {}
+    for table_name, (model, tenant_expression) in _tenant_expressions().items():
+        if tables and table_name not in tables:
+            continue
+        table = model.__table__
+        min_id, max_id = db.session.execute(
+            select(func.min(table.c.id), func.max(table.c.id)).where(table.c.tenant_id.is_(None))
+        ).one()
+        updated = 0
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, chunk_size):
+                result = db.session.execute(
+                    update(table)
+                    .where(
+                        table.c.id >= start,
+                        table.c.id < start + chunk_size,
+                        table.c.tenant_id.is_(None),
+                    )
+                    .values(tenant_id=tenant_expression)
+                    .execution_options(synchronize_session=False)
+                )
+                updated += result.rowcount or 0
+                if commit:
+                    db.session.commit()
+        stats[table_name] = updated
+    return stats
+
+
+def run(tables=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    app = create_app()
+    with app.app_context():
+        stats = backfill_tenant_ids(tables=tables, chunk_size=chunk_size)
+        print("Tenant id backfill done:")
+        for table_name, count in stats.items():
+            print(f"{table_name}={count}")
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Isi tenant_id invoices/transactions/attendances/grades secara bertahap")
+    parser.add_argument(
+        "--table",
+        dest="tables",
+        action="append",
+        choices=("invoices", "transactions", "attendances", "grades"),
+        help="Optional nama tabel (can repeat).",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Jumlah id per UPDATE (default 5000).")
+    args = parser.parse_args()
+    run(tables=args.tables, chunk_size=args.chunk_size)
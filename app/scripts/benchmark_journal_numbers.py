@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import date
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import FinanceJournalSequence
+from app.services.journal_number_service import generate_journal_no
+
+
+# Bulan khusus benchmark agar sequence bulan berjalan tidak ikut bergeser; dihapus setelah selesai.
+BENCHMARK_DATE = date(2099, 12, 1)
+
+
+def _worker(app, tenant_id, iterations, hold_seconds, numbers, errors):
+    with app.app_context():
+        for _ in range(iterations):
+            try:
+                numbers.append(generate_journal_no(tenant_id=tenant_id, journal_date=BENCHMARK_DATE))
+                # Simulasi sisa pekerjaan posting (insert jurnal, baris, saldo) sebelum commit.
+                time.sleep(hold_seconds)
+                db.session.commit()
+            except Exception as exc:  # pragma: no cover - hanya dilaporkan
+                db.session.rollback()
+                errors.append(repr(exc))
+        db.session.remove()
+
+
+def _run_mode(app, tenant_id, block_size, workers, iterations, hold_seconds):
+    app.config["FINANCE_JOURNAL_NUMBER_BLOCK_SIZE"] = block_size
+    app.extensions.pop("finance_journal_number_pool", None)
+    numbers, errors = [], []
+    threads = [
+        threading.Thread(target=_worker, args=(app, tenant_id, iterations, hold_seconds, numbers, errors))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    duplicates = len(numbers) - len(set(numbers))
+    return len(numbers), elapsed, duplicates, errors
+
+
+def run(tenant_id, workers=8, iterations=50, hold_ms=20, block_size=50):
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            print("Peringatan: SQLite selalu memakai mode kunci; jalankan benchmark di PostgreSQL.")
+        results = {}
+        try:
+            for label, size in (("locked", 1), ("block", block_size)):
+                count, elapsed, duplicates, errors = _run_mode(
+                    app, tenant_id, size, workers, iterations, hold_ms / 1000.0
+                )
+                results[label] = count / elapsed if elapsed else 0.0
+                print(
+                    f"[{label}] block_size={size} numbers={count} elapsed={elapsed:.2f}s",
+                    f"throughput={results[label]:.1f}/s duplicates={duplicates} errors={len(errors)}",
+                )
+        finally:
+            FinanceJournalSequence.query.filter_by(
+                tenant_id=tenant_id,
+                year_month=BENCHMARK_DATE.strftime("%Y-%m"),
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        if results.get("locked"):
+            print(f"Speedup block vs locked: {results['block'] / results['locked']:.1f}x")
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bandingkan throughput penomoran jurnal: kunci sequence vs blok")
+    parser.add_argument("--tenant-id", type=int, required=True, help="Tenant yang dipakai (bukan tenant gapless).")
+    parser.add_argument("--workers", type=int, default=8, help="Jumlah thread paralel (default 8).")
+    parser.add_argument("--iterations", type=int, default=50, help="Nomor per thread (default 50).")
+    parser.add_argument("--hold-ms", type=int, default=20, help="Lama transaksi ditahan setelah ambil nomor (default 20ms).")
+    parser.add_argument("--block-size", type=int, default=50, help="Ukuran blok mode pool (default 50).")
+    args = parser.parse_args()
+    run(
+        tenant_id=args.tenant_id,
+        workers=args.workers,
+        iterations=args.iterations,
+        hold_ms=args.hold_ms,
+        block_size=args.block_size,
+    )
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import Tenant
+from app.services.finance_balance_service import rebuild_daily_balances, verify_daily_balances
+
+
+def _select_tenants(tenant_ids: list[int] | None):
+    if tenant_ids:
+        return Tenant.query.filter(Tenant.id.in_(tenant_ids), Tenant.is_deleted.is_(False)).order_by(Tenant.id.asc()).all()
+    return Tenant.query.filter(Tenant.is_deleted.is_(False)).order_by(Tenant.id.asc()).all()
+
+
+def run(tenant_ids: list[int] | None = None, verify_only: bool = False, rebuild_on_drift: bool = False):
+    app = create_app()
+    with app.app_context():
+        tenants = _select_tenants(tenant_ids)
+        rebuilt_count = 0
+        drift_count = 0
+        for tenant in tenants:
+            if verify_only or rebuild_on_drift:
+                drifts = verify_daily_balances(tenant.id)
+                drift_count += len(drifts)
+                for drift in drifts[:20]:
+                    print(
+                        f"[drift] tenant={tenant.id} account={drift.account_id} date={drift.balance_date}",
+                        f"expected={drift.expected_debit}/{drift.expected_credit}",
+                        f"actual={drift.actual_debit}/{drift.actual_credit}",
+                    )
+                if verify_only or not drifts:
+                    continue
+
+            row_count = rebuild_daily_balances(tenant.id)
+            db.session.commit()
+            rebuilt_count += 1
+            print(f"[rebuild] tenant={tenant.id} rows={row_count}")
+
+        print(
+            "Finance balance maintenance done:",
+            f"tenants={len(tenants)}",
+            f"rebuilt_tenants={rebuilt_count}",
+            f"drift_rows={drift_count}",
+        )
+        return drift_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild/verify saldo harian akun keuangan (finance_account_daily_balances)")
+    parser.add_argument("--tenant-id", dest="tenant_ids", action="append", type=int, help="Optional tenant id (can repeat).")
+    parser.add_argument("--verify-only", action="store_true", help="Hanya bandingkan saldo harian dengan jurnal POSTED, tanpa menulis.")
+    parser.add_argument("--rebuild-on-drift", action="store_true", help="Verifikasi dulu, rebuild hanya tenant yang drift.")
+    args = parser.parse_args()
+    drift_rows = run(
+        tenant_ids=args.tenant_ids,
+        verify_only=args.verify_only,
+        rebuild_on_drift=args.rebuild_on_drift,
+    )
+    if args.verify_only and drift_rows:
+        sys.exit(1)
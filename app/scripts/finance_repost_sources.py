@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.models import Tenant, User, UserRole
+from app.services.finance_reconciliation_service import (
+    REPOST_CHUNK_SIZE,
+    RETRY_SOURCE_LABELS,
+    bulk_repost_sources,
+)
+
+
+def _select_tenants(tenant_ids: list[int] | None):
+    query = Tenant.query.filter(Tenant.is_deleted.is_(False))
+    if tenant_ids:
+        query = query.filter(Tenant.id.in_(tenant_ids))
+    return query.order_by(Tenant.id.asc()).all()
+
+
+def _resolve_actor_id(tenant_id: int, actor_user_id: int | None):
+    if actor_user_id:
+        return actor_user_id
+    return (
+        User.query.with_entities(User.id)
+        .filter(
+            User.tenant_id == tenant_id,
+            User.is_deleted.is_(False),
+            User.role.in_([UserRole.TU, UserRole.ADMIN]),
+        )
+        .order_by(User.id.asc())
+        .limit(1)
+        .scalar()
+    )
+
+
+def run(
+    tenant_ids: list[int] | None = None,
+    sources: list[str] | None = None,
+    actor_user_id: int | None = None,
+    limit: int | None = None,
+    chunk_size: int = REPOST_CHUNK_SIZE,
+):
+    app = create_app()
+    with app.app_context():
+        sources = sources or list(RETRY_SOURCE_LABELS)
+        totals = {"success": 0, "failed": 0}
+        skipped = 0
+        tenants = _select_tenants(tenant_ids)
+        for tenant in tenants:
+            actor_id = _resolve_actor_id(tenant.id, actor_user_id)
+            if not actor_id:
+                skipped += 1
+                print(f"Tenant {tenant.id}: dilewati, tidak ada user TU/admin untuk dicatat sebagai pembuat jurnal.")
+                continue
+            for source in sources:
+                result = bulk_repost_sources(
+                    tenant_id=tenant.id,
+                    source=source,
+                    actor_user_id=actor_id,
+                    limit=limit,
+                    chunk_size=chunk_size,
+                )
+                totals["success"] += result["success"]
+                totals["failed"] += result["failed"]
+                print(f"Tenant {tenant.id}: {result['message']}")
+
+        print(
+            "Finance repost sources done:",
+            f"tenants={len(tenants)}",
+            f"skipped_tenants={skipped}",
+            f"posted={totals['success']}",
+            f"failed={totals['failed']}",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Buat jurnal massal untuk pembayaran/tabungan yang belum punya jurnal (per chunk)."
+    )
+    parser.add_argument("--tenant-id", dest="tenant_ids", action="append", type=int, help="Optional tenant id (can repeat).")
+    parser.add_argument(
+        "--source",
+        dest="sources",
+        action="append",
+        choices=sorted(RETRY_SOURCE_LABELS),
+        help="Sumber yang diproses (can repeat). Default: semua.",
+    )
+    parser.add_argument("--actor-user-id", type=int, help="User pembuat jurnal. Default: user TU/admin pertama per tenant.")
+    parser.add_argument("--limit", type=int, help="Maksimum sumber per tenant per jenis.")
+    parser.add_argument("--chunk-size", type=int, default=REPOST_CHUNK_SIZE, help="Jumlah sumber per commit.")
+    args = parser.parse_args()
+    run(
+        tenant_ids=args.tenant_ids,
+        sources=args.sources,
+        actor_user_id=args.actor_user_id,
+        limit=args.limit,
+        chunk_size=args.chunk_size,
+    )
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+
+import click
+from flask.cli import AppGroup
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.services.job_queue_service import requeue_stale_jobs, run_worker
+
+
+jobs_cli = AppGroup("jobs", help="Worker antrean background job (tabel background_jobs).")
+
+
+@jobs_cli.command("worker")
+@click.option("--once", is_flag=True, help="Proses job yang sudah jatuh tempo lalu berhenti (untuk cron).")
+@click.option("--poll-interval", default=2.0, show_default=True, type=float, help="Jeda (detik) saat antrean kosong.")
+@click.option("--max-jobs", default=None, type=int, help="Berhenti setelah sejumlah job (untuk recycle proses).")
+@click.option("--worker-id", default=None, help="Identitas worker di kolom locked_by (default host:pid).")
+def worker_command(once, poll_interval, max_jobs, worker_id):
+    processed = run_worker(worker_id=worker_id, poll_interval=poll_interval, once=once, max_jobs=max_jobs)
+    click.echo(f"Background worker selesai: jobs={processed}")
+
+
+@jobs_cli.command("requeue-stale")
+def requeue_stale_command():
+    click.echo(f"Job macet dikembalikan ke antrean: {requeue_stale_jobs()}")
+
+
+def run(once: bool = False, poll_interval: float = 2.0, max_jobs: int | None = None):
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        processed = run_worker(poll_interval=poll_interval, once=once, max_jobs=max_jobs)
+        print(f"Background worker selesai: jobs={processed}")
+        return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jalankan worker background job (setara `flask jobs worker`).")
+    parser.add_argument("--once", action="store_true", help="Proses job yang sudah jatuh tempo lalu berhenti.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Jeda (detik) saat antrean kosong.")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Berhenti setelah sejumlah job.")
+    args = parser.parse_args()
+    run(once=args.once, poll_interval=args.poll_interval, max_jobs=args.max_jobs)
@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.services.auth_rate_limit_service import purge_expired_auth_rate_limit_buckets
+from app.services.mobile_idempotency_service import cleanup_expired_idempotency_keys
+from app.utils.mobile_api_auth import cleanup_expired_revoked_tokens
+
+
+def run(dry_run: bool = False):
+    app = create_app()
+    with app.app_context():
+        deleted = cleanup_expired_revoked_tokens()
+        idempotency_deleted = cleanup_expired_idempotency_keys()
+        rate_limit_deleted = 0 if dry_run else purge_expired_auth_rate_limit_buckets()
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        print(
+            "Mobile token maintenance done:",
+            f"expired_revoked_tokens={deleted}",
+            f"expired_idempotency_keys={idempotency_deleted}",
+            f"expired_rate_limit_buckets={rate_limit_deleted}",
+            f"dry_run={dry_run}",
+        )
+        return deleted + idempotency_deleted + rate_limit_deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hapus token mobile dicabut, idempotency key, dan bucket rate-limit login yang sudah kedaluwarsa (jalankan berkala via cron)")
+    parser.add_argument("--dry-run", action="store_true", help="Hitung saja tanpa menghapus.")
+    args = parser.parse_args()
+    run(dry_run=args.dry_run)
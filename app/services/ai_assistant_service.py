@@ -1,7 +1,11 @@
+import os
 import re
 from pathlib import Path
 from flask import current_app
 
+from app.models import AiAssistantDocument
+from app.services.job_queue_service import job_handler
+
 
 ALLOWED_DOCUMENT_EXTENSIONS = {"txt", "md", "pdf", "docx"}
 MAX_CONTEXT_CHARACTERS = 12000
@@ -28,6 +32,34 @@ def extract_document_text(file_path):
     raise ValueError("Format dokumen belum didukung.")
 
 
+def extract_stored_document(document):
+    """Ekstrak teks dokumen yang sudah tersimpan di static/uploads lalu perbarui status dokumennya."""
+    file_path = os.path.join(current_app.root_path, "static", document.file_path)
+    try:
+        document.extracted_text = extract_document_text(file_path)
+        document.extraction_status = 'COMPLETED'
+        document.extraction_error = None
+        if not (document.extracted_text or '').strip():
+            document.extraction_status = 'FAILED'
+            document.extraction_error = 'Dokumen tidak berisi teks yang bisa diekstrak.'
+    except Exception as exc:
+        document.extraction_status = 'FAILED'
+        document.extraction_error = str(exc)
+    return document
+
+
+@job_handler('ai_document_extraction')
+def run_document_extraction_job(job):
+    document = AiAssistantDocument.query.filter_by(id=job.payload.get('document_id')).first()
+    if document is None:
+        return {'message': 'Dokumen sudah tidak tersedia.', 'level': 'warning'}
+
+    extract_stored_document(document)
+    if document.extraction_status == 'COMPLETED':
+        return {'message': 'Teks dokumen berhasil diekstrak.', 'level': 'success'}
+    return {'message': f'Ekstraksi teks gagal: {document.extraction_error}', 'level': 'warning'}
+
+
 def build_ai_prompt(request_type, document, parameters):
     label = _request_type_label(request_type)
     params = "\n".join(
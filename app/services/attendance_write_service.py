@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import or_, text
+
+from app.extensions import db
+from app.models import ATTENDANCE_PARTICIPANT_COLUMNS, Attendance, AttendanceStatus, BoardingAttendance, Teacher, User
+from app.services.dashboard_metrics_service import invalidate_daily_metrics
+from app.utils.sql import dialect_insert
+from app.utils.timezone import utc_now_naive
+
+
+class AttendanceSheetError(ValueError):
+    pass
+
+
+def parse_attendance_status(raw_value) -> Optional[AttendanceStatus]:
+    key = str(raw_value or "").strip().upper()
+    return AttendanceStatus.__members__.get(key)
+
+
+def _clean_notes(raw_value, max_length):
+    notes = str(raw_value or "").strip()
+    return notes[:max_length] if notes else None
+
+
+def _participant_key(participant_type, student_id, majlis_participant_id):
+    return participant_type, student_id, majlis_participant_id
+
+
+@dataclass(frozen=True)
+class AttendanceSaveResult:
+    saved: int = 0
+    changed: int = 0
+
+    @property
+    def unchanged(self) -> int:
+        return self.saved - self.changed
+
+    def as_dict(self) -> dict:
+        return {"saved": self.saved, "changed": self.changed, "unchanged": self.unchanged}
+
+
+def _upsert_rows(table, rows, *, index_elements, update_columns, index_where=None, extra_set=None):
+    """
+    Satu INSERT ... ON CONFLICT DO UPDATE untuk seluruh baris. Baris yang isinya sama
+    tidak di-update (klausa WHERE), sehingga RETURNING hanya berisi baris baru/berubah.
+    Mengembalikan None jika dialect tidak mendukung ON CONFLICT.
+    """
+    statement = dialect_insert(table).values(rows)
+    if not hasattr(statement, "on_conflict_do_update"):
+        return None
+    excluded = statement.excluded
+    set_ = {column: getattr(excluded, column) for column in update_columns}
+    set_.update(extra_set or {})
+    set_["updated_at"] = excluded.updated_at
+    set_["is_deleted"] = False
+    statement = statement.on_conflict_do_update(
+        index_elements=index_elements,
+        index_where=index_where,
+        set_=set_,
+        where=or_(
+            table.c.is_deleted.is_(True),
+            *(table.c[column].is_distinct_from(getattr(excluded, column)) for column in update_columns),
+        ),
+    ).returning(table.c.id)
+    return len(db.session.execute(statement).all())
+
+
+def _save_class_rows_orm(class_id, attendance_date, rows_by_type, academic_year_id):
+    existing = {
+        _participant_key(row.participant_type, row.student_id, row.majlis_participant_id): row
+        for row in Attendance.query.execution_options(include_deleted=True).filter(
+            Attendance.class_id == class_id,
+            Attendance.date == attendance_date,
+            Attendance.participant_type.in_(list(rows_by_type)),
+        )
+    }
+    changed = 0
+    for rows in rows_by_type.values():
+        for row in rows:
+            target = existing.get(
+                _participant_key(row["participant_type"], row["student_id"], row["majlis_participant_id"])
+            )
+            if target is None:
+                db.session.add(Attendance(**row))
+                changed += 1
+                continue
+            if target.status == row["status"] and target.notes == row["notes"] and not target.is_deleted:
+                continue
+            target.status = row["status"]
+            target.notes = row["notes"]
+            target.is_deleted = False
+            if academic_year_id:
+                target.academic_year_id = academic_year_id
+            changed += 1
+    db.session.flush()
+    return changed
+
+
+def _teacher_tenant_id(teacher_id):
+    return (
+        db.session.query(User.tenant_id)
+        .join(Teacher, Teacher.user_id == User.id)
+        .filter(Teacher.id == teacher_id)
+        .scalar()
+    )
+
+
+def save_class_attendance_sheet(
+    *,
+    teacher_id: int,
+    class_id: int,
+    attendance_date: date,
+    participants: dict,
+    records: Iterable,
+    academic_year_id: Optional[int] = None,
+    tenant_id: Optional[int] = None,
+) -> AttendanceSaveResult:
+    """
+    Simpan satu lembar absensi kelas. `participants` = map participant_key -> baris peserta
+    (hasil _build_participant_rows). Baris dengan peserta/status tidak dikenal dilewati.
+    Setiap jenis peserta ditulis dengan satu upsert pada indeks unik (kelas, tanggal, peserta).
+    Upsert tidak melewati hook ORM, jadi tenant_id diambil dari guru bila tidak diberikan
+    dan rollup dashboard hari itu diinvalidasi di sini.
+    """
+    now = utc_now_naive()
+    entries = {}
+    for row in records or []:
+        if not isinstance(row, dict):
+            continue
+        participant = participants.get((row.get("participant_key") or "").strip())
+        status = parse_attendance_status(row.get("status"))
+        if participant is None or status is None:
+            continue
+        key = _participant_key(
+            participant.get("participant_type"),
+            participant.get("student_id"),
+            participant.get("majlis_participant_id"),
+        )
+        participant_type, student_id, majlis_participant_id = key
+        entries[key] = {
+            "tenant_id": tenant_id,
+            "student_id": student_id,
+            "majlis_participant_id": majlis_participant_id,
+            "participant_type": participant_type,
+            "class_id": class_id,
+            "teacher_id": teacher_id,
+            "academic_year_id": academic_year_id,
+            "date": attendance_date,
+            "status": status,
+            "notes": _clean_notes(row.get("notes"), 100),
+            "created_at": now,
+            "updated_at": now,
+            "is_deleted": False,
+        }
+    if not entries:
+        return AttendanceSaveResult()
+    if tenant_id is None:
+        tenant_id = _teacher_tenant_id(teacher_id)
+        for row in entries.values():
+            row["tenant_id"] = tenant_id
+
+    rows_by_type = defaultdict(list)
+    for row in entries.values():
+        rows_by_type[row["participant_type"]].append(row)
+
+    table = Attendance.__table__
+    changed = 0
+    for participant_type, rows in rows_by_type.items():
+        type_changed = _upsert_rows(
+            table,
+            rows,
+            index_elements=["class_id", "date", ATTENDANCE_PARTICIPANT_COLUMNS[participant_type]],
+            # Predikat literal yang sama dengan indeks parsial agar PostgreSQL dapat mencocokkannya.
+            index_where=text(f"participant_type = '{participant_type.name}'"),
+            update_columns=("status", "notes"),
+            extra_set={"academic_year_id": academic_year_id} if academic_year_id else None,
+        )
+        if type_changed is None:
+            changed = _save_class_rows_orm(class_id, attendance_date, rows_by_type, academic_year_id)
+            return AttendanceSaveResult(saved=len(entries), changed=changed)
+        changed += type_changed
+    if changed:
+        invalidate_daily_metrics(tenant_id, [attendance_date])
+    return AttendanceSaveResult(saved=len(entries), changed=changed)
+
+
+def save_boarding_attendance_sheet(
+    *,
+    dormitory_id: int,
+    schedule_id: int,
+    attendance_date: date,
+    student_ids: set,
+    records: Iterable,
+    recorded_by_user_id: int,
+) -> AttendanceSaveResult:
+    """
+    Simpan satu lembar absensi asrama dengan satu INSERT ... ON CONFLICT DO UPDATE
+    pada kunci (date, schedule_id, student_id). Status tidak dikenal -> AttendanceSheetError.
+    """
+    now = utc_now_naive()
+    values = {}
+    for row in records or []:
+        if not isinstance(row, dict):
+            continue
+        try:
+            student_id = int(row.get("student_id"))
+        except (TypeError, ValueError):
+            continue
+        status_raw = str(row.get("status") or "").strip().upper()
+        if student_id not in student_ids or not status_raw:
+            continue
+        status = parse_attendance_status(status_raw)
+        if status is None:
+            raise AttendanceSheetError(f"Status absensi tidak valid: {status_raw}.")
+        values[student_id] = {
+            "dormitory_id": dormitory_id,
+            "schedule_id": schedule_id,
+            "student_id": student_id,
+            "attendance_by_user_id": recorded_by_user_id,
+            "date": attendance_date,
+            "status": status,
+            "notes": _clean_notes(row.get("notes"), 150),
+            "created_at": now,
+            "updated_at": now,
+            "is_deleted": False,
+        }
+    if not values:
+        return AttendanceSaveResult()
+
+    rows = list(values.values())
+    changed = _upsert_rows(
+        BoardingAttendance.__table__,
+        rows,
+        index_elements=["date", "schedule_id", "student_id"],
+        update_columns=("status", "notes"),
+        extra_set={"dormitory_id": dormitory_id, "attendance_by_user_id": recorded_by_user_id},
+    )
+    if changed is not None:
+        return AttendanceSaveResult(saved=len(rows), changed=changed)
+
+    existing = {
+        row.student_id: row
+        for row in BoardingAttendance.query.execution_options(include_deleted=True).filter(
+            BoardingAttendance.date == attendance_date,
+            BoardingAttendance.schedule_id == schedule_id,
+            BoardingAttendance.student_id.in_(list(values)),
+        )
+    }
+    changed = 0
+    for student_id, row in values.items():
+        target = existing.get(student_id)
+        if target is None:
+            db.session.add(BoardingAttendance(**row))
+            changed += 1
+            continue
+        if target.status == row["status"] and target.notes == row["notes"] and not target.is_deleted:
+            continue
+        for column in ("dormitory_id", "attendance_by_user_id", "status", "notes", "is_deleted"):
+            setattr(target, column, row[column])
+        changed += 1
+    db.session.flush()
+    return AttendanceSaveResult(saved=len(rows), changed=changed)
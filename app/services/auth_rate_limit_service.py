@@ -1,15 +1,18 @@
 import hashlib
 import hmac
-import random
+import math
+import os
 import re
+import threading
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from flask import current_app, request
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import case, create_engine, event, select
 
 from app.extensions import db
 from app.models import MobileRateLimitBucket
+from app.utils.sql import dialect_insert
 from app.utils.timezone import utc_now_naive
 
 
@@ -18,6 +21,15 @@ SCOPE_IDENTIFIER_TENANT_IP = "identifier_tenant_ip"
 SCOPE_IP = "ip"
 
 
+BACKEND_DATABASE = "database"
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+
+MEMORY_STORE_MAX_BUCKETS = 100_000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
 @dataclass(frozen=True)
 class RateLimitDecision:
     limited: bool
@@ -25,6 +37,15 @@ class RateLimitDecision:
     limited_scope: str | None = None
 
 
+@dataclass(frozen=True)
+class BucketState:
+    """Hitungan window berjalan (`count`, berakhir di `window_ends_at`) dan window sebelumnya."""
+
+    count: int
+    previous_count: int
+    window_ends_at: datetime
+
+
 def _enabled():
     return bool(current_app.config.get("AUTH_RATE_LIMIT_ENABLED", True))
 
@@ -82,25 +103,19 @@ def _normalize_ip(ip_address):
     return str(ip_address or "unknown").strip().lower() or "unknown"
 
 
-def _window_start_epoch(now):
-    timestamp = int(now.timestamp())
+def _window_bounds(now):
+    """(akhir window berjalan, akhir window sebelumnya); window sejajar epoch UTC."""
     window_seconds = _window_seconds()
-    return timestamp - (timestamp % window_seconds)
-
+    elapsed = int((now - _EPOCH).total_seconds())
+    window_end = _EPOCH + timedelta(seconds=elapsed - (elapsed % window_seconds) + window_seconds)
+    return window_end, window_end - timedelta(seconds=window_seconds)
 
-def _window_end(now):
-    window_ends_epoch = _window_start_epoch(now) + _window_seconds()
-    remaining_seconds = max(1, window_ends_epoch - int(now.timestamp()))
-    return now + timedelta(seconds=remaining_seconds)
 
-
-def _bucket_specs(action_name, identifier, tenant_hint=None, ip_address=None, now=None):
-    now = now or utc_now_naive()
+def _bucket_specs(action_name, identifier, tenant_hint=None, ip_address=None):
     action = str(action_name or "auth").strip().lower()
     identifier_hash = _digest(normalize_identifier(identifier))
     tenant_hash = _digest(normalize_tenant_hint(tenant_hint))
     ip_hash = _digest(_normalize_ip(ip_address or current_request_ip()))
-    window_start = _window_start_epoch(now)
 
     raw_specs = [
         (
@@ -121,7 +136,8 @@ def _bucket_specs(action_name, identifier, tenant_hint=None, ip_address=None, no
     for scope_type, scope_material in raw_specs:
         scope_hash = _digest(scope_material)
         scope_key = f"{scope_type}:{scope_hash}"
-        bucket_key = f"auth:v1:{action}:{scope_type}:{scope_hash}:{window_start}"
+        # Satu baris per scope; window berjalan + sebelumnya disimpan di baris yang sama.
+        bucket_key = f"auth:v2:{action}:{scope_type}:{scope_hash}"
         specs.append(
             {
                 "action_name": action,
@@ -133,81 +149,215 @@ def _bucket_specs(action_name, identifier, tenant_hint=None, ip_address=None, no
     return specs
 
 
-def _maybe_cleanup_expired(now):
-    probability = float(current_app.config.get("AUTH_RATE_LIMIT_CLEANUP_PROBABILITY", 0.01))
-    if probability <= 0 or random.random() > probability:
-        return
-    MobileRateLimitBucket.query.filter(MobileRateLimitBucket.window_ends_at < now).delete(
-        synchronize_session=False
-    )
+class DatabaseRateLimitStore:
+    """
+    Bucket di tabel `mobile_rate_limit_buckets`. Setiap percobaan gagal = satu
+    `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` untuk semua scope sekaligus.
+    Tanpa `engine`, statement berjalan di db.session (database utama).
+    """
 
+    def __init__(self, engine=None):
+        self._engine = engine
 
-def check_auth_rate_limit(action_name, identifier, tenant_hint=None, ip_address=None, now=None):
-    if not _enabled():
-        return RateLimitDecision(limited=False)
+    def _execute(self, statement):
+        if self._engine is None:
+            return db.session.execute(statement).all()
+        with self._engine.begin() as connection:
+            return connection.execute(statement).all()
+
+    def read(self, bucket_keys):
+        table = MobileRateLimitBucket.__table__
+        rows = self._execute(
+            select(table.c.bucket_key, table.c.count, table.c.previous_count, table.c.window_ends_at)
+            .where(table.c.bucket_key.in_(list(bucket_keys)))
+        )
+        return {row.bucket_key: BucketState(row.count, row.previous_count, row.window_ends_at) for row in rows}
+
+    def hit(self, specs, window_end, previous_window_end, now):
+        table = MobileRateLimitBucket.__table__
+        statement = dialect_insert(table, bind=self._engine).values([
+            {
+                "bucket_key": spec["bucket_key"],
+                "action_name": spec["action_name"],
+                "scope_key": spec["scope_key"],
+                "count": 1,
+                "previous_count": 0,
+                "window_ends_at": window_end,
+                "created_at": now,
+                "updated_at": now,
+            }
+            # Urutan kunci tetap agar upsert paralel tidak saling deadlock.
+            for spec in sorted(specs, key=lambda item: item["bucket_key"])
+        ])
+        same_window = table.c.window_ends_at >= window_end
+        statement = statement.on_conflict_do_update(
+            index_elements=["bucket_key"],
+            set_={
+                "previous_count": case(
+                    (same_window, table.c.previous_count),
+                    (table.c.window_ends_at == previous_window_end, table.c.count),
+                    else_=0,
+                ),
+                "count": case((same_window, table.c.count + 1), else_=1),
+                "window_ends_at": case((same_window, table.c.window_ends_at), else_=window_end),
+                "updated_at": now,
+            },
+        ).returning(table.c.bucket_key, table.c.count, table.c.previous_count, table.c.window_ends_at)
+        rows = self._execute(statement)
+        if self._engine is None:
+            db.session.commit()
+        return {row.bucket_key: BucketState(row.count, row.previous_count, row.window_ends_at) for row in rows}
+
+    def purge(self, before):
+        table = MobileRateLimitBucket.__table__
+        statement = table.delete().where(table.c.window_ends_at < before)
+        if self._engine is None:
+            return db.session.execute(statement).rowcount
+        with self._engine.begin() as connection:
+            return connection.execute(statement).rowcount
+
+
+class MemoryRateLimitStore:
+    """
+    Bucket di memori proses (AUTH_RATE_LIMIT_BACKEND=memory). Hanya akurat bila satu proses
+    melayani login (dev/test atau satu worker); untuk beberapa worker di satu host pakai `sqlite`.
+    """
+
+    def __init__(self, max_buckets=MEMORY_STORE_MAX_BUCKETS):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_buckets = max_buckets
+
+    def read(self, bucket_keys):
+        with self._lock:
+            return {key: self._buckets[key] for key in bucket_keys if key in self._buckets}
+
+    def hit(self, specs, window_end, previous_window_end, now):
+        states = {}
+        with self._lock:
+            if len(self._buckets) >= self.max_buckets:
+                self._purge_locked(previous_window_end)
+            for spec in specs:
+                key = spec["bucket_key"]
+                state = self._buckets.get(key)
+                if state is not None and state.window_ends_at >= window_end:
+                    state = BucketState(state.count + 1, state.previous_count, state.window_ends_at)
+                else:
+                    previous_count = state.count if state and state.window_ends_at == previous_window_end else 0
+                    state = BucketState(1, previous_count, window_end)
+                self._buckets[key] = states[key] = state
+        return states
+
+    def purge(self, before):
+        with self._lock:
+            return self._purge_locked(before)
+
+    def _purge_locked(self, before):
+        expired = [key for key, state in self._buckets.items() if state.window_ends_at < before]
+        for key in expired:
+            del self._buckets[key]
+        return len(expired)
+
+
+def _sqlite_store_engine(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 5})
+
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, _record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    MobileRateLimitBucket.__table__.create(engine, checkfirst=True)
+    return engine
+
+
+def rate_limit_store():
+    """Store bucket sesuai AUTH_RATE_LIMIT_BACKEND (database | memory | sqlite), satu per aplikasi."""
+    backend = (current_app.config.get("AUTH_RATE_LIMIT_BACKEND") or BACKEND_DATABASE).strip().lower()
+    if backend == BACKEND_DATABASE:
+        return DatabaseRateLimitStore()
+    store = current_app.extensions.get("auth_rate_limit_store")
+    if store is not None:
+        return store
+    if backend == BACKEND_MEMORY:
+        store = MemoryRateLimitStore()
+    elif backend == BACKEND_SQLITE:
+        path = current_app.config.get("AUTH_RATE_LIMIT_SQLITE_PATH") or os.path.join(
+            current_app.instance_path, "auth_rate_limit.sqlite3"
+        )
+        store = DatabaseRateLimitStore(engine=_sqlite_store_engine(path))
+    else:
+        raise ValueError(f"AUTH_RATE_LIMIT_BACKEND tidak dikenal: {backend}")
+    return current_app.extensions.setdefault("auth_rate_limit_store", store)
 
-    now = now or utc_now_naive()
-    specs = _bucket_specs(action_name, identifier, tenant_hint=tenant_hint, ip_address=ip_address, now=now)
-    buckets = {
-        row.bucket_key: row
-        for row in MobileRateLimitBucket.query.filter(
-            MobileRateLimitBucket.bucket_key.in_([spec["bucket_key"] for spec in specs])
-        ).all()
-    }
 
+def _sliding_counts(state, window_end, now):
+    """(perkiraan jumlah dalam sliding window, hitungan window berjalan, hitungan window sebelumnya)."""
+    if state is None:
+        return 0.0, 0, 0
+    window_seconds = _window_seconds()
+    if state.window_ends_at >= window_end:
+        current, previous = int(state.count or 0), int(state.previous_count or 0)
+    elif state.window_ends_at == window_end - timedelta(seconds=window_seconds):
+        current, previous = 0, int(state.count or 0)
+    else:
+        return 0.0, 0, 0
+    # Bagian window sebelumnya yang masih tercakup sliding window sepanjang `window_seconds` ke belakang.
+    previous_weight = max(0.0, (window_end - now).total_seconds()) / window_seconds
+    return current + previous * previous_weight, current, previous
+
+
+def _retry_after_seconds(limit, current, previous, window_end, now):
+    window_seconds = _window_seconds()
+    remaining = max(0.0, (window_end - now).total_seconds())
+    if current >= limit:
+        # Tunggu sampai window berjalan menjadi "sebelumnya" dan bobotnya turun di bawah limit.
+        wait = remaining + window_seconds * (1 - limit / current)
+    else:
+        wait = remaining - (limit - current) * window_seconds / previous
+    # Limit berlaku untuk perkiraan >= limit, jadi tunggu sampai lewat batasnya.
+    return max(1, math.floor(wait) + 1)
+
+
+def _decide(specs, states, window_end, now):
     for spec in specs:
-        bucket = buckets.get(spec["bucket_key"])
-        if bucket is None or bucket.window_ends_at <= now:
-            continue
-        if int(bucket.count or 0) >= _limit_for_scope(spec["scope_type"]):
-            retry_after = max(1, int((bucket.window_ends_at - now).total_seconds()))
+        limit = _limit_for_scope(spec["scope_type"])
+        estimate, current, previous = _sliding_counts(states.get(spec["bucket_key"]), window_end, now)
+        if estimate >= limit:
             return RateLimitDecision(
                 limited=True,
-                retry_after_seconds=retry_after,
+                retry_after_seconds=_retry_after_seconds(limit, current, previous, window_end, now),
                 limited_scope=spec["scope_type"],
             )
-
     return RateLimitDecision(limited=False)
 
 
+def check_auth_rate_limit(action_name, identifier, tenant_hint=None, ip_address=None, now=None):
+    if not _enabled():
+        return RateLimitDecision(limited=False)
+
+    now = now or utc_now_naive()
+    window_end, _previous_window_end = _window_bounds(now)
+    specs = _bucket_specs(action_name, identifier, tenant_hint=tenant_hint, ip_address=ip_address)
+    states = rate_limit_store().read([spec["bucket_key"] for spec in specs])
+    return _decide(specs, states, window_end, now)
+
+
 def record_auth_rate_limit_failure(action_name, identifier, tenant_hint=None, ip_address=None, now=None):
+    """Catat satu percobaan gagal (satu upsert untuk semua scope); hasilnya keputusan untuk percobaan berikutnya."""
     if not _enabled():
-        return
+        return RateLimitDecision(limited=False)
 
     now = now or utc_now_naive()
-    _maybe_cleanup_expired(now)
-    for spec in _bucket_specs(action_name, identifier, tenant_hint=tenant_hint, ip_address=ip_address, now=now):
-        _increment_bucket(spec, now)
-    db.session.commit()
-
-
-def _increment_bucket(spec, now):
-    bucket = MobileRateLimitBucket.query.filter_by(bucket_key=spec["bucket_key"]).first()
-    if bucket is None:
-        bucket = MobileRateLimitBucket(
-            bucket_key=spec["bucket_key"],
-            action_name=spec["action_name"],
-            scope_key=spec["scope_key"],
-            count=1,
-            window_ends_at=_window_end(now),
-            created_at=now,
-            updated_at=now,
-        )
-        db.session.add(bucket)
-        try:
-            db.session.flush()
-            return
-        except IntegrityError:
-            db.session.rollback()
-            bucket = MobileRateLimitBucket.query.filter_by(bucket_key=spec["bucket_key"]).first()
-            if bucket is None:
-                raise
-
-    if bucket.window_ends_at <= now:
-        bucket.count = 1
-        bucket.window_ends_at = _window_end(now)
-    else:
-        bucket.count = int(bucket.count or 0) + 1
-    bucket.updated_at = now
-    db.session.add(bucket)
-    db.session.flush()
+    window_end, previous_window_end = _window_bounds(now)
+    specs = _bucket_specs(action_name, identifier, tenant_hint=tenant_hint, ip_address=ip_address)
+    states = rate_limit_store().hit(specs, window_end, previous_window_end, now)
+    return _decide(specs, states, window_end, now)
+
+
+def purge_expired_auth_rate_limit_buckets(now=None) -> int:
+    """Hapus bucket yang window berjalan maupun sebelumnya sudah lewat (dijalankan berkala, bukan per request)."""
+    now = now or utc_now_naive()
+    _window_end, previous_window_end = _window_bounds(now)
+    return rate_limit_store().purge(previous_window_end)
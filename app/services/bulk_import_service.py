@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models import ClassRoom, Gender, Parent, Student, Teacher, User, UserRole, UserRoleAssignment
+from app.services.job_queue_service import job_handler, job_progress_callback
+from app.utils.nis import allocate_nis_range
+from app.utils.security import hash_passwords
+from app.utils.sql import chunked
+from app.utils.tenant import scoped_classrooms_query
+from app.utils.uploads import UploadLimitError, iter_upload_rows, upload_from_bytes
+
+
+PROGRESS_EVERY_ROWS = 50
+MAX_REPORTED_ERRORS = 50
+IMPORT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 500
+
+DEFAULT_STUDENT_PASSWORD = "123456"
+DEFAULT_TEACHER_PASSWORD = "guru123"
+
+ProgressCallback = Optional[Callable[[int, Optional[int]], None]]
+
+
+def _import_result(label, created, skipped, errors):
+    return {
+        'created': created,
+        'skipped': skipped,
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'error_count': len(errors),
+        'message': f'Upload {label} selesai. Berhasil: {created}, Dilewati: {skipped}.',
+    }
+
+
+def _validation_result(label, valid, skipped, errors):
+    return {
+        'created': 0,
+        'valid': valid,
+        'skipped': skipped,
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'error_count': len(errors),
+        'level': 'warning' if errors else 'success',
+        'message': f'Validasi upload {label} selesai (belum ada data disimpan). Siap diimpor: {valid}, Bermasalah: {skipped}.',
+    }
+
+
+def _sorted_errors(row_errors):
+    return [f'Baris {idx}: {message}' for idx, message in sorted(row_errors, key=lambda item: item[0])]
+
+
+def _initial_password_hashes(passwords):
+    """
+    Hash password awal akun import. Akun baru wajib ganti password saat login pertama,
+    sehingga metode hash awal bisa lebih ringan (BULK_IMPORT_PASSWORD_METHOD).
+    Satu hash (dan salt) per akun, urut sesuai input, walau password awalnya sama.
+    """
+    return hash_passwords(
+        list(passwords),
+        method=current_app.config.get('BULK_IMPORT_PASSWORD_METHOD'),
+        workers=current_app.config.get('BULK_IMPORT_HASH_WORKERS', 0),
+    )
+
+
+def _existing_usernames(usernames):
+    """username -> daftar (tenant_id, is_deleted) di semua tenant, termasuk akun terhapus."""
+    found = {}
+    for chunk in chunked(set(usernames), LOOKUP_CHUNK_SIZE):
+        rows = (
+            db.session.query(User.username, User.tenant_id, User.is_deleted)
+            .filter(User.username.in_(chunk))
+            .execution_options(include_deleted=True)
+        )
+        for username, user_tenant_id, is_deleted in rows:
+            found.setdefault(username, []).append((user_tenant_id, bool(is_deleted)))
+    return found
+
+
+def _existing_emails(tenant_id, emails):
+    found = set()
+    for chunk in chunked(set(emails), LOOKUP_CHUNK_SIZE):
+        found.update(
+            email
+            for (email,) in db.session.query(User.email)
+            .filter(User.tenant_id == tenant_id, User.email.in_(chunk))
+            .execution_options(include_deleted=True)
+        )
+    return found
+
+
+def _existing_values(column, values):
+    found = set()
+    for chunk in chunked(set(values), LOOKUP_CHUNK_SIZE):
+        found.update(
+            value
+            for (value,) in db.session.query(column)
+            .filter(column.in_(chunk))
+            .execution_options(include_deleted=True)
+        )
+    return found
+
+
+def _username_conflict(entries, tenant_id, label, value):
+    if not entries:
+        return None
+    if any(owner == tenant_id for owner, _ in entries):
+        return f'{label} {value} sudah terdaftar.'
+    return f'{label} {value} sudah dipakai tenant lain.'
+
+
+def _add_in_batches(objects):
+    for batch in chunked(objects, IMPORT_BATCH_SIZE):
+        db.session.add_all(batch)
+        db.session.flush()
+
+
+def _parse_teacher_row(row):
+    return {
+        'nip': (row.get('nip') or row.get('NIP') or '').strip(),
+        'full_name': (row.get('full_name') or row.get('nama') or row.get('nama_lengkap') or '').strip(),
+        'specialty': (row.get('specialty') or row.get('mapel') or '').strip(),
+        'phone': (row.get('phone') or row.get('no_hp') or row.get('whatsapp') or '').strip(),
+        'password': (row.get('password') or '').strip() or DEFAULT_TEACHER_PASSWORD,
+    }
+
+
+def import_teachers(
+    rows: Iterable,
+    *,
+    tenant_id: int,
+    progress: ProgressCallback = None,
+    validate_only: bool = False,
+) -> dict:
+    """
+    Buat akun + profil guru dari baris upload. Semua baris divalidasi dulu terhadap data yang
+    dimuat sekaligus, baru disimpan per batch. Caller yang melakukan commit.
+    """
+    row_errors = []
+    parsed = []
+    for idx, row in rows:
+        data = _parse_teacher_row(row)
+        if not data['nip'] or not data['full_name']:
+            row_errors.append((idx, 'NIP dan Nama wajib diisi.'))
+            continue
+        parsed.append((idx, data))
+
+    total = len(parsed) + len(row_errors)
+    if progress:
+        progress(0, total)
+
+    nips = [data['nip'] for _, data in parsed]
+    existing_users = _existing_usernames(nips)
+    existing_nips = _existing_values(Teacher.nip, nips)
+    existing_emails = _existing_emails(tenant_id, [f"{nip}@sekolah.id" for nip in nips])
+
+    accepted = []
+    seen_nips = set()
+    for idx, data in parsed:
+        nip = data['nip']
+        conflict = _username_conflict(existing_users.get(nip), tenant_id, 'NIP', nip)
+        if conflict is None and (nip in existing_nips or f"{nip}@sekolah.id" in existing_emails):
+            conflict = f'NIP {nip} sudah terdaftar.'
+        if conflict is None and nip in seen_nips:
+            conflict = f'NIP {nip} muncul lebih dari sekali di file.'
+        if conflict:
+            row_errors.append((idx, conflict))
+            continue
+        seen_nips.add(nip)
+        accepted.append(data)
+
+    errors = _sorted_errors(row_errors)
+    skipped = len(row_errors)
+    if validate_only:
+        return _validation_result('guru', len(accepted), skipped, errors)
+
+    password_hashes = _initial_password_hashes(data['password'] for data in accepted)
+    written = 0
+    for batch in chunked(zip(accepted, password_hashes), IMPORT_BATCH_SIZE):
+        users = [
+            User(
+                tenant_id=tenant_id,
+                username=data['nip'],
+                email=f"{data['nip']}@sekolah.id",
+                password_hash=password_hash,
+                role=UserRole.GURU,
+                must_change_password=True
+            )
+            for data, password_hash in batch
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+
+        db.session.add_all([
+            Teacher(
+                user_id=user.id,
+                nip=data['nip'],
+                full_name=data['full_name'],
+                phone=data['phone'],
+                specialty=data['specialty']
+            )
+            for user, (data, _password_hash) in zip(users, batch)
+        ])
+        db.session.flush()
+        written += len(batch)
+        if progress:
+            progress(skipped + written, total)
+
+    return _import_result('guru', written, skipped, errors)
+
+
+def _parse_student_row(row):
+    return {
+        'nis': (row.get('nis') or row.get('NIS') or '').strip(),
+        'full_name': (row.get('full_name') or row.get('nama') or row.get('nama_lengkap') or '').strip(),
+        'gender': (row.get('gender') or row.get('jk') or row.get('jenis_kelamin') or '').strip().upper(),
+        'class_name': (row.get('class') or row.get('kelas') or row.get('class_name') or '').strip(),
+        'place_of_birth': (row.get('place_of_birth') or row.get('tempat_lahir') or '').strip(),
+        'date_of_birth': (row.get('date_of_birth') or row.get('tanggal_lahir') or '').strip(),
+        'address': (row.get('address') or row.get('alamat') or '').strip(),
+        'email': (row.get('email') or '').strip(),
+        'parent_name': (row.get('parent_name') or row.get('nama_wali') or '').strip(),
+        'parent_phone': (row.get('parent_phone') or row.get('no_wa') or row.get('no_hp_wali') or '').strip(),
+        'parent_job': (row.get('parent_job') or row.get('pekerjaan_wali') or '').strip(),
+    }
+
+
+def _validate_student_fields(data):
+    if not data['full_name']:
+        return 'Nama wajib diisi.'
+    if not data['parent_phone']:
+        return 'Nomor HP wali wajib diisi.'
+    if data['gender'] not in {'L', 'P'}:
+        return 'Gender harus L atau P.'
+    try:
+        data['dob'] = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
+    except ValueError:
+        return 'Tanggal lahir harus YYYY-MM-DD.'
+    return None
+
+
+def _load_parent_users(tenant_id, phones):
+    parents = {}
+    for chunk in chunked(set(phones), LOOKUP_CHUNK_SIZE):
+        users = (
+            User.query
+            .options(selectinload(User.role_assignments), selectinload(User.parent_profile))
+            .filter(User.tenant_id == tenant_id, User.username.in_(chunk))
+            .all()
+        )
+        parents.update((user.username, user) for user in users)
+    return parents
+
+
+def _parent_conflict(phone, tenant_id, existing_users, parent_users):
+    parent_user = parent_users.get(phone)
+    if parent_user is not None:
+        if parent_user.role == UserRole.ADMIN:
+            return 'Akun admin tidak boleh dipakai sebagai wali murid.'
+        return None
+    entries = existing_users.get(phone) or []
+    if any(owner != tenant_id and not is_deleted for owner, is_deleted in entries):
+        return 'Nomor HP wali sudah terdaftar pada tenant lain.'
+    if entries:
+        return 'Nomor HP wali terdaftar pada akun yang sudah dihapus.'
+    return None
+
+
+def import_students(
+    rows: Iterable,
+    *,
+    tenant_id: int,
+    progress: ProgressCallback = None,
+    validate_only: bool = False,
+) -> dict:
+    """
+    Buat akun siswa, profil, dan akun wali dari baris upload.
+
+    Tahap 1 memvalidasi semua baris terhadap data yang dimuat sekaligus (username, NIS, email,
+    kelas, wali) sehingga semua error dilaporkan di awal. Tahap 2 menyimpan per batch.
+    Caller yang melakukan commit.
+    """
+    row_errors = []
+    parsed = []
+    for idx, row in rows:
+        data = _parse_student_row(row)
+        message = _validate_student_fields(data)
+        if message:
+            row_errors.append((idx, message))
+            continue
+        parsed.append((idx, data))
+
+    total = len(parsed) + len(row_errors)
+    if progress:
+        progress(0, total)
+
+    provided_nis = [data['nis'] for _, data in parsed if data['nis']]
+    phones = {data['parent_phone'] for _, data in parsed}
+    existing_users = _existing_usernames([*provided_nis, *phones])
+    existing_student_nis = _existing_values(Student.nis, provided_nis)
+    parent_users = _load_parent_users(tenant_id, phones)
+
+    checked = []
+    seen_nis = set()
+    for idx, data in parsed:
+        nis = data['nis']
+        message = _parent_conflict(data['parent_phone'], tenant_id, existing_users, parent_users)
+        if message is None and nis:
+            message = _username_conflict(existing_users.get(nis), tenant_id, 'NIS', nis)
+            if message is None and nis in existing_student_nis:
+                message = f'NIS {nis} sudah terdaftar.'
+            if message is None and (nis in seen_nis or nis in phones):
+                message = f'NIS {nis} muncul lebih dari sekali di file.'
+        if message:
+            row_errors.append((idx, message))
+            continue
+        if nis:
+            seen_nis.add(nis)
+        checked.append((idx, data))
+
+    # NIS otomatis dialokasikan sekaligus, melewati NIS/no. HP yang ada di file ini.
+    missing_nis = [data for _, data in checked if not data['nis']]
+    for data, nis in zip(missing_nis, allocate_nis_range(len(missing_nis), reserved=seen_nis | phones)):
+        data['nis'] = nis
+
+    new_phones = sorted(phone for phone in phones if phone not in parent_users)
+    for _, data in checked:
+        data['email'] = data['email'] or f"{data['nis']}@sekolah.id"
+    existing_emails = _existing_emails(
+        tenant_id,
+        [data['email'] for _, data in checked] + [f"{phone}@wali.sekolah.id" for phone in new_phones],
+    )
+
+    accepted = []
+    seen_emails = set()
+    for idx, data in checked:
+        email = data['email']
+        if email in existing_emails or email in seen_emails:
+            row_errors.append((idx, f'Email {email} sudah dipakai.'))
+            continue
+        if data['parent_phone'] in new_phones and f"{data['parent_phone']}@wali.sekolah.id" in existing_emails:
+            row_errors.append((idx, f"Email wali {data['parent_phone']}@wali.sekolah.id sudah dipakai."))
+            continue
+        seen_emails.add(email)
+        accepted.append(data)
+
+    errors = _sorted_errors(row_errors)
+    skipped = len(row_errors)
+    if validate_only:
+        return _validation_result('siswa', len(accepted), skipped, errors)
+
+    class_names = {data['class_name'] for data in accepted if data['class_name']}
+    class_ids = {}
+    for chunk in chunked(class_names, LOOKUP_CHUNK_SIZE):
+        for name, class_id in (
+            scoped_classrooms_query(tenant_id)
+            .filter(ClassRoom.name.in_(chunk))
+            .order_by(ClassRoom.id.asc())
+            .with_entities(ClassRoom.name, ClassRoom.id)
+        ):
+            class_ids.setdefault(name, class_id)
+
+    # Wali: satu akun per nomor HP (saudara kandung berbagi akun/profil yang sama).
+    first_row_by_phone = {}
+    for data in accepted:
+        first_row_by_phone.setdefault(data['parent_phone'], data)
+    needed_new_phones = [phone for phone in new_phones if phone in first_row_by_phone]
+    new_parent_users = [
+        User(
+            tenant_id=tenant_id,
+            username=phone,
+            email=f"{phone}@wali.sekolah.id",
+            password_hash=password_hash,
+            role=UserRole.WALI_MURID
+        )
+        for phone, password_hash in zip(needed_new_phones, _initial_password_hashes(needed_new_phones))
+    ]
+    _add_in_batches(new_parent_users)
+    parent_users.update((user.username, user) for user in new_parent_users)
+
+    new_assignments = []
+    new_profiles = []
+    created_phones = set(needed_new_phones)
+    for phone, data in first_row_by_phone.items():
+        parent_user = parent_users[phone]
+        is_new = phone in created_phones
+        if not is_new and not parent_user.has_role(UserRole.WALI_MURID):
+            new_assignments.append(UserRoleAssignment(user_id=parent_user.id, role=UserRole.WALI_MURID))
+        if parent_user.role != UserRole.WALI_MURID:
+            parent_user.role = UserRole.WALI_MURID
+        if is_new or parent_user.parent_profile is None:
+            new_profiles.append(Parent(
+                user_id=parent_user.id,
+                full_name=data['parent_name'] or "Wali Murid",
+                phone=phone,
+                job=data['parent_job'],
+                address=data['address']
+            ))
+    _add_in_batches(new_assignments)
+    _add_in_batches(new_profiles)
+    parent_ids = {profile.phone: profile.id for profile in new_profiles}
+    for phone in first_row_by_phone:
+        if phone not in parent_ids:
+            parent_ids[phone] = parent_users[phone].parent_profile.id
+
+    student_password_hashes = _initial_password_hashes([DEFAULT_STUDENT_PASSWORD] * len(accepted))
+    written = 0
+    for batch in chunked(zip(accepted, student_password_hashes), IMPORT_BATCH_SIZE):
+        users = [
+            User(
+                tenant_id=tenant_id,
+                username=data['nis'],
+                email=data['email'],
+                password_hash=password_hash,
+                role=UserRole.SISWA
+            )
+            for data, password_hash in batch
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+
+        db.session.add_all([
+            Student(
+                user_id=user.id,
+                parent_id=parent_ids[data['parent_phone']],
+                nis=data['nis'],
+                full_name=data['full_name'],
+                gender=Gender[data['gender']],
+                place_of_birth=data['place_of_birth'],
+                date_of_birth=data['dob'],
+                current_class_id=class_ids.get(data['class_name']),
+                address=data['address']
+            )
+            for user, (data, _password_hash) in zip(users, batch)
+        ])
+        db.session.flush()
+        written += len(batch)
+        if progress:
+            progress(skipped + written, total)
+
+    return _import_result('siswa', written, skipped, errors)
+
+
+def _run_upload_import(job, importer):
+    rows = iter_upload_rows(upload_from_bytes(job.input_blob, job.input_filename))
+    try:
+        return importer(
+            rows,
+            tenant_id=job.tenant_id,
+            progress=job_progress_callback(job),
+            validate_only=bool(job.payload.get('validate_only')),
+        )
+    except UploadLimitError as exc:
+        # Batas file bukan gangguan sementara; laporkan tanpa retry.
+        return {'created': 0, 'skipped': 0, 'errors': [], 'error_count': 0, 'level': 'danger', 'message': str(exc)}
+
+
+@job_handler('import_teachers')
+def run_teacher_import_job(job):
+    return _run_upload_import(job, import_teachers)
+
+
+@job_handler('import_students')
+def run_student_import_job(job):
+    return _run_upload_import(job, import_students)
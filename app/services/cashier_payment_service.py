@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import Invoice, PaymentStatus, Transaction
+from app.services.finance_posting_service import PaymentPostingAccounts, post_invoice_payment_batch
+from app.utils.money import to_rupiah_int
+from app.utils.timezone import utc_now_naive
+
+
+class CashierPaymentError(ValueError):
+    pass
+
+
+@dataclass
+class CashierPaymentResult:
+    receipt_no: str
+    transactions: list = field(default_factory=list)
+    total_amount: int = 0
+    journal_id: Optional[int] = None
+    posting_error: Optional[str] = None
+
+    @property
+    def primary_transaction(self):
+        return self.transactions[0] if self.transactions else None
+
+
+def new_receipt_no() -> str:
+    return f"KW-{uuid.uuid4().hex[:12].upper()}"
+
+
+def apply_invoice_payment(invoice: Invoice, amount: int) -> None:
+    total_amount = to_rupiah_int(invoice.total_amount)
+    invoice.paid_amount = min(total_amount, to_rupiah_int(invoice.paid_amount) + amount)
+    if invoice.paid_amount >= total_amount:
+        invoice.status = PaymentStatus.PAID
+    elif invoice.paid_amount > 0:
+        invoice.status = PaymentStatus.PARTIAL
+    else:
+        invoice.status = PaymentStatus.UNPAID
+
+
+def _normalize_allocations(allocations: Iterable[tuple[int, int]]) -> dict[int, int]:
+    amounts = {}
+    for invoice_id, amount in allocations:
+        amount = to_rupiah_int(amount)
+        if amount <= 0:
+            raise CashierPaymentError('Jumlah pembayaran harus lebih dari 0.')
+        amounts[int(invoice_id)] = amounts.get(int(invoice_id), 0) + amount
+    if not amounts:
+        raise CashierPaymentError('Pilih minimal satu tagihan untuk dibayar.')
+    return amounts
+
+
+def record_cashier_payment(
+    *,
+    tenant_id: int,
+    student_id: int,
+    allocations: Iterable[tuple[int, int]],
+    method: str,
+    actor_user_id: int,
+    accounts: Optional[PaymentPostingAccounts] = None,
+) -> CashierPaymentResult:
+    """
+    Terima pembayaran satu kwitansi (satu/lebih invoice siswa) dan posting satu jurnal gabungan
+    dalam transaksi yang sama; caller cukup commit sekali. Jurnal dibuat dalam savepoint sehingga
+    kegagalan posting tidak membatalkan pembayaran (bisa di-retry dari menu rekonsiliasi).
+    """
+    amounts = _normalize_allocations(allocations)
+
+    # Kunci semua invoice sekaligus, urut id, agar kwitansi paralel tidak saling deadlock.
+    invoices = (
+        Invoice.query.filter(
+            Invoice.id.in_(list(amounts)),
+            Invoice.student_id == student_id,
+            Invoice.is_deleted.is_(False),
+            Invoice.status != PaymentStatus.PAID,
+        )
+        .order_by(Invoice.id.asc())
+        .with_for_update()
+        .all()
+    )
+    if len(invoices) != len(amounts):
+        raise CashierPaymentError('Invoice tidak ditemukan atau tidak sesuai dengan siswa ini.')
+
+    for invoice in invoices:
+        remaining = max(0, to_rupiah_int(invoice.total_amount) - to_rupiah_int(invoice.paid_amount))
+        if amounts[invoice.id] > remaining:
+            raise CashierPaymentError(
+                f'Gagal! Pembayaran {invoice.invoice_number or invoice.id} melebihi sisa (Maks: {remaining})'
+            )
+
+    result = CashierPaymentResult(receipt_no=new_receipt_no())
+    paid_at = utc_now_naive()
+    for invoice in invoices:
+        amount = amounts[invoice.id]
+        result.transactions.append(Transaction(
+            tenant_id=tenant_id,
+            invoice_id=invoice.id,
+            amount=amount,
+            method=method,
+            date=paid_at,
+            pic_id=actor_user_id,
+            receipt_no=result.receipt_no,
+        ))
+        apply_invoice_payment(invoice, amount)
+        result.total_amount += amount
+    db.session.add_all(result.transactions)
+    db.session.flush()
+
+    try:
+        with db.session.begin_nested():
+            journal = post_invoice_payment_batch(
+                tenant_id=tenant_id,
+                transactions=result.transactions,
+                actor_user_id=actor_user_id,
+                accounts=accounts,
+            )
+        result.journal_id = journal.id
+    except Exception as exc:
+        current_app.logger.exception(
+            "Gagal auto-post jurnal pembayaran kasir tenant_id=%s receipt_no=%s",
+            tenant_id,
+            result.receipt_no,
+        )
+        result.posting_error = str(exc)
+    return result
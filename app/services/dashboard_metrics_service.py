@@ -0,0 +1,679 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import case, delete, func, inspect, select
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import (
+    Attendance,
+    AttendanceStatus,
+    BehaviorReport,
+    ClassRoom,
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceAccountDailyBalance,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+    FinancePeriod,
+    Invoice,
+    PaymentStatus,
+    RegistrationStatus,
+    Staff,
+    Student,
+    StudentCandidate,
+    Teacher,
+    TenantDailyMetric,
+    Transaction,
+    User,
+)
+from app.services.finance_balance_service import daily_balances_ready
+from app.utils.cache import app_cache
+from app.utils.sql import dialect_insert
+from app.utils.tenant import active_student_exists, scoped_classrooms_query
+from app.utils.timezone import local_day_bounds_utc_naive, local_now, local_today, utc_now_naive
+
+
+DASHBOARD_CACHE_NAME = 'leadership_dashboard'
+DEFAULT_DASHBOARD_CACHE_TTL_SECONDS = 60
+DEFAULT_REFRESH_DAYS = 3
+BACKFILL_CHUNK_DAYS = 31
+CLASS_OVERVIEW_LIMIT = 8
+
+ATTENDANCE_COLUMNS = {
+    AttendanceStatus.HADIR: 'attendance_hadir',
+    AttendanceStatus.SAKIT: 'attendance_sakit',
+    AttendanceStatus.IZIN: 'attendance_izin',
+    AttendanceStatus.ALPA: 'attendance_alpa',
+}
+METRIC_COLUMNS = (*ATTENDANCE_COLUMNS.values(), 'payment_count', 'payment_amount', 'revenue_amount', 'expense_amount')
+
+
+def format_chart_date(day):
+    return day.strftime('%d/%m')
+
+
+def shift_month(month_start, offset):
+    month_index = month_start.month - 1 + offset
+    year = month_start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, 1)
+
+
+def next_month(month_start):
+    return shift_month(month_start, 1)
+
+
+def leadership_period(raw_period):
+    today = local_today()
+    options = {
+        '7d': ('7 Hari', today - timedelta(days=6), today),
+        '14d': ('14 Hari', today - timedelta(days=13), today),
+        '30d': ('30 Hari', today - timedelta(days=29), today),
+        '90d': ('90 Hari', today - timedelta(days=89), today),
+        'month': ('Bulan Ini', date(today.year, today.month, 1), today),
+        'year': ('Tahun Ini', date(today.year, 1, 1), today),
+    }
+    key = raw_period if raw_period in options else '14d'
+    label, start_date, end_date = options[key]
+    return key, label, start_date, end_date, [{'key': item_key, 'label': item[0]} for item_key, item in options.items()]
+
+
+def date_series(start_date, end_date):
+    days = (end_date - start_date).days
+    return [start_date + timedelta(days=offset) for offset in range(days + 1)]
+
+
+def month_series(start_date, end_date):
+    cursor = date(start_date.year, start_date.month, 1)
+    end_month = date(end_date.year, end_date.month, 1)
+    months = []
+    while cursor <= end_month:
+        months.append(cursor)
+        cursor = next_month(cursor)
+    return months
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _tenant_student_filters(tenant_id):
+    return (Student.is_deleted.is_(False), User.tenant_id == tenant_id)
+
+
+# ---------------------------------------------------------------------------
+# Rollup harian
+# ---------------------------------------------------------------------------
+
+def _empty_metric_row():
+    return {column: 0 for column in METRIC_COLUMNS}
+
+
+def _finance_daily_rows(tenant_id, start_date, end_date):
+    """(tanggal, kategori, debit, kredit) dari saldo harian jika sudah dibangun, selain itu dari jurnal POSTED."""
+    categories = (FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE)
+    if daily_balances_ready(tenant_id):
+        return (
+            db.session.query(
+                FinanceAccountDailyBalance.balance_date,
+                FinanceAccount.category,
+                func.coalesce(func.sum(FinanceAccountDailyBalance.debit_total), 0),
+                func.coalesce(func.sum(FinanceAccountDailyBalance.credit_total), 0),
+            )
+            .join(FinanceAccount, FinanceAccount.id == FinanceAccountDailyBalance.account_id)
+            .filter(
+                FinanceAccountDailyBalance.tenant_id == tenant_id,
+                FinanceAccountDailyBalance.balance_date >= start_date,
+                FinanceAccountDailyBalance.balance_date <= end_date,
+                FinanceAccount.category.in_(categories),
+            )
+            .group_by(FinanceAccountDailyBalance.balance_date, FinanceAccount.category)
+            .all()
+        )
+    return (
+        db.session.query(
+            FinanceJournal.journal_date,
+            FinanceAccount.category,
+            func.coalesce(func.sum(case(
+                (FinanceJournalLine.entry_side == FinanceEntrySide.DEBIT, FinanceJournalLine.amount), else_=0
+            )), 0),
+            func.coalesce(func.sum(case(
+                (FinanceJournalLine.entry_side == FinanceEntrySide.CREDIT, FinanceJournalLine.amount), else_=0
+            )), 0),
+        )
+        .join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
+        .join(FinanceAccount, FinanceAccount.id == FinanceJournalLine.account_id)
+        .filter(
+            FinanceJournalLine.tenant_id == tenant_id,
+            FinanceJournal.tenant_id == tenant_id,
+            FinanceJournal.status == FinanceJournalStatus.POSTED,
+            FinanceJournal.journal_date >= start_date,
+            FinanceJournal.journal_date <= end_date,
+            FinanceAccount.category.in_(categories),
+        )
+        .group_by(FinanceJournal.journal_date, FinanceAccount.category)
+        .all()
+    )
+
+
+def compute_daily_metrics(tenant_id: int, start_date: date, end_date: date) -> dict[date, dict]:
+    """Hitung rollup untuk rentang tanggal dengan tiga query group-by (absensi, pembayaran, keuangan)."""
+    metrics = {day: _empty_metric_row() for day in date_series(start_date, end_date)}
+
+    attendance_rows = (
+        db.session.query(Attendance.date, Attendance.status, func.count(Attendance.id))
+        .filter(
+            Attendance.tenant_id == tenant_id,
+            Attendance.date >= start_date,
+            Attendance.date <= end_date,
+            Attendance.student_id.isnot(None),
+            active_student_exists(Attendance.student_id),
+        )
+        .group_by(Attendance.date, Attendance.status)
+        .all()
+    )
+    for day, status, count in attendance_rows:
+        column = ATTENDANCE_COLUMNS.get(status)
+        if column and day in metrics:
+            metrics[day][column] += int(count or 0)
+
+    payment_day = func.date(Transaction.date)
+    payment_rows = (
+        db.session.query(payment_day, func.count(Transaction.id), func.sum(Transaction.amount))
+        .join(Invoice, Invoice.id == Transaction.invoice_id)
+        .filter(
+            Transaction.tenant_id == tenant_id,
+            Transaction.date >= datetime.combine(start_date, datetime.min.time()),
+            Transaction.date < datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+            Invoice.is_deleted.is_(False),
+            active_student_exists(Invoice.student_id),
+        )
+        .group_by(payment_day)
+        .all()
+    )
+    for day, count, amount in payment_rows:
+        day = _as_date(day)
+        if day in metrics:
+            metrics[day]['payment_count'] += int(count or 0)
+            metrics[day]['payment_amount'] += int(amount or 0)
+
+    for day, category, debit, credit in _finance_daily_rows(tenant_id, start_date, end_date):
+        day = _as_date(day)
+        if day not in metrics:
+            continue
+        if category == FinanceAccountCategory.REVENUE:
+            metrics[day]['revenue_amount'] += int(credit or 0) - int(debit or 0)
+        elif category == FinanceAccountCategory.EXPENSE:
+            metrics[day]['expense_amount'] += int(debit or 0) - int(credit or 0)
+    return metrics
+
+
+def _upsert_metric_rows(tenant_id: int, metrics: dict[date, dict]) -> None:
+    if not metrics:
+        return
+    now = utc_now_naive()
+    rows = [
+        {'tenant_id': tenant_id, 'metric_date': day, 'updated_at': now, **values}
+        for day, values in metrics.items()
+    ]
+    table = TenantDailyMetric.__table__
+    statement = dialect_insert(table).values(rows)
+    if hasattr(statement, 'on_conflict_do_update'):
+        statement = statement.on_conflict_do_update(
+            index_elements=['tenant_id', 'metric_date'],
+            set_={column: getattr(statement.excluded, column) for column in (*METRIC_COLUMNS, 'updated_at')},
+        )
+        db.session.execute(statement)
+        return
+
+    existing = {
+        row.metric_date: row
+        for row in TenantDailyMetric.query.filter(
+            TenantDailyMetric.tenant_id == tenant_id,
+            TenantDailyMetric.metric_date.in_(list(metrics)),
+        )
+    }
+    for row in rows:
+        target = existing.get(row['metric_date'])
+        if target is None:
+            db.session.add(TenantDailyMetric(**row))
+            continue
+        for column in METRIC_COLUMNS:
+            setattr(target, column, row[column])
+    db.session.flush()
+
+
+def refresh_daily_metrics(tenant_id: int, start_date: date, end_date: date) -> int:
+    """Hitung ulang dan simpan rollup untuk rentang tanggal. Caller yang melakukan commit."""
+    if start_date > end_date:
+        return 0
+    metrics = compute_daily_metrics(tenant_id, start_date, end_date)
+    _upsert_metric_rows(tenant_id, metrics)
+    return len(metrics)
+
+
+def backfill_daily_metrics(
+    tenant_id: int,
+    start_date: date,
+    end_date: date,
+    commit: bool = True,
+    missing_only: bool = False,
+) -> int:
+    """
+    Isi rollup per potongan BACKFILL_CHUNK_DAYS hari agar transaksi tidak terlalu besar.
+    Dengan missing_only, hanya hari yang belum tersimpan (belum pernah diisi atau sudah
+    diinvalidasi) yang dihitung dan disimpan.
+    """
+    total = 0
+    cursor = start_date
+    while cursor <= end_date:
+        chunk_end = min(cursor + timedelta(days=BACKFILL_CHUNK_DAYS - 1), end_date)
+        if missing_only:
+            missing = _missing_metric_days(cursor, chunk_end, _stored_metric_rows(tenant_id, cursor, chunk_end))
+            if missing:
+                computed = compute_daily_metrics(tenant_id, missing[0], missing[-1])
+                _upsert_metric_rows(tenant_id, {day: computed[day] for day in missing})
+            total += len(missing)
+        else:
+            total += refresh_daily_metrics(tenant_id, cursor, chunk_end)
+        if commit:
+            db.session.commit()
+        cursor = chunk_end + timedelta(days=1)
+    return total
+
+
+def _refresh_days() -> int:
+    return max(1, int(current_app.config.get('DASHBOARD_METRICS_REFRESH_DAYS', DEFAULT_REFRESH_DAYS)))
+
+
+def _stored_metric_rows(tenant_id: int, start_date: date, end_date: date) -> dict[date, dict]:
+    return {
+        row.metric_date: {column: int(getattr(row, column) or 0) for column in METRIC_COLUMNS}
+        for row in TenantDailyMetric.query.filter(
+            TenantDailyMetric.tenant_id == tenant_id,
+            TenantDailyMetric.metric_date >= start_date,
+            TenantDailyMetric.metric_date <= end_date,
+        )
+    }
+
+
+def _missing_metric_days(start_date: date, end_date: date, stored: dict) -> list[date]:
+    return [day for day in date_series(start_date, end_date) if day not in stored]
+
+
+def daily_metrics_for_period(tenant_id: int, start_date: date, end_date: date, today: Optional[date] = None) -> dict[date, dict]:
+    """
+    Rollup harian untuk periode dashboard, tanpa menulis ke database. Beberapa hari terakhir
+    (DASHBOARD_METRICS_REFRESH_DAYS) selalu dihitung ulang karena absensi/pembayaran masih bisa
+    berubah; hari lama dibaca dari tabel, dan hari yang belum tersimpan atau sudah diinvalidasi
+    oleh penulisan mundur (lihat invalidate_daily_metrics) dihitung langsung dari data sumber.
+    Penyimpanan ulang dilakukan oleh skrip backfill_dashboard_metrics --missing-only.
+    """
+    today = today or local_today()
+    refresh_from = max(start_date, today - timedelta(days=_refresh_days() - 1))
+
+    metrics = {}
+    if start_date < refresh_from:
+        stored_end = refresh_from - timedelta(days=1)
+        metrics = _stored_metric_rows(tenant_id, start_date, stored_end)
+        missing = _missing_metric_days(start_date, stored_end, metrics)
+        if missing:
+            computed = compute_daily_metrics(tenant_id, missing[0], missing[-1])
+            metrics.update({day: computed[day] for day in missing})
+
+    if refresh_from <= end_date:
+        metrics.update(compute_daily_metrics(tenant_id, refresh_from, end_date))
+    return metrics
+
+
+# Model sumber rollup dan atribut tanggal yang menentukan hari rollup-nya.
+METRIC_SOURCE_DATE_ATTRIBUTES = {
+    Attendance: 'date',
+    Transaction: 'date',
+    FinanceJournal: 'journal_date',
+}
+
+
+def invalidate_daily_metrics(tenant_id: Optional[int], days, session=None) -> int:
+    """
+    Hapus rollup tersimpan untuk hari yang data sumbernya berubah agar dihitung ulang saat dibaca.
+    Hari dalam jendela DASHBOARD_METRICS_REFRESH_DAYS dilewati karena selalu dihitung ulang.
+    Caller yang melakukan commit.
+    """
+    refresh_from = local_today() - timedelta(days=_refresh_days() - 1)
+    stale_days = sorted({_as_date(day) for day in days if day is not None and _as_date(day) < refresh_from})
+    if tenant_id is None or not stale_days:
+        return 0
+    table = TenantDailyMetric.__table__
+    result = (session or db.session).execute(
+        delete(table).where(table.c.tenant_id == tenant_id, table.c.metric_date.in_(stale_days))
+    )
+    return int(result.rowcount or 0)
+
+
+def invalidate_daily_metrics_for_session(session) -> None:
+    """Dipanggil dari hook after_flush: invalidasi hari rollup dari absensi/transaksi/jurnal yang berubah."""
+    touched = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        attribute = METRIC_SOURCE_DATE_ATTRIBUTES.get(type(obj))
+        if attribute is None or obj.tenant_id is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        # Nilai lama ikut diinvalidasi bila tanggalnya dipindah.
+        days = touched.setdefault(obj.tenant_id, set())
+        days.update(value for value in inspect(obj).attrs[attribute].history.sum() if value is not None)
+    if not touched:
+        return
+    connection = session.connection()
+    for tenant_id, days in touched.items():
+        invalidate_daily_metrics(tenant_id, days, session=connection)
+
+
+# ---------------------------------------------------------------------------
+# Payload dashboard pimpinan
+# ---------------------------------------------------------------------------
+
+def _headline_counts(tenant_id):
+    """Semua angka tunggal dashboard dalam satu SELECT berisi scalar subquery."""
+    start_utc, end_utc = local_day_bounds_utc_naive()
+
+    def _profile_count(model):
+        return (
+            select(func.count(model.id))
+            .join(User, User.id == model.user_id)
+            .where(model.is_deleted.is_(False), User.tenant_id == tenant_id)
+            .scalar_subquery()
+        )
+
+    income_today = (
+        select(func.coalesce(func.sum(Transaction.amount), 0))
+        .join(Invoice, Invoice.id == Transaction.invoice_id)
+        .where(
+            Transaction.tenant_id == tenant_id,
+            Transaction.date >= start_utc,
+            Transaction.date < end_utc,
+            Invoice.is_deleted.is_(False),
+            active_student_exists(Invoice.student_id),
+        )
+        .scalar_subquery()
+    )
+    draft_journals = (
+        select(func.count(FinanceJournal.id))
+        .where(FinanceJournal.tenant_id == tenant_id, FinanceJournal.status == FinanceJournalStatus.DRAFT)
+        .scalar_subquery()
+    )
+    row = db.session.execute(select(
+        _profile_count(Student).label('students'),
+        _profile_count(Teacher).label('teachers'),
+        _profile_count(Staff).label('staff'),
+        income_today.label('income_today'),
+        draft_journals.label('draft_journals'),
+    )).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def _invoice_status_summary(tenant_id):
+    rows = (
+        db.session.query(
+            Invoice.status,
+            func.count(Invoice.id),
+            func.sum(Invoice.total_amount),
+            func.sum(Invoice.paid_amount),
+        )
+        .filter(
+            Invoice.tenant_id == tenant_id,
+            Invoice.is_deleted.is_(False),
+            active_student_exists(Invoice.student_id),
+        )
+        .group_by(Invoice.status)
+        .all()
+    )
+    invoice_status = []
+    receivable_total = 0
+    for status, count, total_amount, paid_amount in rows:
+        total_amount = int(total_amount or 0)
+        paid_amount = int(paid_amount or 0)
+        if status != PaymentStatus.PAID:
+            receivable_total += total_amount - paid_amount
+        invoice_status.append({
+            'label': status.value if status else '-',
+            'count': int(count or 0),
+            'total_amount': total_amount,
+            'paid_amount': paid_amount,
+            'outstanding_amount': max(total_amount - paid_amount, 0),
+        })
+    return invoice_status, receivable_total
+
+
+def _class_overview(tenant_id, today):
+    class_rooms = (
+        scoped_classrooms_query(tenant_id)
+        .order_by(ClassRoom.name.asc())
+        .limit(CLASS_OVERVIEW_LIMIT)
+        .with_entities(ClassRoom.id, ClassRoom.name)
+        .all()
+    )
+    class_ids = [class_id for class_id, _ in class_rooms]
+    if not class_ids:
+        return []
+    student_counts = dict(
+        db.session.query(Student.current_class_id, func.count(Student.id))
+        .join(User, Student.user_id == User.id)
+        .filter(Student.current_class_id.in_(class_ids), *_tenant_student_filters(tenant_id))
+        .group_by(Student.current_class_id)
+        .all()
+    )
+    attendance_counts = dict(
+        db.session.query(Attendance.class_id, func.count(Attendance.id))
+        .filter(
+            Attendance.tenant_id == tenant_id,
+            Attendance.date == today,
+            Attendance.class_id.in_(class_ids),
+            Attendance.student_id.isnot(None),
+            active_student_exists(Attendance.student_id),
+        )
+        .group_by(Attendance.class_id)
+        .all()
+    )
+    return [
+        {
+            'name': name,
+            'student_count': int(student_counts.get(class_id, 0)),
+            'attendance_count': int(attendance_counts.get(class_id, 0)),
+        }
+        for class_id, name in class_rooms
+    ]
+
+
+def _behavior_summary(tenant_id, period_start, period_end):
+    in_period = (BehaviorReport.report_date >= period_start) & (BehaviorReport.report_date <= period_end)
+    rows = (
+        db.session.query(
+            BehaviorReport.report_type,
+            func.sum(case((in_period, 1), else_=0)),
+            func.sum(case((BehaviorReport.is_resolved.is_(False), 1), else_=0)),
+        )
+        .join(Student, Student.id == BehaviorReport.student_id)
+        .join(User, User.id == Student.user_id)
+        .filter(*_tenant_student_filters(tenant_id))
+        .group_by(BehaviorReport.report_type)
+        .all()
+    )
+    summary = [
+        {'label': report_type.value if report_type else '-', 'count': int(period_count or 0)}
+        for report_type, period_count, _ in rows
+        if period_count
+    ]
+    return summary, sum(int(open_count or 0) for _, _, open_count in rows)
+
+
+def _ppdb_summary(tenant_id, period_start, period_end):
+    in_period = (
+        (StudentCandidate.created_at >= datetime.combine(period_start, datetime.min.time()))
+        & (StudentCandidate.created_at < datetime.combine(period_end + timedelta(days=1), datetime.min.time()))
+    )
+    rows = (
+        db.session.query(
+            StudentCandidate.status,
+            func.count(StudentCandidate.id),
+            func.sum(case((in_period, 1), else_=0)),
+        )
+        .filter(StudentCandidate.tenant_id == tenant_id)
+        .group_by(StudentCandidate.status)
+        .all()
+    )
+    status_summary = [
+        {'label': status.value if status else '-', 'count': int(period_count or 0)}
+        for status, _, period_count in rows
+        if period_count
+    ]
+    pending = sum(int(count or 0) for status, count, _ in rows if status == RegistrationStatus.PENDING)
+    return status_summary, pending
+
+
+def build_leadership_payload(tenant_id: int, period_key: str = '14d') -> dict:
+    today = local_today()
+    period_key, period_label, period_start, period_end, period_options = leadership_period(period_key)
+
+    headline = _headline_counts(tenant_id)
+    invoice_status, receivable_total = _invoice_status_summary(tenant_id)
+    metrics = daily_metrics_for_period(tenant_id, period_start, period_end, today=today)
+
+    today_metrics = metrics.get(today, _empty_metric_row())
+    attendance_counts = {status.value: today_metrics[column] for status, column in ATTENDANCE_COLUMNS.items()}
+    attendance_total = sum(attendance_counts.values())
+    attendance_present = attendance_counts.get(AttendanceStatus.HADIR.value, 0)
+    attendance_rate = round((attendance_present / attendance_total) * 100, 1) if attendance_total else 0
+
+    period_days = date_series(period_start, period_end)
+    attendance_trend = []
+    payment_trend = []
+    for day in period_days:
+        day_metrics = metrics.get(day, _empty_metric_row())
+        total = sum(day_metrics[column] for column in ATTENDANCE_COLUMNS.values())
+        present = day_metrics['attendance_hadir']
+        attendance_trend.append({
+            'label': format_chart_date(day),
+            'present': present,
+            'total': total,
+            'rate': round((present / total) * 100, 1) if total else 0,
+        })
+        payment_trend.append({'label': format_chart_date(day), 'amount': day_metrics['payment_amount']})
+
+    monthly_revenue = sum(metrics.get(day, _empty_metric_row())['revenue_amount'] for day in period_days)
+    monthly_expense = sum(metrics.get(day, _empty_metric_row())['expense_amount'] for day in period_days)
+
+    finance_trend = []
+    for trend_month_start in month_series(period_start, period_end):
+        month_days = [
+            day for day in period_days
+            if day.year == trend_month_start.year and day.month == trend_month_start.month and day <= today
+        ]
+        revenue = sum(metrics[day]['revenue_amount'] for day in month_days if day in metrics)
+        expense = sum(metrics[day]['expense_amount'] for day in month_days if day in metrics)
+        finance_trend.append({
+            'label': trend_month_start.strftime('%b %Y'),
+            'revenue': int(revenue),
+            'expense': int(expense),
+            'surplus': int(revenue - expense),
+        })
+
+    behavior_summary, behavior_open = _behavior_summary(tenant_id, period_start, period_end)
+    ppdb_status, ppdb_pending = _ppdb_summary(tenant_id, period_start, period_end)
+    period_today = FinancePeriod.query.filter(
+        FinancePeriod.tenant_id == tenant_id,
+        FinancePeriod.start_date <= today,
+        FinancePeriod.end_date >= today,
+    ).first()
+    period_status = period_today.status.value if period_today else 'BELUM ADA'
+
+    recent_payments = (
+        Transaction.query
+        .options(joinedload(Transaction.invoice).joinedload(Invoice.student))
+        .join(Invoice, Invoice.id == Transaction.invoice_id)
+        .filter(
+            Transaction.tenant_id == tenant_id,
+            Invoice.is_deleted.is_(False),
+            active_student_exists(Invoice.student_id),
+        )
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(5)
+        .all()
+    )
+
+    return {
+        'generated_at': local_now().strftime('%d/%m/%Y %H:%M:%S'),
+        'period': {
+            'key': period_key,
+            'label': period_label,
+            'start_date': period_start.isoformat(),
+            'end_date': period_end.isoformat(),
+            'options': period_options,
+        },
+        'cards': {
+            'students': headline['students'],
+            'teachers_staff': headline['teachers'] + headline['staff'],
+            'attendance_rate': attendance_rate,
+            'income_today': headline['income_today'],
+            'receivable_total': int(receivable_total),
+            'monthly_surplus': int(monthly_revenue - monthly_expense),
+        },
+        'finance': {
+            'monthly_revenue': int(monthly_revenue),
+            'monthly_expense': int(monthly_expense),
+            'monthly_surplus': int(monthly_revenue - monthly_expense),
+            'draft_journals': headline['draft_journals'],
+            'period_status': period_status,
+        },
+        'attendance': {
+            'counts': attendance_counts,
+            'total': attendance_total,
+            'rate': attendance_rate,
+        },
+        'payment_trend': payment_trend,
+        'attendance_trend': attendance_trend,
+        'finance_trend': finance_trend,
+        'invoice_status': invoice_status,
+        'class_overview': _class_overview(tenant_id, today),
+        'behavior_summary': behavior_summary,
+        'ppdb_status': ppdb_status,
+        'alerts': {
+            'ppdb_pending': ppdb_pending,
+            'behavior_open': behavior_open,
+            'draft_journals': headline['draft_journals'],
+            'period_status': period_status,
+        },
+        'recent_payments': [
+            {
+                'student': payment.invoice.student.full_name if payment.invoice and payment.invoice.student else '-',
+                'amount': int(payment.amount or 0),
+                'method': payment.method or '-',
+                'date': payment.date.strftime('%d/%m/%Y %H:%M') if payment.date else '-',
+            }
+            for payment in recent_payments
+        ],
+    }
+
+
+def leadership_dashboard_payload(tenant_id: int, period_key: Optional[str] = None) -> dict:
+    """Payload dashboard pimpinan dengan cache TTL pendek per tenant + periode (refresh AJAX berulang)."""
+    period_key = leadership_period(period_key)[0]
+    cache = app_cache(
+        DASHBOARD_CACHE_NAME,
+        'LEADERSHIP_DASHBOARD_CACHE_TTL_SECONDS',
+        DEFAULT_DASHBOARD_CACHE_TTL_SECONDS,
+        max_entries=256,
+    )
+    key = (tenant_id, period_key, local_today().isoformat())
+    return cache.get_or_set(key, lambda: build_leadership_payload(tenant_id, period_key))
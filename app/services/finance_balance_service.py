@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func
+
+from app.extensions import db
+from app.models import (
+    AppConfig,
+    FinanceAccountDailyBalance,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+)
+from app.utils.sql import chunked, dialect_insert
+from app.utils.timezone import utc_now_naive
+
+
+DAILY_BALANCE_READY_KEY = "finance.daily_balance_rebuilt_at"
+REBUILD_INSERT_CHUNK_SIZE = 500
+
+
+@dataclass(frozen=True)
+class DailyBalanceDrift:
+    account_id: int
+    balance_date: date
+    expected_debit: int
+    expected_credit: int
+    actual_debit: int
+    actual_credit: int
+
+
+def apply_journal_to_daily_balances(journal: FinanceJournal, direction: int = 1) -> None:
+    """Tambahkan (direction=1) atau keluarkan (direction=-1) mutasi jurnal dari saldo harian."""
+    deltas = defaultdict(lambda: [0, 0])
+    for line in journal.lines:
+        amount = int(line.amount or 0)
+        if line.entry_side == FinanceEntrySide.DEBIT:
+            deltas[line.account_id][0] += amount
+        elif line.entry_side == FinanceEntrySide.CREDIT:
+            deltas[line.account_id][1] += amount
+    if not deltas:
+        return
+
+    now = utc_now_naive()
+    _upsert_daily_rows([
+        {
+            'tenant_id': journal.tenant_id,
+            'account_id': account_id,
+            'balance_date': journal.journal_date,
+            'debit_total': debit * direction,
+            'credit_total': credit * direction,
+            'updated_at': now,
+        }
+        for account_id, (debit, credit) in deltas.items()
+    ])
+
+
+def _upsert_daily_rows(rows: list[dict]) -> None:
+    table = FinanceAccountDailyBalance.__table__
+    statement = dialect_insert(table).values(rows)
+    if hasattr(statement, 'on_conflict_do_update'):
+        statement = statement.on_conflict_do_update(
+            index_elements=['tenant_id', 'account_id', 'balance_date'],
+            set_={
+                'debit_total': table.c.debit_total + statement.excluded.debit_total,
+                'credit_total': table.c.credit_total + statement.excluded.credit_total,
+                'updated_at': statement.excluded.updated_at,
+            },
+        )
+        db.session.execute(statement)
+        return
+
+    for row in rows:
+        existing = FinanceAccountDailyBalance.query.filter_by(
+            tenant_id=row['tenant_id'],
+            account_id=row['account_id'],
+            balance_date=row['balance_date'],
+        ).with_for_update().first()
+        if existing is None:
+            db.session.add(FinanceAccountDailyBalance(**row))
+        else:
+            existing.debit_total = int(existing.debit_total or 0) + row['debit_total']
+            existing.credit_total = int(existing.credit_total or 0) + row['credit_total']
+    db.session.flush()
+
+
+def _live_daily_totals_query(tenant_id: int):
+    debit_sum = func.coalesce(
+        func.sum(case((FinanceJournalLine.entry_side == FinanceEntrySide.DEBIT, FinanceJournalLine.amount), else_=0)),
+        0,
+    )
+    credit_sum = func.coalesce(
+        func.sum(case((FinanceJournalLine.entry_side == FinanceEntrySide.CREDIT, FinanceJournalLine.amount), else_=0)),
+        0,
+    )
+    return (
+        db.session.query(
+            FinanceJournalLine.account_id,
+            FinanceJournal.journal_date,
+            debit_sum,
+            credit_sum,
+        )
+        .join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
+        .filter(
+            FinanceJournalLine.tenant_id == tenant_id,
+            FinanceJournal.tenant_id == tenant_id,
+            FinanceJournal.status == FinanceJournalStatus.POSTED,
+        )
+        .group_by(FinanceJournalLine.account_id, FinanceJournal.journal_date)
+    )
+
+
+def daily_balances_ready(tenant_id: Optional[int]) -> bool:
+    if tenant_id is None:
+        return False
+    row = AppConfig.query.filter_by(tenant_id=tenant_id, key=DAILY_BALANCE_READY_KEY, is_deleted=False).first()
+    return bool(row and (row.value or '').strip())
+
+
+def _mark_daily_balances_ready(tenant_id: int) -> None:
+    stamp = utc_now_naive().isoformat(timespec='seconds')
+    row = AppConfig.query.filter_by(tenant_id=tenant_id, key=DAILY_BALANCE_READY_KEY).first()
+    if row:
+        row.value = stamp
+        row.is_deleted = False
+    else:
+        db.session.add(AppConfig(
+            tenant_id=tenant_id,
+            key=DAILY_BALANCE_READY_KEY,
+            value=stamp,
+            description='Waktu terakhir saldo harian akun keuangan dibangun ulang.',
+        ))
+
+
+def rebuild_daily_balances(tenant_id: int) -> int:
+    """Bangun ulang saldo harian tenant dari jurnal POSTED. Caller yang melakukan commit."""
+    FinanceAccountDailyBalance.query.filter_by(tenant_id=tenant_id).delete(synchronize_session=False)
+    now = utc_now_naive()
+    rows = [
+        {
+            'tenant_id': tenant_id,
+            'account_id': account_id,
+            'balance_date': journal_date,
+            'debit_total': int(debit or 0),
+            'credit_total': int(credit or 0),
+            'updated_at': now,
+        }
+        for account_id, journal_date, debit, credit in _live_daily_totals_query(tenant_id).all()
+    ]
+    for chunk in chunked(rows, REBUILD_INSERT_CHUNK_SIZE):
+        db.session.execute(FinanceAccountDailyBalance.__table__.insert(), chunk)
+    _mark_daily_balances_ready(tenant_id)
+    db.session.flush()
+    return len(rows)
+
+
+def verify_daily_balances(tenant_id: int) -> list[DailyBalanceDrift]:
+    expected = {
+        (account_id, journal_date): (int(debit or 0), int(credit or 0))
+        for account_id, journal_date, debit, credit in _live_daily_totals_query(tenant_id).all()
+    }
+    actual = {
+        (row.account_id, row.balance_date): (int(row.debit_total or 0), int(row.credit_total or 0))
+        for row in FinanceAccountDailyBalance.query.filter_by(tenant_id=tenant_id).all()
+    }
+    drifts = []
+    for key in sorted(set(expected) | set(actual), key=lambda item: (item[1], item[0])):
+        expected_debit, expected_credit = expected.get(key, (0, 0))
+        actual_debit, actual_credit = actual.get(key, (0, 0))
+        if (expected_debit, expected_credit) != (actual_debit, actual_credit):
+            drifts.append(DailyBalanceDrift(
+                account_id=key[0],
+                balance_date=key[1],
+                expected_debit=expected_debit,
+                expected_credit=expected_credit,
+                actual_debit=actual_debit,
+                actual_credit=actual_credit,
+            ))
+    return drifts
+
+
+def materialized_account_totals(
+    tenant_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    account_ids: Optional[Iterable[int]] = None,
+) -> Optional[dict[int, tuple[int, int]]]:
+    """
+    Total debit/kredit per akun dari saldo harian. Mengembalikan None jika saldo harian
+    tenant belum pernah dibangun ulang, sehingga caller harus memakai jalur live.
+    """
+    if not daily_balances_ready(tenant_id):
+        return None
+
+    query = (
+        db.session.query(
+            FinanceAccountDailyBalance.account_id,
+            func.coalesce(func.sum(FinanceAccountDailyBalance.debit_total), 0),
+            func.coalesce(func.sum(FinanceAccountDailyBalance.credit_total), 0),
+        )
+        .filter(FinanceAccountDailyBalance.tenant_id == tenant_id)
+        .group_by(FinanceAccountDailyBalance.account_id)
+    )
+    if start_date:
+        query = query.filter(FinanceAccountDailyBalance.balance_date >= start_date)
+    if end_date:
+        query = query.filter(FinanceAccountDailyBalance.balance_date <= end_date)
+    if account_ids is not None:
+        query = query.filter(FinanceAccountDailyBalance.account_id.in_(list(account_ids)))
+    return {account_id: (int(debit or 0), int(credit or 0)) for account_id, debit, credit in query.all()}
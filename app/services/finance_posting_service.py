@@ -15,7 +15,6 @@ from app.models import (
     FinanceEntrySide,
     FinanceJournal,
     FinanceJournalLine,
-    FinanceJournalSequence,
     FinanceJournalSourceType,
     FinanceJournalStatus,
     FinancePeriod,
@@ -29,6 +28,8 @@ from app.models import (
     Transaction,
     User,
 )
+from app.services.finance_balance_service import apply_journal_to_daily_balances
+from app.services.journal_number_service import generate_journal_no
 from app.utils.timezone import utc_now_naive
 
 
@@ -38,35 +39,104 @@ class PostingContext:
     reason: Optional[str] = None
 
 
-def generate_journal_no(*, tenant_id: int, journal_date: date) -> str:
-    year_month = journal_date.strftime('%Y-%m')
-    sequence = (
-        FinanceJournalSequence.query
-        .filter_by(tenant_id=tenant_id, year_month=year_month)
-        .with_for_update()
-        .first()
+@dataclass(frozen=True)
+class PaymentPostingAccounts:
+    cash_gl_account_id: Optional[int]
+    revenue_account_id: Optional[int]
+    savings_liability_account_id: Optional[int] = None
+
+
+def resolve_payment_posting_accounts(tenant_id: int) -> PaymentPostingAccounts:
+    """Akun default posting (kas/bank, pendapatan, titipan tabungan); cukup di-resolve sekali per request/batch."""
+    settings = _get_finance_settings(tenant_id)
+    return PaymentPostingAccounts(
+        cash_gl_account_id=_resolve_cash_bank_gl_account_id(tenant_id, settings),
+        revenue_account_id=getattr(settings, 'default_spp_revenue_account_id', None) if settings else None,
+        savings_liability_account_id=(
+            getattr(settings, 'default_savings_liability_account_id', None) if settings else None
+        ),
     )
-    if not sequence:
-        sequence = FinanceJournalSequence(tenant_id=tenant_id, year_month=year_month, last_value=0)
-        db.session.add(sequence)
-        db.session.flush()
-        sequence = (
-            FinanceJournalSequence.query
-            .filter_by(id=sequence.id)
-            .with_for_update()
-            .first()
-        )
-    sequence.last_value = (sequence.last_value or 0) + 1
-    db.session.flush()
-    return f"JV-{year_month}-{sequence.last_value:04d}"
 
 
-def post_invoice_payment(*, tenant_id: int, transaction_id: int, actor_user_id: int) -> int:
-    existing = _find_existing_source_journal(
+class FinancePeriodMap:
+    """Periode akuntansi satu tenant, dimuat sekali untuk posting massal."""
+
+    def __init__(self, periods: Iterable[FinancePeriod]):
+        self._periods = [(period.start_date, period.end_date, period.status) for period in periods]
+
+    @classmethod
+    def load(cls, tenant_id: int) -> FinancePeriodMap:
+        return cls(FinancePeriod.query.filter_by(tenant_id=tenant_id).order_by(FinancePeriod.start_date.asc()).all())
+
+    def context_for(self, journal_date: date) -> PostingContext:
+        for start_date, end_date, status in self._periods:
+            if start_date <= journal_date <= end_date:
+                return _period_posting_context(status)
+        return _period_posting_context(None)
+
+
+def post_invoice_payment_batch(
+    *,
+    tenant_id: int,
+    transactions: list[Transaction],
+    actor_user_id: int,
+    accounts: Optional[PaymentPostingAccounts] = None,
+    periods: Optional[FinancePeriodMap] = None,
+) -> FinanceJournal:
+    """
+    Satu jurnal untuk satu kwitansi: debit kas sebesar total, kredit pendapatan per transaksi
+    (reference_id = id transaksi). Sumber jurnal = transaksi pertama. Tidak melakukan commit.
+    """
+    if not transactions:
+        raise ValueError("Tidak ada transaksi pembayaran untuk diposting.")
+    amounts = [int(trx.amount or 0) for trx in transactions]
+    if any(amount <= 0 for amount in amounts):
+        raise ValueError("Nominal transaksi pembayaran harus lebih dari 0.")
+
+    accounts = accounts or resolve_payment_posting_accounts(tenant_id)
+    primary = transactions[0]
+    if len(transactions) == 1:
+        invoice = primary.invoice
+        description = (
+            f"Pembayaran invoice {invoice.invoice_number or invoice.id} "
+            f"(trx #{primary.id}, metode={primary.method or '-'})"
+        )
+        credit_specs = [(accounts.revenue_account_id, FinanceEntrySide.CREDIT, amounts[0], 'Pendapatan pendidikan')]
+    else:
+        description = (
+            f"Pembayaran {len(transactions)} invoice "
+            f"(kwitansi {primary.receipt_no or primary.id}, metode={primary.method or '-'})"
+        )
+        credit_specs = [
+            (
+                accounts.revenue_account_id,
+                FinanceEntrySide.CREDIT,
+                amount,
+                f"Pendapatan pendidikan ({trx.invoice.invoice_number or trx.invoice_id})",
+                trx.id,
+            )
+            for trx, amount in zip(transactions, amounts)
+        ]
+
+    return _create_journal_with_lines(
         tenant_id=tenant_id,
+        actor_user_id=actor_user_id,
+        journal_date=_resolve_journal_date(primary.date),
+        description=description,
         source_type=FinanceJournalSourceType.INVOICE_PAYMENT,
-        source_id=transaction_id,
+        source_id=primary.id,
+        line_specs=(
+            (accounts.cash_gl_account_id, FinanceEntrySide.DEBIT, sum(amounts), 'Kas/Bank masuk'),
+            *credit_specs,
+        ),
+        reference_type='transaction',
+        reference_id=primary.id,
+        periods=periods,
     )
+
+
+def post_invoice_payment(*, tenant_id: int, transaction_id: int, actor_user_id: int) -> int:
+    existing = _find_invoice_payment_journal(tenant_id=tenant_id, transaction_id=transaction_id)
     if existing:
         return existing.id
 
@@ -87,34 +157,7 @@ def post_invoice_payment(*, tenant_id: int, transaction_id: int, actor_user_id:
     if not trx:
         raise ValueError("Transaksi pembayaran tidak ditemukan untuk tenant ini.")
 
-    invoice = trx.invoice
-    amount = int(trx.amount or 0)
-    if amount <= 0:
-        raise ValueError("Nominal transaksi pembayaran harus lebih dari 0.")
-
-    settings = _get_finance_settings(tenant_id)
-    cash_gl_account_id = _resolve_cash_bank_gl_account_id(tenant_id, settings)
-    revenue_account_id = getattr(settings, 'default_spp_revenue_account_id', None) if settings else None
-    journal_date = _resolve_journal_date(trx.date)
-    journal_description = (
-        f"Pembayaran invoice {invoice.invoice_number or invoice.id} "
-        f"(trx #{trx.id}, metode={trx.method or '-'})"
-    )
-
-    journal = _create_journal_with_lines(
-        tenant_id=tenant_id,
-        actor_user_id=actor_user_id,
-        journal_date=journal_date,
-        description=journal_description,
-        source_type=FinanceJournalSourceType.INVOICE_PAYMENT,
-        source_id=trx.id,
-        line_specs=(
-            (cash_gl_account_id, FinanceEntrySide.DEBIT, amount, 'Kas/Bank masuk'),
-            (revenue_account_id, FinanceEntrySide.CREDIT, amount, 'Pendapatan pendidikan'),
-        ),
-        reference_type='transaction',
-        reference_id=trx.id,
-    )
+    journal = post_invoice_payment_batch(tenant_id=tenant_id, transactions=[trx], actor_user_id=actor_user_id)
     db.session.commit()
     return journal.id
 
@@ -154,29 +197,49 @@ def post_savings_transaction(*, tenant_id: int, savings_transaction_id: int, act
     if existing:
         return existing.id
 
+    journal = post_savings_transaction_entry(
+        tenant_id=tenant_id,
+        savings_trx=savings_trx,
+        actor_user_id=actor_user_id,
+    )
+    db.session.commit()
+    return journal.id
+
+
+def post_savings_transaction_entry(
+    *,
+    tenant_id: int,
+    savings_trx: StudentSavingsTransaction,
+    actor_user_id: int,
+    accounts: Optional[PaymentPostingAccounts] = None,
+    periods: Optional[FinancePeriodMap] = None,
+) -> FinanceJournal:
+    """Buat jurnal setoran/penarikan tabungan APPROVED tanpa commit; caller memastikan belum ada jurnal sumber."""
     amount = int(savings_trx.amount or 0)
     if amount <= 0:
         raise ValueError("Nominal transaksi tabungan harus lebih dari 0.")
 
-    settings = _get_finance_settings(tenant_id)
-    cash_gl_account_id = _resolve_cash_bank_gl_account_id(tenant_id, settings)
-    savings_liability_account_id = getattr(settings, 'default_savings_liability_account_id', None) if settings else None
+    accounts = accounts or resolve_payment_posting_accounts(tenant_id)
+    cash_gl_account_id = accounts.cash_gl_account_id
+    savings_liability_account_id = accounts.savings_liability_account_id
     journal_date = _resolve_journal_date(savings_trx.approved_at or savings_trx.updated_at or savings_trx.created_at)
 
     if savings_trx.transaction_type == SavingsTransactionType.DEPOSIT:
+        source_type = FinanceJournalSourceType.SAVINGS_DEPOSIT
         line_specs = (
             (cash_gl_account_id, FinanceEntrySide.DEBIT, amount, 'Kas/Bank masuk'),
             (savings_liability_account_id, FinanceEntrySide.CREDIT, amount, 'Titipan tabungan santri'),
         )
         label = "Setoran tabungan"
     else:
+        source_type = FinanceJournalSourceType.SAVINGS_WITHDRAWAL
         line_specs = (
             (savings_liability_account_id, FinanceEntrySide.DEBIT, amount, 'Pengurangan titipan tabungan'),
             (cash_gl_account_id, FinanceEntrySide.CREDIT, amount, 'Kas/Bank keluar'),
         )
         label = "Penarikan tabungan"
 
-    journal = _create_journal_with_lines(
+    return _create_journal_with_lines(
         tenant_id=tenant_id,
         actor_user_id=actor_user_id,
         journal_date=journal_date,
@@ -186,9 +249,8 @@ def post_savings_transaction(*, tenant_id: int, savings_transaction_id: int, act
         line_specs=line_specs,
         reference_type='student_savings_transaction',
         reference_id=savings_trx.id,
+        periods=periods,
     )
-    db.session.commit()
-    return journal.id
 
 
 def create_cash_bank_transaction(
@@ -308,9 +370,12 @@ def post_journal(*, tenant_id: int, journal_id: int, actor_user_id: int) -> None
     if not posting_context.can_post:
         raise ValueError(posting_context.reason or "Periode akuntansi tidak siap untuk posting.")
 
+    was_posted = journal.status == FinanceJournalStatus.POSTED
     journal.status = FinanceJournalStatus.POSTED
     journal.posted_at = utc_now_naive()
     journal.approved_by_user_id = actor_user_id
+    if not was_posted:
+        apply_journal_to_daily_balances(journal)
     if journal.source_type == FinanceJournalSourceType.CASH_BANK_TRANSACTION and journal.source_id:
         cash_bank_trx = FinanceCashBankTransaction.query.filter_by(
             id=journal.source_id,
@@ -368,6 +433,7 @@ def reverse_journal(*, tenant_id: int, journal_id: int, reason: str, actor_user_
 
     post_journal(tenant_id=tenant_id, journal_id=reversal_journal.id, actor_user_id=actor_user_id)
     original.status = FinanceJournalStatus.VOID
+    apply_journal_to_daily_balances(original, direction=-1)
     original.voided_at = utc_now_naive()
     original.void_reason = reason
     if original.source_type == FinanceJournalSourceType.CASH_BANK_TRANSACTION and original.source_id:
@@ -389,6 +455,28 @@ def _find_existing_source_journal(*, tenant_id: int, source_type: FinanceJournal
     ).first()
 
 
+def _find_invoice_payment_journal(*, tenant_id: int, transaction_id: int) -> Optional[FinanceJournal]:
+    """Jurnal pembayaran yang bersumber dari transaksi ini atau memuatnya sebagai baris (kwitansi gabungan)."""
+    existing = _find_existing_source_journal(
+        tenant_id=tenant_id,
+        source_type=FinanceJournalSourceType.INVOICE_PAYMENT,
+        source_id=transaction_id,
+    )
+    if existing:
+        return existing
+    return (
+        FinanceJournal.query
+        .join(FinanceJournalLine, FinanceJournalLine.journal_id == FinanceJournal.id)
+        .filter(
+            FinanceJournal.tenant_id == tenant_id,
+            FinanceJournal.source_type == FinanceJournalSourceType.INVOICE_PAYMENT,
+            FinanceJournalLine.reference_type == 'transaction',
+            FinanceJournalLine.reference_id == transaction_id,
+        )
+        .first()
+    )
+
+
 def _get_finance_settings(tenant_id: int) -> Optional[FinanceSetting]:
     return FinanceSetting.query.filter_by(tenant_id=tenant_id).first()
 
@@ -396,22 +484,19 @@ def _get_finance_settings(tenant_id: int) -> Optional[FinanceSetting]:
 def _resolve_cash_bank_gl_account_id(tenant_id: int, settings: Optional[FinanceSetting]) -> Optional[int]:
     if not settings or not settings.default_cash_bank_account_id:
         return None
-    cash_bank_account = FinanceCashBankAccount.query.filter_by(
-        id=settings.default_cash_bank_account_id,
-        tenant_id=tenant_id,
-        is_active=True,
-    ).first()
-    if not cash_bank_account:
-        return None
-
-    gl_account = FinanceAccount.query.filter_by(
-        id=cash_bank_account.gl_account_id,
-        tenant_id=tenant_id,
-        is_active=True,
-    ).first()
-    if not gl_account or gl_account.category != FinanceAccountCategory.ASSET:
-        return None
-    return gl_account.id
+    return (
+        db.session.query(FinanceAccount.id)
+        .join(FinanceCashBankAccount, FinanceCashBankAccount.gl_account_id == FinanceAccount.id)
+        .filter(
+            FinanceCashBankAccount.id == settings.default_cash_bank_account_id,
+            FinanceCashBankAccount.tenant_id == tenant_id,
+            FinanceCashBankAccount.is_active.is_(True),
+            FinanceAccount.tenant_id == tenant_id,
+            FinanceAccount.is_active.is_(True),
+            FinanceAccount.category == FinanceAccountCategory.ASSET,
+        )
+        .scalar()
+    )
 
 
 def _resolve_journal_date(raw_value: Optional[datetime]) -> date:
@@ -422,7 +507,14 @@ def _resolve_journal_date(raw_value: Optional[datetime]) -> date:
     return date.today()
 
 
-def _posting_context(*, tenant_id: int, journal_date: date) -> PostingContext:
+def _posting_context(
+    *,
+    tenant_id: int,
+    journal_date: date,
+    periods: Optional[FinancePeriodMap] = None,
+) -> PostingContext:
+    if periods is not None:
+        return periods.context_for(journal_date)
     period = (
         FinancePeriod.query
         .filter(
@@ -432,9 +524,13 @@ def _posting_context(*, tenant_id: int, journal_date: date) -> PostingContext:
         )
         .first()
     )
-    if not period:
+    return _period_posting_context(period.status if period else None)
+
+
+def _period_posting_context(status: Optional[FinancePeriodStatus]) -> PostingContext:
+    if status is None:
         return PostingContext(can_post=False, reason="Periode akuntansi belum dibuat.")
-    if period.status != FinancePeriodStatus.OPEN:
+    if status != FinancePeriodStatus.OPEN:
         return PostingContext(can_post=False, reason="Periode akuntansi tidak dalam status OPEN.")
     return PostingContext(can_post=True)
 
@@ -466,11 +562,12 @@ def _create_journal_with_lines(
     description: str,
     source_type: FinanceJournalSourceType,
     source_id: int,
-    line_specs: Iterable[tuple[Optional[int], FinanceEntrySide, int, str]],
+    line_specs: Iterable[tuple],
     reference_type: str,
     reference_id: int,
+    periods: Optional[FinancePeriodMap] = None,
 ) -> FinanceJournal:
-    posting_context = _posting_context(tenant_id=tenant_id, journal_date=journal_date)
+    posting_context = _posting_context(tenant_id=tenant_id, journal_date=journal_date, periods=periods)
     missing_accounts = [spec for spec in line_specs if not spec[0]]
 
     journal = FinanceJournal(
@@ -484,23 +581,20 @@ def _create_journal_with_lines(
         created_by_user_id=actor_user_id,
     )
     db.session.add(journal)
-    db.session.flush()
 
-    for account_id, entry_side, amount, memo in line_specs:
+    # Baris ditempel lewat relasi agar jurnal + baris ter-insert dalam satu flush.
+    for account_id, entry_side, amount, memo, *line_reference in line_specs:
         if not account_id:
             continue
-        db.session.add(
-            FinanceJournalLine(
-                tenant_id=tenant_id,
-                journal_id=journal.id,
-                account_id=account_id,
-                entry_side=entry_side,
-                amount=amount,
-                memo=memo,
-                reference_type=reference_type,
-                reference_id=reference_id,
-            )
-        )
+        journal.lines.append(FinanceJournalLine(
+            tenant_id=tenant_id,
+            account_id=account_id,
+            entry_side=entry_side,
+            amount=amount,
+            memo=memo,
+            reference_type=reference_type,
+            reference_id=line_reference[0] if line_reference else reference_id,
+        ))
 
     db.session.flush()
     if missing_accounts:
@@ -510,4 +604,5 @@ def _create_journal_with_lines(
         journal.status = FinanceJournalStatus.POSTED
         journal.posted_at = utc_now_naive()
         journal.approved_by_user_id = actor_user_id
+        apply_journal_to_daily_balances(journal)
     return journal
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import contains_eager
+
+from app.extensions import db
+from app.models import (
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalSourceType,
+    FinanceJournalStatus,
+    Invoice,
+    SavingsTransactionStatus,
+    SavingsTransactionType,
+    Student,
+    StudentSavingsTransaction,
+    Transaction,
+)
+from app.services.finance_posting_service import (
+    FinancePeriodMap,
+    post_invoice_payment_batch,
+    post_journal,
+    post_savings_transaction_entry,
+    resolve_payment_posting_accounts,
+)
+from app.services.job_queue_service import job_handler, job_progress_callback
+
+
+REPOST_CHUNK_SIZE = 200
+PROGRESS_EVERY_ITEMS = 20
+
+RETRY_SOURCE_LABELS = {
+    'invoice': 'pembayaran',
+    'savings': 'tabungan',
+}
+
+ProgressCallback = Optional[Callable[[int, Optional[int]], None]]
+
+
+def _source_journal_exists(source_type, source_id_column, tenant_id: int, posted_only: bool):
+    conditions = [
+        FinanceJournal.tenant_id == tenant_id,
+        FinanceJournal.source_type == source_type,
+        FinanceJournal.source_id == source_id_column,
+    ]
+    if posted_only:
+        conditions.append(FinanceJournal.status == FinanceJournalStatus.POSTED)
+    return exists().where(*conditions)
+
+
+def _payment_line_journal_exists(tenant_id: int, posted_only: bool):
+    # Kwitansi multi-invoice memakai satu jurnal; transaksi selain sumber tercatat di baris jurnal.
+    conditions = [
+        FinanceJournalLine.tenant_id == tenant_id,
+        FinanceJournalLine.reference_type == 'transaction',
+        FinanceJournalLine.reference_id == Transaction.id,
+        FinanceJournal.id == FinanceJournalLine.journal_id,
+        FinanceJournal.source_type == FinanceJournalSourceType.INVOICE_PAYMENT,
+    ]
+    if posted_only:
+        conditions.append(FinanceJournal.status == FinanceJournalStatus.POSTED)
+    return exists().where(*conditions)
+
+
+def unposted_invoice_payment_transactions(tenant_id: int, *, posted_only: bool = True):
+    """
+    Transaksi pembayaran tanpa jurnal POSTED (anti-join NOT EXISTS). Dengan posted_only=False
+    hanya transaksi yang belum punya jurnal sama sekali (draft ditangani retry draft).
+    """
+    return (
+        Transaction.query
+        .join(Invoice, Invoice.id == Transaction.invoice_id)
+        .join(Student, Student.id == Invoice.student_id)
+        .filter(
+            Transaction.tenant_id == tenant_id,
+            Invoice.is_deleted.is_(False),
+            Student.is_deleted.is_(False),
+            ~_source_journal_exists(FinanceJournalSourceType.INVOICE_PAYMENT, Transaction.id, tenant_id, posted_only),
+            ~_payment_line_journal_exists(tenant_id, posted_only),
+        )
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+    )
+
+
+def unposted_savings_transactions(tenant_id: int, *, posted_only: bool = True):
+    return (
+        StudentSavingsTransaction.query
+        .filter(
+            StudentSavingsTransaction.tenant_id == tenant_id,
+            StudentSavingsTransaction.status == SavingsTransactionStatus.APPROVED,
+            or_(
+                and_(
+                    StudentSavingsTransaction.transaction_type == SavingsTransactionType.DEPOSIT,
+                    ~_source_journal_exists(
+                        FinanceJournalSourceType.SAVINGS_DEPOSIT, StudentSavingsTransaction.id, tenant_id, posted_only
+                    ),
+                ),
+                and_(
+                    StudentSavingsTransaction.transaction_type == SavingsTransactionType.WITHDRAWAL,
+                    ~_source_journal_exists(
+                        FinanceJournalSourceType.SAVINGS_WITHDRAWAL, StudentSavingsTransaction.id, tenant_id, posted_only
+                    ),
+                ),
+            ),
+        )
+        .order_by(StudentSavingsTransaction.approved_at.desc(), StudentSavingsTransaction.id.desc())
+    )
+
+
+def _retry_each(item_ids, post_one, progress: ProgressCallback):
+    """Posting satu per satu; setiap item di-commit sendiri agar satu kegagalan tidak membatalkan yang lain."""
+    success = 0
+    failed = 0
+    total = len(item_ids)
+    if progress:
+        progress(0, total)
+    for position, item_id in enumerate(item_ids, start=1):
+        try:
+            post_one(item_id)
+            db.session.commit()
+            success += 1
+        except Exception:
+            db.session.rollback()
+            failed += 1
+        if progress and (position % PROGRESS_EVERY_ITEMS == 0 or position == total):
+            progress(position, total)
+    return success, failed
+
+
+def retry_draft_journals(*, tenant_id: int, actor_user_id: int, progress: ProgressCallback = None) -> dict:
+    draft_ids = [
+        journal_id
+        for (journal_id,) in db.session.query(FinanceJournal.id).filter(
+            FinanceJournal.tenant_id == tenant_id,
+            FinanceJournal.status == FinanceJournalStatus.DRAFT,
+        ).order_by(FinanceJournal.id.asc())
+    ]
+    success, failed = _retry_each(
+        draft_ids,
+        lambda journal_id: post_journal(tenant_id=tenant_id, journal_id=journal_id, actor_user_id=actor_user_id),
+        progress,
+    )
+    return {
+        'success': success,
+        'failed': failed,
+        'message': f'Retry posting draft selesai. Berhasil: {success}, gagal: {failed}.',
+    }
+
+
+def _repost_chunk(items, post_one) -> tuple[int, int]:
+    """Satu savepoint per chunk; jika gagal, chunk diulang per item agar satu sumber rusak tidak membatalkan batch."""
+    try:
+        with db.session.begin_nested():
+            for item in items:
+                post_one(item)
+        return len(items), 0
+    except Exception:
+        pass
+
+    success = 0
+    failed = 0
+    for item in items:
+        try:
+            with db.session.begin_nested():
+                post_one(item)
+            success += 1
+        except Exception:
+            failed += 1
+    return success, failed
+
+
+def bulk_repost_sources(
+    *,
+    tenant_id: int,
+    source: str,
+    actor_user_id: int,
+    limit: Optional[int] = None,
+    chunk_size: int = REPOST_CHUNK_SIZE,
+    progress: ProgressCallback = None,
+) -> dict:
+    """
+    Buat jurnal untuk sumber yang belum punya jurnal, per chunk (keyset id) dengan akun dan
+    periode yang di-resolve sekali. Setiap chunk di-commit sendiri.
+    """
+    accounts = resolve_payment_posting_accounts(tenant_id)
+    periods = FinancePeriodMap.load(tenant_id)
+    if source == 'invoice':
+        model = Transaction
+        pending = (
+            unposted_invoice_payment_transactions(tenant_id, posted_only=False)
+            .options(contains_eager(Transaction.invoice))
+        )
+
+        def post_one(trx):
+            post_invoice_payment_batch(
+                tenant_id=tenant_id,
+                transactions=[trx],
+                actor_user_id=actor_user_id,
+                accounts=accounts,
+                periods=periods,
+            )
+    elif source == 'savings':
+        model = StudentSavingsTransaction
+        pending = unposted_savings_transactions(tenant_id, posted_only=False)
+
+        def post_one(savings_trx):
+            post_savings_transaction_entry(
+                tenant_id=tenant_id,
+                savings_trx=savings_trx,
+                actor_user_id=actor_user_id,
+                accounts=accounts,
+                periods=periods,
+            )
+    else:
+        raise ValueError('Sumber retry tidak valid.')
+
+    pending = pending.order_by(None)
+    total = pending.count()
+    if limit is not None:
+        total = min(total, limit)
+    success = 0
+    failed = 0
+    last_id = 0
+    if progress:
+        progress(0, total)
+    while success + failed < total:
+        items = (
+            pending
+            .filter(model.id > last_id)
+            .order_by(model.id.asc())
+            .limit(min(chunk_size, total - success - failed))
+            .all()
+        )
+        if not items:
+            break
+        last_id = items[-1].id
+        chunk_success, chunk_failed = _repost_chunk(items, post_one)
+        db.session.commit()
+        success += chunk_success
+        failed += chunk_failed
+        if progress:
+            progress(success + failed, total)
+    return {
+        'success': success,
+        'failed': failed,
+        'message': f'Retry sumber {RETRY_SOURCE_LABELS[source]} selesai. Berhasil: {success}, gagal: {failed}.',
+    }
+
+
+def retry_source_postings(
+    *,
+    tenant_id: int,
+    source: str,
+    actor_user_id: int,
+    limit: Optional[int] = None,
+    progress: ProgressCallback = None,
+) -> dict:
+    return bulk_repost_sources(
+        tenant_id=tenant_id,
+        source=source,
+        actor_user_id=actor_user_id,
+        limit=limit,
+        progress=progress,
+    )
+
+
+@job_handler('finance_retry_draft_journals')
+def run_retry_draft_journals_job(job):
+    return retry_draft_journals(
+        tenant_id=job.tenant_id,
+        actor_user_id=job.payload['actor_user_id'],
+        progress=job_progress_callback(job),
+    )
+
+
+@job_handler('finance_retry_sources')
+def run_retry_sources_job(job):
+    payload = job.payload
+    return retry_source_postings(
+        tenant_id=job.tenant_id,
+        source=payload['source'],
+        actor_user_id=payload['actor_user_id'],
+        progress=job_progress_callback(job),
+    )
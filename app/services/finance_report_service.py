@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import (
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+)
+from app.services.finance_balance_service import materialized_account_totals
+
+
+INCOME_STATEMENT_CATEGORIES = (FinanceAccountCategory.REVENUE, FinanceAccountCategory.EXPENSE)
+FINANCIAL_POSITION_CATEGORIES = (
+    FinanceAccountCategory.ASSET,
+    FinanceAccountCategory.LIABILITY,
+    FinanceAccountCategory.EQUITY,
+)
+
+
+class LedgerEntry(NamedTuple):
+    journal_id: int
+    journal_date: date
+    journal_no: str
+    description: str
+    memo: str
+    debit: int
+    credit: int
+    balance: int
+
+
+def _filter_posted(query, tenant_id: int, start_date: Optional[date], end_date: Optional[date]):
+    query = query.filter(
+        FinanceJournalLine.tenant_id == tenant_id,
+        FinanceJournal.tenant_id == tenant_id,
+        FinanceJournal.status == FinanceJournalStatus.POSTED,
+    )
+    if start_date:
+        query = query.filter(FinanceJournal.journal_date >= start_date)
+    if end_date:
+        query = query.filter(FinanceJournal.journal_date <= end_date)
+    return query
+
+
+def posted_lines_query(tenant_id: int, start_date: Optional[date], end_date: Optional[date]):
+    query = FinanceJournalLine.query.join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
+    return _filter_posted(query, tenant_id, start_date, end_date)
+
+
+def posted_account_totals(
+    tenant_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    account_ids: Optional[Iterable[int]] = None,
+) -> dict[int, tuple[int, int]]:
+    """Total debit/kredit jurnal POSTED per akun, dijumlahkan di database."""
+    if account_ids is not None:
+        account_ids = list(account_ids)
+    totals = materialized_account_totals(tenant_id, start_date, end_date, account_ids=account_ids)
+    if totals is not None:
+        return totals
+
+    query = db.session.query(
+        FinanceJournalLine.account_id,
+        FinanceJournalLine.entry_side,
+        func.coalesce(func.sum(FinanceJournalLine.amount), 0),
+    ).join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
+    query = _filter_posted(query, tenant_id, start_date, end_date)
+    if account_ids is not None:
+        query = query.filter(FinanceJournalLine.account_id.in_(account_ids))
+
+    totals = {}
+    for account_id, entry_side, amount in query.group_by(FinanceJournalLine.account_id, FinanceJournalLine.entry_side):
+        debit_total, credit_total = totals.get(account_id, (0, 0))
+        if entry_side == FinanceEntrySide.DEBIT:
+            debit_total += int(amount or 0)
+        elif entry_side == FinanceEntrySide.CREDIT:
+            credit_total += int(amount or 0)
+        totals[account_id] = (debit_total, credit_total)
+    return totals
+
+
+def _account_rows(tenant_id: int, categories=None, **extra_fields) -> dict[int, dict]:
+    query = FinanceAccount.query.filter(FinanceAccount.tenant_id == tenant_id)
+    if categories:
+        query = query.filter(FinanceAccount.category.in_(list(categories)))
+    return {
+        account.id: {'account': account, 'debit_total': 0, 'credit_total': 0, **extra_fields}
+        for account in query.order_by(FinanceAccount.code.asc()).all()
+    }
+
+
+def _apply_account_totals(rows_by_account_id: dict[int, dict], totals: dict[int, tuple[int, int]]) -> None:
+    for account_id, (debit_total, credit_total) in totals.items():
+        row = rows_by_account_id.get(account_id)
+        if not row:
+            continue
+        row['debit_total'] += debit_total
+        row['credit_total'] += credit_total
+
+
+def trial_balance_report(tenant_id: int, start_date: Optional[date], end_date: Optional[date]):
+    rows_by_account_id = _account_rows(tenant_id, ending_debit=0, ending_credit=0)
+    _apply_account_totals(rows_by_account_id, posted_account_totals(tenant_id, start_date, end_date))
+
+    report_rows = []
+    total_debit = 0
+    total_credit = 0
+    for row in rows_by_account_id.values():
+        balance = row['debit_total'] - row['credit_total']
+        if balance > 0:
+            row['ending_debit'] = balance
+            total_debit += balance
+        elif balance < 0:
+            row['ending_credit'] = abs(balance)
+            total_credit += abs(balance)
+        if row['debit_total'] or row['credit_total']:
+            report_rows.append(row)
+    return report_rows, total_debit, total_credit
+
+
+def income_statement_report(tenant_id: int, start_date: Optional[date], end_date: Optional[date]):
+    rows_by_account_id = _account_rows(tenant_id, INCOME_STATEMENT_CATEGORIES, amount=0)
+    _apply_account_totals(
+        rows_by_account_id,
+        posted_account_totals(tenant_id, start_date, end_date, account_ids=rows_by_account_id.keys()),
+    )
+
+    revenue_rows = []
+    expense_rows = []
+    total_revenue = 0
+    total_expense = 0
+    for row in rows_by_account_id.values():
+        account = row['account']
+        if account.category == FinanceAccountCategory.REVENUE:
+            row['amount'] = row['credit_total'] - row['debit_total']
+            if row['amount']:
+                total_revenue += row['amount']
+                revenue_rows.append(row)
+        elif account.category == FinanceAccountCategory.EXPENSE:
+            row['amount'] = row['debit_total'] - row['credit_total']
+            if row['amount']:
+                total_expense += row['amount']
+                expense_rows.append(row)
+    return revenue_rows, expense_rows, total_revenue, total_expense, total_revenue - total_expense
+
+
+def financial_position_report(tenant_id: int, as_of_date: date, net_income: Optional[int] = None) -> dict:
+    rows_by_account_id = _account_rows(tenant_id, FINANCIAL_POSITION_CATEGORIES, amount=0)
+    _apply_account_totals(
+        rows_by_account_id,
+        posted_account_totals(tenant_id, None, as_of_date, account_ids=rows_by_account_id.keys()),
+    )
+
+    asset_rows = []
+    liability_rows = []
+    equity_rows = []
+    total_assets = 0
+    total_liabilities = 0
+    total_equity = 0
+    for row in rows_by_account_id.values():
+        account = row['account']
+        if account.category == FinanceAccountCategory.ASSET:
+            row['amount'] = row['debit_total'] - row['credit_total']
+            if row['amount']:
+                total_assets += row['amount']
+                asset_rows.append(row)
+        elif account.category == FinanceAccountCategory.LIABILITY:
+            row['amount'] = row['credit_total'] - row['debit_total']
+            if row['amount']:
+                total_liabilities += row['amount']
+                liability_rows.append(row)
+        elif account.category == FinanceAccountCategory.EQUITY:
+            row['amount'] = row['credit_total'] - row['debit_total']
+            if row['amount']:
+                total_equity += row['amount']
+                equity_rows.append(row)
+
+    if net_income is None:
+        _, _, _, _, net_income = income_statement_report(tenant_id, None, as_of_date)
+    if net_income:
+        total_equity += net_income
+        equity_rows.append({
+            'account': None,
+            'code': 'LR-BERJALAN',
+            'name': 'Laba/Rugi Berjalan',
+            'amount': net_income,
+        })
+
+    return {
+        'asset_rows': asset_rows,
+        'liability_rows': liability_rows,
+        'equity_rows': equity_rows,
+        'total_assets': total_assets,
+        'total_liabilities': total_liabilities,
+        'total_equity': total_equity,
+        'net_income': net_income,
+        'total_liabilities_equity': total_liabilities + total_equity,
+    }
+
+
+def ledger_entries_query(tenant_id: int, account_id: int, start_date: Optional[date], end_date: Optional[date]):
+    query = db.session.query(
+        FinanceJournal.id,
+        FinanceJournal.journal_date,
+        FinanceJournal.journal_no,
+        FinanceJournal.description,
+        FinanceJournalLine.memo,
+        FinanceJournalLine.entry_side,
+        FinanceJournalLine.amount,
+    ).join(FinanceJournal, FinanceJournal.id == FinanceJournalLine.journal_id)
+    return (
+        _filter_posted(query, tenant_id, start_date, end_date)
+        .filter(FinanceJournalLine.account_id == account_id)
+        .order_by(FinanceJournal.journal_date.asc(), FinanceJournal.id.asc(), FinanceJournalLine.id.asc())
+    )
+
+
+def iter_ledger_entries(rows, opening_balance: int):
+    running_balance = opening_balance
+    for journal_id, journal_date, journal_no, description, memo, entry_side, amount in rows:
+        debit = int(amount or 0) if entry_side == FinanceEntrySide.DEBIT else 0
+        credit = int(amount or 0) if entry_side == FinanceEntrySide.CREDIT else 0
+        running_balance += debit - credit
+        yield LedgerEntry(journal_id, journal_date, journal_no, description or '', memo or '', debit, credit, running_balance)
+
+
+def ledger_opening_totals(tenant_id: int, account_id: int, start_date: date) -> tuple[int, int]:
+    return posted_account_totals(
+        tenant_id,
+        None,
+        start_date - timedelta(days=1),
+        account_ids=[account_id],
+    ).get(account_id, (0, 0))
+
+
+def ledger_report(tenant_id: int, selected_account: FinanceAccount, start_date: date, end_date: date):
+    opening_debit, opening_credit = ledger_opening_totals(tenant_id, selected_account.id, start_date)
+    ledger_rows = list(iter_ledger_entries(
+        ledger_entries_query(tenant_id, selected_account.id, start_date, end_date).all(),
+        opening_debit - opening_credit,
+    ))
+    running_balance = ledger_rows[-1].balance if ledger_rows else opening_debit - opening_credit
+    closing_debit = running_balance if running_balance >= 0 else 0
+    closing_credit = abs(running_balance) if running_balance < 0 else 0
+    return opening_debit, opening_credit, ledger_rows, closing_debit, closing_credit
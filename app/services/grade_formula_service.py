@@ -1,8 +1,11 @@
 import json
+from collections import defaultdict
+from functools import lru_cache
 
 from flask import current_app
 
-from app.models import AppConfig, ReportScoreAdjustment
+from app.models import ReportScoreAdjustment
+from app.utils.sql import chunked
 
 
 GRADE_FORMULA_CONFIG_KEY = "grade_formula_weights"
@@ -46,6 +49,7 @@ def calculate_weighted_final(
     subject_id=None,
     student_id=None,
     class_id=None,
+    resolver=None,
 ):
     detail = calculate_report_final_detail(
         type_averages,
@@ -54,6 +58,7 @@ def calculate_weighted_final(
         subject_id=subject_id,
         student_id=student_id,
         class_id=class_id,
+        resolver=resolver,
     )
     return detail["final_score"]
 
@@ -65,50 +70,16 @@ def calculate_report_final_detail(
     subject_id=None,
     student_id=None,
     class_id=None,
+    resolver=None,
 ):
-    weights = resolve_grade_weights(
-        tenant_id=tenant_id,
+    resolver = resolver or GradeFormulaResolver(tenant_id)
+    return resolver.final_detail(
+        type_averages,
         academic_year_id=academic_year_id,
         subject_id=subject_id,
-    )
-    total_weighted = 0.0
-    total_weight = 0.0
-
-    for type_name, average in (type_averages or {}).items():
-        weight = float(weights.get(str(type_name).upper(), 0))
-        if weight <= 0:
-            continue
-        total_weighted += float(average or 0) * weight
-        total_weight += weight
-
-    if total_weight <= 0:
-        original_score = 0
-    else:
-        original_score = round(total_weighted / total_weight, 2)
-
-    adjustment = resolve_report_score_adjustment(
-        tenant_id=tenant_id,
         student_id=student_id,
-        academic_year_id=academic_year_id,
-        subject_id=subject_id,
         class_id=class_id,
-        source_type=REPORT_ADJUSTMENT_SOURCE_ACADEMIC,
     )
-    if not adjustment:
-        return {
-            "final_score": original_score,
-            "original_score": original_score,
-            "is_adjusted": False,
-            "adjustment": None,
-        }
-
-    adjusted_score = round(float(adjustment.adjusted_score or 0), 2)
-    return {
-        "final_score": adjusted_score,
-        "original_score": round(float(adjustment.original_score or original_score), 2),
-        "is_adjusted": True,
-        "adjustment": adjustment,
-    }
 
 
 def resolve_report_score_adjustment(
@@ -127,10 +98,7 @@ def resolve_report_score_adjustment(
     if source_type == REPORT_ADJUSTMENT_SOURCE_ACADEMIC and not subject_id:
         return None
 
-    query = ReportScoreAdjustment.query.filter(
-        ReportScoreAdjustment.is_deleted.is_(False),
-        ReportScoreAdjustment.status == REPORT_ADJUSTMENT_STATUS_ACTIVE,
-        ReportScoreAdjustment.tenant_id == tenant_id,
+    query = _adjustment_query_base(tenant_id).filter(
         ReportScoreAdjustment.student_id == student_id,
         ReportScoreAdjustment.academic_year_id == academic_year_id,
         ReportScoreAdjustment.source_type == source_type,
@@ -144,11 +112,23 @@ def resolve_report_score_adjustment(
             db_or_class_scope(ReportScoreAdjustment.class_id, class_id)
         )
 
-    return query.order_by(
+    return query.order_by(*_adjustment_ordering()).first()
+
+
+def _adjustment_query_base(tenant_id):
+    return ReportScoreAdjustment.query.filter(
+        ReportScoreAdjustment.is_deleted.is_(False),
+        ReportScoreAdjustment.status == REPORT_ADJUSTMENT_STATUS_ACTIVE,
+        ReportScoreAdjustment.tenant_id == tenant_id,
+    )
+
+
+def _adjustment_ordering():
+    return (
         ReportScoreAdjustment.approved_at.desc(),
         ReportScoreAdjustment.created_at.desc(),
         ReportScoreAdjustment.id.desc(),
-    ).first()
+    )
 
 
 def db_or_class_scope(column, class_id):
@@ -158,41 +138,37 @@ def db_or_class_scope(column, class_id):
 
 
 def resolve_grade_weights(tenant_id=None, academic_year_id=None, subject_id=None):
-    config = _load_grade_formula_config(tenant_id)
-    if not config:
-        return dict(DEFAULT_GRADE_WEIGHTS)
-
-    selected = _select_weight_config(
-        config,
-        academic_year_id=academic_year_id,
-        subject_id=subject_id,
-    )
-    normalized = _normalize_weights(selected)
-    return normalized or dict(DEFAULT_GRADE_WEIGHTS)
+    return GradeFormulaResolver(tenant_id).weights(academic_year_id=academic_year_id, subject_id=subject_id)
 
 
 def _load_grade_formula_config(tenant_id):
     if tenant_id is None:
         return None
 
-    row = AppConfig.query.filter_by(
-        tenant_id=tenant_id,
-        key=GRADE_FORMULA_CONFIG_KEY,
-        is_deleted=False,
-    ).first()
-    if row is None or not row.value:
+    # Nilai mentah ikut snapshot tenant (TTL + invalidasi saat AppConfig berubah).
+    from app.utils.tenant_context import get_tenant_snapshot
+
+    snapshot = get_tenant_snapshot(tenant_id)
+    raw_value = snapshot.config.get(GRADE_FORMULA_CONFIG_KEY) if snapshot else None
+    if not raw_value:
         return None
 
-    try:
-        parsed = json.loads(row.value)
-    except (TypeError, ValueError):
+    parsed = _parse_grade_formula_config(raw_value)
+    if parsed is None:
         current_app.logger.warning(
             "Invalid JSON in %s for tenant_id=%s",
             GRADE_FORMULA_CONFIG_KEY,
             tenant_id,
         )
-        return None
+    return parsed
 
+
+@lru_cache(maxsize=64)
+def _parse_grade_formula_config(raw_value):
+    try:
+        parsed = json.loads(raw_value)
+    except (TypeError, ValueError):
+        return None
     return parsed if isinstance(parsed, dict) else None
 
 
@@ -244,3 +220,133 @@ def _normalize_weights(value):
         if weight > 0:
             weights[normalized_key] = weight
     return weights
+
+
+class GradeFormulaResolver:
+    """
+    Resolver bobot nilai dan adjustment raport untuk satu tenant. Formula tenant dibaca sekali,
+    bobot per (tahun ajaran, mapel) dan adjustment ACTIVE per (siswa, tahun ajaran) disimpan di
+    memori sehingga rekap kelas/raport massal tidak query per mapel per siswa.
+    """
+
+    def __init__(self, tenant_id=None):
+        self.tenant_id = tenant_id
+        self._config = None
+        self._config_loaded = False
+        self._weights = {}
+        self._adjustments = defaultdict(list)
+        self._loaded_pairs = set()
+
+    @property
+    def config(self):
+        if not self._config_loaded:
+            self._config = _load_grade_formula_config(self.tenant_id)
+            self._config_loaded = True
+        return self._config
+
+    def weights(self, academic_year_id=None, subject_id=None):
+        key = (academic_year_id, subject_id)
+        if key not in self._weights:
+            config = self.config
+            normalized = {}
+            if config:
+                normalized = _normalize_weights(
+                    _select_weight_config(config, academic_year_id=academic_year_id, subject_id=subject_id)
+                )
+            self._weights[key] = normalized or dict(DEFAULT_GRADE_WEIGHTS)
+        return dict(self._weights[key])
+
+    def preload_adjustments(self, student_ids, academic_year_ids):
+        """Muat semua adjustment ACTIVE untuk kombinasi siswa x tahun ajaran dalam beberapa query IN."""
+        if self.tenant_id is None:
+            return
+        year_ids = sorted({item for item in academic_year_ids or [] if item})
+        pending = sorted({
+            student_id
+            for student_id in student_ids or []
+            if student_id and any((student_id, year_id) not in self._loaded_pairs for year_id in year_ids)
+        })
+        if not year_ids or not pending:
+            return
+        for chunk in chunked(pending, 500):
+            new_pairs = {
+                (student_id, year_id)
+                for student_id in chunk
+                for year_id in year_ids
+                if (student_id, year_id) not in self._loaded_pairs
+            }
+            rows = _adjustment_query_base(self.tenant_id).filter(
+                ReportScoreAdjustment.student_id.in_(chunk),
+                ReportScoreAdjustment.academic_year_id.in_(year_ids),
+            ).order_by(*_adjustment_ordering()).all()
+            for row in rows:
+                pair = (row.student_id, row.academic_year_id)
+                if pair in new_pairs:
+                    self._adjustments[pair].append(row)
+            self._loaded_pairs.update(new_pairs)
+
+    def adjustment(
+        self,
+        student_id=None,
+        academic_year_id=None,
+        subject_id=None,
+        class_id=None,
+        source_type=REPORT_ADJUSTMENT_SOURCE_ACADEMIC,
+    ):
+        source_type = normalize_report_adjustment_source(source_type)
+        if not source_type:
+            return None
+        if not all([self.tenant_id, student_id, academic_year_id]):
+            return None
+        if source_type == REPORT_ADJUSTMENT_SOURCE_ACADEMIC and not subject_id:
+            return None
+
+        self.preload_adjustments([student_id], [academic_year_id])
+        expected_subject_id = subject_id if source_type == REPORT_ADJUSTMENT_SOURCE_ACADEMIC else None
+        for row in self._adjustments.get((student_id, academic_year_id), []):
+            if row.source_type != source_type or row.subject_id != expected_subject_id:
+                continue
+            if class_id is not None and row.class_id not in (class_id, None):
+                continue
+            return row
+        return None
+
+    def final_detail(self, type_averages, academic_year_id=None, subject_id=None, student_id=None, class_id=None):
+        weights = self.weights(academic_year_id=academic_year_id, subject_id=subject_id)
+        total_weighted = 0.0
+        total_weight = 0.0
+
+        for type_name, average in (type_averages or {}).items():
+            weight = float(weights.get(str(type_name).upper(), 0))
+            if weight <= 0:
+                continue
+            total_weighted += float(average or 0) * weight
+            total_weight += weight
+
+        if total_weight <= 0:
+            original_score = 0
+        else:
+            original_score = round(total_weighted / total_weight, 2)
+
+        adjustment = self.adjustment(
+            student_id=student_id,
+            academic_year_id=academic_year_id,
+            subject_id=subject_id,
+            class_id=class_id,
+            source_type=REPORT_ADJUSTMENT_SOURCE_ACADEMIC,
+        )
+        if not adjustment:
+            return {
+                "final_score": original_score,
+                "original_score": original_score,
+                "is_adjusted": False,
+                "adjustment": None,
+            }
+
+        adjusted_score = round(float(adjustment.adjusted_score or 0), 2)
+        return {
+            "final_score": adjusted_score,
+            "original_score": round(float(adjustment.original_score or original_score), 2),
+            "is_adjusted": True,
+            "adjustment": adjustment,
+        }
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections import defaultdict
+
+from sqlalchemy import case, func, select
+
+from app.extensions import db
+from app.models import Grade, GradeType, ParticipantType, Subject
+from app.services.grade_formula_service import GradeFormulaResolver
+from app.utils.sql import chunked
+
+
+GRADE_RECAP_TYPES = tuple(item.name for item in GradeType)
+
+
+def _grade_type_averages(student_ids, academic_year_ids, subject_ids=None):
+    """
+    Rata-rata nilai per (siswa, mapel, tipe) langsung dari database. Hasilnya berbentuk
+    {(student_id, subject_id): {'academic_year_id': ..., 'averages': {...}, 'counts': {...}}}.
+    Tahun ajaran sel diambil dari nilai terbaru (created_at, id) seperti raport wali kelas.
+    """
+    cells = {}
+    if not student_ids or not academic_year_ids:
+        return cells
+
+    for chunk in chunked(sorted(student_ids), 500):
+        criteria = [
+            Grade.is_deleted.is_(False),
+            Grade.participant_type == ParticipantType.STUDENT,
+            Grade.student_id.in_(chunk),
+            Grade.academic_year_id.in_(academic_year_ids),
+            Grade.subject_id.isnot(None),
+        ]
+        if subject_ids:
+            criteria.append(Grade.subject_id.in_(subject_ids))
+        ranked = (
+            select(
+                Grade.id,
+                Grade.student_id,
+                Grade.subject_id,
+                Grade.type,
+                Grade.score,
+                Grade.academic_year_id,
+                func.row_number().over(
+                    partition_by=(Grade.student_id, Grade.subject_id),
+                    order_by=(Grade.created_at.desc(), Grade.id.desc()),
+                ).label('recency'),
+            )
+            .where(*criteria)
+            .subquery()
+        )
+        # Baris tanpa tipe tetap ikut agar tahun dari nilai terbarunya terbaca, lalu dilewati saat merata-rata.
+        statement = (
+            select(
+                ranked.c.student_id,
+                ranked.c.subject_id,
+                ranked.c.type,
+                func.avg(func.coalesce(ranked.c.score, 0)),
+                func.count(ranked.c.id),
+                func.max(case((ranked.c.recency == 1, ranked.c.academic_year_id))),
+            )
+            .group_by(ranked.c.student_id, ranked.c.subject_id, ranked.c.type)
+        )
+
+        for student_id, subject_id, grade_type, average, count, year_id in db.session.execute(statement):
+            cell = cells.setdefault(
+                (student_id, subject_id),
+                {'academic_year_id': None, 'averages': {}, 'counts': {}},
+            )
+            if year_id:
+                cell['academic_year_id'] = year_id
+            if grade_type is None:
+                continue
+            cell['averages'][grade_type.name] = round(float(average or 0), 2)
+            cell['counts'][grade_type.name] = int(count or 0)
+    return {key: cell for key, cell in cells.items() if cell['averages']}
+
+
+def _competition_ranks(values):
+    """Peringkat 1, 2, 2, 4 untuk nilai yang sama; siswa tanpa nilai tidak diberi peringkat."""
+    ranked = sorted(
+        ((value, key) for key, value in values.items() if value is not None),
+        key=lambda item: -item[0],
+    )
+    ranks = {}
+    previous_value = None
+    previous_rank = 0
+    for position, (value, key) in enumerate(ranked, start=1):
+        if value != previous_value:
+            previous_rank = position
+            previous_value = value
+        ranks[key] = previous_rank
+    return ranks
+
+
+def _mean(values):
+    values = [float(item) for item in values]
+    return round(sum(values) / len(values), 2) if values else 0
+
+
+def build_class_grade_recap(students, *, tenant_id, academic_year_ids, class_id=None, subject_ids=None, resolver=None):
+    """
+    Leger nilai satu kelas: nilai akhir setiap siswa x mapel (rata-rata per tipe, bobot formula,
+    adjustment), rata-rata siswa beserta peringkat, dan rata-rata kelas per mapel.
+    """
+    students = list(students or [])
+    student_ids = [student.id for student in students]
+    academic_year_ids = [item for item in academic_year_ids or [] if item]
+    cells = _grade_type_averages(student_ids, academic_year_ids, subject_ids=subject_ids)
+
+    resolver = resolver or GradeFormulaResolver(tenant_id)
+    resolver.preload_adjustments(student_ids, academic_year_ids)
+
+    subject_rows = []
+    recap_subject_ids = sorted({subject_id for _, subject_id in cells})
+    if recap_subject_ids:
+        subject_rows = (
+            Subject.query.filter(Subject.id.in_(recap_subject_ids))
+            .order_by(Subject.name.asc(), Subject.id.asc())
+            .all()
+        )
+
+    scores_by_student = defaultdict(dict)
+    finals_by_subject = defaultdict(list)
+    for (student_id, subject_id), cell in cells.items():
+        detail = resolver.final_detail(
+            cell['averages'],
+            academic_year_id=cell['academic_year_id'],
+            subject_id=subject_id,
+            student_id=student_id,
+            class_id=class_id,
+        )
+        scores_by_student[student_id][subject_id] = {
+            'type_averages': cell['averages'],
+            'type_counts': cell['counts'],
+            'final_score': detail['final_score'],
+            'original_score': detail['original_score'],
+            'is_adjusted': detail['is_adjusted'],
+        }
+        finals_by_subject[subject_id].append(detail['final_score'])
+
+    student_averages = {
+        student.id: _mean(item['final_score'] for item in scores_by_student[student.id].values())
+        if scores_by_student.get(student.id) else None
+        for student in students
+    }
+    ranks = _competition_ranks(student_averages)
+
+    rows = [
+        {
+            'student_id': student.id,
+            'nis': student.nis or '-',
+            'name': student.full_name or '-',
+            'scores': scores_by_student.get(student.id, {}),
+            'subject_count': len(scores_by_student.get(student.id, {})),
+            'final_average': student_averages[student.id],
+            'rank': ranks.get(student.id),
+        }
+        for student in students
+    ]
+    rows.sort(key=lambda row: (row['rank'] is None, row['rank'] or 0, row['name'].lower()))
+
+    subjects = []
+    for subject in subject_rows:
+        kkm = subject.kkm if subject.kkm is not None else 75
+        finals = finals_by_subject[subject.id]
+        subjects.append({
+            'id': subject.id,
+            'name': subject.name,
+            'kkm': kkm,
+            'average': _mean(finals),
+            'below_kkm': sum(1 for score in finals if score < kkm),
+        })
+    graded_averages = [value for value in student_averages.values() if value is not None]
+    return {
+        'subjects': subjects,
+        'rows': rows,
+        'grade_types': GRADE_RECAP_TYPES,
+        'student_count': len(students),
+        'class_average': _mean(graded_averages),
+    }
+
+
+def grade_recap_xlsx_rows(recap):
+    """Baris export leger (generator) untuk xlsx_stream_response."""
+    for index, row in enumerate(recap['rows'], start=1):
+        values = [index, row['nis'], row['name']]
+        for subject in recap['subjects']:
+            cell = row['scores'].get(subject['id'])
+            values.append(cell['final_score'] if cell else None)
+        values.extend([row['final_average'], row['rank']])
+        yield values
+    yield (
+        ['', '', 'Rata-rata kelas']
+        + [subject['average'] for subject in recap['subjects']]
+        + [recap['class_average'], None]
+    )
+
+
+def grade_recap_xlsx_header(recap):
+    return ['No', 'NIS', 'Nama'] + [subject['name'] for subject in recap['subjects']] + ['Rata-rata', 'Peringkat']
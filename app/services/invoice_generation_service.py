@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import ClassRoom, FeeType, Invoice, PaymentStatus, ProgramGroup, ProgramType, Student, User
+from app.services.job_queue_service import job_handler, job_progress_callback
+from app.services.mobile_sync_service import register_sync_rows
+from app.utils.invoice import format_sequenced_invoice_number, sequenced_invoice_prefix
+from app.utils.money import to_rupiah_int
+from app.utils.sql import chunked
+from app.utils.timezone import local_now, utc_now_naive
+
+
+INVOICE_INSERT_CHUNK_SIZE = 500
+INVOICE_SEQUENCE_SCAN_LIMIT = 50
+DEFAULT_DUE_DAYS = 10
+PREVIEW_ROW_LIMIT = 50
+
+
+@dataclass
+class InvoiceGenerationResult:
+    fee_type_id: int
+    total_target: int = 0
+    created: int = 0
+    skipped_duplicate: int = 0
+    skipped_program: int = 0
+    dry_run: bool = False
+    preview_rows: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            'fee_type_id': self.fee_type_id,
+            'total_target': self.total_target,
+            'created': self.created,
+            'skipped_duplicate': self.skipped_duplicate,
+            'skipped_program': self.skipped_program,
+            'dry_run': self.dry_run,
+            'preview_rows': list(self.preview_rows),
+        }
+
+
+def targeted_students_query(tenant_id: int, target: Optional[dict] = None):
+    """
+    Query siswa aktif tenant sesuai target penerbitan (`target_scope` ALL/PROGRAM/CLASS/STUDENT).
+    Tanpa `target` berarti seluruh siswa tenant.
+    """
+    students_query = Student.query.join(User, Student.user_id == User.id).filter(
+        Student.is_deleted.is_(False),
+        User.tenant_id == tenant_id,
+    )
+    target = target or {}
+    target_scope = target.get('target_scope') or 'ALL'
+
+    if target_scope == 'PROGRAM':
+        program_enum = ProgramType[target['target_program_type']]
+        students_query = students_query.join(
+            ClassRoom, Student.current_class_id == ClassRoom.id
+        ).filter(
+            ClassRoom.is_deleted.is_(False),
+            ClassRoom.program_type == program_enum
+        )
+    elif target_scope == 'CLASS':
+        students_query = students_query.join(
+            ClassRoom,
+            Student.current_class_id == ClassRoom.id,
+        ).join(
+            ProgramGroup,
+            ClassRoom.program_group_id == ProgramGroup.id,
+        ).filter(
+            Student.current_class_id == target['target_class_id'],
+            ClassRoom.is_deleted.is_(False),
+            ProgramGroup.tenant_id == tenant_id,
+            ProgramGroup.is_deleted.is_(False),
+        )
+    elif target_scope == 'STUDENT':
+        students_query = students_query.filter(Student.id == target['target_student_id'])
+
+    return students_query
+
+
+def is_monthly_fee(fee: FeeType) -> bool:
+    fee_name = (fee.name or '').upper()
+    return 'SPP' in fee_name or 'BULAN' in fee_name
+
+
+def _skipped_by_program(fee: FeeType, program_type: Optional[ProgramType]) -> bool:
+    if program_type is None:
+        return False
+    is_rqdf_fee = 'RQDF' in (fee.name or '').upper()
+    is_rqdf_student = program_type == ProgramType.RQDF_SORE
+    return is_rqdf_fee != is_rqdf_student
+
+
+def _existing_invoice_student_ids(fee_type_id: int, student_ids: list[int]) -> set[int]:
+    existing = set()
+    for chunk in chunked(student_ids, INVOICE_INSERT_CHUNK_SIZE):
+        existing.update(
+            student_id
+            for (student_id,) in db.session.query(Invoice.student_id).filter(
+                Invoice.fee_type_id == fee_type_id,
+                Invoice.student_id.in_(chunk),
+                Invoice.is_deleted.is_(False),
+            )
+        )
+    return existing
+
+
+def _next_invoice_sequence(tenant_id: int, fee_type_id: int) -> int:
+    prefix = sequenced_invoice_prefix(tenant_id, fee_type_id)
+    # MAX() atas string salah bila lebar angka berbeda (…-999999 > …-1000000); urutkan per panjang dulu
+    # lalu ambil akhiran pertama yang benar-benar angka.
+    candidates = (
+        db.session.query(Invoice.invoice_number)
+        .filter(Invoice.invoice_number.like(f'{prefix}%'))
+        .order_by(func.length(Invoice.invoice_number).desc(), Invoice.invoice_number.desc())
+        .limit(INVOICE_SEQUENCE_SCAN_LIMIT)
+        .execution_options(include_deleted=True)
+    )
+    for (invoice_number,) in candidates:
+        suffix = invoice_number[len(prefix):]
+        if suffix.isdigit():
+            return int(suffix) + 1
+    return 1
+
+
+def generate_fee_invoices(
+    *,
+    tenant_id: int,
+    fee: FeeType,
+    student_query,
+    enforce_program_rule: bool = False,
+    due_date: Optional[date] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> InvoiceGenerationResult:
+    """
+    Terbitkan tagihan `fee` untuk seluruh siswa pada `student_query` secara massal.
+    Caller yang melakukan commit; pada dry_run tidak ada baris yang ditulis.
+    `progress(selesai, total)` dipanggil per batch insert.
+    """
+    result = InvoiceGenerationResult(fee_type_id=fee.id, dry_run=dry_run)
+    due_date = due_date or (local_now() + timedelta(days=DEFAULT_DUE_DAYS)).date()
+    monthly_fee = is_monthly_fee(fee)
+
+    target_student_ids = student_query.with_entities(Student.id).order_by(None).subquery()
+    student_rows = (
+        db.session.query(Student.id, Student.nis, Student.full_name, Student.custom_spp_fee, ClassRoom.program_type)
+        .outerjoin(ClassRoom, ClassRoom.id == Student.current_class_id)
+        .filter(Student.id.in_(select(target_student_ids.c.id)))
+        .order_by(Student.id.asc())
+        .all()
+    )
+    result.total_target = len(student_rows)
+    if not student_rows:
+        return result
+
+    if not dry_run:
+        # Kunci baris biaya agar penerbitan paralel untuk biaya yang sama tidak berebut nomor urut.
+        db.session.query(FeeType.id).filter(FeeType.id == fee.id).with_for_update().first()
+
+    existing_student_ids = _existing_invoice_student_ids(fee.id, [row[0] for row in student_rows])
+    pending = []
+    for student_id, nis, full_name, custom_spp_fee, program_type in student_rows:
+        if enforce_program_rule and _skipped_by_program(fee, program_type):
+            result.skipped_program += 1
+            continue
+        if student_id in existing_student_ids:
+            result.skipped_duplicate += 1
+            continue
+
+        nominal_final = fee.amount
+        if monthly_fee and custom_spp_fee is not None:
+            nominal_final = custom_spp_fee
+        pending.append((student_id, nis, full_name, to_rupiah_int(nominal_final)))
+
+    result.created = len(pending)
+    if dry_run:
+        result.preview_rows = [
+            {'student_id': student_id, 'nis': nis, 'full_name': full_name, 'total_amount': amount}
+            for student_id, nis, full_name, amount in pending[:PREVIEW_ROW_LIMIT]
+        ]
+        return result
+
+    sequence = _next_invoice_sequence(tenant_id, fee.id)
+    now = utc_now_naive()
+    rows = []
+    for offset, (student_id, _, _, amount) in enumerate(pending):
+        rows.append({
+            'tenant_id': tenant_id,
+            'invoice_number': format_sequenced_invoice_number(tenant_id, fee.id, sequence + offset),
+            'student_id': student_id,
+            'fee_type_id': fee.id,
+            'total_amount': amount,
+            'paid_amount': 0,
+            'status': PaymentStatus.UNPAID,
+            'due_date': due_date,
+            'created_at': now,
+            'updated_at': now,
+            'is_deleted': False,
+        })
+    table = Invoice.__table__
+    written = 0
+    if progress:
+        progress(0, len(rows))
+    for chunk in chunked(rows, INVOICE_INSERT_CHUNK_SIZE):
+        inserted_ids = db.session.execute(table.insert().returning(table.c.id), chunk).scalars().all()
+        # Job penerbitan baru commit di akhir; id dicatat agar dicap ulang untuk sinkron mobile.
+        register_sync_rows(db.session, table, inserted_ids, stamp=now)
+        written += len(chunk)
+        if progress:
+            progress(written, len(rows))
+    return result
+
+
+def invoice_generation_message(result: InvoiceGenerationResult) -> tuple[str, str]:
+    if result.total_target == 0:
+        return 'Tidak ada siswa sesuai target pengiriman tagihan.', 'warning'
+    if result.created == 0 and result.skipped_duplicate > 0:
+        return (
+            f'Tidak ada tagihan baru. Target {result.total_target} siswa, '
+            'seluruhnya sudah punya tagihan aktif untuk biaya ini.',
+            'warning',
+        )
+    message = f'Berhasil menerbitkan {result.created} tagihan baru.'
+    if result.skipped_duplicate or result.skipped_program:
+        message += f' Dilewati: {result.skipped_duplicate} duplikat, {result.skipped_program} beda program.'
+        return message, 'warning'
+    return message, 'success'
+
+
+@job_handler('generate_invoices')
+def run_invoice_generation_job(job):
+    payload = job.payload
+    fee = FeeType.query.filter_by(id=payload['fee_id'], tenant_id=job.tenant_id).first()
+    if fee is None:
+        return {'message': 'Jenis biaya sudah tidak tersedia.', 'level': 'warning'}
+
+    result = generate_fee_invoices(
+        tenant_id=job.tenant_id,
+        fee=fee,
+        student_query=targeted_students_query(job.tenant_id, payload.get('target')),
+        enforce_program_rule=bool(payload.get('enforce_program_rule')),
+        progress=job_progress_callback(job),
+    )
+    message, level = invoice_generation_message(result)
+    summary = result.as_dict()
+    summary.update(message=message, level=level)
+    return summary
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, Optional
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.extensions import db
+from app.models import BackgroundJob, BackgroundJobStatus, UserRole
+from app.utils.timezone import utc_now_naive
+
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_SECONDS = 30
+DEFAULT_LOCK_TIMEOUT_SECONDS = 1800
+MAX_RETRY_DELAY_SECONDS = 3600
+ERROR_LOG_MAX_CHARACTERS = 20000
+
+# Modul yang mendaftarkan handler lewat @job_handler; diimpor worker sebelum mengambil job.
+JOB_HANDLER_MODULES = (
+    'app.services.bulk_import_service',
+    'app.services.invoice_generation_service',
+    'app.services.finance_reconciliation_service',
+    'app.services.ai_assistant_service',
+    'app.services.report_batch_service',
+    'app.utils.push_notifications',
+)
+
+JOB_TYPE_LABELS = {
+    'import_students': 'Upload siswa',
+    'import_teachers': 'Upload guru',
+    'generate_invoices': 'Penerbitan tagihan',
+    'finance_retry_draft_journals': 'Retry posting draft jurnal',
+    'finance_retry_sources': 'Retry posting sumber transaksi',
+    'announcement_push': 'Push notifikasi pengumuman',
+    'ai_document_extraction': 'Ekstraksi teks dokumen',
+    'print_report_batch': 'Cetak raport kelas',
+}
+
+# Job administrasi yang boleh dipantau admin/TU tenant selain pembuatnya.
+ADMIN_JOB_TYPES = frozenset({
+    'import_students',
+    'import_teachers',
+    'generate_invoices',
+    'finance_retry_draft_journals',
+    'finance_retry_sources',
+    'announcement_push',
+})
+ADMIN_JOB_ROLES = (UserRole.ADMIN, UserRole.TU)
+
+JOB_HANDLERS: dict[str, Callable[[BackgroundJob], Optional[dict]]] = {}
+# Aturan akses khusus per tipe job: `viewer(job, user) -> bool` untuk user tenant yang sama.
+JOB_VIEWERS: dict[str, Callable[[BackgroundJob, object], bool]] = {}
+
+
+def job_handler(job_type: str):
+    """Daftarkan fungsi `handler(job) -> dict` sebagai eksekutor job bertipe `job_type`."""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def job_viewer(job_type: str):
+    """Daftarkan aturan siapa (selain pembuat dan super admin) yang boleh melihat/mengunduh job `job_type`."""
+    def decorator(func):
+        JOB_VIEWERS[job_type] = func
+        return func
+    return decorator
+
+
+def load_job_handlers() -> None:
+    for module_name in JOB_HANDLER_MODULES:
+        importlib.import_module(module_name)
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue_job(
+    job_type: str,
+    *,
+    tenant_id: Optional[int],
+    created_by_user_id: Optional[int] = None,
+    payload: Optional[dict] = None,
+    input_blob: Optional[bytes] = None,
+    input_filename: Optional[str] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> BackgroundJob:
+    """
+    Simpan job baru lalu commit agar langsung terlihat oleh worker.
+    Dengan BACKGROUND_JOBS_EAGER, job dijalankan saat itu juga di proses pemanggil.
+    """
+    job = BackgroundJob(
+        tenant_id=tenant_id,
+        job_type=job_type,
+        status=BackgroundJobStatus.QUEUED,
+        payload_json=json.dumps(payload or {}, default=str),
+        input_blob=input_blob,
+        input_filename=input_filename,
+        max_attempts=max(1, int(max_attempts or 1)),
+        created_by_user_id=created_by_user_id,
+        run_after=utc_now_naive(),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if current_app.config.get('BACKGROUND_JOBS_EAGER', False):
+        _mark_running(job, 'eager')
+        db.session.commit()
+        run_job(job)
+    return job
+
+
+def _mark_running(job: BackgroundJob, worker_id: str) -> None:
+    now = utc_now_naive()
+    job.status = BackgroundJobStatus.RUNNING
+    job.locked_by = worker_id
+    job.locked_at = now
+    job.started_at = now
+    job.attempts = (job.attempts or 0) + 1
+
+
+def requeue_stale_jobs(now=None) -> int:
+    """
+    Job RUNNING yang heartbeat-nya (locked_at) kedaluwarsa dikembalikan ke antrean: worker-nya
+    dianggap mati. Job yang masih melapor progres terus memperbarui locked_at sehingga tidak disentuh.
+    """
+    now = now or utc_now_naive()
+    timeout = int(current_app.config.get('BACKGROUND_JOBS_LOCK_TIMEOUT_SECONDS', DEFAULT_LOCK_TIMEOUT_SECONDS))
+    stale = (
+        BackgroundJob.status == BackgroundJobStatus.RUNNING,
+        BackgroundJob.locked_at < now - timedelta(seconds=timeout),
+    )
+    db.session.execute(
+        update(BackgroundJob)
+        .where(*stale, BackgroundJob.attempts >= BackgroundJob.max_attempts)
+        .values(status=BackgroundJobStatus.FAILED, locked_by=None, locked_at=None, finished_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(
+        update(BackgroundJob)
+        .where(*stale)
+        .values(status=BackgroundJobStatus.QUEUED, locked_by=None, locked_at=None, run_after=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+
+def claim_next_job(worker_id: str) -> Optional[BackgroundJob]:
+    """
+    Ambil satu job QUEUED yang sudah jatuh tempo. FOR UPDATE SKIP LOCKED membuat beberapa
+    worker bisa berjalan bersamaan tanpa mengambil job yang sama.
+    """
+    now = utc_now_naive()
+    job = (
+        BackgroundJob.query
+        .filter(
+            BackgroundJob.status == BackgroundJobStatus.QUEUED,
+            BackgroundJob.run_after <= now,
+        )
+        .order_by(BackgroundJob.run_after.asc(), BackgroundJob.id.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.commit()
+        return None
+    _mark_running(job, worker_id)
+    db.session.commit()
+    return job
+
+
+def report_job_progress(job: BackgroundJob, current: int, total: Optional[int] = None) -> None:
+    """
+    Simpan progres lewat koneksi terpisah agar halaman status bisa membacanya
+    sementara transaksi handler belum di-commit. Sekaligus menjadi heartbeat:
+    locked_at diperbarui agar requeue_stale_jobs tidak mengambil alih job yang masih berjalan.
+    """
+    now = utc_now_naive()
+    values = {'progress_current': int(current), 'locked_at': now, 'updated_at': now}
+    if total is not None:
+        values['progress_total'] = int(total)
+
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite hanya punya satu penulis; tulis di sesi yang sama (ikut commit handler).
+        for key, value in values.items():
+            setattr(job, key, value)
+        return
+
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(BackgroundJob.__table__).where(BackgroundJob.__table__.c.id == job.id).values(**values)
+        )
+    for key, value in values.items():
+        set_committed_value(job, key, value)
+
+
+def job_progress_callback(job: BackgroundJob) -> Callable[[int, Optional[int]], None]:
+    def _progress(current, total=None):
+        report_job_progress(job, current, total)
+    return _progress
+
+
+def _retry_delay_seconds(attempts: int) -> int:
+    base = int(current_app.config.get('BACKGROUND_JOBS_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS))
+    return min(base * (2 ** max(attempts - 1, 0)), MAX_RETRY_DELAY_SECONDS)
+
+
+def _append_error_log(job: BackgroundJob, message: str) -> None:
+    entry = f'[{utc_now_naive().isoformat(timespec="seconds")}] percobaan {job.attempts}: {message}'
+    combined = f'{job.error_log}\n{entry}' if job.error_log else entry
+    job.error_log = combined[-ERROR_LOG_MAX_CHARACTERS:]
+
+
+def run_job(job: BackgroundJob) -> BackgroundJob:
+    """Eksekusi handler job; gagal -> dijadwalkan ulang dengan backoff atau ditandai FAILED."""
+    job_id = job.id
+    handler = JOB_HANDLERS.get(job.job_type)
+    if handler is None:
+        load_job_handlers()
+        handler = JOB_HANDLERS.get(job.job_type)
+
+    try:
+        if handler is None:
+            raise LookupError(f'Handler untuk job "{job.job_type}" tidak terdaftar.')
+        result = handler(job) or {}
+        now = utc_now_naive()
+        job.status = BackgroundJobStatus.SUCCEEDED
+        job.result_json = json.dumps(result, default=str)
+        job.finished_at = now
+        job.locked_by = None
+        job.locked_at = None
+        job.input_blob = None
+        if job.progress_total is not None:
+            job.progress_current = job.progress_total
+        db.session.commit()
+        return job
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception('Background job #%s (%s) gagal.', job_id, job.job_type)
+        job = db.session.get(BackgroundJob, job_id)
+        _append_error_log(job, f'{exc}\n{traceback.format_exc(limit=5)}'.strip())
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = BackgroundJobStatus.QUEUED
+            job.run_after = utc_now_naive() + timedelta(seconds=_retry_delay_seconds(job.attempts))
+        else:
+            job.status = BackgroundJobStatus.FAILED
+            job.finished_at = utc_now_naive()
+        db.session.commit()
+        return job
+
+
+def run_worker(
+    *,
+    worker_id: Optional[str] = None,
+    poll_interval: float = 2.0,
+    once: bool = False,
+    max_jobs: Optional[int] = None,
+) -> int:
+    """
+    Loop worker. `once=True` menghabiskan job yang jatuh tempo lalu berhenti (cocok untuk cron).
+    Mengembalikan jumlah job yang dieksekusi.
+    """
+    worker_id = worker_id or default_worker_id()
+    load_job_handlers()
+    processed = 0
+    requeue_stale_jobs()
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job(worker_id)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            requeue_stale_jobs()
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def job_visible_to(job: BackgroundJob, user) -> bool:
+    """Pembuat job, super admin, aturan `job_viewer` tipe job, atau admin/TU tenant untuk job administrasi."""
+    if job.created_by_user_id is not None and job.created_by_user_id == user.id:
+        return True
+    if user.has_role(UserRole.SUPER_ADMIN):
+        return True
+    if job.tenant_id is None or job.tenant_id != user.tenant_id:
+        return False
+    load_job_handlers()
+    viewer = JOB_VIEWERS.get(job.job_type)
+    if viewer is not None:
+        return bool(viewer(job, user))
+    return job.job_type in ADMIN_JOB_TYPES and user.has_role(*ADMIN_JOB_ROLES)
+
+
+def job_status_payload(job: BackgroundJob) -> dict:
+    result = job.result
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'label': JOB_TYPE_LABELS.get(job.job_type, job.job_type),
+        'status': job.status.value,
+        'is_finished': job.is_finished,
+        'progress_current': job.progress_current,
+        'progress_total': job.progress_total,
+        'progress_percent': job.progress_percent,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'message': result.get('message'),
+        'level': result.get('level') or ('danger' if job.status == BackgroundJobStatus.FAILED else 'success'),
+        'errors': (result.get('errors') or [])[:20],
+    }
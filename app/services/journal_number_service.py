@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+
+from app.extensions import db
+from app.models import FinanceJournal, FinanceJournalSequence, FinanceSetting
+from app.utils.sql import dialect_insert
+from app.utils.timezone import utc_now_naive
+
+
+PROVISIONAL_JOURNAL_PREFIX = 'TMP-'
+_PENDING_GAPLESS_KEY = 'provisional_journal_tenants'
+_POOL_EXTENSION_KEY = 'finance_journal_number_pool'
+
+
+def format_journal_no(year_month: str, value: int) -> str:
+    return f"JV-{year_month}-{value:04d}"
+
+
+def _bump_sequence(executor, tenant_id: int, year_month: str, step: int) -> int:
+    """Naikkan sequence (tenant, bulan) sebanyak `step` dan kembalikan nilai terakhirnya."""
+    table = FinanceJournalSequence.__table__
+    criteria = (table.c.tenant_id == tenant_id, table.c.year_month == year_month)
+    now = utc_now_naive()
+    bump = update(table).where(*criteria).values(last_value=table.c.last_value + step, updated_at=now)
+    if executor.execute(bump).rowcount == 0:
+        statement = dialect_insert(table).values(
+            tenant_id=tenant_id,
+            year_month=year_month,
+            last_value=step,
+            created_at=now,
+            updated_at=now,
+            is_deleted=False,
+        )
+        if hasattr(statement, 'on_conflict_do_nothing'):
+            statement = statement.on_conflict_do_nothing(index_elements=['tenant_id', 'year_month'])
+        if not executor.execute(statement).rowcount:
+            executor.execute(bump)
+    return executor.execute(select(table.c.last_value).where(*criteria)).scalar_one()
+
+
+def _reserve_block(tenant_id: int, year_month: str, size: int) -> tuple[int, int]:
+    # Transaksi terpisah yang langsung di-commit: kunci baris sequence hanya selama UPDATE ini.
+    with db.engine.begin() as connection:
+        last_value = _bump_sequence(connection, tenant_id, year_month, size)
+    return last_value - size + 1, last_value
+
+
+class JournalNumberPool:
+    """
+    Pool nomor jurnal per proses. Blok nomor dipesan per (tenant, bulan); nomor yang belum
+    terpakai saat proses berhenti atau transaksi rollback menjadi celah (urutan tetap unik).
+    """
+
+    def __init__(self, reserve_block=_reserve_block):
+        self._reserve_block = reserve_block
+        self._blocks = {}
+        self._locks = defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks[key]
+
+    def next_value(self, tenant_id: int, year_month: str, block_size: int) -> int:
+        key = (tenant_id, year_month)
+        with self._lock_for(key):
+            next_value, last_value = self._blocks.get(key, (1, 0))
+            if next_value > last_value:
+                next_value, last_value = self._reserve_block(tenant_id, year_month, block_size)
+            self._blocks[key] = (next_value + 1, last_value)
+            return next_value
+
+
+def journal_number_pool() -> JournalNumberPool:
+    pool = current_app.extensions.get(_POOL_EXTENSION_KEY)
+    if pool is None:
+        pool = current_app.extensions.setdefault(_POOL_EXTENSION_KEY, JournalNumberPool())
+    return pool
+
+
+def _block_allocation_enabled(block_size: int) -> bool:
+    # SQLite mengunci seluruh database saat menulis, sehingga transaksi terpisah akan menunggu
+    # transaksi request itu sendiri; di sana nomor tetap diambil di dalam transaksi berjalan.
+    return block_size > 1 and db.engine.dialect.name != 'sqlite'
+
+
+def uses_gapless_journal_numbers(tenant_id: int) -> bool:
+    return bool(
+        db.session.query(FinanceSetting.gapless_journal_numbers)
+        .filter(FinanceSetting.tenant_id == tenant_id)
+        .order_by(FinanceSetting.id.asc())
+        .limit(1)
+        .scalar()
+    )
+
+
+def generate_journal_no(*, tenant_id: int, journal_date: date) -> str:
+    """
+    Nomor jurnal JV-YYYY-MM-NNNN. Tenant gapless mendapat nomor sementara (TMP-...) yang diganti
+    nomor final setelah commit; tenant lain mengambil dari pool blok tanpa mengunci sequence.
+    """
+    year_month = journal_date.strftime('%Y-%m')
+    if uses_gapless_journal_numbers(tenant_id):
+        db.session.info.setdefault(_PENDING_GAPLESS_KEY, set()).add(tenant_id)
+        return f"{PROVISIONAL_JOURNAL_PREFIX}{uuid.uuid4().hex[:20]}"
+
+    block_size = int(current_app.config.get('FINANCE_JOURNAL_NUMBER_BLOCK_SIZE', 1) or 1)
+    if _block_allocation_enabled(block_size):
+        value = journal_number_pool().next_value(tenant_id, year_month, block_size)
+    else:
+        value = _bump_sequence(db.session, tenant_id, year_month, 1)
+    return format_journal_no(year_month, value)
+
+
+def finalize_provisional_journal_numbers(tenant_id: int) -> int:
+    """
+    Ganti nomor sementara jurnal yang sudah ter-commit dengan nomor final berurutan per bulan
+    (urut id). Hanya jurnal yang benar-benar ter-commit yang memakai nomor, jadi urutan tanpa celah.
+    """
+    journals = FinanceJournal.__table__
+    with db.engine.begin() as connection:
+        rows = connection.execute(
+            select(journals.c.id, journals.c.journal_date)
+            .where(
+                journals.c.tenant_id == tenant_id,
+                journals.c.journal_no.like(f'{PROVISIONAL_JOURNAL_PREFIX}%'),
+            )
+            .order_by(journals.c.id.asc())
+            .with_for_update()
+        ).all()
+        ids_by_month = defaultdict(list)
+        for journal_id, journal_date in rows:
+            ids_by_month[journal_date.strftime('%Y-%m')].append(journal_id)
+
+        assign = (
+            update(journals)
+            .where(journals.c.id == bindparam('target_id'))
+            .values(journal_no=bindparam('final_no'))
+        )
+        for year_month, journal_ids in sorted(ids_by_month.items()):
+            last_value = _bump_sequence(connection, tenant_id, year_month, len(journal_ids))
+            first_value = last_value - len(journal_ids) + 1
+            connection.execute(assign, [
+                {'target_id': journal_id, 'final_no': format_journal_no(year_month, first_value + offset)}
+                for offset, journal_id in enumerate(journal_ids)
+            ])
+    return len(rows)
+
+
+def finalize_session_journal_numbers(session) -> None:
+    """Dipanggil dari hook after_commit untuk tenant gapless yang membuat jurnal di sesi ini."""
+    if session.in_nested_transaction():
+        # after_commit juga terpanggil saat savepoint dilepas; tunggu commit transaksi luar.
+        return
+    tenant_ids = session.info.pop(_PENDING_GAPLESS_KEY, None)
+    for tenant_id in sorted(tenant_ids or ()):
+        try:
+            finalize_provisional_journal_numbers(tenant_id)
+        except Exception:
+            # Nomor sementara tetap tersimpan dan ikut difinalkan pada commit gapless berikutnya.
+            current_app.logger.exception('Finalisasi nomor jurnal tenant #%s gagal.', tenant_id)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+from typing import Iterable
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import MobileIdempotencyKey
+from app.utils.timezone import utc_now_naive
+
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 100
+DEFAULT_IDEMPOTENCY_RETENTION_HOURS = 24 * 7
+
+
+def request_fingerprint(payload) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def normalize_idempotency_key(raw_value):
+    key = str(raw_value or "").strip()
+    if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return None
+    return key
+
+
+def load_idempotency_records(user_id: int, keys: Iterable[str]) -> dict:
+    keys = {key for key in keys if key}
+    if not keys:
+        return {}
+    rows = MobileIdempotencyKey.query.filter(
+        MobileIdempotencyKey.user_id == user_id,
+        MobileIdempotencyKey.idempotency_key.in_(keys),
+    ).all()
+    return {row.idempotency_key: row for row in rows}
+
+
+def record_idempotent_result(user_id: int, key: str, scope: str, fingerprint: str, result: dict) -> MobileIdempotencyKey:
+    row = MobileIdempotencyKey(
+        user_id=user_id,
+        idempotency_key=key,
+        scope=scope,
+        request_hash=fingerprint,
+        result_json=json.dumps(result, default=str),
+    )
+    db.session.add(row)
+    db.session.flush()
+    return row
+
+
+def stored_result(row: MobileIdempotencyKey) -> dict:
+    try:
+        return json.loads(row.result_json or "{}")
+    except ValueError:
+        return {}
+
+
+def cleanup_expired_idempotency_keys(now=None) -> int:
+    now = now or utc_now_naive()
+    hours = int(current_app.config.get("MOBILE_IDEMPOTENCY_RETENTION_HOURS", DEFAULT_IDEMPOTENCY_RETENTION_HOURS))
+    return MobileIdempotencyKey.query.filter(
+        MobileIdempotencyKey.created_at < now - timedelta(hours=hours)
+    ).delete(synchronize_session=False)
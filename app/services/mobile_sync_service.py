@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import selectinload
+
+from app.models import (
+    Announcement,
+    Attendance,
+    Grade,
+    Invoice,
+    ParticipantType,
+    RecitationRecord,
+    Student,
+    StudentSavingsTransaction,
+    TahfidzRecord,
+    User,
+)
+from app.services.formal_service import get_student_formal_classroom
+from app.utils.announcements import announcement_audience_filter, announcement_role_values
+from app.utils.sql import chunked
+from app.utils.timezone import utc_now_naive
+
+
+SYNC_CURSOR_VERSION = 1
+SYNC_CURSOR_SALT = "mobile-sync-cursor-v1"
+DEFAULT_SYNC_PAGE_SIZE = 200
+MAX_SYNC_PAGE_SIZE = 500
+DEFAULT_SYNC_SETTLE_SECONDS = 2
+SYNC_TOUCH_CHUNK_SIZE = 1000
+# session.info: baris tabel sinkron yang ditulis transaksi berjalan, untuk dicap ulang saat commit.
+SYNC_PENDING_ROWS_KEY = "mobile_sync_pending_rows"
+
+
+class SyncCursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SyncScope:
+    """Data yang boleh dilihat user: siswa (anak/diri sendiri), kelas, role, dan target pengumuman."""
+
+    student_ids: tuple
+    class_ids: tuple
+    user_ids: tuple
+    program_types: tuple
+    role_values: tuple = ()
+
+    @property
+    def key(self):
+        material = repr((self.student_ids, self.class_ids, self.user_ids, self.program_types, self.role_values))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _enum_name(value):
+    return value.name if value else None
+
+
+def _serialize_grade(row):
+    subject = row.subject or row.majlis_subject
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "subject_id": row.subject_id,
+        "majlis_subject_id": row.majlis_subject_id,
+        "subject_name": subject.name if subject else None,
+        "academic_year_id": row.academic_year_id,
+        "type": _enum_name(row.type),
+        "score": row.score,
+        "notes": row.notes,
+        "created_at": _iso(row.created_at),
+    }
+
+
+def _serialize_attendance(row):
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "class_id": row.class_id,
+        "academic_year_id": row.academic_year_id,
+        "date": _iso(row.date),
+        "status": _enum_name(row.status),
+        "status_label": row.status.value if row.status else None,
+        "notes": row.notes,
+    }
+
+
+def _serialize_tahfidz(row):
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "date": _iso(row.date),
+        "type": _enum_name(row.type),
+        "juz": row.juz,
+        "surah": row.surah,
+        "ayat_start": row.ayat_start,
+        "ayat_end": row.ayat_end,
+        "quality": row.quality,
+        "score": row.score,
+        "notes": row.notes,
+    }
+
+
+def _serialize_recitation(row):
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "date": _iso(row.date),
+        "recitation_source": _enum_name(row.recitation_source),
+        "surah": row.surah,
+        "ayat_start": row.ayat_start,
+        "ayat_end": row.ayat_end,
+        "book_name": row.book_name,
+        "page_start": row.page_start,
+        "page_end": row.page_end,
+        "score": row.score,
+        "notes": row.notes,
+    }
+
+
+def _serialize_invoice(row):
+    total = int(row.total_amount or 0)
+    paid = int(row.paid_amount or 0)
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "invoice_number": row.invoice_number or f"INV-{row.id}",
+        "fee_type": row.fee_type.name if row.fee_type else None,
+        "total_amount": total,
+        "paid_amount": paid,
+        "remaining_amount": max(0, total - paid),
+        "status": _enum_name(row.status),
+        "due_date": _iso(row.due_date),
+        "created_at": _iso(row.created_at),
+    }
+
+
+def _serialize_savings(row):
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "amount": int(row.amount or 0),
+        "transaction_type": _enum_name(row.transaction_type),
+        "status": _enum_name(row.status),
+        "notes": row.notes,
+        "created_at": _iso(row.created_at),
+    }
+
+
+def _serialize_announcement(row):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "content": row.content,
+        "target_scope": row.target_scope,
+        "created_at": _iso(row.created_at),
+    }
+
+
+@dataclass(frozen=True)
+class SyncResource:
+    name: str
+    model: type
+    serializer: Callable
+    scope_filter: Callable[[SyncScope], list]
+    load_options: tuple = ()
+    # False untuk resource yang tidak dimiliki siswa (pengumuman): tetap disinkronkan tanpa anak.
+    student_scoped: bool = True
+    # Baris yang masih dalam scope tetapi disembunyikan (mis. pengumuman nonaktif) dikirim sebagai delete.
+    is_visible: Optional[Callable] = None
+
+
+def _student_rows(model, participant_column=True):
+    def _filters(scope):
+        filters = [model.student_id.in_(scope.student_ids)]
+        if participant_column:
+            filters.append(model.participant_type == ParticipantType.STUDENT)
+        return filters
+    return _filters
+
+
+def _announcement_rows(scope):
+    return [announcement_audience_filter(
+        scope.role_values,
+        class_ids=scope.class_ids,
+        user_ids=scope.user_ids,
+        program_types=scope.program_types,
+    )]
+
+
+SYNC_RESOURCES = (
+    SyncResource("grades", Grade, _serialize_grade, _student_rows(Grade),
+                 (selectinload(Grade.subject), selectinload(Grade.majlis_subject))),
+    SyncResource("attendance", Attendance, _serialize_attendance, _student_rows(Attendance)),
+    SyncResource("tahfidz_records", TahfidzRecord, _serialize_tahfidz, _student_rows(TahfidzRecord)),
+    SyncResource("recitation_records", RecitationRecord, _serialize_recitation, _student_rows(RecitationRecord)),
+    SyncResource("invoices", Invoice, _serialize_invoice, _student_rows(Invoice, participant_column=False),
+                 (selectinload(Invoice.fee_type),)),
+    SyncResource("savings_transactions", StudentSavingsTransaction, _serialize_savings,
+                 _student_rows(StudentSavingsTransaction, participant_column=False)),
+    SyncResource("announcements", Announcement, _serialize_announcement, _announcement_rows,
+                 student_scoped=False, is_visible=lambda row: bool(row.is_active)),
+)
+
+
+def _sync_settle_seconds():
+    return int(current_app.config.get("MOBILE_SYNC_SETTLE_SECONDS", DEFAULT_SYNC_SETTLE_SECONDS))
+
+
+def _synced_tables():
+    return {resource.model.__table__.name: resource.model.__table__ for resource in SYNC_RESOURCES}
+
+
+def register_sync_rows(session, table, ids, stamp=None):
+    """
+    Catat baris tabel sinkron yang ditulis transaksi ini. Insert Core massal memanggil ini
+    dengan id hasil RETURNING dan cap waktu yang dipakai; baris ORM dicatat hook after_flush.
+    """
+    ids = [row_id for row_id in ids if row_id is not None]
+    if not ids or table.name not in _synced_tables():
+        return
+    stamp = stamp or utc_now_naive()
+    pending = session.info.setdefault(SYNC_PENDING_ROWS_KEY, {"since": stamp, "rows": {}})
+    pending["since"] = min(pending["since"], stamp)
+    pending["rows"].setdefault(table.name, set()).update(ids)
+
+
+def track_sync_rows_for_session(session):
+    """Dipanggil dari hook after_flush: catat baris resource sinkron yang baru/berubah."""
+    synced_models = {resource.model for resource in SYNC_RESOURCES}
+    stamp = utc_now_naive()
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) not in synced_models or obj.id is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        register_sync_rows(session, type(obj).__table__, [obj.id], stamp=stamp)
+
+
+def touch_late_sync_rows(session):
+    """
+    Dipanggil dari hook before_commit. Cursor sinkron memakai updated_at, jadi baris yang dicap
+    di awal transaksi panjang (job impor/penerbitan tagihan) lalu baru di-commit setelah cursor
+    klien maju akan terlewat. Jika transaksi sudah terbuka lebih dari setengah jendela settle,
+    updated_at baris tersebut dicap ulang tepat sebelum commit agar urutannya mengikuti commit.
+    """
+    pending = session.info.pop(SYNC_PENDING_ROWS_KEY, None)
+    if not pending:
+        return
+    now = utc_now_naive()
+    if pending["since"] > now - timedelta(seconds=_sync_settle_seconds() / 2):
+        return
+    tables = _synced_tables()
+    for table_name, ids in pending["rows"].items():
+        table = tables[table_name]
+        for chunk in chunked(sorted(ids), SYNC_TOUCH_CHUNK_SIZE):
+            session.execute(
+                update(table).where(table.c.id.in_(chunk)).values(updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+    # Flush yang dipicu UPDATE di atas tidak perlu dicap ulang lagi.
+    session.info.pop(SYNC_PENDING_ROWS_KEY, None)
+
+
+def discard_sync_rows(session):
+    """Dipanggil dari hook after_commit/after_rollback."""
+    session.info.pop(SYNC_PENDING_ROWS_KEY, None)
+
+
+def _cursor_serializer():
+    return URLSafeSerializer(current_app.config.get("SECRET_KEY"), salt=SYNC_CURSOR_SALT)
+
+
+def encode_sync_cursor(scope_key, marks):
+    return _cursor_serializer().dumps({"v": SYNC_CURSOR_VERSION, "scope": scope_key, "marks": marks})
+
+
+def decode_sync_cursor(token):
+    if not token:
+        return None
+    try:
+        payload = _cursor_serializer().loads(token)
+    except BadSignature as exc:
+        raise SyncCursorError("Cursor sinkronisasi tidak valid.") from exc
+    if not isinstance(payload, dict) or payload.get("v") != SYNC_CURSOR_VERSION:
+        return None
+    return payload
+
+
+def resolve_sync_scope(user):
+    students = []
+    parent = user.parent_profile
+    if parent is not None:
+        students.extend(
+            Student.query.join(User, Student.user_id == User.id)
+            .filter(Student.parent_id == parent.id, User.tenant_id == user.tenant_id)
+            .all()
+        )
+    if user.student_profile is not None and user.student_profile not in students:
+        students.append(user.student_profile)
+
+    class_ids = set()
+    program_types = set()
+    for student in students:
+        class_room = get_student_formal_classroom(student) or student.current_class
+        if class_room is None:
+            continue
+        class_ids.add(class_room.id)
+        if class_room.program_type:
+            program_types.add(class_room.program_type.name)
+
+    user_ids = {user.id} | {student.user_id for student in students if student.user_id}
+    return SyncScope(
+        student_ids=tuple(sorted(student.id for student in students)),
+        class_ids=tuple(sorted(class_ids)),
+        user_ids=tuple(sorted(user_ids)),
+        program_types=tuple(sorted(program_types)),
+        role_values=tuple(sorted(announcement_role_values(user))),
+    )
+
+
+def _version_column(model):
+    return func.coalesce(model.updated_at, model.created_at)
+
+
+def _changed_rows(resource, scope, mark, settle_before, limit):
+    model = resource.model
+    version = _version_column(model)
+    query = (
+        model.query.execution_options(include_deleted=True)
+        .filter(*resource.scope_filter(scope), version < settle_before)
+    )
+    if mark is None:
+        query = query.filter(model.is_deleted.is_(False))
+    else:
+        mark_at = datetime.fromisoformat(mark[0])
+        query = query.filter(or_(version > mark_at, and_(version == mark_at, model.id > mark[1])))
+    if resource.load_options:
+        query = query.options(*resource.load_options)
+    return query.order_by(version.asc(), model.id.asc()).limit(limit + 1).all()
+
+
+def build_sync_changes(user, cursor_token=None, limit=None):
+    """
+    Perubahan sejak cursor untuk setiap resource, diurutkan (updated_at, id).
+    Cursor kosong = sinkronisasi awal (tanpa tombstone). Baris soft-delete atau yang tidak
+    lagi terlihat dikirim sebagai `deletes`. Baris yang updated_at-nya belum lewat
+    MOBILE_SYNC_SETTLE_SECONDS ditahan dulu agar transaksi yang belum commit tidak terlewat.
+    """
+    limit = max(1, min(int(limit or DEFAULT_SYNC_PAGE_SIZE), MAX_SYNC_PAGE_SIZE))
+    scope = resolve_sync_scope(user)
+    cursor = decode_sync_cursor(cursor_token)
+
+    reset = bool(cursor_token) and (cursor is None or cursor.get("scope") != scope.key)
+    marks = {} if reset or cursor is None else dict(cursor.get("marks") or {})
+    settle_before = utc_now_naive() - timedelta(seconds=_sync_settle_seconds())
+
+    changes = {}
+    has_more = False
+    for resource in SYNC_RESOURCES:
+        mark = marks.get(resource.name)
+        upserts, deletes = [], []
+        if scope.student_ids or not resource.student_scoped:
+            rows = _changed_rows(resource, scope, mark, settle_before, limit)
+            if len(rows) > limit:
+                has_more = True
+                rows = rows[:limit]
+
+            for row in rows:
+                if row.is_deleted or (resource.is_visible is not None and not resource.is_visible(row)):
+                    if mark is not None:
+                        deletes.append(row.id)
+                else:
+                    upserts.append(resource.serializer(row))
+            if rows:
+                last = rows[-1]
+                marks[resource.name] = [(last.updated_at or last.created_at).isoformat(), last.id]
+        changes[resource.name] = {"upserts": upserts, "deletes": deletes}
+
+    return {
+        "cursor": encode_sync_cursor(scope.key, marks),
+        "has_more": has_more,
+        "reset": reset,
+        "student_ids": list(scope.student_ids),
+        "changes": changes,
+    }
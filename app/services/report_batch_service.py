@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models import (
+    Attendance,
+    BehaviorReport,
+    ClassRoom,
+    EnrollmentStatus,
+    Grade,
+    GroupMembership,
+    MembershipStatus,
+    Parent,
+    ParticipantType,
+    Program,
+    ProgramEnrollment,
+    RecitationRecord,
+    Schedule,
+    Student,
+    StudentReportFinalization,
+    TahfidzEvaluation,
+    TahfidzRecord,
+    Teacher,
+    UserRole,
+)
+from app.services.formal_service import FORMAL_PROGRAM_CODES, _student_tenant_id, is_formal_classroom
+from app.services.job_queue_service import job_handler, job_progress_callback, job_viewer
+
+
+RUMAH_QURAN_PROGRAM_CODE = "RUMAH_QURAN"
+BAHASA_PROGRAM_CODE = "BAHASA"
+
+
+def _group_by_student(rows):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.student_id].append(row)
+    return grouped
+
+
+def _membership_order_key(membership):
+    # Sama dengan ORDER BY is_primary DESC, start_date DESC, id DESC di service per siswa.
+    return (not membership.is_primary, -(membership.start_date.toordinal() if membership.start_date else 0), -membership.id)
+
+
+def _enrollment_order_key(enrollment):
+    return (-(enrollment.join_date.toordinal() if enrollment.join_date else 0), -enrollment.id)
+
+
+def resolve_program_classrooms(students: Iterable[Student]) -> dict:
+    """
+    Versi batch dari get_student_formal_classroom / get_student_rumah_quran_classroom /
+    get_student_bahasa_classroom: student_id -> {"formal", "tahfidz", "bahasa"} dengan
+    aturan pemilihan yang sama, tetapi memakai empat query untuk seluruh siswa.
+    """
+    students = list(students)
+    result = {student.id: {"formal": None, "tahfidz": None, "bahasa": None} for student in students}
+    tenant_by_student = {student.id: _student_tenant_id(student) for student in students}
+    person_keys = {
+        (tenant_by_student[student.id], student.person_id)
+        for student in students
+        if tenant_by_student[student.id] and student.person_id
+    }
+
+    formal_memberships = {}
+    program_memberships = {}
+    if person_keys:
+        tenant_ids = {tenant_id for tenant_id, _ in person_keys}
+        person_ids = {person_id for _, person_id in person_keys}
+
+        formal_rows = (
+            GroupMembership.query.join(GroupMembership.enrollment)
+            .join(ProgramEnrollment.program)
+            .filter(
+                ProgramEnrollment.tenant_id.in_(tenant_ids),
+                ProgramEnrollment.person_id.in_(person_ids),
+                ProgramEnrollment.status == EnrollmentStatus.ACTIVE,
+                ProgramEnrollment.is_deleted.is_(False),
+                Program.code.in_(FORMAL_PROGRAM_CODES),
+                Program.is_deleted.is_(False),
+                GroupMembership.status == MembershipStatus.ACTIVE,
+                GroupMembership.is_deleted.is_(False),
+            )
+            .with_entities(GroupMembership, ProgramEnrollment.tenant_id, ProgramEnrollment.person_id)
+            .all()
+        )
+        for membership, tenant_id, person_id in formal_rows:
+            key = (tenant_id, person_id)
+            current = formal_memberships.get(key)
+            if current is None or _membership_order_key(membership) < _membership_order_key(current):
+                formal_memberships[key] = membership
+
+        enrollments = (
+            ProgramEnrollment.query.join(ProgramEnrollment.program)
+            .filter(
+                ProgramEnrollment.tenant_id.in_(tenant_ids),
+                ProgramEnrollment.person_id.in_(person_ids),
+                ProgramEnrollment.status == EnrollmentStatus.ACTIVE,
+                ProgramEnrollment.is_deleted.is_(False),
+                Program.code.in_((RUMAH_QURAN_PROGRAM_CODE, BAHASA_PROGRAM_CODE)),
+            )
+            .with_entities(ProgramEnrollment, Program.code)
+            .all()
+        )
+        latest_enrollments = {}
+        for enrollment, code in enrollments:
+            key = (enrollment.tenant_id, enrollment.person_id, code)
+            current = latest_enrollments.get(key)
+            if current is None or _enrollment_order_key(enrollment) < _enrollment_order_key(current):
+                latest_enrollments[key] = enrollment
+
+        enrollment_keys = {enrollment.id: key for key, enrollment in latest_enrollments.items()}
+        if enrollment_keys:
+            memberships = GroupMembership.query.filter(
+                GroupMembership.enrollment_id.in_(list(enrollment_keys)),
+                GroupMembership.status == MembershipStatus.ACTIVE,
+                GroupMembership.is_deleted.is_(False),
+            ).all()
+            for membership in memberships:
+                key = enrollment_keys[membership.enrollment_id]
+                if membership.tenant_id != key[0]:
+                    continue
+                current = program_memberships.get(key)
+                if current is None or _membership_order_key(membership) < _membership_order_key(current):
+                    program_memberships[key] = membership
+
+    group_ids = {item.group_id for item in formal_memberships.values()}
+    group_ids.update(item.group_id for item in program_memberships.values())
+    classrooms_by_group = {}
+    if group_ids:
+        classrooms_by_group = {
+            class_room.program_group_id: class_room
+            for class_room in ClassRoom.query.filter(
+                ClassRoom.program_group_id.in_(group_ids),
+                ClassRoom.is_deleted.is_(False),
+            )
+        }
+
+    for student in students:
+        tenant_id = tenant_by_student[student.id]
+        slots = result[student.id]
+        current_class = student.current_class
+        fallback_formal = current_class if is_formal_classroom(current_class) else None
+        if not tenant_id or not student.person_id:
+            slots["formal"] = fallback_formal
+            continue
+        membership = formal_memberships.get((tenant_id, student.person_id))
+        slots["formal"] = (classrooms_by_group.get(membership.group_id) if membership else None) or fallback_formal
+        for slot, code in (("tahfidz", RUMAH_QURAN_PROGRAM_CODE), ("bahasa", BAHASA_PROGRAM_CODE)):
+            membership = program_memberships.get((tenant_id, student.person_id, code))
+            slots[slot] = classrooms_by_group.get(membership.group_id) if membership else None
+    return result
+
+
+def _preload_students(students):
+    """Muat user, wali (beserta user-nya), dan kelas siswa sekaligus; dipakai untuk resolusi tenant/kelas."""
+    students = list(students)
+    student_ids = [student.id for student in students]
+    if len(student_ids) > 1:
+        (
+            Student.query.options(
+                selectinload(Student.user),
+                selectinload(Student.parent).selectinload(Parent.user),
+                selectinload(Student.current_class),
+            )
+            .filter(Student.id.in_(student_ids))
+            .execution_options(populate_existing=True)
+            .all()
+        )
+    return students
+
+
+def _datetime_bounds(query, column, start_date, end_date):
+    if start_date:
+        query = query.filter(column >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        query = query.filter(column <= datetime.combine(end_date, datetime.max.time()))
+    return query
+
+
+class ReportBatchData:
+    """
+    Data mentah raport untuk sekelompok siswa pada satu periode. Setiap jenis data dimuat
+    dengan satu query `student_id IN (...)` lalu dibagi per siswa di memori, sehingga jumlah
+    query tidak bertambah mengikuti jumlah siswa.
+    """
+
+    def __init__(
+        self,
+        students: Iterable[Student],
+        *,
+        tenant_id: Optional[int],
+        academic_year_ids: Iterable[int],
+        start_date=None,
+        end_date=None,
+        period_key: Optional[str] = None,
+    ):
+        self.students = _preload_students(students)
+        self.tenant_id = tenant_id
+        self.academic_year_ids = list(academic_year_ids or [])
+        self.start_date = start_date
+        self.end_date = end_date
+        student_ids = [student.id for student in self.students]
+
+        self.classrooms = resolve_program_classrooms(self.students)
+        self.grades = self._load_grades(student_ids)
+        self.tahfidz_records = self._load_dated(TahfidzRecord, student_ids)
+        self.recitation_records = self._load_dated(RecitationRecord, student_ids)
+        self.evaluations = self._load_dated(TahfidzEvaluation, student_ids)
+        self.attendances = self._load_attendances(student_ids)
+        self.behavior_reports = self._load_behavior_reports(student_ids)
+        self.finalizations = self._load_finalizations(student_ids, period_key)
+
+        class_ids = {
+            class_room.id
+            for slots in self.classrooms.values()
+            for class_room in slots.values()
+            if class_room is not None
+        }
+        class_ids.update(student.current_class_id for student in self.students if student.current_class_id)
+        self.class_subject_ids = self._load_class_subject_ids(class_ids)
+        self.class_meeting_dates = self._load_class_meeting_dates(class_ids)
+
+    def _load_grades(self, student_ids):
+        if not student_ids or not self.academic_year_ids:
+            return {}
+        rows = (
+            Grade.query.options(
+                selectinload(Grade.subject),
+                selectinload(Grade.majlis_subject),
+                selectinload(Grade.teacher),
+            )
+            .filter(
+                Grade.is_deleted.is_(False),
+                Grade.participant_type == ParticipantType.STUDENT,
+                Grade.student_id.in_(student_ids),
+                Grade.academic_year_id.in_(self.academic_year_ids),
+            )
+            .order_by(Grade.created_at.desc(), Grade.id.desc())
+            .all()
+        )
+        return _group_by_student(rows)
+
+    def _load_dated(self, model, student_ids):
+        if not student_ids:
+            return {}
+        query = model.query.filter(
+            model.is_deleted.is_(False),
+            model.participant_type == ParticipantType.STUDENT,
+            model.student_id.in_(student_ids),
+        )
+        query = _datetime_bounds(query, model.date, self.start_date, self.end_date)
+        return _group_by_student(query.order_by(model.date.asc(), model.id.asc()).all())
+
+    def _load_attendances(self, student_ids):
+        if not student_ids:
+            return {}
+        query = Attendance.query.filter(
+            Attendance.is_deleted.is_(False),
+            Attendance.participant_type == ParticipantType.STUDENT,
+            Attendance.student_id.in_(student_ids),
+        )
+        if self.academic_year_ids:
+            query = query.filter(Attendance.academic_year_id.in_(self.academic_year_ids))
+        return _group_by_student(query.order_by(Attendance.date.desc(), Attendance.created_at.desc()).all())
+
+    def _load_behavior_reports(self, student_ids):
+        if not student_ids:
+            return {}
+        query = BehaviorReport.query.options(selectinload(BehaviorReport.teacher)).filter(
+            BehaviorReport.is_deleted.is_(False),
+            BehaviorReport.student_id.in_(student_ids),
+        )
+        if self.start_date:
+            query = query.filter(BehaviorReport.report_date >= self.start_date)
+        if self.end_date:
+            query = query.filter(BehaviorReport.report_date <= self.end_date)
+        rows = query.order_by(BehaviorReport.report_date.desc(), BehaviorReport.created_at.desc()).all()
+        return _group_by_student(rows)
+
+    def _load_finalizations(self, student_ids, period_key):
+        if self.tenant_id is None or not student_ids or not period_key:
+            return {}
+        rows = StudentReportFinalization.query.filter(
+            StudentReportFinalization.is_deleted.is_(False),
+            StudentReportFinalization.tenant_id == self.tenant_id,
+            StudentReportFinalization.student_id.in_(student_ids),
+            StudentReportFinalization.period_key == period_key,
+        ).all()
+        return {row.student_id: row for row in rows}
+
+    def _load_class_subject_ids(self, class_ids):
+        subject_ids = {class_id: (set(), set()) for class_id in class_ids}
+        if not class_ids:
+            return subject_ids
+        schedules = Schedule.query.filter(
+            Schedule.is_deleted.is_(False),
+            Schedule.class_id.in_(class_ids),
+        ).with_entities(Schedule.class_id, Schedule.subject_id, Schedule.majlis_subject_id)
+        for class_id, subject_id, majlis_subject_id in schedules:
+            if subject_id:
+                subject_ids[class_id][0].add(subject_id)
+            if majlis_subject_id:
+                subject_ids[class_id][1].add(majlis_subject_id)
+        return subject_ids
+
+    def _load_class_meeting_dates(self, class_ids):
+        meeting_dates = {class_id: set() for class_id in class_ids}
+        if not class_ids:
+            return {}
+        query = Attendance.query.filter(
+            Attendance.is_deleted.is_(False),
+            Attendance.class_id.in_(class_ids),
+            Attendance.participant_type == ParticipantType.STUDENT,
+        )
+        if self.academic_year_ids:
+            query = query.filter(Attendance.academic_year_id.in_(self.academic_year_ids))
+        if self.start_date:
+            query = query.filter(Attendance.date >= self.start_date)
+        if self.end_date:
+            query = query.filter(Attendance.date <= self.end_date)
+        for class_id, attendance_date in query.with_entities(Attendance.class_id, Attendance.date).distinct():
+            if attendance_date:
+                meeting_dates[class_id].add(attendance_date)
+        return {class_id: sorted(dates) for class_id, dates in meeting_dates.items()}
+
+    def meeting_dates_for(self, class_id):
+        return self.class_meeting_dates.get(class_id, [])
+
+    def subject_ids_for(self, class_room):
+        if class_room is None:
+            return set(), set()
+        return self.class_subject_ids.get(class_room.id, (set(), set()))
+
+
+@job_viewer('print_report_batch')
+def can_view_report_batch_job(job, user) -> bool:
+    """Hasil cetak berisi nilai seluruh kelas: hanya admin tenant dan wali kelas tersebut."""
+    if user.has_role(UserRole.ADMIN):
+        return True
+    teacher = user.teacher_profile
+    if teacher is None:
+        return False
+    return db.session.query(ClassRoom.id).filter(
+        ClassRoom.id == job.payload.get('class_id'),
+        ClassRoom.homeroom_teacher_id == teacher.id,
+    ).first() is not None
+
+
+@job_handler('print_report_batch')
+def run_report_batch_job(job):
+    # Import lokal: renderer raport ada di modul route guru yang juga mengimpor service ini.
+    from app.routes.teacher import render_class_report_batch
+
+    payload = job.payload
+    teacher = db.session.get(Teacher, payload.get('teacher_id'))
+    class_room = db.session.get(ClassRoom, payload.get('class_id'))
+    if teacher is None or class_room is None:
+        return {'message': 'Guru atau kelas sudah tidak tersedia.', 'level': 'warning'}
+
+    # Template raport memakai url_for; worker tidak punya request aktif.
+    with current_app.test_request_context():
+        output = render_class_report_batch(
+            teacher,
+            class_room,
+            output_format=payload.get('output_format') or 'html',
+            progress=job_progress_callback(job),
+            **(payload.get('options') or {}),
+        )
+    if not output['count']:
+        return {'message': 'Tidak ada raport yang tersedia untuk dicetak di kelas ini.', 'level': 'warning'}
+
+    job.output_blob = output['content']
+    job.output_filename = output['filename']
+    job.output_mimetype = output['mimetype']
+    return {'message': f"{output['count']} raport kelas {class_room.name} siap diunduh.", 'count': output['count']}
@@ -1,3 +1,5 @@
+from sqlalchemy import func, or_, select
+
 from app.extensions import db
 from app.models import (
     AcademicYear,
@@ -23,6 +25,8 @@ ASSIGNMENT_LABEL_DEFAULTS = {
     "assignment_label.boarding_supervisor": ("Pembina Asrama", "Label untuk assignment pengasuhan/asrama."),
 }
 
+TEACHER_ASSIGNMENT_CACHE = "teacher_assignment_summary"
+
 
 def _default_tenant():
     return get_default_tenant()
@@ -385,38 +389,76 @@ def _active_staff_assignments_for_teacher(teacher, assignment_role=None):
     return query.order_by(StaffAssignment.id.asc()).all()
 
 
-def list_teacher_homeroom_classes_from_assignments(teacher):
+def _classes_for_teacher_assignments(teacher, assignment_role):
+    tenant_id = _resolve_assignment_tenant_id(teacher=teacher)
+    person_id = _teacher_person_id(teacher)
+    if teacher is None or tenant_id is None or not person_id:
+        return []
+
+    rows = (
+        db.session.query(ClassRoom)
+        .join(StaffAssignment, StaffAssignment.group_id == ClassRoom.program_group_id)
+        .filter(
+            StaffAssignment.tenant_id == tenant_id,
+            StaffAssignment.person_id == person_id,
+            StaffAssignment.assignment_role == assignment_role,
+            StaffAssignment.is_deleted.is_(False),
+            StaffAssignment.end_date.is_(None),
+            ClassRoom.is_deleted.is_(False),
+        )
+        .order_by(StaffAssignment.id.asc())
+        .all()
+    )
     classes = []
     seen_ids = set()
-    for assignment in _active_staff_assignments_for_teacher(teacher, AssignmentRole.HOMEROOM):
-        if not assignment.group_id:
-            continue
-        class_room = ClassRoom.query.filter_by(
-            program_group_id=assignment.group_id,
-            is_deleted=False,
-        ).first()
-        if class_room and class_room.id not in seen_ids:
+    for class_room in rows:
+        if class_room.id not in seen_ids:
             seen_ids.add(class_room.id)
             classes.append(class_room)
     return classes
 
 
+def list_teacher_homeroom_classes_from_assignments(teacher):
+    return _classes_for_teacher_assignments(teacher, AssignmentRole.HOMEROOM)
+
+
 def list_teacher_subject_classes_from_assignments(teacher):
-    classes = []
-    seen_ids = set()
-    for assignment in _active_staff_assignments_for_teacher(teacher, AssignmentRole.SUBJECT_TEACHER):
-        if not assignment.group_id:
-            continue
-        class_room = ClassRoom.query.filter_by(
-            program_group_id=assignment.group_id,
-            is_deleted=False,
-        ).first()
-        if class_room and class_room.program_type in (ProgramType.RQDF_SORE, ProgramType.TAKHOSUS_TAHFIDZ):
-            continue
-        if class_room and class_room.id not in seen_ids:
-            seen_ids.add(class_room.id)
-            classes.append(class_room)
-    return classes
+    return [
+        class_room
+        for class_room in _classes_for_teacher_assignments(teacher, AssignmentRole.SUBJECT_TEACHER)
+        if class_room.program_type not in (ProgramType.RQDF_SORE, ProgramType.TAKHOSUS_TAHFIDZ)
+    ]
+
+
+def teacher_assignment_version(teacher):
+    """
+    Versi ringkasan penugasan guru dibaca dari database (jumlah baris + updated_at terakhir
+    jadwal, assignment, dan kelas terkait) agar semua worker melihat perubahan yang sama.
+    Baris soft-delete ikut dihitung supaya penghapusan juga mengubah versi.
+    """
+    if teacher is None:
+        return ()
+    person_id = _teacher_person_id(teacher)
+    schedule_criteria = (Schedule.teacher_id == teacher.id,)
+    assignment_criteria = (StaffAssignment.person_id == person_id,)
+    class_criteria = (
+        or_(
+            ClassRoom.homeroom_teacher_id == teacher.id,
+            ClassRoom.id.in_(select(Schedule.class_id).where(*schedule_criteria)),
+            ClassRoom.program_group_id.in_(select(StaffAssignment.group_id).where(*assignment_criteria)),
+        ),
+    )
+    columns = []
+    for model, criteria in (
+        (Schedule, schedule_criteria),
+        (StaffAssignment, assignment_criteria),
+        (ClassRoom, class_criteria),
+    ):
+        table = model.__table__
+        columns.append(select(func.count()).select_from(table).where(*criteria).scalar_subquery())
+        columns.append(select(func.max(table.c.updated_at)).where(*criteria).scalar_subquery())
+    row = db.session.execute(select(*columns).execution_options(include_deleted=True)).one()
+    return tuple(row)
 
 
 def list_teacher_assignment_groups_from_assignments(teacher):
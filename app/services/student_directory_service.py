@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager, selectinload
+
+from app.extensions import db
+from app.models import ClassRoom, EducationLevel, Parent, ProgramType, Student, User
+from app.services.bahasa_service import apply_bahasa_student_filter
+from app.services.report_batch_service import resolve_program_classrooms
+from app.services.rumah_quran_service import apply_rumah_quran_student_filter
+from app.utils.tenant_modules import PACKAGE_RUMAH_QURAN, PACKAGE_SEKOLAH
+
+
+STUDENT_DIRECTORY_PAGE_SIZE = 50
+STUDENT_AUTOCOMPLETE_LIMIT = 20
+SCHOOL_STUDENT_CATEGORIES = ('sbq_sd', 'sbq_smp', 'sbq_sma')
+RUMAH_QURAN_STUDENT_CATEGORIES = ('reguler', 'takhosus')
+
+_SCHOOL_LEVELS = {
+    'sbq_sd': (EducationLevel.SD, 'sd', [1, 2, 3, 4, 5, 6]),
+    'sbq_smp': (EducationLevel.SMP, 'smp', [7, 8, 9]),
+    'sbq_sma': (EducationLevel.SMA, 'sma', [10, 11, 12]),
+}
+
+
+def allowed_student_categories(package):
+    if package == PACKAGE_SEKOLAH:
+        return {'all', *SCHOOL_STUDENT_CATEGORIES, 'bahasa'}
+    if package == PACKAGE_RUMAH_QURAN:
+        return {'all', *RUMAH_QURAN_STUDENT_CATEGORIES, 'bahasa'}
+    return {'all', *SCHOOL_STUDENT_CATEGORIES, 'bahasa', *RUMAH_QURAN_STUDENT_CATEGORIES}
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _phone_terms(search):
+    """Nomor HP dicari dalam bentuk digit saja; awalan 62 juga dicoba sebagai 0."""
+    digits = re.sub(r'\D', '', search)
+    if len(digits) < 4:
+        return []
+    terms = [digits]
+    if digits.startswith('62'):
+        terms.append('0' + digits[2:])
+    return terms
+
+
+def normalize_student_search(raw_value):
+    return ' '.join((raw_value or '').split())[:100]
+
+
+def student_search_clause(search, *, include_parent=True, include_class=True):
+    """
+    Filter ILIKE nama/NIS (+ nama wali, no HP wali, nama kelas). Di PostgreSQL kolom-kolom ini
+    punya indeks GIN pg_trgm sehingga pola '%q%' tidak lagi memindai seluruh tabel.
+    """
+    pattern = _like_pattern(search)
+    clauses = [
+        Student.full_name.ilike(pattern, escape='\\'),
+        Student.nis.ilike(pattern, escape='\\'),
+    ]
+    if include_parent:
+        clauses.extend([
+            Parent.full_name.ilike(pattern, escape='\\'),
+            Parent.phone.ilike(pattern, escape='\\'),
+        ])
+        clauses.extend(Parent.phone.ilike(_like_pattern(term), escape='\\') for term in _phone_terms(search))
+    if include_class:
+        clauses.append(ClassRoom.name.ilike(pattern, escape='\\'))
+    return or_(*clauses)
+
+
+def _school_level_clause(category):
+    level, name_hint, grade_levels = _SCHOOL_LEVELS[category]
+    return or_(
+        and_(
+            ClassRoom.program_type == ProgramType.SEKOLAH_FULLDAY,
+            ClassRoom.education_level == level,
+        ),
+        and_(
+            ClassRoom.program_type.is_(None),
+            or_(
+                ClassRoom.name.ilike(f'%{name_hint}%'),
+                ClassRoom.grade_level.in_(grade_levels),
+            ),
+        ),
+    )
+
+
+def student_directory_query(tenant_id, *, search='', category='all'):
+    query = (
+        Student.query.join(User, Student.user_id == User.id)
+        .outerjoin(ClassRoom, Student.current_class_id == ClassRoom.id)
+        .outerjoin(Parent, Student.parent_id == Parent.id)
+        .filter(
+            Student.is_deleted.is_(False),
+            User.tenant_id == tenant_id,
+        )
+    )
+    if search:
+        query = query.filter(student_search_clause(search))
+
+    if category in _SCHOOL_LEVELS:
+        query = query.filter(_school_level_clause(category))
+    elif category in RUMAH_QURAN_STUDENT_CATEGORIES:
+        query = apply_rumah_quran_student_filter(query, track=category)
+    elif category == 'bahasa':
+        query = apply_bahasa_student_filter(query)
+    return query
+
+
+@dataclass
+class StudentDirectoryPage:
+    students: list
+    page_size: int
+    next_cursor: int | None = None
+    prev_cursor: int | None = None
+    bahasa_class_map: dict = field(default_factory=dict)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginate_students(query, *, after=None, before=None, page_size=STUDENT_DIRECTORY_PAGE_SIZE):
+    """
+    Keyset pagination berurutan Student.id menurun. `after` = id terakhir halaman sebelumnya
+    (halaman berikut), `before` = id pertama halaman saat ini (halaman sebelumnya).
+    Mengembalikan (students, next_cursor, prev_cursor).
+    """
+    page_size = max(1, int(page_size or STUDENT_DIRECTORY_PAGE_SIZE))
+    if before:
+        rows = query.filter(Student.id > before).order_by(Student.id.asc()).limit(page_size + 1).all()
+        has_more_before = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        next_cursor = rows[-1].id if rows else None
+        prev_cursor = rows[0].id if rows and has_more_before else None
+        return rows, next_cursor, prev_cursor
+
+    if after:
+        query = query.filter(Student.id < after)
+    rows = query.order_by(Student.id.desc()).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = rows[-1].id if rows and has_more else None
+    prev_cursor = rows[0].id if rows and after else None
+    return rows, next_cursor, prev_cursor
+
+
+def student_directory_page(tenant_id, *, search='', category='all', after=None, before=None,
+                           page_size=STUDENT_DIRECTORY_PAGE_SIZE):
+    query = student_directory_query(tenant_id, search=search, category=category).options(
+        contains_eager(Student.current_class),
+        contains_eager(Student.parent),
+        selectinload(Student.user),
+    )
+    students, next_cursor, prev_cursor = paginate_students(
+        query,
+        after=after,
+        before=before,
+        page_size=page_size,
+    )
+    bahasa_class_map = {}
+    if category == 'bahasa' and students:
+        bahasa_class_map = {
+            student_id: classrooms['bahasa']
+            for student_id, classrooms in resolve_program_classrooms(students).items()
+        }
+    return StudentDirectoryPage(
+        students=students,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        bahasa_class_map=bahasa_class_map,
+    )
+
+
+def student_autocomplete(tenant_id, search, *, after=None, limit=STUDENT_AUTOCOMPLETE_LIMIT):
+    """Hasil pencarian siswa untuk picker (format Select2: results + pagination.more)."""
+    search = normalize_student_search(search)
+    query = (
+        db.session.query(Student.id, Student.full_name, Student.nis, ClassRoom.name)
+        .join(User, Student.user_id == User.id)
+        .outerjoin(ClassRoom, Student.current_class_id == ClassRoom.id)
+        .filter(
+            Student.is_deleted.is_(False),
+            User.tenant_id == tenant_id,
+        )
+    )
+    if search:
+        query = query.filter(student_search_clause(search, include_parent=False, include_class=False))
+    if after:
+        query = query.filter(Student.id < after)
+    rows = query.order_by(Student.id.desc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'results': [
+            {
+                'id': student_id,
+                'text': f'{full_name} ({nis})',
+                'nis': nis,
+                'class_name': class_name or '-',
+            }
+            for student_id, full_name, nis, class_name in rows
+        ],
+        'pagination': {'more': more, 'after': rows[-1][0] if rows and more else None},
+    }
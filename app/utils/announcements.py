@@ -23,16 +23,19 @@ def _author_display_name(author):
     return ""
 
 
-def visible_announcements_query(user, class_ids=None, user_ids=None, program_types=None):
+def announcement_role_values(user):
+    return list(user.all_role_values()) if hasattr(user, 'all_role_values') else [user.role.value]
+
+
+def announcement_audience_filter(role_values, class_ids=None, user_ids=None, program_types=None):
+    """Kriteria sasaran pengumuman (tanpa status aktif) untuk role, kelas, user, dan program tertentu."""
     class_ids = [cid for cid in (class_ids or []) if cid]
     user_ids = [uid for uid in (user_ids or []) if uid]
     program_types = [p for p in (program_types or []) if p]
 
-    role_values = list(user.all_role_values()) if hasattr(user, 'all_role_values') else [user.role.value]
-
     filters = [
         Announcement.target_scope == 'ALL',
-        and_(Announcement.target_scope == 'ROLE', Announcement.target_role.in_(role_values)),
+        and_(Announcement.target_scope == 'ROLE', Announcement.target_role.in_(list(role_values))),
     ]
 
     if class_ids:
@@ -44,9 +47,18 @@ def visible_announcements_query(user, class_ids=None, user_ids=None, program_typ
     if program_types:
         filters.append(and_(Announcement.target_scope == 'PROGRAM', Announcement.target_program_type.in_(program_types)))
 
+    return or_(*filters)
+
+
+def visible_announcements_query(user, class_ids=None, user_ids=None, program_types=None):
     return Announcement.query.filter(
         Announcement.is_active.is_(True),
-        or_(*filters)
+        announcement_audience_filter(
+            announcement_role_values(user),
+            class_ids=class_ids,
+            user_ids=user_ids,
+            program_types=program_types,
+        ),
     )
 
 
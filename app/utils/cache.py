@@ -0,0 +1,87 @@
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+
+class TtlCache:
+    """Cache in-process sederhana dengan masa berlaku per entri (thread-safe)."""
+
+    def __init__(self, ttl_seconds=30, max_entries=1024):
+        self.ttl_seconds = max(0, int(ttl_seconds or 0))
+        self.max_entries = max(1, int(max_entries or 1))
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        if self.ttl_seconds <= 0:
+            return default
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                self._entries.pop(key, None)
+                return default
+            return value
+
+    def set(self, key, value):
+        if self.ttl_seconds <= 0:
+            return value
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._evict_locked(now)
+            self._entries[key] = (now + self.ttl_seconds, value)
+        return value
+
+    def get_or_set(self, key, loader):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.set(key, loader())
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_locked(self, now):
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            oldest_key = min(self._entries, key=lambda item: self._entries[item][0])
+            self._entries.pop(oldest_key, None)
+
+
+def app_cache(name, ttl_config_key, default_ttl_seconds=30, max_entries=1024):
+    """
+    Ambil cache per-aplikasi (per worker). Cache disimpan di app.extensions agar
+    setiap instance Flask (termasuk app test) punya ruang cache sendiri.
+    """
+    caches = current_app.extensions.setdefault("rqdf_caches", {})
+    cache = caches.get(name)
+    if cache is None:
+        ttl_seconds = current_app.config.get(ttl_config_key, default_ttl_seconds)
+        cache = TtlCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        caches[name] = cache
+    return cache
+
+
+def existing_app_cache(name):
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("rqdf_caches", {}).get(name)
+
@@ -0,0 +1,97 @@
+import csv
+from io import StringIO
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_FLUSH_ROWS = 500
+XLSX_WIDTH_SAMPLE_ROWS = 200
+XLSX_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def _attachment_headers(filename):
+    return {'Content-Disposition': f'attachment; filename="{filename}"'}
+
+
+def iter_csv_chunks(header, rows, flush_rows=CSV_FLUSH_ROWS):
+    """Tulis CSV per blok baris supaya memori tidak bertambah mengikuti jumlah baris."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def csv_stream_response(filename, header, rows):
+    """`rows` boleh berupa generator (mis. hasil query `yield_per`); baris ditulis sambil dikirim."""
+    return Response(
+        stream_with_context(iter_csv_chunks(header, rows)),
+        mimetype=CSV_MIMETYPE,
+        headers=_attachment_headers(filename),
+    )
+
+
+def estimate_column_widths(header, sample_rows, min_width=12, max_width=40):
+    widths = [len(str(value or '')) for value in header]
+    for row in sample_rows:
+        for index, value in enumerate(row):
+            length = len(str(value or ''))
+            if index >= len(widths):
+                widths.append(length)
+            elif length > widths[index]:
+                widths[index] = length
+    return [min(max(width + 2, min_width), max_width) for width in widths]
+
+
+def _iter_file_chunks(handle, chunk_size=FILE_CHUNK_BYTES):
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+def xlsx_stream_response(filename, sheet_title, header, rows, width_sample_rows=XLSX_WIDTH_SAMPLE_ROWS):
+    """
+    XLSX mode write-only: baris langsung ditulis ke worksheet tanpa menyimpan objek cell,
+    lebar kolom diperkirakan dari sampel baris awal, dan file dikirim per potongan.
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, width_sample_rows))
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_title[:31])
+    for index, width in enumerate(estimate_column_widths(header, sample), start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width
+    worksheet.append(header)
+    for row in sample:
+        worksheet.append(row)
+    for row in rows:
+        worksheet.append(row)
+
+    output = SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_BYTES)
+    workbook.save(output)
+    size = output.tell()
+    output.seek(0)
+    headers = _attachment_headers(filename)
+    headers['Content-Length'] = str(size)
+    return Response(_iter_file_chunks(output), mimetype=XLSX_MIMETYPE, headers=headers)
@@ -14,3 +14,16 @@ def generate_invoice_number(fee_type_id, student_id, sequence=None, tenant_id=No
     if sequence is not None:
         invoice_number = f"{invoice_number}-{int(sequence)}"
     return invoice_number
+
+
+def sequenced_invoice_prefix(tenant_id, fee_type_id):
+    return f"INV-T{int(tenant_id)}-F{int(fee_type_id)}-"
+
+
+def format_sequenced_invoice_number(tenant_id, fee_type_id, sequence):
+    """
+    Nomor invoice untuk penerbitan massal (maksimal <= 50 karakter):
+    INV-T{tenant_id}-F{fee_type_id}-{sequence:06d}
+    Urutan per tenant+biaya, sehingga tidak bergantung pada timestamp menit.
+    """
+    return f"{sequenced_invoice_prefix(tenant_id, fee_type_id)}{int(sequence):06d}"
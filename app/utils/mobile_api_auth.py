@@ -1,4 +1,6 @@
 import hashlib
+import threading
+import time
 import uuid
 from datetime import timedelta
 
@@ -13,6 +15,11 @@ from app.utils.timezone import utc_now_naive
 TOKEN_TYPE_ACCESS = "access"
 TOKEN_TYPE_REFRESH = "refresh"
 
+REVOKED_TOKEN_CACHE_KEY = "mobile_revoked_tokens"
+DEFAULT_REVOKED_TOKEN_REFRESH_SECONDS = 5
+# Baris yang di-commit sedikit terlambat (transaksi lain) tetap terbaca pada sinkronisasi berikutnya.
+REVOKED_TOKEN_SYNC_OVERLAP_SECONDS = 120
+
 
 def _serializer():
     secret_key = current_app.config.get("SECRET_KEY")
@@ -79,22 +86,70 @@ def revoke_mobile_token(token, token_type, expires_at=None):
             expires_at=expires_at,
         )
     )
+    revoked_token_cache().add(token_hash, expires_at)
     return True
 
 
 def cleanup_expired_revoked_tokens():
+    """Hapus token dicabut yang sudah kedaluwarsa. Dijalankan berkala oleh mobile_token_maintenance."""
     now = utc_now_naive()
-    MobileRevokedToken.query.filter(MobileRevokedToken.expires_at < now).delete(synchronize_session=False)
+    return MobileRevokedToken.query.filter(MobileRevokedToken.expires_at < now).delete(synchronize_session=False)
+
+
+class RevokedTokenCache:
+    """
+    Salinan in-process hash token yang dicabut dan belum kedaluwarsa. Disinkronkan bertahap
+    (hanya baris baru) paling sering tiap `refresh_seconds`, sehingga verifikasi token akses
+    tidak perlu query ke mobile_revoked_tokens di setiap request.
+    """
+
+    def __init__(self, refresh_seconds=DEFAULT_REVOKED_TOKEN_REFRESH_SECONDS):
+        self.refresh_seconds = max(0.0, float(refresh_seconds or 0))
+        self._entries = {}
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, token_hash, expires_at):
+        with self._lock:
+            self._entries[token_hash] = expires_at
+
+    def contains(self, token_hash):
+        self._sync_if_due()
+        with self._lock:
+            return token_hash in self._entries
+
+    def _sync_if_due(self):
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            now = utc_now_naive()
+            query = db.session.query(MobileRevokedToken.token_hash, MobileRevokedToken.expires_at).filter(
+                MobileRevokedToken.expires_at >= now
+            )
+            if self._synced_at is not None:
+                query = query.filter(
+                    MobileRevokedToken.created_at >= self._synced_at - timedelta(seconds=REVOKED_TOKEN_SYNC_OVERLAP_SECONDS)
+                )
+            for token_hash, expires_at in query.all():
+                self._entries[token_hash] = expires_at
+            self._entries = {key: value for key, value in self._entries.items() if value >= now}
+            self._synced_at = now
+            self._next_sync = time.monotonic() + self.refresh_seconds
+
+
+def revoked_token_cache():
+    cache = current_app.extensions.get(REVOKED_TOKEN_CACHE_KEY)
+    if cache is None:
+        cache = RevokedTokenCache(
+            current_app.config.get("MOBILE_REVOKED_TOKEN_REFRESH_SECONDS", DEFAULT_REVOKED_TOKEN_REFRESH_SECONDS)
+        )
+        current_app.extensions[REVOKED_TOKEN_CACHE_KEY] = cache
+    return cache
 
 
 def is_mobile_token_revoked(token):
-    token_hash = _token_hash(token)
-    return (
-        db.session.query(MobileRevokedToken.id)
-        .filter(MobileRevokedToken.token_hash == token_hash)
-        .first()
-        is not None
-    )
+    return revoked_token_cache().contains(_token_hash(token))
 
 
 def decode_mobile_token(token, expected_type):
@@ -102,10 +157,6 @@ def decode_mobile_token(token, expected_type):
     if not raw_token:
         raise ValueError("Token tidak ada.")
 
-    cleanup_expired_revoked_tokens()
-    if is_mobile_token_revoked(raw_token):
-        raise ValueError("Token sudah tidak berlaku.")
-
     serializer = _serializer()
     try:
         payload = serializer.loads(raw_token, max_age=_token_ttl_seconds(expected_type))
@@ -114,6 +165,9 @@ def decode_mobile_token(token, expected_type):
     except BadSignature as exc:
         raise ValueError("Token tidak valid.") from exc
 
+    if is_mobile_token_revoked(raw_token):
+        raise ValueError("Token sudah tidak berlaku.")
+
     token_type = payload.get("typ")
     if token_type != expected_type:
         raise ValueError("Jenis token tidak sesuai.")
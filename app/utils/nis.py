@@ -1,22 +1,66 @@
 from datetime import datetime
+from sqlalchemy import func
+from app.extensions import db
 from app.models import Student, Teacher, User
+from app.utils.sql import chunked
 from app.utils.timezone import local_now
 
 
-def generate_nis(year=None):
+NIS_SEQUENCE_DIGITS = 5
+
+
+def _taken_nis(candidates):
+    taken = set()
+    for chunk in chunked(list(candidates), 500):
+        taken.update(
+            value
+            for (value,) in db.session.query(Student.nis)
+            .filter(Student.nis.in_(chunk))
+            .execution_options(include_deleted=True)
+        )
+        taken.update(
+            value
+            for (value,) in db.session.query(User.username)
+            .filter(User.username.in_(chunk))
+            .execution_options(include_deleted=True)
+        )
+    return taken
+
+
+def allocate_nis_range(count, year=None, reserved=()):
+    """
+    Alokasikan `count` NIS berurutan sekaligus (format TAHUN + 5 digit), melewati NIS/username
+    yang sudah terpakai maupun yang ada di `reserved` (mis. NIS lain di file upload yang sama).
+    """
+    if count <= 0:
+        return []
+
     target_year = year or local_now().year
     prefix = f"{target_year}"
-    last_student = Student.query.filter(Student.nis.like(f"{prefix}%")).order_by(Student.nis.desc()).first()
+    last_nis = (
+        db.session.query(func.max(Student.nis))
+        .filter(Student.nis.like(f"{prefix}%"), func.length(Student.nis) == len(prefix) + NIS_SEQUENCE_DIGITS)
+        .execution_options(include_deleted=True)
+        .scalar()
+    )
 
     sequence = 1
-    if last_student and last_student.nis and last_student.nis[4:].isdigit():
-        sequence = int(last_student.nis[4:]) + 1
+    if last_nis and last_nis[len(prefix):].isdigit():
+        sequence = int(last_nis[len(prefix):]) + 1
 
-    while True:
-        nis = f"{prefix}{sequence:05d}"
-        if not User.query.filter_by(username=nis).first():
-            return nis
-        sequence += 1
+    reserved = set(reserved or ())
+    allocated = []
+    while len(allocated) < count:
+        needed = count - len(allocated)
+        candidates = [f"{prefix}{value:05d}" for value in range(sequence, sequence + needed)]
+        sequence += needed
+        taken = _taken_nis(candidates) | reserved
+        allocated.extend(nis for nis in candidates if nis not in taken)
+    return allocated
+
+
+def generate_nis(year=None):
+    return allocate_nis_range(1, year=year)[0]
 
 
 def generate_nip(year=None):
@@ -1,8 +1,12 @@
+import json
 import os
-from typing import Iterable
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 
 from flask import current_app
-from sqlalchemy import or_
+from sqlalchemy import or_, select, true, update
+from sqlalchemy.orm import aliased
 
 from app.extensions import db
 from app.models import (
@@ -10,6 +14,7 @@ from app.models import (
     ClassRoom,
     MajlisParticipant,
     MobileDeviceToken,
+    NotificationQueue,
     Parent,
     ProgramType,
     Schedule,
@@ -19,6 +24,8 @@ from app.models import (
     UserRole,
     UserRoleAssignment,
 )
+from app.services.job_queue_service import enqueue_job, job_handler, job_progress_callback
+from app.utils.sql import chunked
 from app.utils.timezone import utc_now_naive
 
 try:
@@ -30,6 +37,22 @@ except Exception:  # pragma: no cover - optional dependency at runtime
     messaging = None
 
 
+PUSH_CHANNEL = "push"
+ANNOUNCEMENT_PUSH_SOURCE = "announcement"
+PUSH_STATUS_PENDING = "PENDING"
+PUSH_STATUS_SENT = "SENT"
+PUSH_STATUS_FAILED = "FAILED"
+FCM_MULTICAST_LIMIT = 500
+DEFAULT_PUSH_CONCURRENCY = 4
+DEFAULT_PUSH_MAX_ATTEMPTS = 4
+
+_INVALID_TOKEN_MARKERS = (
+    "registration-token-not-registered",
+    "invalid-registration-token",
+    "invalid argument",
+)
+_RETRYABLE_ERROR_MARKERS = ("unavailable", "internal", "quota", "deadline", "timeout", "no-response")
+
 _firebase_app = None
 _firebase_initialized = False
 
@@ -75,33 +98,175 @@ def deactivate_mobile_device_token(user, token=None):
 
 
 def notify_announcement_created(announcement):
+    """Antrekan fan-out push pengumuman ke background job (lihat run_announcement_push_job)."""
     if announcement is None or not announcement.is_active:
-        return
+        return None
+
+    if get_push_transport() is None:
+        return None
+
+    author = announcement.author or User.query.filter_by(id=announcement.user_id).first()
+    return enqueue_job(
+        "announcement_push",
+        tenant_id=author.tenant_id if author else None,
+        created_by_user_id=announcement.user_id,
+        payload={"announcement_id": announcement.id},
+        max_attempts=_push_max_attempts(),
+    )
+
+
+class PushDeliveryPending(RuntimeError):
+    """Masih ada batch yang gagal sementara; job dijadwalkan ulang dengan backoff."""
+
+
+@job_handler("announcement_push")
+def run_announcement_push_job(job):
+    announcement = Announcement.query.filter_by(id=job.payload.get("announcement_id")).first()
+    if announcement is None or not announcement.is_active:
+        return {"sent": 0, "message": "Pengumuman tidak aktif; push dilewati."}
+
+    queue_announcement_push(announcement)
+    result = deliver_push_batches(
+        ANNOUNCEMENT_PUSH_SOURCE,
+        announcement.id,
+        progress=job_progress_callback(job),
+    )
+    if result.pending:
+        raise PushDeliveryPending(
+            f"{result.pending} batch push menunggu percobaan ulang ({result.sent} perangkat sudah terkirim)."
+        )
+    return {
+        "sent": result.sent,
+        "invalid": result.invalid,
+        "failed": result.failed,
+        "message": f"Push pengumuman terkirim ke {result.sent} perangkat.",
+    }
+
+
+def send_announcement_push(announcement):
+    """Materialisasi + kirim langsung di proses pemanggil; mengembalikan jumlah perangkat terkirim."""
+    if announcement is None or not announcement.is_active:
+        return 0
+    if get_push_transport() is None:
+        return 0
+
+    queue_announcement_push(announcement)
+    return deliver_push_batches(ANNOUNCEMENT_PUSH_SOURCE, announcement.id).sent
+
+
+# ---------------------------------------------------------
+# Transport
+# ---------------------------------------------------------
+
+@dataclass(frozen=True)
+class PushMessage:
+    title: str
+    body: str
+    data: dict
+
+
+class FcmPushTransport:
+    def __init__(self, firebase_app):
+        self.firebase_app = firebase_app
+
+    def send(self, tokens, message):
+        """Kirim satu multicast; hasilnya daftar error per token (None = terkirim)."""
+        multicast = messaging.MulticastMessage(
+            tokens=list(tokens),
+            notification=messaging.Notification(title=message.title, body=message.body),
+            data=message.data,
+            android=messaging.AndroidConfig(priority="high"),
+        )
+        response = messaging.send_each_for_multicast(multicast, app=self.firebase_app)
+        responses = getattr(response, "responses", []) or []
+        errors = []
+        for index, _ in enumerate(tokens):
+            item = responses[index] if index < len(responses) else None
+            if item is not None and getattr(item, "success", False):
+                errors.append(None)
+            else:
+                errors.append(str(getattr(item, "exception", None) or "no-response"))
+        return errors
+
+
+class StubPushTransport:
+    """
+    Transport lokal (PUSH_TRANSPORT=stub) untuk test/dev: kiriman hanya dicatat di `sent`.
+    Token di `invalid_tokens` dibalas sebagai tidak terdaftar; `failures` = jumlah panggilan
+    berikutnya yang dibuat gagal (simulasi gangguan jaringan).
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.invalid_tokens = set()
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def send(self, tokens, message):
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("unavailable: stub push transport")
+            self.sent.append((list(tokens), message))
+        return [
+            "registration-token-not-registered" if token in self.invalid_tokens else None
+            for token in tokens
+        ]
+
+
+def get_push_transport():
+    backend = (current_app.config.get("PUSH_TRANSPORT") or "fcm").strip().lower()
+    if backend == "stub":
+        return current_app.extensions.setdefault("push_stub_transport", StubPushTransport())
 
     firebase_app = _get_firebase_app()
     if firebase_app is None:
-        return
-
-    recipient_ids = _announcement_recipient_user_ids(announcement)
-    if not recipient_ids:
-        return
+        return None
+    return FcmPushTransport(firebase_app)
+
+
+def _push_error_kind(error):
+    message_text = (error or "").lower()
+    if any(marker in message_text for marker in _INVALID_TOKEN_MARKERS):
+        return "invalid"
+    if any(marker in message_text for marker in _RETRYABLE_ERROR_MARKERS):
+        return "retry"
+    return "failed"
+
+
+def _push_max_attempts():
+    return max(1, int(current_app.config.get("PUSH_DELIVERY_MAX_ATTEMPTS", DEFAULT_PUSH_MAX_ATTEMPTS)))
+
+
+# ---------------------------------------------------------
+# Materialisasi penerima -> NotificationQueue
+# ---------------------------------------------------------
+
+def queue_announcement_push(announcement):
+    """
+    Simpan token penerima pengumuman sebagai batch NotificationQueue (PENDING).
+    Idempoten: pengumuman yang batch-nya sudah ada tidak dimaterialisasi ulang.
+    Mengembalikan jumlah batch yang dibuat.
+    """
+    already_queued = (
+        db.session.query(NotificationQueue.id)
+        .filter(
+            NotificationQueue.channel == PUSH_CHANNEL,
+            NotificationQueue.source_type == ANNOUNCEMENT_PUSH_SOURCE,
+            NotificationQueue.source_id == announcement.id,
+        )
+        .first()
+    )
+    if already_queued:
+        return 0
 
-    author_id = announcement.user_id or 0
-    recipient_ids.discard(author_id)
-    if not recipient_ids:
-        return
+    author = announcement.author or User.query.filter_by(id=announcement.user_id).first()
+    if author is None:
+        return 0
 
-    tokens = [
-        row.token
-        for row in MobileDeviceToken.query.filter(
-            MobileDeviceToken.user_id.in_(list(recipient_ids)),
-            MobileDeviceToken.is_active.is_(True),
-            MobileDeviceToken.is_deleted.is_(False),
-        ).all()
-        if (row.token or "").strip()
-    ]
+    tokens = announcement_push_tokens(announcement, author.tenant_id)
     if not tokens:
-        return
+        return 0
 
     body = (announcement.content or "").strip()
     if len(body) > 140:
@@ -116,22 +281,242 @@ def notify_announcement_created(announcement):
         "target_scope": (announcement.target_scope or "ALL").upper(),
     }
 
-    chunk_size = 500
-    for start in range(0, len(tokens), chunk_size):
-        chunk_tokens = tokens[start : start + chunk_size]
-        multicast = messaging.MulticastMessage(
-            tokens=chunk_tokens,
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data,
-            android=messaging.AndroidConfig(priority="high"),
+    batch_size = min(FCM_MULTICAST_LIMIT, max(1, int(current_app.config.get("PUSH_BATCH_SIZE", FCM_MULTICAST_LIMIT))))
+    batches = [
+        NotificationQueue(
+            tenant_id=author.tenant_id,
+            channel=PUSH_CHANNEL,
+            source_type=ANNOUNCEMENT_PUSH_SOURCE,
+            source_id=announcement.id,
+            title=title,
+            message=body,
+            payload_json=json.dumps(data),
+            tokens_json=json.dumps(chunk),
+            token_count=len(chunk),
+            status=PUSH_STATUS_PENDING,
         )
-        response = messaging.send_each_for_multicast(multicast, app=firebase_app)
-        _mark_invalid_tokens(chunk_tokens, response)
+        for chunk in chunked(tokens, batch_size)
+    ]
+    db.session.add_all(batches)
+    db.session.commit()
+    return len(batches)
+
+
+def announcement_push_tokens(announcement, tenant_id):
+    """Token aktif semua penerima pengumuman, diambil dengan satu query per scope."""
+    recipient_clause = _announcement_recipient_clause(announcement)
+    if recipient_clause is None:
+        return []
+
+    statement = (
+        select(MobileDeviceToken.token)
+        .join(User, MobileDeviceToken.user_id == User.id)
+        .where(
+            User.tenant_id == tenant_id,
+            User.is_deleted.is_(False),
+            MobileDeviceToken.is_active.is_(True),
+            MobileDeviceToken.is_deleted.is_(False),
+            recipient_clause,
+        )
+        .order_by(MobileDeviceToken.id.asc())
+    )
+    if announcement.user_id:
+        statement = statement.where(User.id != announcement.user_id)
+    return [token for token in db.session.scalars(statement) if (token or "").strip()]
+
+
+def _announcement_recipient_clause(announcement):
+    scope = (announcement.target_scope or "ALL").upper()
+    if scope == "USER":
+        return User.id == announcement.target_user_id if announcement.target_user_id else None
+    if scope == "CLASS":
+        if not announcement.target_class_id:
+            return None
+        return _class_member_clause([announcement.target_class_id])
+    if scope == "ROLE":
+        return _role_member_clause(announcement.target_role)
+    if scope == "PROGRAM":
+        return _program_member_clause(announcement.target_program_type)
+    return true()
+
+
+def _class_member_clause(class_ids):
+    """
+    Anggota kelas: siswa, wali siswa, peserta majlis (wali & eksternal), guru pengampu,
+    dan wali kelas. `class_ids` boleh berupa list atau subquery id kelas.
+    """
+    member_user_ids = (
+        select(Student.user_id).where(Student.current_class_id.in_(class_ids)),
+        select(Parent.user_id)
+        .join(Student, Student.parent_id == Parent.id)
+        .where(Student.current_class_id.in_(class_ids)),
+        select(Parent.user_id).where(Parent.majlis_class_id.in_(class_ids)),
+        select(MajlisParticipant.user_id).where(MajlisParticipant.majlis_class_id.in_(class_ids)),
+        select(Teacher.user_id)
+        .join(Schedule, Schedule.teacher_id == Teacher.id)
+        .where(Schedule.class_id.in_(class_ids)),
+        select(Teacher.user_id)
+        .join(ClassRoom, ClassRoom.homeroom_teacher_id == Teacher.id)
+        .where(ClassRoom.id.in_(class_ids)),
+    )
+    return or_(*(User.id.in_(statement) for statement in member_user_ids))
+
+
+def _role_member_clause(role_value):
+    role_key = (role_value or "").strip()
+    if not role_key:
+        return None
+    try:
+        target_role = UserRole(role_key)
+    except ValueError:
+        return None
+
+    return or_(
+        User.role == target_role,
+        User.id.in_(select(UserRoleAssignment.user_id).where(UserRoleAssignment.role == target_role)),
+    )
+
 
+def _program_member_clause(program_type_value):
+    program_key = (program_type_value or "").strip()
+    if not program_key:
+        return None
+    try:
+        program_type = ProgramType[program_key]
+    except KeyError:
+        return None
+
+    # Alias agar subquery kelas tidak ter-korelasi dengan ClassRoom di subquery wali kelas.
+    program_class = aliased(ClassRoom)
+    return _class_member_clause(
+        select(program_class.id).where(program_class.program_type == program_type)
+    )
+
+
+# ---------------------------------------------------------
+# Pengiriman batch
+# ---------------------------------------------------------
+
+@dataclass
+class PushDeliveryResult:
+    sent: int = 0
+    invalid: int = 0
+    failed: int = 0
+    pending: int = 0
+
+
+def deliver_push_batches(source_type, source_id, *, transport=None, progress=None):
+    """
+    Kirim semua batch PENDING milik satu sumber secara paralel (PUSH_DELIVERY_CONCURRENCY).
+    Token tidak valid dinonaktifkan sekaligus; token yang gagal sementara tetap PENDING
+    sampai PUSH_DELIVERY_MAX_ATTEMPTS tercapai.
+    """
+    result = PushDeliveryResult()
+    batches = (
+        NotificationQueue.query.filter(
+            NotificationQueue.channel == PUSH_CHANNEL,
+            NotificationQueue.source_type == source_type,
+            NotificationQueue.source_id == source_id,
+            NotificationQueue.status == PUSH_STATUS_PENDING,
+        )
+        .order_by(NotificationQueue.id.asc())
+        .all()
+    )
+    if not batches:
+        return result
+
+    transport = transport or get_push_transport()
+    if transport is None:
+        result.pending = len(batches)
+        return result
+
+    work = []
+    for batch in batches:
+        message = PushMessage(
+            title=batch.title or "",
+            body=batch.message or "",
+            data=json.loads(batch.payload_json or "{}"),
+        )
+        work.append((batch, json.loads(batch.tokens_json or "[]"), message))
+
+    concurrency = max(1, int(current_app.config.get("PUSH_DELIVERY_CONCURRENCY", DEFAULT_PUSH_CONCURRENCY)))
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(work))) as executor:
+        futures = {
+            executor.submit(transport.send, tokens, message): batch.id
+            for batch, tokens, message in work
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                outcomes[futures[future]] = (future.result(), None)
+            except Exception as exc:  # gangguan transport: seluruh batch dicoba ulang
+                outcomes[futures[future]] = (None, exc)
+            if progress is not None:
+                progress(done, len(work))
+
+    max_attempts = _push_max_attempts()
+    now = utc_now_naive()
+    invalid_tokens = []
+    for batch, tokens, _ in work:
+        errors, exception = outcomes[batch.id]
+        batch.attempts = (batch.attempts or 0) + 1
+        retry_tokens = []
+        if exception is not None:
+            retry_tokens = list(tokens)
+            batch.last_error = str(exception)[:1000]
+        else:
+            for token, error in zip(tokens, errors):
+                if error is None:
+                    batch.sent_count = (batch.sent_count or 0) + 1
+                    result.sent += 1
+                    continue
+                kind = _push_error_kind(error)
+                batch.last_error = error[:1000]
+                if kind == "invalid":
+                    invalid_tokens.append(token)
+                    batch.invalid_count = (batch.invalid_count or 0) + 1
+                    result.invalid += 1
+                elif kind == "retry":
+                    retry_tokens.append(token)
+                else:
+                    batch.failed_count = (batch.failed_count or 0) + 1
+                    result.failed += 1
+
+        if retry_tokens and batch.attempts < max_attempts:
+            batch.tokens_json = json.dumps(retry_tokens)
+            result.pending += 1
+        elif retry_tokens:
+            batch.status = PUSH_STATUS_FAILED
+            batch.tokens_json = json.dumps(retry_tokens)
+            batch.failed_count = (batch.failed_count or 0) + len(retry_tokens)
+            result.failed += len(retry_tokens)
+        else:
+            batch.status = PUSH_STATUS_SENT
+            batch.tokens_json = None
+            batch.sent_at = now
+
+    deactivate_invalid_push_tokens(invalid_tokens, now=now)
     db.session.commit()
+    return result
+
+
+def deactivate_invalid_push_tokens(tokens, *, now=None):
+    """Nonaktifkan token yang ditolak FCM dengan UPDATE ... WHERE token IN (...)."""
+    tokens = sorted({token for token in tokens if token})
+    if not tokens:
+        return 0
+
+    now = now or utc_now_naive()
+    updated = 0
+    for chunk in chunked(tokens, FCM_MULTICAST_LIMIT):
+        outcome = db.session.execute(
+            update(MobileDeviceToken)
+            .where(MobileDeviceToken.token.in_(chunk))
+            .values(is_active=False, last_seen_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        updated += outcome.rowcount or 0
+    return updated
 
 
 def _get_firebase_app():
@@ -165,175 +550,3 @@ def _get_firebase_app():
         current_app.logger.exception("Gagal inisialisasi Firebase Admin.")
         _firebase_app = None
     return _firebase_app
-
-
-def _announcement_recipient_user_ids(announcement):
-    author = announcement.author or User.query.filter_by(id=announcement.user_id).first()
-    if author is None:
-        return set()
-
-    tenant_id = author.tenant_id
-    scope = (announcement.target_scope or "ALL").upper()
-    if scope == "USER":
-        return {announcement.target_user_id} if announcement.target_user_id else set()
-    if scope == "CLASS":
-        return _class_recipient_user_ids(announcement.target_class_id, tenant_id)
-    if scope == "ROLE":
-        return _role_recipient_user_ids(announcement.target_role, tenant_id)
-    if scope == "PROGRAM":
-        return _program_recipient_user_ids(announcement.target_program_type, tenant_id)
-    return {
-        row.id
-        for row in User.query.filter(
-            User.tenant_id == tenant_id,
-            User.is_deleted.is_(False),
-        ).all()
-    }
-
-
-def _class_recipient_user_ids(class_id, tenant_id):
-    if not class_id:
-        return set()
-
-    user_ids = set()
-
-    student_user_ids = db.session.query(Student.user_id).join(
-        User, Student.user_id == User.id
-    ).filter(
-        Student.current_class_id == class_id,
-        Student.user_id.isnot(None),
-        User.tenant_id == tenant_id,
-        User.is_deleted.is_(False),
-    ).all()
-    user_ids.update(row[0] for row in student_user_ids if row[0])
-
-    parent_user_ids = db.session.query(Parent.user_id).join(
-        Student, Parent.id == Student.parent_id
-    ).join(
-        User, Parent.user_id == User.id
-    ).filter(
-        Student.current_class_id == class_id,
-        Parent.user_id.isnot(None),
-        User.tenant_id == tenant_id,
-        User.is_deleted.is_(False),
-    ).all()
-    user_ids.update(row[0] for row in parent_user_ids if row[0])
-
-    majlis_parent_user_ids = db.session.query(Parent.user_id).join(
-        User, Parent.user_id == User.id
-    ).filter(
-        Parent.majlis_class_id == class_id,
-        Parent.user_id.isnot(None),
-        User.tenant_id == tenant_id,
-        User.is_deleted.is_(False),
-    ).all()
-    user_ids.update(row[0] for row in majlis_parent_user_ids if row[0])
-
-    majlis_external_user_ids = db.session.query(MajlisParticipant.user_id).join(
-        User, MajlisParticipant.user_id == User.id
-    ).filter(
-        MajlisParticipant.majlis_class_id == class_id,
-        MajlisParticipant.user_id.isnot(None),
-        User.tenant_id == tenant_id,
-        User.is_deleted.is_(False),
-    ).all()
-    user_ids.update(row[0] for row in majlis_external_user_ids if row[0])
-
-    teacher_user_ids = db.session.query(Teacher.user_id).join(
-        User, Teacher.user_id == User.id
-    ).outerjoin(
-        Schedule, Schedule.teacher_id == Teacher.id
-    ).outerjoin(
-        ClassRoom, ClassRoom.homeroom_teacher_id == Teacher.id
-    ).filter(
-        User.tenant_id == tenant_id,
-        User.is_deleted.is_(False),
-        or_(
-            Schedule.class_id == class_id,
-            ClassRoom.id == class_id,
-        ),
-    ).all()
-    user_ids.update(row[0] for row in teacher_user_ids if row[0])
-
-    return user_ids
-
-
-def _role_recipient_user_ids(role_value, tenant_id):
-    role_key = (role_value or "").strip()
-    if not role_key:
-        return set()
-    try:
-        target_role = UserRole(role_key)
-    except ValueError:
-        return set()
-
-    direct_ids = db.session.query(User.id).filter(
-        User.tenant_id == tenant_id,
-        User.role == target_role,
-        User.is_deleted.is_(False),
-    ).all()
-    assigned_ids = db.session.query(UserRoleAssignment.user_id).join(
-        User, UserRoleAssignment.user_id == User.id
-    ).filter(
-        User.tenant_id == tenant_id,
-        UserRoleAssignment.role == target_role,
-        User.is_deleted.is_(False),
-    ).all()
-
-    result = {row[0] for row in direct_ids if row[0]}
-    result.update(row[0] for row in assigned_ids if row[0])
-    return result
-
-
-def _program_recipient_user_ids(program_type_value, tenant_id):
-    program_key = (program_type_value or "").strip()
-    if not program_key:
-        return set()
-    try:
-        program_type = ProgramType[program_key]
-    except KeyError:
-        return set()
-
-    class_ids = [
-        row[0]
-        for row in db.session.query(ClassRoom.id).filter(
-            ClassRoom.program_type == program_type,
-        ).all()
-        if row[0]
-    ]
-    if not class_ids:
-        return set()
-
-    user_ids = set()
-    for class_id in class_ids:
-        user_ids.update(_class_recipient_user_ids(class_id, tenant_id))
-    return user_ids
-
-
-def _mark_invalid_tokens(tokens: Iterable[str], response):
-    if response is None:
-        return
-
-    responses = getattr(response, "responses", []) or []
-    for index, token in enumerate(tokens):
-        if index >= len(responses):
-            continue
-        item = responses[index]
-        if getattr(item, "success", False):
-            continue
-
-        exception = getattr(item, "exception", None)
-        message_text = str(exception or "").lower()
-        is_invalid = (
-            "registration-token-not-registered" in message_text
-            or "invalid-registration-token" in message_text
-            or "invalid argument" in message_text
-        )
-        if not is_invalid:
-            continue
-
-        row = MobileDeviceToken.query.filter_by(token=token).first()
-        if row:
-            row.is_active = False
-            row.last_seen_at = utc_now_naive()
-
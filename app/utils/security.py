@@ -1,5 +1,10 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from urllib.parse import urlparse, urljoin
+
 from flask import request
+from werkzeug.security import generate_password_hash
 
 def is_safe_url(target: str) -> bool:
     if not target:
@@ -12,3 +17,19 @@ def is_safe_url(target: str) -> bool:
         redirect_url.scheme in ("http", "https")
         and host_url.netloc == redirect_url.netloc
     )
+
+
+def hash_passwords(passwords, *, method=None, workers=1):
+    """
+    Hash banyak password sekaligus (import massal). `workers` > 1 memakai process pool
+    karena hashing terikat CPU dan GIL membuat thread tidak membantu.
+    """
+    passwords = list(passwords)
+    hasher = partial(generate_password_hash, method=method) if method else generate_password_hash
+    if not workers:
+        workers = os.cpu_count() or 1
+    workers = min(int(workers), len(passwords))
+    if workers <= 1:
+        return [hasher(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(hasher, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
@@ -0,0 +1,27 @@
+from sqlalchemy import insert
+
+from app.extensions import db
+
+
+def dialect_insert(table, bind=None):
+    """
+    INSERT yang mendukung ON CONFLICT (upsert) sesuai dialect database aktif (atau `bind` bila diberikan).
+    PostgreSQL dipakai di produksi; SQLite dipakai oleh test suite.
+    """
+    dialect_name = (bind or db.session.get_bind()).dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(table)
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(table)
+    return insert(table)
+
+
+def chunked(items, size):
+    items = list(items)
+    size = max(1, int(size or 1))
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
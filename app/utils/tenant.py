@@ -1,6 +1,21 @@
-from sqlalchemy import and_, or_
-
-from app.models import BoardingDormitory, ClassRoom, ProgramGroup, Tenant, TenantStatus, User
+from sqlalchemy import and_, exists, func, or_, select
+
+from app.models import (
+    Attendance,
+    BoardingDormitory,
+    ClassRoom,
+    Grade,
+    Invoice,
+    MajlisParticipant,
+    Parent,
+    ProgramGroup,
+    Student,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    Transaction,
+    User,
+)
 
 
 def get_default_tenant():
@@ -112,3 +127,87 @@ def dormitory_in_tenant(dormitory, tenant_id):
             return guardian.tenant_id == tenant_id
 
     return False
+
+
+# Sumber tenant per model ber-tenant_id denormalisasi, dicoba berurutan (kolom FK, model pemilik).
+_DENORMALIZED_TENANT_SOURCES = {
+    Invoice: (('student_id', Student),),
+    Attendance: (
+        ('student_id', Student),
+        ('majlis_participant_id', MajlisParticipant),
+        ('parent_id', Parent),
+        ('teacher_id', Teacher),
+    ),
+    Grade: (
+        ('student_id', Student),
+        ('majlis_participant_id', MajlisParticipant),
+        ('teacher_id', Teacher),
+    ),
+    Transaction: (('invoice_id', Invoice), ('pic_id', User)),
+}
+
+
+def active_student_exists(student_column):
+    """
+    EXISTS siswa yang belum soft-delete untuk `student_column`. Dipakai bersama filter tenant_id
+    baris (absensi/invoice/transaksi) agar data siswa terhapus tetap tidak ikut dihitung.
+    """
+    return exists().where(Student.id == student_column, Student.is_deleted.is_(False))
+
+
+def _owner_tenant_ids(session, owner_model, ids):
+    if owner_model is User:
+        statement = select(User.id, User.tenant_id).where(User.id.in_(ids))
+    elif owner_model is Invoice:
+        statement = (
+            select(Invoice.id, func.coalesce(Invoice.tenant_id, User.tenant_id))
+            .outerjoin(Student, Student.id == Invoice.student_id)
+            .outerjoin(User, User.id == Student.user_id)
+            .where(Invoice.id.in_(ids))
+        )
+    else:
+        statement = (
+            select(owner_model.id, User.tenant_id)
+            .join(User, User.id == owner_model.user_id)
+            .where(owner_model.id.in_(ids))
+        )
+    rows = session.execute(statement.execution_options(include_deleted=True)).all()
+    return {row_id: tenant_id for row_id, tenant_id in rows if tenant_id is not None}
+
+
+def assign_denormalized_tenant_ids(session):
+    """
+    Dipanggil dari hook before_flush: isi tenant_id Invoice/Transaction/Attendance/Grade baru
+    yang belum diisi pemanggil. Satu query per model pemilik per flush.
+    """
+    pending = [
+        obj for obj in session.new
+        if type(obj) in _DENORMALIZED_TENANT_SOURCES and obj.tenant_id is None
+    ]
+    if not pending:
+        return
+
+    # Transaksi yang dibuat bersama invoice-nya mewarisi tenant invoice tersebut.
+    ordered = sorted(pending, key=lambda obj: isinstance(obj, Transaction))
+    with session.no_autoflush:
+        wanted = {}
+        for obj in ordered:
+            for column, owner_model in _DENORMALIZED_TENANT_SOURCES[type(obj)]:
+                owner_id = getattr(obj, column)
+                if owner_id is not None:
+                    wanted.setdefault(owner_model, set()).add(owner_id)
+        resolved = {
+            owner_model: _owner_tenant_ids(session, owner_model, list(ids))
+            for owner_model, ids in wanted.items()
+        }
+
+        for obj in ordered:
+            invoice = obj.__dict__.get('invoice') if isinstance(obj, Transaction) else None
+            if invoice is not None and invoice.tenant_id is not None:
+                obj.tenant_id = invoice.tenant_id
+                continue
+            for column, owner_model in _DENORMALIZED_TENANT_SOURCES[type(obj)]:
+                tenant_id = resolved.get(owner_model, {}).get(getattr(obj, column))
+                if tenant_id is not None:
+                    obj.tenant_id = tenant_id
+                    break
@@ -12,6 +12,7 @@ BRAND_PHONE_KEY = "institution_phone"
 BRAND_DOMAIN_KEY = "tenant_domain"
 DEFAULT_BRAND_NAME = "RQDF Management System"
 DEFAULT_LOGO_STATIC = "img/logo-rqdf-white.png"
+BRAND_CONFIG_KEYS = (BRAND_NAME_KEY, BRAND_LOGO_KEY, BRAND_ADDRESS_KEY, BRAND_PHONE_KEY, BRAND_DOMAIN_KEY)
 
 
 def _clean_host(host):
@@ -64,30 +65,23 @@ def resolve_tenant_from_request():
     return get_default_tenant()
 
 
-def build_tenant_brand(tenant=None):
-    tenant = tenant or resolve_tenant_from_request()
-    if not tenant:
-        return {
-            "tenant": None,
-            "name": DEFAULT_BRAND_NAME,
-            "logo_static": DEFAULT_LOGO_STATIC,
-            "logo_url": url_for("static", filename=DEFAULT_LOGO_STATIC),
-            "address": "",
-            "phone": "",
-            "domain": "",
-        }
-
-    config = get_tenant_config_map(
-        tenant.id,
-        [BRAND_NAME_KEY, BRAND_LOGO_KEY, BRAND_ADDRESS_KEY, BRAND_PHONE_KEY, BRAND_DOMAIN_KEY],
-    )
+def build_tenant_brand_from_config(tenant_name, config, tenant=None):
     logo_static = config.get(BRAND_LOGO_KEY) or DEFAULT_LOGO_STATIC
     return {
         "tenant": tenant,
-        "name": config.get(BRAND_NAME_KEY) or tenant.name or DEFAULT_BRAND_NAME,
+        "name": config.get(BRAND_NAME_KEY) or tenant_name or DEFAULT_BRAND_NAME,
         "logo_static": logo_static,
         "logo_url": url_for("static", filename=logo_static),
         "address": config.get(BRAND_ADDRESS_KEY) or "",
         "phone": config.get(BRAND_PHONE_KEY) or "",
         "domain": config.get(BRAND_DOMAIN_KEY) or "",
     }
+
+
+def build_tenant_brand(tenant=None):
+    tenant = tenant or resolve_tenant_from_request()
+    if not tenant:
+        return build_tenant_brand_from_config(None, {})
+
+    config = get_tenant_config_map(tenant.id, BRAND_CONFIG_KEYS)
+    return build_tenant_brand_from_config(tenant.name, config, tenant=tenant)
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from flask import g, has_app_context
+from flask_login import current_user
+
+from app.models import AppConfig, Tenant, TenantStatus
+from app.services.grade_formula_service import GRADE_FORMULA_CONFIG_KEY
+from app.utils.cache import app_cache, existing_app_cache
+from app.utils.tenant import resolve_tenant_id
+from app.utils.tenant_branding import BRAND_CONFIG_KEYS, build_tenant_brand, build_tenant_brand_from_config
+from app.utils.tenant_modules import PACKAGE_FULL, TENANT_PACKAGE_KEY, normalize_tenant_package
+
+
+TENANT_SNAPSHOT_CACHE = "tenant_snapshot"
+TENANT_SNAPSHOT_CONFIG_KEYS = (TENANT_PACKAGE_KEY, GRADE_FORMULA_CONFIG_KEY) + BRAND_CONFIG_KEYS
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    """Data tenant yang jarang berubah: status, paket modul, formula nilai, dan konfigurasi branding."""
+
+    tenant_id: int
+    name: str | None
+    is_active: bool
+    package: str
+    config: dict = field(default_factory=dict)
+
+
+def _tenant_snapshot_cache():
+    return app_cache(TENANT_SNAPSHOT_CACHE, "TENANT_CONTEXT_CACHE_TTL_SECONDS", default_ttl_seconds=30)
+
+
+def _load_tenant_snapshot(tenant_id):
+    tenant = Tenant.query.filter_by(id=tenant_id, is_deleted=False).first()
+    if tenant is None:
+        return TenantSnapshot(tenant_id=tenant_id, name=None, is_active=False, package=PACKAGE_FULL)
+
+    rows = AppConfig.query.filter(
+        AppConfig.tenant_id == tenant_id,
+        AppConfig.key.in_(TENANT_SNAPSHOT_CONFIG_KEYS),
+        AppConfig.is_deleted.is_(False),
+    ).all()
+    config = {row.key: (row.value or "").strip() for row in rows}
+    return TenantSnapshot(
+        tenant_id=tenant_id,
+        name=tenant.name,
+        is_active=tenant.status == TenantStatus.ACTIVE,
+        package=normalize_tenant_package(config.get(TENANT_PACKAGE_KEY) or PACKAGE_FULL),
+        config=config,
+    )
+
+
+def get_tenant_snapshot(tenant_id):
+    if tenant_id is None:
+        return None
+    return _tenant_snapshot_cache().get_or_set(tenant_id, lambda: _load_tenant_snapshot(tenant_id))
+
+
+def get_cached_tenant_package(tenant_id):
+    snapshot = get_tenant_snapshot(tenant_id)
+    return snapshot.package if snapshot else PACKAGE_FULL
+
+
+def invalidate_tenant_snapshot(tenant_id=None):
+    cache = existing_app_cache(TENANT_SNAPSHOT_CACHE)
+    if cache is None:
+        return
+    if tenant_id is None:
+        cache.clear()
+    else:
+        cache.invalidate(tenant_id)
+    context = g.get("_tenant_context") if has_app_context() else None
+    if context is not None and (tenant_id is None or context.tenant_id == tenant_id):
+        g.pop("_tenant_context", None)
+
+
+def invalidate_tenant_snapshots_for_session(session):
+    """Dipanggil dari hook after_flush: buang snapshot tenant yang Tenant/AppConfig-nya berubah."""
+    tenant_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Tenant) and obj.id is not None:
+            tenant_ids.add(obj.id)
+        elif isinstance(obj, AppConfig) and obj.tenant_id is not None:
+            tenant_ids.add(obj.tenant_id)
+    for tenant_id in tenant_ids:
+        invalidate_tenant_snapshot(tenant_id)
+
+
+class TenantContext:
+    """
+    Konteks tenant untuk satu request. Setiap atribut dihitung sekali (lazy) lalu
+    dipakai bersama oleh before_request, context processor, dan kode route.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def is_authenticated(self):
+        return bool(self.user is not None and self.user.is_authenticated)
+
+    @cached_property
+    def tenant_id(self):
+        if not self.is_authenticated:
+            return None
+        return resolve_tenant_id(self.user, fallback_default=False)
+
+    @cached_property
+    def snapshot(self):
+        return get_tenant_snapshot(self.tenant_id)
+
+    @property
+    def is_tenant_active(self):
+        return bool(self.snapshot and self.snapshot.is_active)
+
+    @property
+    def package(self):
+        return self.snapshot.package if self.snapshot else PACKAGE_FULL
+
+    @cached_property
+    def brand(self):
+        if self.snapshot is None or self.snapshot.name is None:
+            return build_tenant_brand()
+        return build_tenant_brand_from_config(self.snapshot.name, self.snapshot.config)
+
+    @cached_property
+    def finance_draft_journal_count(self):
+        from app.models import FinanceJournal, FinanceJournalStatus
+
+        if self.tenant_id is None:
+            return 0
+        return FinanceJournal.query.filter_by(
+            tenant_id=self.tenant_id,
+            status=FinanceJournalStatus.DRAFT,
+        ).count()
+
+    @cached_property
+    def finance_period_today(self):
+        from app.models import FinancePeriod
+        from app.utils.timezone import local_today
+
+        if self.tenant_id is None:
+            return None
+        today = local_today()
+        return FinancePeriod.query.filter(
+            FinancePeriod.tenant_id == self.tenant_id,
+            FinancePeriod.start_date <= today,
+            FinancePeriod.end_date >= today,
+        ).first()
+
+    @cached_property
+    def teacher(self):
+        from app.models import Teacher
+
+        if not self.is_authenticated or not self.user.has_role("teacher"):
+            return None
+        return Teacher.query.filter_by(user_id=self.user.id, is_deleted=False).first()
+
+    @cached_property
+    def teacher_sidebar_groups(self):
+        from app.routes.teacher import build_teacher_sidebar_groups
+
+        return build_teacher_sidebar_groups(self.teacher)
+
+
+def get_tenant_context():
+    context = g.get("_tenant_context")
+    if context is None or context.user is not current_user._get_current_object():
+        context = TenantContext(current_user._get_current_object())
+        g._tenant_context = context
+    return context
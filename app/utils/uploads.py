@@ -0,0 +1,122 @@
+import csv
+import os
+from datetime import date, datetime
+from io import BytesIO, TextIOWrapper
+
+from flask import current_app, has_app_context
+from openpyxl import load_workbook
+from werkzeug.datastructures import FileStorage
+
+
+DEFAULT_UPLOAD_MAX_ROWS = 20000
+DEFAULT_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+
+class UploadLimitError(ValueError):
+    """File upload melebihi batas ukuran atau jumlah baris."""
+
+
+def _normalize_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return str(value).strip()
+    if isinstance(value, int):
+        return str(value)
+    return str(value).strip()
+
+
+def _config_limit(key, default):
+    if has_app_context():
+        return int(current_app.config.get(key, default) or 0)
+    return default
+
+
+def upload_limits():
+    return (
+        _config_limit('UPLOAD_MAX_ROWS', DEFAULT_UPLOAD_MAX_ROWS),
+        _config_limit('UPLOAD_MAX_BYTES', DEFAULT_UPLOAD_MAX_BYTES),
+    )
+
+
+def upload_size(file):
+    stream = file.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def check_upload_size(size, max_bytes=None):
+    if max_bytes is None:
+        max_bytes = upload_limits()[1]
+    if max_bytes and size > max_bytes:
+        raise UploadLimitError(
+            f'Ukuran file melebihi batas {max_bytes // (1024 * 1024) or 1} MB. Pecah file menjadi beberapa bagian.'
+        )
+
+
+def _xlsx_rows(file):
+    # read_only: sel dibaca bertahap dari XML tanpa memuat style/seluruh sheet ke memori.
+    workbook = load_workbook(file.stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        headers = [str(cell).strip() if cell is not None else '' for cell in header_row]
+        for idx, row in enumerate(rows, start=2):
+            yield idx, {
+                header: _normalize_cell(row[col_idx] if col_idx < len(row) else None)
+                for col_idx, header in enumerate(headers)
+            }
+    finally:
+        workbook.close()
+
+
+def _csv_rows(file):
+    wrapper = TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(wrapper)
+        for idx, row in enumerate(reader, start=2):
+            yield idx, {
+                k: (v.strip() if isinstance(v, str) else '' if v is None else str(v).strip())
+                for k, v in row.items()
+            }
+    finally:
+        wrapper.detach()
+
+
+def iter_upload_rows(file, *, max_rows=None, max_bytes=None):
+    """
+    Baca CSV/XLSX upload secara bertahap: yield (nomor_baris, dict header->nilai).
+    Baris kosong dilewati. Melempar UploadLimitError jika file/baris melebihi batas
+    (default dari UPLOAD_MAX_BYTES / UPLOAD_MAX_ROWS).
+    """
+    default_rows, default_bytes = upload_limits()
+    max_rows = default_rows if max_rows is None else max_rows
+    check_upload_size(upload_size(file), default_bytes if max_bytes is None else max_bytes)
+
+    filename = (file.filename or "").lower()
+    rows = _xlsx_rows(file) if filename.endswith('.xlsx') else _csv_rows(file)
+    count = 0
+    for idx, row_data in rows:
+        if not any(row_data.values()):
+            continue
+        count += 1
+        if max_rows and count > max_rows:
+            rows.close()
+            raise UploadLimitError(f'Jumlah baris melebihi batas {max_rows}. Pecah file menjadi beberapa bagian.')
+        yield idx, row_data
+
+
+def upload_from_bytes(data, filename):
+    """Bangun ulang FileStorage dari isi file yang disimpan (mis. input background job)."""
+    return FileStorage(stream=BytesIO(data or b''), filename=filename)
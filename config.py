@@ -21,9 +21,52 @@ class Config:
     AUTH_RATE_LIMIT_IDENTIFIER_ATTEMPTS = int(os.environ.get('AUTH_RATE_LIMIT_IDENTIFIER_ATTEMPTS', '5'))
     AUTH_RATE_LIMIT_IDENTIFIER_IP_ATTEMPTS = int(os.environ.get('AUTH_RATE_LIMIT_IDENTIFIER_IP_ATTEMPTS', '5'))
     AUTH_RATE_LIMIT_IP_ATTEMPTS = int(os.environ.get('AUTH_RATE_LIMIT_IP_ATTEMPTS', '30'))
-    AUTH_RATE_LIMIT_CLEANUP_PROBABILITY = float(os.environ.get('AUTH_RATE_LIMIT_CLEANUP_PROBABILITY', '0.01'))
+    # database (tabel mobile_rate_limit_buckets) | sqlite (file lokal, dibagi worker satu host) | memory (per proses).
+    AUTH_RATE_LIMIT_BACKEND = os.environ.get('AUTH_RATE_LIMIT_BACKEND', 'database').strip().lower()
+    AUTH_RATE_LIMIT_SQLITE_PATH = os.environ.get('AUTH_RATE_LIMIT_SQLITE_PATH', '')
     AUTH_RATE_LIMIT_HASH_PEPPER = os.environ.get('AUTH_RATE_LIMIT_HASH_PEPPER', '')
 
+    # Cache snapshot tenant (status, paket modul, branding) per worker, dalam detik.
+    # Perubahan dari worker yang sama langsung di-invalidate; worker lain menyusul setelah TTL.
+    TENANT_CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get('TENANT_CONTEXT_CACHE_TTL_SECONDS', '30'))
+    # Cache sidebar/ringkasan assignment guru per worker (di-invalidate saat jadwal/assignment berubah).
+    TEACHER_SIDEBAR_CACHE_TTL_SECONDS = int(os.environ.get('TEACHER_SIDEBAR_CACHE_TTL_SECONDS', '60'))
+    # Dashboard pimpinan: payload di-cache per tenant+periode; N hari terakhir rollup selalu dihitung ulang.
+    LEADERSHIP_DASHBOARD_CACHE_TTL_SECONDS = int(os.environ.get('LEADERSHIP_DASHBOARD_CACHE_TTL_SECONDS', '60'))
+    DASHBOARD_METRICS_REFRESH_DAYS = int(os.environ.get('DASHBOARD_METRICS_REFRESH_DAYS', '3'))
+    # Daftar token mobile yang dicabut disalin per worker dan disinkronkan tiap N detik.
+    # Pembersihan token kedaluwarsa dijalankan berkala: python -m app.scripts.mobile_token_maintenance
+    MOBILE_REVOKED_TOKEN_REFRESH_SECONDS = int(os.environ.get('MOBILE_REVOKED_TOKEN_REFRESH_SECONDS', '5'))
+    # /api/v1/sync menahan baris yang baru berubah N detik agar transaksi yang belum commit tidak terlewati cursor.
+    MOBILE_SYNC_SETTLE_SECONDS = int(os.environ.get('MOBILE_SYNC_SETTLE_SECONDS', '2'))
+    # Hasil kiriman absensi batch disimpan per idempotency key selama N jam (kiriman ulang dari mode offline).
+    MOBILE_IDEMPOTENCY_RETENTION_HOURS = int(os.environ.get('MOBILE_IDEMPOTENCY_RETENTION_HOURS', '168'))
+
+    # Antrean background job (import massal, penerbitan tagihan, push, ekstraksi dokumen).
+    # Jalankan `flask jobs worker`; EAGER=true mengeksekusi job langsung di request (tanpa worker).
+    BACKGROUND_JOBS_EAGER = os.environ.get('BACKGROUND_JOBS_EAGER', 'false').strip().lower() in {
+        '1', 'true', 'yes', 'on'
+    }
+    BACKGROUND_JOBS_RETRY_BASE_SECONDS = int(os.environ.get('BACKGROUND_JOBS_RETRY_BASE_SECONDS', '30'))
+    BACKGROUND_JOBS_LOCK_TIMEOUT_SECONDS = int(os.environ.get('BACKGROUND_JOBS_LOCK_TIMEOUT_SECONDS', '1800'))
+    # Push notifikasi: fcm (default) atau stub (lokal, untuk test/dev). Batch token dikirim paralel
+    # oleh worker; batch yang gagal sementara dicoba ulang sampai MAX_ATTEMPTS.
+    PUSH_TRANSPORT = os.environ.get('PUSH_TRANSPORT', 'fcm').strip().lower()
+    PUSH_DELIVERY_CONCURRENCY = int(os.environ.get('PUSH_DELIVERY_CONCURRENCY', '4'))
+    PUSH_DELIVERY_MAX_ATTEMPTS = int(os.environ.get('PUSH_DELIVERY_MAX_ATTEMPTS', '4'))
+    PUSH_BATCH_SIZE = int(os.environ.get('PUSH_BATCH_SIZE', '500'))
+    # Nomor jurnal dipesan per blok dalam transaksi pendek lalu dibagikan dari pool per proses.
+    # 1 = perilaku lama (kunci baris sequence sampai commit).
+    FINANCE_JOURNAL_NUMBER_BLOCK_SIZE = int(os.environ.get('FINANCE_JOURNAL_NUMBER_BLOCK_SIZE', '50'))
+    # Password awal akun hasil import massal. Akun wajib ganti password saat login pertama
+    # (hash ulang memakai metode default), jadi work factor awal boleh lebih ringan.
+    BULK_IMPORT_PASSWORD_METHOD = os.environ.get('BULK_IMPORT_PASSWORD_METHOD', 'pbkdf2:sha256:20000')
+    # 0 = otomatis (jumlah CPU), 1 = tanpa process pool.
+    BULK_IMPORT_HASH_WORKERS = int(os.environ.get('BULK_IMPORT_HASH_WORKERS', '0'))
+    # Batas file upload CSV/XLSX (import siswa/guru, adjustment nilai raport).
+    UPLOAD_MAX_ROWS = int(os.environ.get('UPLOAD_MAX_ROWS', '20000'))
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+
     # Online meeting backend options:
     # - public_jitsi (default, demo)
     # - jaas (8x8.vc + JWT)
@@ -0,0 +1,48 @@
+"""add finance account daily balances
+
+Revision ID: ch78ij90kl12
+Revises: bg67hi89jk01
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "ch78ij90kl12"
+down_revision = "bg67hi89jk01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "finance_account_daily_balances",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("balance_date", sa.Date(), nullable=False),
+        sa.Column("debit_total", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("credit_total", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["finance_accounts.id"]),
+        sa.ForeignKeyConstraint(["tenant_id"], ["tenants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "tenant_id",
+            "account_id",
+            "balance_date",
+            name="uq_finance_account_daily_balances_key",
+        ),
+    )
+    op.create_index(
+        "ix_finance_account_daily_balances_tenant_date",
+        "finance_account_daily_balances",
+        ["tenant_id", "balance_date"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_finance_account_daily_balances_tenant_date", table_name="finance_account_daily_balances")
+    op.drop_table("finance_account_daily_balances")
@@ -0,0 +1,68 @@
+"""add background jobs
+
+Revision ID: di89jk01lm23
+Revises: ch78ij90kl12
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "di89jk01lm23"
+down_revision = "ch78ij90kl12"
+branch_labels = None
+depends_on = None
+
+
+background_job_status = sa.Enum(
+    "QUEUED",
+    "RUNNING",
+    "SUCCEEDED",
+    "FAILED",
+    name="backgroundjobstatus",
+)
+
+
+def upgrade():
+    op.create_table(
+        "background_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=True),
+        sa.Column("job_type", sa.String(length=80), nullable=False),
+        sa.Column("status", background_job_status, nullable=False, server_default="QUEUED"),
+        sa.Column("payload_json", sa.Text(), nullable=True),
+        sa.Column("input_blob", sa.LargeBinary(), nullable=True),
+        sa.Column("input_filename", sa.String(length=255), nullable=True),
+        sa.Column("result_json", sa.Text(), nullable=True),
+        sa.Column("error_log", sa.Text(), nullable=True),
+        sa.Column("progress_current", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("progress_total", sa.Integer(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_by", sa.String(length=120), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["created_by_user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["tenant_id"], ["tenants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_background_jobs_tenant_id", "background_jobs", ["tenant_id"], unique=False)
+    op.create_index(
+        "ix_background_jobs_status_run_after",
+        "background_jobs",
+        ["status", "run_after"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_background_jobs_status_run_after", table_name="background_jobs")
+    op.drop_index("ix_background_jobs_tenant_id", table_name="background_jobs")
+    op.drop_table("background_jobs")
+    background_job_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,40 @@
+"""add tenant daily metrics
+
+Revision ID: ej90kl12mn34
+Revises: di89jk01lm23
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "ej90kl12mn34"
+down_revision = "di89jk01lm23"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tenant_daily_metrics",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("metric_date", sa.Date(), nullable=False),
+        sa.Column("attendance_hadir", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attendance_sakit", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attendance_izin", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attendance_alpa", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("payment_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("payment_amount", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("revenue_amount", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("expense_amount", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["tenant_id"], ["tenants.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("tenant_id", "metric_date", name="uq_tenant_daily_metrics_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("tenant_daily_metrics")
@@ -0,0 +1,39 @@
+"""add mobile idempotency keys
+
+Revision ID: fk01lm23no45
+Revises: ej90kl12mn34
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "fk01lm23no45"
+down_revision = "ej90kl12mn34"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mobile_idempotency_keys",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=100), nullable=False),
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("result_json", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "idempotency_key", name="uq_mobile_idempotency_user_key"),
+    )
+    op.create_index("ix_mobile_idempotency_keys_user_id", "mobile_idempotency_keys", ["user_id"])
+    op.create_index("ix_mobile_idempotency_keys_created_at", "mobile_idempotency_keys", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_mobile_idempotency_keys_created_at", table_name="mobile_idempotency_keys")
+    op.drop_index("ix_mobile_idempotency_keys_user_id", table_name="mobile_idempotency_keys")
+    op.drop_table("mobile_idempotency_keys")
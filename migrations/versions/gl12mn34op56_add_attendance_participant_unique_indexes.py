@@ -0,0 +1,60 @@
+"""add attendance participant unique indexes
+
+Revision ID: gl12mn34op56
+Revises: fk01lm23no45
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "gl12mn34op56"
+down_revision = "fk01lm23no45"
+branch_labels = None
+depends_on = None
+
+
+PARTICIPANT_COLUMNS = (
+    ("STUDENT", "student_id"),
+    ("PARENT_MAJLIS", "parent_id"),
+    ("EXTERNAL_MAJLIS", "majlis_participant_id"),
+)
+
+
+def _index_name(participant_type):
+    return f"uq_attendance_{participant_type.lower()}_class_date"
+
+
+def upgrade():
+    op.execute(
+        "UPDATE attendances SET participant_type = 'STUDENT' "
+        "WHERE participant_type IS NULL AND student_id IS NOT NULL"
+    )
+    for participant_type, column in PARTICIPANT_COLUMNS:
+        # Sisakan satu absensi untuk setiap (kelas, tanggal, peserta) sebelum indeks unik dibuat:
+        # baris aktif didahulukan dari baris soft-delete, lalu yang terbaru.
+        op.execute(
+            f"DELETE FROM attendances WHERE id IN ("
+            f"SELECT id FROM ("
+            f"SELECT id, ROW_NUMBER() OVER ("
+            f"PARTITION BY class_id, date, {column} "
+            f"ORDER BY COALESCE(is_deleted, FALSE), id DESC"
+            f") AS survivor_rank FROM attendances "
+            f"WHERE participant_type = '{participant_type}' AND {column} IS NOT NULL"
+            f") ranked WHERE survivor_rank > 1)"
+        )
+        where = sa.text(f"participant_type = '{participant_type}'")
+        op.create_index(
+            _index_name(participant_type),
+            "attendances",
+            ["class_id", "date", column],
+            unique=True,
+            postgresql_where=where,
+            sqlite_where=where,
+        )
+
+
+def downgrade():
+    for participant_type, _ in reversed(PARTICIPANT_COLUMNS):
+        op.drop_index(_index_name(participant_type), table_name="attendances")
@@ -0,0 +1,29 @@
+"""add background job output
+
+Revision ID: hm23no45pq67
+Revises: gl12mn34op56
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "hm23no45pq67"
+down_revision = "gl12mn34op56"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("background_jobs") as batch_op:
+        batch_op.add_column(sa.Column("output_blob", sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column("output_filename", sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column("output_mimetype", sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("background_jobs") as batch_op:
+        batch_op.drop_column("output_mimetype")
+        batch_op.drop_column("output_filename")
+        batch_op.drop_column("output_blob")
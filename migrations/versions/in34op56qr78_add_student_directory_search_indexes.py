@@ -0,0 +1,49 @@
+"""add student directory search indexes
+
+Revision ID: in34op56qr78
+Revises: hm23no45pq67
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "in34op56qr78"
+down_revision = "hm23no45pq67"
+branch_labels = None
+depends_on = None
+
+
+# Pencarian direktori siswa memakai ILIKE '%q%'; hanya indeks trigram (pg_trgm) yang bisa
+# dipakai untuk pola seperti itu, jadi indeks ini khusus PostgreSQL.
+TRIGRAM_INDEXES = (
+    ("ix_students_full_name_trgm", "students", "full_name"),
+    ("ix_students_nis_trgm", "students", "nis"),
+    ("ix_parents_full_name_trgm", "parents", "full_name"),
+    ("ix_parents_phone_trgm", "parents", "phone"),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, table_name, column_name in TRIGRAM_INDEXES:
+        op.create_index(
+            index_name,
+            table_name,
+            [column_name],
+            postgresql_using="gin",
+            postgresql_ops={column_name: "gin_trgm_ops"},
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for index_name, table_name, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(index_name, table_name=table_name)
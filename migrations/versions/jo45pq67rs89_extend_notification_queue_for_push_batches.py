@@ -0,0 +1,65 @@
+"""extend notification queue for push batches
+
+Revision ID: jo45pq67rs89
+Revises: in34op56qr78
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "jo45pq67rs89"
+down_revision = "in34op56qr78"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("notification_queues") as batch_op:
+        batch_op.add_column(sa.Column("tenant_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("channel", sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column("source_type", sa.String(length=40), nullable=True))
+        batch_op.add_column(sa.Column("source_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("title", sa.String(length=150), nullable=True))
+        batch_op.add_column(sa.Column("payload_json", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("tokens_json", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("token_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("sent_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("failed_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("invalid_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("last_error", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("sent_at", sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_notification_queues_tenant_id_tenants",
+            "tenants",
+            ["tenant_id"],
+            ["id"],
+        )
+        batch_op.create_index("ix_notification_queues_tenant_id", ["tenant_id"])
+        batch_op.create_index(
+            "ix_notification_queues_source_status",
+            ["source_type", "source_id", "status"],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("notification_queues") as batch_op:
+        batch_op.drop_index("ix_notification_queues_source_status")
+        batch_op.drop_index("ix_notification_queues_tenant_id")
+        batch_op.drop_constraint("fk_notification_queues_tenant_id_tenants", type_="foreignkey")
+        batch_op.drop_column("sent_at")
+        batch_op.drop_column("last_error")
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("invalid_count")
+        batch_op.drop_column("failed_count")
+        batch_op.drop_column("sent_count")
+        batch_op.drop_column("token_count")
+        batch_op.drop_column("tokens_json")
+        batch_op.drop_column("payload_json")
+        batch_op.drop_column("title")
+        batch_op.drop_column("source_id")
+        batch_op.drop_column("source_type")
+        batch_op.drop_column("channel")
+        batch_op.drop_column("tenant_id")
@@ -0,0 +1,86 @@
+"""add tenant_id to invoices, transactions, attendances and grades
+
+Revision ID: kp56qr78st90
+Revises: jo45pq67rs89
+Create Date: 2026-10-18 00:00:00.000000
+
+Kolom ditambahkan nullable lalu data lama diisi dari pemiliknya (siswa/peserta/guru lewat
+User.tenant_id) dalam migrasi ini, agar dashboard dan rekonsiliasi yang menyaring tenant_id
+tidak kehilangan baris lama. Baris yang ditulis kode lama selama rolling deploy dapat diisi
+ulang dengan `python app/scripts/backfill_tenant_ids.py` (bertahap per rentang id).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "kp56qr78st90"
+down_revision = "jo45pq67rs89"
+branch_labels = None
+depends_on = None
+
+
+TENANT_INDEXES = (
+    ("attendances", "idx_attendance_tenant_date", ["tenant_id", "date"]),
+    ("grades", "idx_grade_tenant_year_subject", ["tenant_id", "academic_year_id", "subject_id"]),
+    ("invoices", "idx_invoice_tenant_status_due", ["tenant_id", "status", "due_date"]),
+    ("transactions", "idx_transaction_tenant_date", ["tenant_id", "date"]),
+)
+
+
+def _owner_tenant(owner_table, owner_column):
+    return (
+        f"(SELECT users.tenant_id FROM {owner_table} JOIN users ON users.id = {owner_table}.user_id "
+        f"WHERE {owner_table}.id = {owner_column})"
+    )
+
+
+# Urutan penting: transaksi mengambil tenant dari invoice yang sudah terisi.
+TENANT_BACKFILL = (
+    ("invoices", _owner_tenant("students", "invoices.student_id")),
+    (
+        "transactions",
+        "COALESCE("
+        "(SELECT invoices.tenant_id FROM invoices WHERE invoices.id = transactions.invoice_id), "
+        "(SELECT users.tenant_id FROM users WHERE users.id = transactions.pic_id))",
+    ),
+    (
+        "attendances",
+        "COALESCE("
+        f"{_owner_tenant('students', 'attendances.student_id')}, "
+        f"{_owner_tenant('majlis_participants', 'attendances.majlis_participant_id')}, "
+        f"{_owner_tenant('parents', 'attendances.parent_id')}, "
+        f"{_owner_tenant('teachers', 'attendances.teacher_id')})",
+    ),
+    (
+        "grades",
+        "COALESCE("
+        f"{_owner_tenant('students', 'grades.student_id')}, "
+        f"{_owner_tenant('majlis_participants', 'grades.majlis_participant_id')}, "
+        f"{_owner_tenant('teachers', 'grades.teacher_id')})",
+    ),
+)
+
+
+def upgrade():
+    for table_name, index_name, columns in TENANT_INDEXES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column("tenant_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(
+                f"fk_{table_name}_tenant_id_tenants",
+                "tenants",
+                ["tenant_id"],
+                ["id"],
+            )
+            batch_op.create_index(index_name, columns)
+
+    for table_name, tenant_expression in TENANT_BACKFILL:
+        op.execute(f"UPDATE {table_name} SET tenant_id = {tenant_expression} WHERE tenant_id IS NULL")
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(TENANT_INDEXES):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_index(index_name)
+            batch_op.drop_constraint(f"fk_{table_name}_tenant_id_tenants", type_="foreignkey")
+            batch_op.drop_column("tenant_id")
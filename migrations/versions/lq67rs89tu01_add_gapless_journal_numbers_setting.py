@@ -0,0 +1,27 @@
+"""add gapless journal numbers setting
+
+Revision ID: lq67rs89tu01
+Revises: kp56qr78st90
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "lq67rs89tu01"
+down_revision = "kp56qr78st90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("finance_settings") as batch_op:
+        batch_op.add_column(
+            sa.Column("gapless_journal_numbers", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("finance_settings") as batch_op:
+        batch_op.drop_column("gapless_journal_numbers")
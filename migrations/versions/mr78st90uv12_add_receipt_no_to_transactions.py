@@ -0,0 +1,27 @@
+"""add receipt_no to transactions
+
+Revision ID: mr78st90uv12
+Revises: lq67rs89tu01
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "mr78st90uv12"
+down_revision = "lq67rs89tu01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.add_column(sa.Column("receipt_no", sa.String(length=30), nullable=True))
+        batch_op.create_index("ix_transactions_receipt_no", ["receipt_no"])
+
+
+def downgrade():
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_index("ix_transactions_receipt_no")
+        batch_op.drop_column("receipt_no")
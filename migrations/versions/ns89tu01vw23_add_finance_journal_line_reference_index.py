@@ -0,0 +1,28 @@
+"""add reference index to finance_journal_lines
+
+Revision ID: ns89tu01vw23
+Revises: mr78st90uv12
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "ns89tu01vw23"
+down_revision = "mr78st90uv12"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sumber jurnal sudah ditopang uq_finance_journals_tenant_source; indeks ini untuk anti-join
+    # rekonsiliasi atas transaksi yang tercatat di baris jurnal kwitansi gabungan.
+    op.create_index(
+        "ix_finance_journal_lines_tenant_reference",
+        "finance_journal_lines",
+        ["tenant_id", "reference_type", "reference_id"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_finance_journal_lines_tenant_reference", table_name="finance_journal_lines")
@@ -0,0 +1,28 @@
+"""add previous_count to mobile_rate_limit_buckets
+
+Revision ID: ot90uv12wx34
+Revises: ns89tu01vw23
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "ot90uv12wx34"
+down_revision = "ns89tu01vw23"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("mobile_rate_limit_buckets") as batch_op:
+        batch_op.add_column(sa.Column("previous_count", sa.Integer(), nullable=False, server_default="0"))
+    # Kunci bucket v1 (per window) tidak dipakai lagi; dibersihkan agar tabel tidak menyimpan sisa lama.
+    op.execute("DELETE FROM mobile_rate_limit_buckets WHERE bucket_key LIKE 'auth:v1:%'")
+
+
+def downgrade():
+    op.execute("DELETE FROM mobile_rate_limit_buckets WHERE bucket_key LIKE 'auth:v2:%'")
+    with op.batch_alter_table("mobile_rate_limit_buckets") as batch_op:
+        batch_op.drop_column("previous_count")
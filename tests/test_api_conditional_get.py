@@ -0,0 +1,218 @@
+from datetime import time
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Announcement,
+    BoardingActivitySchedule,
+    BoardingDormitory,
+    Invoice,
+    Parent,
+    PaymentStatus,
+    Student,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def family(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    parent = Parent(user_id=_user(tenant, "wali", UserRole.WALI_MURID).id, full_name="Bapak Wali", phone="0811")
+    db.session.add(parent)
+    db.session.flush()
+    student = Student(
+        user_id=_user(tenant, "siswa", UserRole.SISWA).id,
+        parent_id=parent.id,
+        nis="S1",
+        full_name="Siswa Satu",
+    )
+    db.session.add(student)
+    db.session.flush()
+    db.session.add(Invoice(invoice_number="INV-1", student_id=student.id, total_amount=100000, status=PaymentStatus.UNPAID))
+    teacher_user = _user(tenant, "guru", UserRole.GURU)
+    db.session.add(Teacher(user_id=teacher_user.id, nip="G1", full_name="Ustadz Ahmad"))
+    db.session.commit()
+    return {"tenant": tenant, "student": student}
+
+
+def _headers(client, username):
+    response = client.post("/api/v1/auth/login", json={"identifier": username, "password": PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.get_json()['data']['access_token']}"}
+
+
+def test_finance_returns_304_until_invoices_change(client, family):
+    headers = _headers(client, "wali")
+    path = f"/api/v1/parent/children/{family['student'].id}/finance"
+
+    first = client.get(path, headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    db.session.add(Invoice(invoice_number="INV-2", student_id=family["student"].id, total_amount=50000))
+    db.session.commit()
+
+    changed = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["data"]["summary"]["total_amount"] == 150000
+
+
+def test_dashboard_etag_tracks_announcements_and_query_string(client, family):
+    headers = _headers(client, "wali")
+
+    first = client.get("/api/v1/parent/dashboard", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert client.get("/api/v1/parent/dashboard", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    other_query = client.get(
+        f"/api/v1/parent/dashboard?student_id={family['student'].id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert other_query.status_code == 200
+
+    db.session.add(Announcement(title="Libur", content="Sekolah libur besok."))
+    db.session.commit()
+
+    refreshed = client.get("/api/v1/parent/dashboard", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()["data"]["announcements"][0]["title"] == "Libur"
+
+
+def test_errors_do_not_carry_etag_and_teacher_dashboard_revalidates(client, family):
+    headers = _headers(client, "wali")
+    forbidden = client.get("/api/v1/parent/children/9999/finance", headers=headers)
+    assert forbidden.status_code == 403
+    assert "ETag" not in forbidden.headers
+
+    headers = _headers(client, "guru")
+    first = client.get("/api/v1/teacher/dashboard", headers=headers)
+    assert first.status_code == 200
+    cached = client.get("/api/v1/teacher/dashboard", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_other_tenant_writes_keep_teacher_dashboard_etag(client, family):
+    other = Tenant(name="Tenant B", slug="tenant-b", code="TB", status=TenantStatus.ACTIVE)
+    db.session.add(other)
+    db.session.commit()
+    headers = _headers(client, "guru")
+    etag = client.get("/api/v1/teacher/dashboard", headers=headers).headers["ETag"]
+
+    outsider = _user(other, "siswa-b", UserRole.SISWA)
+    db.session.add(Student(user_id=outsider.id, nis="B1", full_name="Siswa Lain"))
+    db.session.add(Announcement(title="Khusus", content="Pesan pribadi.", target_scope="USER", target_user_id=outsider.id))
+    db.session.commit()
+
+    cached = client.get("/api/v1/teacher/dashboard", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+
+def test_parent_dashboard_etag_tracks_announcements_for_own_child(client, family):
+    headers = _headers(client, "wali")
+    etag = client.get("/api/v1/parent/dashboard", headers=headers).headers["ETag"]
+
+    db.session.add(Announcement(
+        title="Untuk Siswa",
+        content="Pesan untuk anak.",
+        target_scope="USER",
+        target_user_id=family["student"].user_id,
+    ))
+    db.session.commit()
+
+    refreshed = client.get("/api/v1/parent/dashboard", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()["data"]["announcements"][0]["title"] == "Untuk Siswa"
+
+
+def test_boarding_dashboard_etag_ignores_other_dormitories(client, family):
+    guardian = _user(family["tenant"], "asrama", UserRole.WALI_ASRAMA)
+    own = BoardingDormitory(name="Asrama A", guardian_user_id=guardian.id)
+    other = Tenant(name="Tenant B", slug="tenant-b", code="TB", status=TenantStatus.ACTIVE)
+    db.session.add_all([own, other])
+    db.session.commit()
+    headers = _headers(client, "asrama")
+    etag = client.get("/api/v1/boarding/dashboard", headers=headers).headers["ETag"]
+
+    foreign = BoardingDormitory(name="Asrama B", guardian_user_id=_user(other, "asrama-b", UserRole.WALI_ASRAMA).id)
+    db.session.add(foreign)
+    db.session.flush()
+    db.session.add(BoardingActivitySchedule(
+        activity_name="Tahajud",
+        start_time=time(3, 30),
+        end_time=time(4, 30),
+        applies_all_dormitories=False,
+        selected_dormitories=[foreign],
+    ))
+    db.session.commit()
+
+    cached = client.get("/api/v1/boarding/dashboard", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    db.session.add(BoardingActivitySchedule(
+        activity_name="Halaqah",
+        start_time=time(5, 0),
+        end_time=time(6, 0),
+        applies_all_dormitories=False,
+        selected_dormitories=[db.session.get(BoardingDormitory, own.id)],
+    ))
+    db.session.commit()
+
+    refreshed = client.get("/api/v1/boarding/dashboard", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
@@ -0,0 +1,169 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Attendance,
+    AttendanceStatus,
+    ClassRoom,
+    GroupType,
+    MajlisParticipant,
+    MobileIdempotencyKey,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ProgramType,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def majlis_class(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    db.session.add(teacher)
+    db.session.flush()
+    program = Program(tenant_id=tenant.id, code="MT", name="Majelis Ta'lim",
+                      category=ProgramCategory.NON_FORMAL, report_schema="majlis")
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="Majelis A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name="Majelis A", program_group_id=group.id, program_type=ProgramType.MAJLIS_TALIM,
+                           homeroom_teacher_id=teacher.id)
+    db.session.add(class_room)
+    db.session.flush()
+    participants = [
+        MajlisParticipant(
+            user_id=_user(tenant, f"jamaah{index}", UserRole.MAJLIS_PARTICIPANT).id,
+            full_name=f"Jamaah {index}",
+            phone=f"081{index}",
+            majlis_class_id=class_room.id,
+        )
+        for index in range(2)
+    ]
+    db.session.add_all(participants)
+    db.session.commit()
+    return {"class_id": class_room.id, "participant_keys": [f"M-{item.id}" for item in participants]}
+
+
+def _headers(client, username="guru"):
+    response = client.post("/api/v1/auth/login", json={"identifier": username, "password": PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.get_json()['data']['access_token']}"}
+
+
+def _sheet(majlis_class, key, status="HADIR"):
+    return {
+        "idempotency_key": key,
+        "type": "class",
+        "date": "2026-01-05",
+        "class_id": majlis_class["class_id"],
+        "records": [{"participant_key": item, "status": status} for item in majlis_class["participant_keys"]],
+    }
+
+
+def _submit(client, headers, *sheets):
+    response = client.post("/api/v1/attendance/batch", headers=headers, json={"sheets": list(sheets)})
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_batch_saves_sheets_and_replays_retries(client, majlis_class):
+    headers = _headers(client)
+
+    first = _submit(client, headers, _sheet(majlis_class, "sheet-1"))
+    assert first["saved_sheets"] == 1
+    assert first["results"][0]["saved"] == 2
+
+    retry = _submit(client, headers, _sheet(majlis_class, "sheet-1"))
+    assert retry["replayed_sheets"] == 1 and retry["saved_sheets"] == 0
+    assert retry["results"][0]["saved"] == 2
+    assert Attendance.query.count() == 2
+    assert MobileIdempotencyKey.query.count() == 1
+
+
+def test_batch_resubmitting_sheet_with_new_key_updates_rows(client, majlis_class):
+    headers = _headers(client)
+    _submit(client, headers, _sheet(majlis_class, "sheet-1"))
+
+    data = _submit(client, headers, _sheet(majlis_class, "sheet-2", status="SAKIT"))
+    assert data["saved_sheets"] == 1
+    assert {row.status for row in Attendance.query.all()} == {AttendanceStatus.SAKIT}
+    assert Attendance.query.count() == 2
+
+
+def test_batch_rejects_reused_key_and_invalid_sheets_independently(client, majlis_class):
+    headers = _headers(client)
+    _submit(client, headers, _sheet(majlis_class, "sheet-1"))
+
+    foreign_class = dict(_sheet(majlis_class, "sheet-3"), class_id=majlis_class["class_id"] + 99)
+    data = _submit(
+        client,
+        headers,
+        _sheet(majlis_class, "sheet-1", status="IZIN"),
+        dict(_sheet(majlis_class, ""), idempotency_key=None),
+        foreign_class,
+        _sheet(majlis_class, "sheet-4", status="ALPA"),
+    )
+    assert [item["status"] for item in data["results"]] == ["rejected", "rejected", "rejected", "saved"]
+    assert {row.status for row in Attendance.query.all()} == {AttendanceStatus.ALPA}
+    assert MobileIdempotencyKey.query.count() == 2
+
+
+def test_batch_requires_sheets_and_caps_size(client, majlis_class):
+    headers = _headers(client)
+    response = client.post("/api/v1/attendance/batch", headers=headers, json={"sheets": []})
+    assert response.status_code == 400
+
+    sheets = [_sheet(majlis_class, f"k-{index}") for index in range(51)]
+    response = client.post("/api/v1/attendance/batch", headers=headers, json={"sheets": sheets})
+    assert response.status_code == 422
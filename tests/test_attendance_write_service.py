@@ -0,0 +1,203 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Attendance,
+    AttendanceStatus,
+    BoardingActivitySchedule,
+    BoardingAttendance,
+    BoardingDormitory,
+    ClassRoom,
+    GroupType,
+    ParticipantType,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    Student,
+    Teacher,
+    Tenant,
+    TenantDailyMetric,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.services.attendance_write_service import (
+    AttendanceSheetError,
+    save_boarding_attendance_sheet,
+    save_class_attendance_sheet,
+)
+
+
+PASSWORD = "ValidPass123!"
+SHEET_DATE = date(2026, 1, 5)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def school(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    db.session.add(teacher)
+    db.session.flush()
+    program = Program(tenant_id=tenant.id, code="UMUM", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="Kelas A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name="Kelas A", program_group_id=group.id, homeroom_teacher_id=teacher.id)
+    db.session.add(class_room)
+    db.session.flush()
+    students = [
+        Student(user_id=_user(tenant, f"siswa{index}", UserRole.SISWA).id, nis=f"S{index}",
+                full_name=f"Siswa {index}", current_class_id=class_room.id)
+        for index in range(3)
+    ]
+    db.session.add_all(students)
+    db.session.commit()
+    participants = {
+        f"S-{student.id}": {
+            "key": f"S-{student.id}",
+            "participant_type": ParticipantType.STUDENT,
+            "student_id": student.id,
+            "majlis_participant_id": None,
+        }
+        for student in students
+    }
+    return {"teacher": teacher, "class_room": class_room, "students": students, "participants": participants}
+
+
+def _save_class(school, statuses):
+    return save_class_attendance_sheet(
+        teacher_id=school["teacher"].id,
+        class_id=school["class_room"].id,
+        attendance_date=SHEET_DATE,
+        participants=school["participants"],
+        records=[{"participant_key": key, "status": status} for key, status in statuses.items()],
+    )
+
+
+def test_class_sheet_upsert_reports_changed_and_unchanged(school):
+    keys = list(school["participants"])
+    first = _save_class(school, {key: "HADIR" for key in keys})
+    assert (first.saved, first.changed, first.unchanged) == (3, 3, 0)
+
+    second = _save_class(school, {keys[0]: "HADIR", keys[1]: "SAKIT", keys[2]: "HADIR"})
+    db.session.commit()
+    assert (second.saved, second.changed, second.unchanged) == (3, 1, 2)
+    assert Attendance.query.count() == 3
+    assert Attendance.query.filter_by(status=AttendanceStatus.SAKIT).count() == 1
+
+
+def test_class_sheet_upsert_invalidates_stored_rollup_day(school):
+    tenant_id = school["teacher"].user.tenant_id
+    db.session.add(TenantDailyMetric(tenant_id=tenant_id, metric_date=SHEET_DATE, attendance_hadir=0))
+    db.session.commit()
+
+    _save_class(school, {key: "HADIR" for key in school["participants"]})
+    db.session.commit()
+
+    assert TenantDailyMetric.query.filter_by(tenant_id=tenant_id, metric_date=SHEET_DATE).count() == 0
+
+
+def test_class_sheet_revives_soft_deleted_row(school):
+    key = next(iter(school["participants"]))
+    _save_class(school, {key: "HADIR"})
+    row = Attendance.query.one()
+    row.is_deleted = True
+    db.session.commit()
+
+    result = _save_class(school, {key: "HADIR"})
+    db.session.commit()
+    assert result.changed == 1
+    assert Attendance.query.count() == 1
+
+
+def test_attendance_unique_index_rejects_duplicate_participant(school):
+    student = school["students"][0]
+    for _ in range(2):
+        db.session.add(Attendance(student_id=student.id, class_id=school["class_room"].id,
+                                  teacher_id=school["teacher"].id, date=SHEET_DATE,
+                                  participant_type=ParticipantType.STUDENT))
+    with pytest.raises(IntegrityError):
+        db.session.flush()
+
+
+def test_boarding_sheet_upsert_and_invalid_status(school):
+    dormitory = BoardingDormitory(name="Asrama A")
+    schedule = BoardingActivitySchedule(activity_name="Subuh", start_time=time(4, 30), end_time=time(5, 30))
+    db.session.add_all([dormitory, schedule])
+    db.session.commit()
+    student_ids = {student.id for student in school["students"]}
+
+    def _save(status):
+        return save_boarding_attendance_sheet(
+            dormitory_id=dormitory.id,
+            schedule_id=schedule.id,
+            attendance_date=SHEET_DATE,
+            student_ids=student_ids,
+            records=[{"student_id": student_id, "status": status} for student_id in student_ids],
+            recorded_by_user_id=school["teacher"].user_id,
+        )
+
+    assert _save("HADIR").changed == 3
+    repeat = _save("HADIR")
+    assert (repeat.saved, repeat.changed) == (3, 0)
+    assert BoardingAttendance.query.count() == 3
+    with pytest.raises(AttendanceSheetError):
+        _save("TERLAMBAT")
+
+
+def test_teacher_web_form_saves_through_upsert(app, school):
+    client = app.test_client()
+    response = client.post("/auth/login", data={"login_id": "guru", "password": PASSWORD})
+    assert response.status_code == 302
+
+    class_id = school["class_room"].id
+    form = {"attendance_date": SHEET_DATE.isoformat()}
+    form.update({f"status_{key}": "IZIN" for key in school["participants"]})
+    for _ in range(2):
+        response = client.post(f"/teacher/input-absensi?class_id={class_id}", data=form)
+        assert response.status_code == 302
+
+    assert Attendance.query.count() == 3
+    assert {row.status for row in Attendance.query.all()} == {AttendanceStatus.IZIN}
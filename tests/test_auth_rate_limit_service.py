@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 import pytest
 
@@ -6,7 +6,10 @@ from app import create_app
 from app.extensions import db
 from app.models import MobileRateLimitBucket
 from app.services.auth_rate_limit_service import (
+    MemoryRateLimitStore,
     check_auth_rate_limit,
+    purge_expired_auth_rate_limit_buckets,
+    rate_limit_store,
     record_auth_rate_limit_failure,
 )
 from app.utils.timezone import utc_now_naive
@@ -36,6 +39,24 @@ def app():
         db.drop_all()
 
 
+@pytest.fixture(params=["database", "memory", "sqlite"])
+def backend_app(request, tmp_path):
+    config = type("BackendConfig", (TestConfig,), {
+        "AUTH_RATE_LIMIT_BACKEND": request.param,
+        "AUTH_RATE_LIMIT_SQLITE_PATH": str(tmp_path / "rate_limit.sqlite3"),
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+# Awal window 300 detik (sejajar epoch).
+WINDOW_START = datetime(2026, 3, 10, 8, 0, 0)
+
+
 def test_rate_limit_creates_hashed_buckets_without_raw_pii(app):
     identifier = "User.One+Test@example.test"
     tenant_hint = {"tenant_code": "TENANT-ABC"}
@@ -115,3 +136,69 @@ def test_tenant_hint_and_ip_partition_buckets(app):
 
     assert len(scope_keys) > 3
 
+
+
+def test_failure_is_recorded_with_a_single_statement(app):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    record_auth_rate_limit_failure("web_login", "warmup@example.test", ip_address="203.0.113.50")
+    db.event.listen(db.engine, "before_cursor_execute", _count)
+    try:
+        decision = record_auth_rate_limit_failure("web_login", "single@example.test", ip_address="203.0.113.50")
+    finally:
+        db.event.remove(db.engine, "before_cursor_execute", _count)
+
+    assert [statement.split()[0].upper() for statement in statements] == ["INSERT"]
+    assert "ON CONFLICT" in statements[0].upper()
+    assert decision.limited is False
+
+
+def test_sliding_window_carries_previous_window_failures(backend_app):
+    identifier = "slide@example.test"
+    near_end = WINDOW_START + timedelta(seconds=290)
+    for _ in range(3):
+        record_auth_rate_limit_failure("web_login", identifier, ip_address="203.0.113.60", now=near_end)
+
+    # Window tetap akan langsung membuka blokir di window baru; sliding window tidak.
+    next_window = WINDOW_START + timedelta(seconds=310)
+    decision = check_auth_rate_limit("web_login", identifier, ip_address="203.0.113.60", now=next_window)
+    assert decision.limited is True
+    assert decision.retry_after_seconds == 91
+
+    after_retry = next_window + timedelta(seconds=decision.retry_after_seconds)
+    assert not check_auth_rate_limit("web_login", identifier, ip_address="203.0.113.60", now=after_retry).limited
+
+
+def test_recorded_failure_returns_decision_and_rolls_window(backend_app):
+    identifier = "roll@example.test"
+    first = record_auth_rate_limit_failure("web_login", identifier, ip_address="203.0.113.70", now=WINDOW_START)
+    second = record_auth_rate_limit_failure(
+        "web_login", identifier, ip_address="203.0.113.70", now=WINDOW_START + timedelta(seconds=10)
+    )
+    assert first.limited is False
+    assert second.limited is True
+    assert second.retry_after_seconds == 291
+
+    rolled = record_auth_rate_limit_failure(
+        "web_login", identifier, ip_address="203.0.113.70", now=WINDOW_START + timedelta(seconds=599)
+    )
+    # 1 (window baru) + 2 * 1/300 (sisa window lama) masih di bawah limit 2.
+    assert rolled.limited is False
+
+    # Dua window kemudian semua hitungan lama tidak berlaku lagi.
+    far_later = WINDOW_START + timedelta(seconds=1200)
+    assert purge_expired_auth_rate_limit_buckets(now=far_later) == 3
+    assert not check_auth_rate_limit("web_login", identifier, ip_address="203.0.113.70", now=far_later).limited
+
+
+def test_selected_backend_owns_the_buckets(backend_app):
+    store = rate_limit_store()
+    if backend_app.config["AUTH_RATE_LIMIT_BACKEND"] == "memory":
+        assert isinstance(store, MemoryRateLimitStore)
+        assert rate_limit_store() is store
+    record_auth_rate_limit_failure("mobile_login", "shared@example.test", ip_address="203.0.113.80")
+    expected_rows = 3 if backend_app.config["AUTH_RATE_LIMIT_BACKEND"] == "database" else 0
+    assert MobileRateLimitBucket.query.count() == expected_rows
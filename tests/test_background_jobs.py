@@ -0,0 +1,240 @@
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import BackgroundJob, BackgroundJobStatus, Student, Teacher, Tenant, User, UserRole
+from app.services import job_queue_service
+from app.services.job_queue_service import (
+    claim_next_job,
+    enqueue_job,
+    job_handler,
+    report_job_progress,
+    requeue_stale_jobs,
+    run_job,
+    run_worker,
+)
+from app.utils.timezone import utc_now_naive
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BACKGROUND_JOBS_RETRY_BASE_SECONDS = 10
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def admin_user(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    user = User(
+        tenant_id=tenant.id,
+        username="admin",
+        email="admin@example.test",
+        role=UserRole.ADMIN,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture()
+def flaky_handler():
+    calls = {"count": 0}
+
+    @job_handler("test_flaky")
+    def _handler(job):
+        calls["count"] += 1
+        if calls["count"] < job.payload.get("succeed_on", 99):
+            raise RuntimeError("gangguan sementara")
+        report_job_progress(job, 3, 3)
+        return {"message": "selesai"}
+
+    yield calls
+    job_queue_service.JOB_HANDLERS.pop("test_flaky", None)
+
+
+def _login(client, user):
+    response = client.post("/auth/login", data={"login_id": user.username, "password": PASSWORD})
+    assert response.status_code == 302
+
+
+def test_failed_job_is_retried_with_backoff_then_succeeds(app, flaky_handler):
+    job = enqueue_job("test_flaky", tenant_id=None, payload={"succeed_on": 2})
+
+    claimed = claim_next_job("worker-1")
+    assert claimed.id == job.id and claimed.attempts == 1
+    assert claimed.status == BackgroundJobStatus.RUNNING
+
+    before = utc_now_naive()
+    run_job(claimed)
+    job = db.session.get(BackgroundJob, job.id)
+    assert job.status == BackgroundJobStatus.QUEUED
+    assert job.run_after >= before + timedelta(seconds=10)
+    assert "gangguan sementara" in job.error_log
+    assert claim_next_job("worker-1") is None
+
+    job.run_after = utc_now_naive() - timedelta(seconds=1)
+    db.session.commit()
+    job_id = job.id
+    assert run_worker(worker_id="worker-1", once=True) == 1
+
+    job = db.session.get(BackgroundJob, job_id)
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.attempts == 2
+    assert (job.progress_current, job.progress_total, job.progress_percent) == (3, 3, 100)
+    assert job.result == {"message": "selesai"}
+
+
+def test_job_fails_after_max_attempts_and_stale_locks_are_released(app, flaky_handler):
+    job = enqueue_job("test_flaky", tenant_id=None, max_attempts=1)
+    run_job(claim_next_job("worker-1"))
+    job = db.session.get(BackgroundJob, job.id)
+    assert job.status == BackgroundJobStatus.FAILED
+    assert job.finished_at is not None
+
+    stale = enqueue_job("test_flaky", tenant_id=None, payload={"succeed_on": 1})
+    claim_next_job("worker-crashed")
+    stale.locked_at = utc_now_naive() - timedelta(hours=2)
+    db.session.commit()
+    assert requeue_stale_jobs() == 1
+    assert db.session.get(BackgroundJob, stale.id).status == BackgroundJobStatus.QUEUED
+
+
+def test_progress_heartbeat_keeps_long_running_job_locked(app, flaky_handler):
+    job = enqueue_job("test_flaky", tenant_id=None)
+    claimed = claim_next_job("worker-1")
+    claimed.locked_at = utc_now_naive() - timedelta(hours=2)
+    db.session.commit()
+
+    # Job masih berjalan lebih lama dari timeout kunci, tetapi terus melapor progres.
+    report_job_progress(claimed, 1, 10)
+
+    assert requeue_stale_jobs() == 0
+    job = db.session.get(BackgroundJob, job.id)
+    assert job.status == BackgroundJobStatus.RUNNING
+    assert job.locked_by == "worker-1"
+    assert job.progress_current == 1
+
+
+def test_eager_mode_runs_job_inline(app, flaky_handler):
+    app.config["BACKGROUND_JOBS_EAGER"] = True
+
+    job = enqueue_job("test_flaky", tenant_id=None, payload={"succeed_on": 1})
+
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.locked_by is None
+
+
+def test_teacher_upload_is_queued_and_processed_by_worker(client, admin_user):
+    _login(client, admin_user)
+    csv_bytes = "nip,nama,mapel\nG001,Ustadz Ahmad,Fiqih\n,Tanpa NIP,Nahwu\n".encode("utf-8")
+
+    response = client.post(
+        "/admin/sdm/guru/upload",
+        data={"file": (BytesIO(csv_bytes), "guru.csv")},
+        content_type="multipart/form-data",
+    )
+
+    job = BackgroundJob.query.one()
+    job_id = job.id
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith(f"/jobs/{job_id}")
+    assert job.status == BackgroundJobStatus.QUEUED
+    assert Teacher.query.count() == 0
+
+    assert run_worker(worker_id="worker-1", once=True) == 1
+
+    job = db.session.get(BackgroundJob, job_id)
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.input_blob is None
+    assert (job.result["created"], job.result["skipped"]) == (1, 1)
+    assert Teacher.query.one().full_name == "Ustadz Ahmad"
+
+    page = client.get(f"/jobs/{job.id}")
+    assert page.status_code == 200
+    assert "Upload guru selesai" in page.get_data(as_text=True)
+    status = client.get(f"/jobs/{job.id}/status.json").get_json()
+    assert status["status"] == "SUCCEEDED" and status["errors"] == ["Baris 3: NIP dan Nama wajib diisi."]
+
+
+def test_job_status_is_hidden_from_other_tenants(client, admin_user):
+    other_tenant = Tenant(name="Tenant B", slug="tenant-b", code="TB")
+    db.session.add(other_tenant)
+    db.session.flush()
+    outsider = User(
+        tenant_id=other_tenant.id,
+        username="admin-b",
+        email="admin-b@example.test",
+        role=UserRole.ADMIN,
+        must_change_password=False,
+    )
+    outsider.set_password(PASSWORD)
+    db.session.add(outsider)
+    db.session.commit()
+    job = enqueue_job("import_students", tenant_id=admin_user.tenant_id, created_by_user_id=admin_user.id)
+
+    _login(client, outsider)
+
+    assert client.get(f"/jobs/{job.id}").status_code == 404
+    assert Student.query.count() == 0
+
+
+def _tenant_jobs(admin_user):
+    users = {}
+    for username, role in (("guru", UserRole.GURU), ("tu", UserRole.TU)):
+        user = User(tenant_id=admin_user.tenant_id, username=username, email=f"{username}@example.test",
+                    role=role, must_change_password=False)
+        user.set_password(PASSWORD)
+        users[username] = user
+    db.session.add_all(users.values())
+    db.session.commit()
+    import_job = enqueue_job("import_students", tenant_id=admin_user.tenant_id, created_by_user_id=admin_user.id)
+    teacher_job = enqueue_job("ai_document_extraction", tenant_id=admin_user.tenant_id,
+                              created_by_user_id=users["guru"].id)
+    return users, import_job, teacher_job
+
+
+def test_admin_job_is_hidden_from_other_roles_of_the_tenant(client, admin_user):
+    users, import_job, teacher_job = _tenant_jobs(admin_user)
+
+    _login(client, users["guru"])
+
+    assert client.get(f"/jobs/{import_job.id}").status_code == 404
+    assert client.get(f"/jobs/{import_job.id}/status.json").status_code == 404
+    assert client.get(f"/jobs/{teacher_job.id}/status.json").status_code == 200
+
+
+def test_tenant_tu_sees_admin_jobs_but_not_personal_jobs(client, admin_user):
+    users, import_job, teacher_job = _tenant_jobs(admin_user)
+
+    _login(client, users["tu"])
+
+    assert client.get(f"/jobs/{import_job.id}/status.json").status_code == 200
+    assert client.get(f"/jobs/{teacher_job.id}/status.json").status_code == 404
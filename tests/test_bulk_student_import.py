@@ -0,0 +1,181 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    ClassRoom,
+    GroupType,
+    Parent,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ProgramType,
+    Student,
+    Teacher,
+    Tenant,
+    User,
+    UserRole,
+)
+from app.services.bulk_import_service import import_students, import_teachers
+from app.utils.nis import allocate_nis_range
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BULK_IMPORT_PASSWORD_METHOD = "pbkdf2:sha256:1000"
+    BULK_IMPORT_HASH_WORKERS = 1
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def tenants(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    other = Tenant(name="Tenant B", slug="tenant-b", code="TB")
+    db.session.add_all([tenant, other])
+    db.session.flush()
+
+    program = Program(
+        tenant_id=tenant.id,
+        code="SBQ",
+        name="Sekolah Bina Qur'an",
+        category=ProgramCategory.FORMAL,
+        report_schema="formal",
+    )
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="7A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add(ClassRoom(name="7A", program_group_id=group.id, program_type=ProgramType.SEKOLAH_FULLDAY))
+    db.session.commit()
+    return tenant, other
+
+
+def _student_row(name, phone, **extra):
+    row = {
+        "full_name": name,
+        "gender": "L",
+        "date_of_birth": "2012-05-01",
+        "parent_phone": phone,
+        "parent_name": f"Wali {name}",
+    }
+    row.update(extra)
+    return row
+
+
+def _add_user(tenant, username, role):
+    user = User(tenant_id=tenant.id, username=username, email=f"{username}@example.test", role=role)
+    user.set_password("rahasia")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_allocate_nis_range_skips_taken_and_reserved_numbers(app, tenants):
+    tenant, _ = tenants
+    _add_user(tenant, "202600002", UserRole.SISWA)
+
+    assert allocate_nis_range(3, year=2026, reserved={"202600003"}) == ["202600001", "202600004", "202600005"]
+    assert allocate_nis_range(0, year=2026) == []
+
+
+def test_validate_only_reports_every_error_without_writing(app, tenants):
+    tenant, other = tenants
+    _add_user(other, "0811", UserRole.WALI_MURID)
+    _add_user(tenant, "0899", UserRole.ADMIN)
+    rows = [
+        (2, _student_row("", "0812")),
+        (3, _student_row("Budi", "0812", gender="X")),
+        (4, _student_row("Citra", "0812", date_of_birth="01-05-2012")),
+        (5, _student_row("Dodi", "0811")),
+        (6, _student_row("Eka", "0899")),
+        (7, _student_row("Fajar", "0812", nis="N-1")),
+        (8, _student_row("Gita", "0812", nis="N-1")),
+    ]
+
+    result = import_students(rows, tenant_id=tenant.id, validate_only=True)
+
+    assert (result["valid"], result["skipped"], result["created"]) == (1, 6, 0)
+    assert result["errors"] == [
+        "Baris 2: Nama wajib diisi.",
+        "Baris 3: Gender harus L atau P.",
+        "Baris 4: Tanggal lahir harus YYYY-MM-DD.",
+        "Baris 5: Nomor HP wali sudah terdaftar pada tenant lain.",
+        "Baris 6: Akun admin tidak boleh dipakai sebagai wali murid.",
+        "Baris 8: NIS N-1 muncul lebih dari sekali di file.",
+    ]
+    assert Student.query.count() == 0
+    assert User.query.filter_by(tenant_id=tenant.id).count() == 1
+
+
+def test_import_students_creates_accounts_in_batches_and_shares_parents(app, tenants):
+    tenant, _ = tenants
+    existing_parent = _add_user(tenant, "0813", UserRole.GURU)
+    rows = [
+        (2, _student_row("Ahmad", "0812", kelas="7A")),
+        (3, _student_row("Aisyah", "0812", nis="S-2")),
+        (4, _student_row("Bilal", "0813", email="bilal@example.test")),
+    ]
+
+    result = import_students(rows, tenant_id=tenant.id)
+    db.session.commit()
+
+    assert (result["created"], result["skipped"], result["errors"]) == (3, 0, [])
+    students = {student.full_name: student for student in Student.query.all()}
+    assert students["Ahmad"].nis.isdigit() and students["Aisyah"].nis == "S-2"
+    assert students["Ahmad"].current_class_id == ClassRoom.query.filter_by(name="7A").one().id
+    assert students["Ahmad"].parent_id == students["Aisyah"].parent_id
+    assert Parent.query.count() == 2
+
+    new_parent = User.query.filter_by(username="0812").one()
+    assert new_parent.role == UserRole.WALI_MURID and new_parent.must_change_password
+    assert new_parent.check_password("0812")
+    assert students["Ahmad"].user.check_password("123456")
+    # Password awal sama, tapi setiap akun punya salt/hash sendiri.
+    student_hashes = {student.user.password_hash for student in students.values()}
+    assert len(student_hashes) == 3
+    assert students["Bilal"].user.email == "bilal@example.test"
+
+    db.session.refresh(existing_parent)
+    assert existing_parent.role == UserRole.WALI_MURID
+    assert existing_parent.has_role(UserRole.WALI_MURID)
+    assert existing_parent.parent_profile.full_name == "Wali Bilal"
+
+    again = import_students([(2, _student_row("Aisyah", "0812", nis="S-2"))], tenant_id=tenant.id)
+    assert again["errors"] == ["Baris 2: NIS S-2 sudah terdaftar."]
+
+
+def test_import_teachers_checks_existing_nip_up_front(app, tenants):
+    tenant, other = tenants
+    _add_user(other, "G002", UserRole.GURU)
+    rows = [
+        (2, {"nip": "G001", "nama": "Ustadz Ahmad", "password": "awal123"}),
+        (3, {"nip": "G002", "nama": "Ustadz Bakar"}),
+        (4, {"nip": "G001", "nama": "Ganda"}),
+        (5, {"nip": "G003", "nama": "Ustadzah Chairunnisa"}),
+    ]
+
+    result = import_teachers(rows, tenant_id=tenant.id)
+    db.session.commit()
+
+    assert (result["created"], result["skipped"]) == (2, 2)
+    assert result["errors"] == [
+        "Baris 3: NIP G002 sudah dipakai tenant lain.",
+        "Baris 4: NIP G001 muncul lebih dari sekali di file.",
+    ]
+    assert Teacher.query.count() == 2
+    assert User.query.filter_by(username="G001").one().check_password("awal123")
+    assert User.query.filter_by(username="G003").one().check_password("guru123")
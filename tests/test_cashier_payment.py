@@ -0,0 +1,200 @@
+from datetime import date
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FeeType,
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceCashBankAccount,
+    FinanceCashBankAccountType,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalStatus,
+    FinanceNormalBalance,
+    FinancePeriod,
+    FinancePeriodStatus,
+    FinanceSetting,
+    Invoice,
+    PaymentStatus,
+    Student,
+    Tenant,
+    TenantStatus,
+    Transaction,
+    User,
+    UserRole,
+)
+from app.routes.staff import _sign_cashier_invoice
+from app.services.cashier_payment_service import CashierPaymentError, record_cashier_payment
+from app.services.finance_posting_service import post_invoice_payment
+from app.services.finance_reconciliation_service import unposted_invoice_payment_transactions
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(tenant_id=tenant.id, username=username, email=f"{username}@example.test", role=role,
+                must_change_password=False)
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _account(tenant, code, category, normal_balance):
+    account = FinanceAccount(tenant_id=tenant.id, code=code, name=code, category=category,
+                             normal_balance=normal_balance, is_active=True)
+    db.session.add(account)
+    db.session.flush()
+    return account
+
+
+@pytest.fixture()
+def cashier(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    tu = _user(tenant, "tu", UserRole.TU)
+    student = Student(user_id=_user(tenant, "siswa", UserRole.SISWA).id, nis="S001", full_name="Siswa Satu")
+    db.session.add(student)
+
+    cash = _account(tenant, "1010", FinanceAccountCategory.ASSET, FinanceNormalBalance.DEBIT)
+    revenue = _account(tenant, "4100", FinanceAccountCategory.REVENUE, FinanceNormalBalance.CREDIT)
+    cash_bank = FinanceCashBankAccount(tenant_id=tenant.id, account_name="Kas", gl_account_id=cash.id,
+                                       account_type=FinanceCashBankAccountType.CASH, is_active=True)
+    db.session.add(cash_bank)
+    db.session.flush()
+    db.session.add_all([
+        FinanceSetting(tenant_id=tenant.id, default_cash_bank_account_id=cash_bank.id,
+                       default_spp_revenue_account_id=revenue.id),
+        FinancePeriod(tenant_id=tenant.id, name="Semua", start_date=date(2000, 1, 1),
+                      end_date=date(2100, 12, 31), status=FinancePeriodStatus.OPEN),
+    ])
+    fee = FeeType(tenant_id=tenant.id, name="SPP", amount=100_000)
+    db.session.add(fee)
+    db.session.flush()
+    invoices = [
+        Invoice(invoice_number=f"INV-{index}", student_id=student.id, fee_type_id=fee.id,
+                total_amount=amount, paid_amount=0, status=PaymentStatus.UNPAID)
+        for index, amount in enumerate((100_000, 250_000, 75_000), start=1)
+    ]
+    db.session.add_all(invoices)
+    db.session.commit()
+    return {
+        "tenant_id": tenant.id,
+        "actor_id": tu.id,
+        "student_id": student.id,
+        "invoice_ids": [invoice.id for invoice in invoices],
+        "cash_id": cash.id,
+        "revenue_id": revenue.id,
+    }
+
+
+def test_multi_invoice_receipt_posts_one_combined_journal(app, cashier):
+    first_id, second_id, _ = cashier["invoice_ids"]
+    client = app.test_client()
+    client.post("/auth/login", data={"login_id": "tu", "password": PASSWORD})
+
+    response = client.post(f"/staff/kasir/bayar/{cashier['student_id']}", data={
+        "action": "settle_multiple",
+        "invoice_token": [
+            _sign_cashier_invoice(first_id, cashier["student_id"]),
+            _sign_cashier_invoice(second_id, cashier["student_id"]),
+        ],
+        f"amount_{first_id}": "100000",
+        f"amount_{second_id}": "150.000",
+        "method": "TUNAI",
+    })
+    assert response.status_code == 302
+
+    transactions = Transaction.query.order_by(Transaction.id).all()
+    assert [(trx.invoice_id, trx.amount) for trx in transactions] == [(first_id, 100_000), (second_id, 150_000)]
+    assert len({trx.receipt_no for trx in transactions}) == 1
+    assert db.session.get(Invoice, first_id).status == PaymentStatus.PAID
+    assert db.session.get(Invoice, second_id).status == PaymentStatus.PARTIAL
+
+    journal = FinanceJournal.query.one()
+    assert journal.status == FinanceJournalStatus.POSTED
+    assert journal.source_id == transactions[0].id
+    lines = sorted((line.entry_side.value, line.account_id, line.amount, line.reference_id) for line in journal.lines)
+    assert lines == sorted([
+        (FinanceEntrySide.DEBIT.value, cashier["cash_id"], 250_000, transactions[0].id),
+        (FinanceEntrySide.CREDIT.value, cashier["revenue_id"], 100_000, transactions[0].id),
+        (FinanceEntrySide.CREDIT.value, cashier["revenue_id"], 150_000, transactions[1].id),
+    ])
+    assert unposted_invoice_payment_transactions(cashier["tenant_id"]).count() == 0
+    assert post_invoice_payment(
+        tenant_id=cashier["tenant_id"], transaction_id=transactions[1].id, actor_user_id=cashier["actor_id"]
+    ) == journal.id
+
+    receipt = client.get(f"/staff/kasir/kwitansi/{transactions[1].id}")
+    assert receipt.status_code == 200
+    assert transactions[0].receipt_no.encode() in receipt.data
+    assert b"INV-1" in receipt.data and b"INV-2" in receipt.data
+
+
+def test_single_invoice_payment_commits_once(app, cashier):
+    commits = []
+    invoice_id = cashier["invoice_ids"][2]
+
+    def _count(connection):
+        commits.append(connection)
+
+    db.event.listen(db.engine, "commit", _count)
+    try:
+        result = record_cashier_payment(
+            tenant_id=cashier["tenant_id"],
+            student_id=cashier["student_id"],
+            allocations=[(invoice_id, 75_000)],
+            method="TRANSFER",
+            actor_user_id=cashier["actor_id"],
+        )
+        db.session.commit()
+    finally:
+        db.event.remove(db.engine, "commit", _count)
+
+    assert len(commits) == 1
+    assert result.posting_error is None
+    journal = db.session.get(FinanceJournal, result.journal_id)
+    assert journal.status == FinanceJournalStatus.POSTED
+    assert journal.source_id == result.primary_transaction.id
+    assert db.session.get(Invoice, invoice_id).status == PaymentStatus.PAID
+
+
+def test_overpayment_is_rejected_without_writes(cashier):
+    first_id, second_id, _ = cashier["invoice_ids"]
+    with pytest.raises(CashierPaymentError):
+        record_cashier_payment(
+            tenant_id=cashier["tenant_id"],
+            student_id=cashier["student_id"],
+            allocations=[(first_id, 50_000), (second_id, 300_000)],
+            method="TUNAI",
+            actor_user_id=cashier["actor_id"],
+        )
+    db.session.rollback()
+
+    assert Transaction.query.count() == 0
+    assert FinanceJournal.query.count() == 0
+    assert db.session.get(Invoice, first_id).paid_amount == 0
@@ -0,0 +1,276 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Attendance,
+    AttendanceStatus,
+    ClassRoom,
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+    FinanceNormalBalance,
+    GroupType,
+    Invoice,
+    PaymentStatus,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ProgramType,
+    Student,
+    Teacher,
+    Tenant,
+    TenantDailyMetric,
+    Transaction,
+    User,
+    UserRole,
+)
+from app.services.dashboard_metrics_service import (
+    backfill_daily_metrics,
+    build_leadership_payload,
+    leadership_dashboard_payload,
+)
+from app.utils.timezone import local_today
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DASHBOARD_METRICS_REFRESH_DAYS = 2
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def school(app):
+    today = local_today()
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    other = Tenant(name="Tenant B", slug="tenant-b", code="TB")
+    db.session.add_all([tenant, other])
+    db.session.flush()
+
+    program = Program(
+        tenant_id=tenant.id,
+        code="SBQ",
+        name="Sekolah Bina Qur'an",
+        category=ProgramCategory.FORMAL,
+        report_schema="formal",
+    )
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="7A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name="7A", program_group_id=group.id, program_type=ProgramType.SEKOLAH_FULLDAY)
+    db.session.add(class_room)
+    db.session.flush()
+
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    db.session.add(teacher)
+    students = []
+    for index, owner in enumerate((tenant, tenant, other)):
+        student = Student(
+            user_id=_user(owner, f"siswa{index}", UserRole.SISWA).id,
+            nis=f"S{index}",
+            full_name=f"Siswa {index}",
+            current_class_id=class_room.id,
+        )
+        db.session.add(student)
+        students.append(student)
+    db.session.flush()
+
+    def attend(student, day, status):
+        db.session.add(Attendance(
+            student_id=student.id,
+            class_id=class_room.id,
+            teacher_id=teacher.id,
+            date=day,
+            status=status,
+        ))
+
+    attend(students[0], today, AttendanceStatus.HADIR)
+    attend(students[1], today, AttendanceStatus.SAKIT)
+    attend(students[2], today, AttendanceStatus.HADIR)
+    attend(students[0], today - timedelta(days=5), AttendanceStatus.HADIR)
+
+    invoice = Invoice(
+        invoice_number="INV-1",
+        student_id=students[0].id,
+        total_amount=300000,
+        paid_amount=100000,
+        status=PaymentStatus.PARTIAL,
+    )
+    db.session.add(invoice)
+    db.session.flush()
+    db.session.add(Transaction(
+        invoice_id=invoice.id,
+        amount=100000,
+        method="CASH",
+        date=datetime.combine(today - timedelta(days=5), time(9, 0)),
+    ))
+
+    cash = FinanceAccount(
+        tenant_id=tenant.id, code="1101", name="Kas",
+        category=FinanceAccountCategory.ASSET, normal_balance=FinanceNormalBalance.DEBIT,
+    )
+    revenue = FinanceAccount(
+        tenant_id=tenant.id, code="4101", name="Pendapatan SPP",
+        category=FinanceAccountCategory.REVENUE, normal_balance=FinanceNormalBalance.CREDIT,
+    )
+    db.session.add_all([cash, revenue])
+    db.session.flush()
+    leader = _user(tenant, "pimpinan", UserRole.PIMPINAN)
+    journal = FinanceJournal(
+        tenant_id=tenant.id,
+        journal_no="JU-1",
+        journal_date=today - timedelta(days=5),
+        status=FinanceJournalStatus.POSTED,
+        created_by_user_id=leader.id,
+    )
+    db.session.add(journal)
+    db.session.flush()
+    db.session.add_all([
+        FinanceJournalLine(tenant_id=tenant.id, journal_id=journal.id, account_id=cash.id,
+                           entry_side=FinanceEntrySide.DEBIT, amount=100000),
+        FinanceJournalLine(tenant_id=tenant.id, journal_id=journal.id, account_id=revenue.id,
+                           entry_side=FinanceEntrySide.CREDIT, amount=100000),
+    ])
+    db.session.commit()
+    return {"tenant": tenant, "leader": leader, "students": students, "today": today}
+
+
+def test_payload_is_built_from_daily_rollups(school):
+    tenant = school["tenant"]
+    today = school["today"]
+
+    payload = build_leadership_payload(tenant.id, "7d")
+
+    assert payload["cards"]["students"] == 2
+    assert payload["cards"]["teachers_staff"] == 1
+    assert payload["cards"]["receivable_total"] == 200000
+    assert payload["attendance"]["counts"] == {"Hadir": 1, "Sakit": 1, "Izin": 0, "Alpa": 0}
+    assert payload["attendance"]["rate"] == 50.0
+    assert sum(item["amount"] for item in payload["payment_trend"]) == 100000
+    assert payload["finance"]["monthly_revenue"] == 100000
+    assert payload["class_overview"] == [{"name": "7A", "student_count": 2, "attendance_count": 2}]
+    assert payload["recent_payments"][0]["student"] == "Siswa 0"
+
+    assert TenantDailyMetric.query.filter_by(tenant_id=tenant.id).count() == 0
+
+    stored = backfill_daily_metrics(tenant.id, today - timedelta(days=6), today, missing_only=True)
+    assert stored == 7
+    five_days_ago = TenantDailyMetric.query.filter_by(
+        tenant_id=tenant.id, metric_date=today - timedelta(days=5)
+    ).one()
+    assert (five_days_ago.attendance_hadir, five_days_ago.payment_amount, five_days_ago.revenue_amount) == (
+        1, 100000, 100000
+    )
+
+
+def test_older_days_are_served_from_stored_rollups(school):
+    tenant = school["tenant"]
+    today = school["today"]
+    backfill_daily_metrics(tenant.id, today - timedelta(days=10), today)
+
+    old_day = TenantDailyMetric.query.filter_by(tenant_id=tenant.id, metric_date=today - timedelta(days=5)).one()
+    old_day.payment_amount = 555
+    today_row = TenantDailyMetric.query.filter_by(tenant_id=tenant.id, metric_date=today).one()
+    today_row.attendance_alpa = 99
+    db.session.commit()
+
+    payload = build_leadership_payload(tenant.id, "7d")
+
+    assert sum(item["amount"] for item in payload["payment_trend"]) == 555
+    assert payload["attendance"]["counts"]["Alpa"] == 0
+
+
+def test_backdated_writes_invalidate_stored_rollup_days(school):
+    tenant = school["tenant"]
+    today = school["today"]
+    students = school["students"]
+    backfill_daily_metrics(tenant.id, today - timedelta(days=10), today)
+    stored_days = TenantDailyMetric.query.filter_by(tenant_id=tenant.id).count()
+
+    old_attendance = Attendance.query.filter_by(student_id=students[0].id, date=today - timedelta(days=5)).one()
+    old_attendance.status = AttendanceStatus.ALPA
+    db.session.add(Attendance(
+        student_id=students[1].id,
+        class_id=old_attendance.class_id,
+        teacher_id=old_attendance.teacher_id,
+        date=today - timedelta(days=8),
+        status=AttendanceStatus.IZIN,
+    ))
+    db.session.commit()
+
+    remaining = {row.metric_date for row in TenantDailyMetric.query.filter_by(tenant_id=tenant.id)}
+    assert len(remaining) == stored_days - 2
+    assert today - timedelta(days=5) not in remaining
+    assert today - timedelta(days=8) not in remaining
+
+    payload = build_leadership_payload(tenant.id, "14d")
+    trend = {item["label"]: item for item in payload["attendance_trend"]}
+    assert trend[(today - timedelta(days=5)).strftime("%d/%m")]["present"] == 0
+    assert trend[(today - timedelta(days=8)).strftime("%d/%m")]["total"] == 1
+
+    assert backfill_daily_metrics(tenant.id, today - timedelta(days=10), today, missing_only=True) == 2
+    refreshed = TenantDailyMetric.query.filter_by(tenant_id=tenant.id, metric_date=today - timedelta(days=5)).one()
+    assert (refreshed.attendance_hadir, refreshed.attendance_alpa) == (0, 1)
+
+
+def test_dashboard_payload_is_cached_per_tenant_and_period(school):
+    tenant = school["tenant"]
+    first = leadership_dashboard_payload(tenant.id, "7d")
+
+    db.session.add(Student(nis="S9", full_name="Siswa Baru", user_id=school["students"][0].user_id))
+    db.session.commit()
+
+    assert leadership_dashboard_payload(tenant.id, "7d") is first
+    assert leadership_dashboard_payload(tenant.id, "30d")["cards"]["students"] == 3
+
+
+def test_leadership_data_endpoint(app, school):
+    client = app.test_client()
+    response = client.post("/auth/login", data={"login_id": "pimpinan", "password": PASSWORD})
+    assert response.status_code == 302
+
+    response = client.get("/admin/dashboard/pimpinan/data?period=30d")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["period"]["key"] == "30d"
+    assert data["cards"]["income_today"] == 0
+    assert len(data["attendance_trend"]) == 30
+    assert client.get("/admin/dashboard/pimpinan").status_code == 200
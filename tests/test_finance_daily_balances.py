@@ -0,0 +1,232 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceAccountDailyBalance,
+    FinanceCashBankAccount,
+    FinanceCashBankAccountType,
+    FinanceCashBankTransaction,
+    FinanceNormalBalance,
+    FinancePeriod,
+    FinancePeriodStatus,
+    FinanceSetting,
+    Invoice,
+    PaymentStatus,
+    Student,
+    Tenant,
+    Transaction,
+    User,
+    UserRole,
+)
+from app.routes.admin import _financial_position_data, _income_statement_data, _ledger_data, _trial_balance_data
+from app.services.finance_balance_service import (
+    daily_balances_ready,
+    materialized_account_totals,
+    rebuild_daily_balances,
+    verify_daily_balances,
+)
+from app.services.finance_posting_service import (
+    create_cash_bank_transaction,
+    post_invoice_payment,
+    reverse_journal,
+)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _open_period(tenant_id, day):
+    month_start = day.replace(day=1)
+    next_month = date(day.year + (day.month // 12), (day.month % 12) + 1, 1)
+    return FinancePeriod(
+        tenant_id=tenant_id,
+        name=day.strftime("%Y-%m"),
+        start_date=month_start,
+        end_date=date.fromordinal(next_month.toordinal() - 1),
+        status=FinancePeriodStatus.OPEN,
+    )
+
+
+@pytest.fixture()
+def finance_context(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+
+    actor = User(
+        tenant_id=tenant.id,
+        username="admin",
+        email="admin@example.test",
+        role=UserRole.ADMIN,
+        must_change_password=False,
+    )
+    student_user = User(
+        tenant_id=tenant.id,
+        username="student",
+        email="student@example.test",
+        role=UserRole.SISWA,
+        must_change_password=False,
+    )
+    student = Student(user=student_user, nis="S001", full_name="Student One")
+    cash_account = FinanceAccount(
+        tenant_id=tenant.id,
+        code="1010",
+        name="Kas Operasional",
+        category=FinanceAccountCategory.ASSET,
+        normal_balance=FinanceNormalBalance.DEBIT,
+        is_active=True,
+    )
+    revenue_account = FinanceAccount(
+        tenant_id=tenant.id,
+        code="4100",
+        name="Pendapatan SPP",
+        category=FinanceAccountCategory.REVENUE,
+        normal_balance=FinanceNormalBalance.CREDIT,
+        is_active=True,
+    )
+    expense_account = FinanceAccount(
+        tenant_id=tenant.id,
+        code="5100",
+        name="Beban ATK",
+        category=FinanceAccountCategory.EXPENSE,
+        normal_balance=FinanceNormalBalance.DEBIT,
+        is_active=True,
+    )
+    db.session.add_all([actor, student_user, student, cash_account, revenue_account, expense_account])
+    db.session.flush()
+
+    cash_bank = FinanceCashBankAccount(
+        tenant_id=tenant.id,
+        account_name="Kas Operasional",
+        account_type=FinanceCashBankAccountType.CASH,
+        gl_account_id=cash_account.id,
+        is_active=True,
+    )
+    db.session.add(cash_bank)
+    db.session.flush()
+    db.session.add(FinanceSetting(
+        tenant_id=tenant.id,
+        default_cash_bank_account_id=cash_bank.id,
+        default_spp_revenue_account_id=revenue_account.id,
+    ))
+    db.session.add(_open_period(tenant.id, date(2026, 5, 1)))
+    if date.today().strftime("%Y-%m") != "2026-05":
+        db.session.add(_open_period(tenant.id, date.today()))
+
+    invoice = Invoice(
+        student=student,
+        invoice_number="INV-001",
+        total_amount=100_000,
+        paid_amount=100_000,
+        status=PaymentStatus.PAID,
+        due_date=date(2026, 5, 31),
+    )
+    trx = Transaction(invoice=invoice, amount=100_000, method="cash", date=datetime(2026, 5, 10, 9, 0, 0), pic_id=actor.id)
+    db.session.add_all([invoice, trx])
+    db.session.commit()
+
+    return {
+        "tenant": tenant,
+        "actor": actor,
+        "cash_account": cash_account,
+        "revenue_account": revenue_account,
+        "expense_account": expense_account,
+        "cash_bank": cash_bank,
+        "invoice_transaction": trx,
+    }
+
+
+def _post_sample_journals(context):
+    tenant = context["tenant"]
+    actor = context["actor"]
+    post_invoice_payment(tenant_id=tenant.id, transaction_id=context["invoice_transaction"].id, actor_user_id=actor.id)
+    return create_cash_bank_transaction(
+        tenant_id=tenant.id,
+        trx_date=date(2026, 5, 12),
+        cash_bank_account_id=context["cash_bank"].id,
+        trx_type="OUT",
+        amount=25_000,
+        counterpart_account_id=context["expense_account"].id,
+        description="Beli ATK",
+        actor_user_id=actor.id,
+    )
+
+
+def test_posting_maintains_daily_balance_rows(finance_context):
+    _post_sample_journals(finance_context)
+    cash_account = finance_context["cash_account"]
+
+    cash_row = FinanceAccountDailyBalance.query.filter_by(
+        account_id=cash_account.id,
+        balance_date=date(2026, 5, 10),
+    ).one()
+    assert (cash_row.debit_total, cash_row.credit_total) == (100_000, 0)
+    assert verify_daily_balances(finance_context["tenant"].id) == []
+
+
+def test_reversal_removes_voided_journal_and_adds_reversal(finance_context):
+    tenant = finance_context["tenant"]
+    cash_bank_trx_id = _post_sample_journals(finance_context)
+    journal_id = db.session.get(FinanceCashBankTransaction, cash_bank_trx_id).journal_id
+
+    reverse_journal(tenant_id=tenant.id, journal_id=journal_id, reason="Salah input", actor_user_id=finance_context["actor"].id)
+
+    assert verify_daily_balances(tenant.id) == []
+
+
+def test_reports_from_materialized_balances_match_live_reports(finance_context):
+    tenant = finance_context["tenant"]
+    _post_sample_journals(finance_context)
+    start_date, end_date = date(2026, 5, 1), date(2026, 5, 31)
+
+    live_trial_balance = _trial_balance_data(tenant.id, start_date, end_date)
+    live_income = _income_statement_data(tenant.id, start_date, end_date)
+    live_position = _financial_position_data(tenant.id, end_date)
+    live_ledger = _ledger_data(tenant.id, finance_context["cash_account"], date(2026, 5, 11), end_date)
+
+    assert materialized_account_totals(tenant.id) is None
+    rebuild_daily_balances(tenant.id)
+    db.session.commit()
+    assert daily_balances_ready(tenant.id)
+
+    assert _trial_balance_data(tenant.id, start_date, end_date) == live_trial_balance
+    assert _income_statement_data(tenant.id, start_date, end_date) == live_income
+    assert _financial_position_data(tenant.id, end_date) == live_position
+    assert _ledger_data(tenant.id, finance_context["cash_account"], date(2026, 5, 11), end_date)[0] == live_ledger[0]
+    assert live_ledger[0] == 100_000
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(finance_context):
+    tenant = finance_context["tenant"]
+    _post_sample_journals(finance_context)
+    row = FinanceAccountDailyBalance.query.filter_by(account_id=finance_context["cash_account"].id).first()
+    row.debit_total = int(row.debit_total) + 1
+    db.session.commit()
+
+    drifts = verify_daily_balances(tenant.id)
+    assert len(drifts) == 1
+    assert drifts[0].actual_debit == drifts[0].expected_debit + 1
+
+    rebuild_daily_balances(tenant.id)
+    db.session.commit()
+    assert verify_daily_balances(tenant.id) == []
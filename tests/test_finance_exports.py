@@ -0,0 +1,146 @@
+import csv
+from datetime import date, datetime
+from io import BytesIO, StringIO
+
+import pytest
+from openpyxl import load_workbook
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+    FinanceNormalBalance,
+    Tenant,
+    User,
+    UserRole,
+)
+from app.utils.exports import estimate_column_widths, iter_csv_chunks
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def journal_context(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    user = User(
+        tenant_id=tenant.id,
+        username="tu",
+        email="tu@example.test",
+        role=UserRole.TU,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    cash = FinanceAccount(
+        tenant_id=tenant.id,
+        code="1010",
+        name="Kas",
+        category=FinanceAccountCategory.ASSET,
+        normal_balance=FinanceNormalBalance.DEBIT,
+    )
+    revenue = FinanceAccount(
+        tenant_id=tenant.id,
+        code="4100",
+        name="Pendapatan",
+        category=FinanceAccountCategory.REVENUE,
+        normal_balance=FinanceNormalBalance.CREDIT,
+    )
+    db.session.add_all([user, cash, revenue])
+    db.session.flush()
+
+    for index in range(1, 26):
+        journal = FinanceJournal(
+            tenant_id=tenant.id,
+            journal_no=f"JV-{index:03d}",
+            journal_date=date(2026, 5, 1 + (index % 28)),
+            description=f"Pembayaran {index}",
+            status=FinanceJournalStatus.POSTED,
+            created_by_user_id=user.id,
+            approved_by_user_id=user.id,
+            posted_at=datetime(2026, 5, 1, 8, 0, 0),
+        )
+        db.session.add(journal)
+        db.session.flush()
+        db.session.add_all([
+            FinanceJournalLine(tenant_id=tenant.id, journal_id=journal.id, account_id=cash.id, entry_side=FinanceEntrySide.DEBIT, amount=1_000),
+            FinanceJournalLine(tenant_id=tenant.id, journal_id=journal.id, account_id=revenue.id, entry_side=FinanceEntrySide.CREDIT, amount=1_000),
+        ])
+    db.session.commit()
+    return {"user": user, "cash": cash}
+
+
+def _login(client, user):
+    response = client.post("/auth/login", data={"login_id": user.username, "password": PASSWORD})
+    assert response.status_code == 302
+
+
+def test_csv_chunks_flush_in_blocks():
+    chunks = list(iter_csv_chunks(["A", "B"], ([index, f"baris {index}"] for index in range(5)), flush_rows=2))
+
+    assert len(chunks) == 3
+    assert chunks[0].startswith("\ufeffA,B")
+    assert list(csv.reader(StringIO("".join(chunks).lstrip("\ufeff"))))[-1] == ["4", "baris 4"]
+
+
+def test_column_widths_come_from_sampled_rows():
+    assert estimate_column_widths(["Kode", "Deskripsi"], [["1", "x" * 100]]) == [12, 40]
+
+
+def test_journal_csv_export_streams_all_rows(client, journal_context):
+    _login(client, journal_context["user"])
+
+    response = client.get("/admin/keuangan/jurnal/export")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    rows = list(csv.reader(StringIO(response.get_data(as_text=True).lstrip("\ufeff"))))
+    assert rows[0][1] == "No Jurnal"
+    assert len(rows) == 26
+    assert rows[1][6] == "tu"
+
+
+def test_ledger_xlsx_export_uses_write_only_workbook(client, journal_context):
+    _login(client, journal_context["user"])
+
+    response = client.get(
+        "/admin/keuangan/laporan/buku-besar/export-xlsx",
+        query_string={"account_id": journal_context["cash"].id, "start_date": "2026-05-01", "end_date": "2026-05-31"},
+    )
+
+    assert response.status_code == 200
+    worksheet = load_workbook(BytesIO(response.get_data())).active
+    rows = list(worksheet.iter_rows(values_only=True))
+    assert worksheet.title == "Buku Besar"
+    assert rows[1][4] == "SALDO AWAL"
+    assert len(rows) == 27
+    assert rows[-1][8] == 25_000
@@ -0,0 +1,138 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceEntrySide,
+    FinanceJournal,
+    FinanceJournalLine,
+    FinanceJournalStatus,
+    FinanceNormalBalance,
+    Tenant,
+    User,
+    UserRole,
+)
+from app.routes.admin import _trial_balance_data
+from app.services.finance_report_service import LedgerEntry, ledger_report, posted_account_totals
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _journal(tenant, actor, journal_no, journal_date, status, lines):
+    journal = FinanceJournal(
+        tenant_id=tenant.id,
+        journal_no=journal_no,
+        journal_date=journal_date,
+        description=f"Jurnal {journal_no}",
+        status=status,
+        created_by_user_id=actor.id,
+        posted_at=datetime.combine(journal_date, datetime.min.time()) if status == FinanceJournalStatus.POSTED else None,
+    )
+    db.session.add(journal)
+    db.session.flush()
+    for account, entry_side, amount in lines:
+        db.session.add(FinanceJournalLine(
+            tenant_id=tenant.id,
+            journal_id=journal.id,
+            account_id=account.id,
+            entry_side=entry_side,
+            amount=amount,
+        ))
+    return journal
+
+
+@pytest.fixture()
+def ledger_context(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    actor = User(
+        tenant_id=tenant.id,
+        username="admin",
+        email="admin@example.test",
+        role=UserRole.ADMIN,
+        must_change_password=False,
+    )
+    cash = FinanceAccount(
+        tenant_id=tenant.id,
+        code="1010",
+        name="Kas",
+        category=FinanceAccountCategory.ASSET,
+        normal_balance=FinanceNormalBalance.DEBIT,
+    )
+    revenue = FinanceAccount(
+        tenant_id=tenant.id,
+        code="4100",
+        name="Pendapatan",
+        category=FinanceAccountCategory.REVENUE,
+        normal_balance=FinanceNormalBalance.CREDIT,
+    )
+    db.session.add_all([actor, cash, revenue])
+    db.session.flush()
+
+    debit, credit = FinanceEntrySide.DEBIT, FinanceEntrySide.CREDIT
+    _journal(tenant, actor, "JV-1", date(2026, 4, 30), FinanceJournalStatus.POSTED, [(cash, debit, 50_000), (revenue, credit, 50_000)])
+    _journal(tenant, actor, "JV-2", date(2026, 5, 3), FinanceJournalStatus.POSTED, [(cash, debit, 70_000), (revenue, credit, 70_000)])
+    _journal(tenant, actor, "JV-3", date(2026, 5, 9), FinanceJournalStatus.POSTED, [(revenue, debit, 20_000), (cash, credit, 20_000)])
+    _journal(tenant, actor, "JV-4", date(2026, 5, 10), FinanceJournalStatus.DRAFT, [(cash, debit, 999_000), (revenue, credit, 999_000)])
+    db.session.commit()
+    return {"tenant": tenant, "cash": cash, "revenue": revenue}
+
+
+def test_posted_account_totals_are_grouped_in_sql_and_skip_drafts(ledger_context):
+    tenant = ledger_context["tenant"]
+    cash = ledger_context["cash"]
+    revenue = ledger_context["revenue"]
+
+    totals = posted_account_totals(tenant.id, date(2026, 5, 1), date(2026, 5, 31))
+
+    assert totals == {cash.id: (70_000, 20_000), revenue.id: (20_000, 70_000)}
+    assert posted_account_totals(tenant.id, None, date(2026, 5, 31), account_ids=[cash.id]) == {cash.id: (120_000, 20_000)}
+
+
+def test_ledger_report_returns_lightweight_entries_with_running_balance(ledger_context):
+    tenant = ledger_context["tenant"]
+
+    opening_debit, opening_credit, rows, closing_debit, closing_credit = ledger_report(
+        tenant.id, ledger_context["cash"], date(2026, 5, 1), date(2026, 5, 31)
+    )
+
+    assert (opening_debit, opening_credit) == (50_000, 0)
+    assert all(isinstance(row, LedgerEntry) for row in rows)
+    assert [(row.journal_no, row.debit, row.credit, row.balance) for row in rows] == [
+        ("JV-2", 70_000, 0, 120_000),
+        ("JV-3", 0, 20_000, 100_000),
+    ]
+    assert (closing_debit, closing_credit) == (100_000, 0)
+
+
+def test_report_is_computed_once_per_request_shape(app, ledger_context):
+    tenant = ledger_context["tenant"]
+    with app.test_request_context("/admin/keuangan/laporan/neraca-saldo/export"):
+        first = _trial_balance_data(tenant.id, date(2026, 5, 1), date(2026, 5, 31))
+        second = _trial_balance_data(tenant.id, date(2026, 5, 1), date(2026, 5, 31))
+        other_range = _trial_balance_data(tenant.id, date(2026, 4, 1), date(2026, 4, 30))
+
+    assert second is first
+    assert other_range is not first
+    assert other_range[1] == 50_000
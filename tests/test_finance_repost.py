@@ -0,0 +1,173 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FeeType,
+    FinanceAccount,
+    FinanceAccountCategory,
+    FinanceCashBankAccount,
+    FinanceCashBankAccountType,
+    FinanceJournal,
+    FinanceJournalSourceType,
+    FinanceJournalStatus,
+    FinanceNormalBalance,
+    FinancePeriod,
+    FinancePeriodStatus,
+    FinanceSetting,
+    Invoice,
+    PaymentStatus,
+    SavingsTransactionStatus,
+    SavingsTransactionType,
+    Student,
+    StudentSavingsAccount,
+    StudentSavingsTransaction,
+    Tenant,
+    TenantStatus,
+    Transaction,
+    User,
+    UserRole,
+)
+from app.services.finance_reconciliation_service import (
+    bulk_repost_sources,
+    unposted_invoice_payment_transactions,
+    unposted_savings_transactions,
+)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _account(tenant, code, category, normal_balance):
+    account = FinanceAccount(tenant_id=tenant.id, code=code, name=code, category=category,
+                             normal_balance=normal_balance, is_active=True)
+    db.session.add(account)
+    db.session.flush()
+    return account
+
+
+@pytest.fixture()
+def ledger(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    users = []
+    for username, role in (("tu", UserRole.TU), ("siswa", UserRole.SISWA)):
+        user = User(tenant_id=tenant.id, username=username, email=f"{username}@example.test", role=role,
+                    must_change_password=False)
+        user.set_password("ValidPass123!")
+        users.append(user)
+    db.session.add_all(users)
+    db.session.flush()
+    tu, student_user = users
+    student = Student(user_id=student_user.id, nis="S001", full_name="Siswa Satu")
+    db.session.add(student)
+
+    cash = _account(tenant, "1010", FinanceAccountCategory.ASSET, FinanceNormalBalance.DEBIT)
+    revenue = _account(tenant, "4100", FinanceAccountCategory.REVENUE, FinanceNormalBalance.CREDIT)
+    liability = _account(tenant, "2100", FinanceAccountCategory.LIABILITY, FinanceNormalBalance.CREDIT)
+    cash_bank = FinanceCashBankAccount(tenant_id=tenant.id, account_name="Kas", gl_account_id=cash.id,
+                                       account_type=FinanceCashBankAccountType.CASH, is_active=True)
+    db.session.add(cash_bank)
+    db.session.flush()
+    db.session.add_all([
+        FinanceSetting(tenant_id=tenant.id, default_cash_bank_account_id=cash_bank.id,
+                       default_spp_revenue_account_id=revenue.id,
+                       default_savings_liability_account_id=liability.id),
+        FinancePeriod(tenant_id=tenant.id, name="2026-03", start_date=date(2026, 3, 1),
+                      end_date=date(2026, 3, 31), status=FinancePeriodStatus.OPEN),
+        FinancePeriod(tenant_id=tenant.id, name="2026-02", start_date=date(2026, 2, 1),
+                      end_date=date(2026, 2, 28), status=FinancePeriodStatus.LOCKED),
+    ])
+    fee = FeeType(tenant_id=tenant.id, name="SPP", amount=100_000)
+    db.session.add(fee)
+    db.session.flush()
+    invoice = Invoice(invoice_number="INV-1", student_id=student.id, fee_type_id=fee.id,
+                      total_amount=1_000_000, paid_amount=0, status=PaymentStatus.PARTIAL)
+    savings_account = StudentSavingsAccount(tenant_id=tenant.id, student_id=student.id, balance=0)
+    db.session.add_all([invoice, savings_account])
+    db.session.flush()
+
+    payments = [
+        Transaction(invoice_id=invoice.id, amount=amount, method="TUNAI", date=paid_at, pic_id=tu.id)
+        for amount, paid_at in (
+            (100_000, datetime(2026, 3, 2, 8)),
+            (0, datetime(2026, 3, 3, 8)),
+            (50_000, datetime(2026, 2, 20, 8)),
+            (25_000, datetime(2026, 3, 4, 8)),
+        )
+    ]
+    savings = StudentSavingsTransaction(
+        tenant_id=tenant.id, account_id=savings_account.id, student_id=student.id, amount=30_000,
+        transaction_type=SavingsTransactionType.DEPOSIT, status=SavingsTransactionStatus.APPROVED,
+        requested_by_user_id=tu.id, approved_at=datetime(2026, 3, 5, 8),
+    )
+    db.session.add_all([*payments, savings])
+    db.session.commit()
+    return {
+        "tenant_id": tenant.id,
+        "actor_id": tu.id,
+        "payment_ids": [trx.id for trx in payments],
+        "savings_id": savings.id,
+    }
+
+
+def test_bulk_repost_commits_per_chunk_and_isolates_bad_sources(app, ledger):
+    tenant_id = ledger["tenant_id"]
+    commits = []
+
+    def _count(connection):
+        commits.append(connection)
+
+    db.event.listen(db.engine, "commit", _count)
+    try:
+        result = bulk_repost_sources(tenant_id=tenant_id, source="invoice", actor_user_id=ledger["actor_id"],
+                                     chunk_size=2)
+    finally:
+        db.event.remove(db.engine, "commit", _count)
+
+    assert (result["success"], result["failed"]) == (3, 1)
+    assert len(commits) == 2
+    journals = {
+        journal.source_id: journal.status
+        for journal in FinanceJournal.query.filter_by(source_type=FinanceJournalSourceType.INVOICE_PAYMENT)
+    }
+    first, zero, locked, last = ledger["payment_ids"]
+    assert journals == {
+        first: FinanceJournalStatus.POSTED,
+        locked: FinanceJournalStatus.DRAFT,
+        last: FinanceJournalStatus.POSTED,
+    }
+    # Draft (periode terkunci) masih tampil di rekonsiliasi, tapi tidak diulang oleh engine.
+    assert sorted(trx.id for trx in unposted_invoice_payment_transactions(tenant_id)) == sorted([zero, locked])
+    assert [trx.id for trx in unposted_invoice_payment_transactions(tenant_id, posted_only=False)] == [zero]
+
+
+def test_bulk_repost_savings_uses_liability_account(ledger):
+    tenant_id = ledger["tenant_id"]
+    result = bulk_repost_sources(tenant_id=tenant_id, source="savings", actor_user_id=ledger["actor_id"])
+
+    assert (result["success"], result["failed"]) == (1, 0)
+    journal = FinanceJournal.query.filter_by(source_id=ledger["savings_id"]).one()
+    assert journal.status == FinanceJournalStatus.POSTED
+    assert journal.source_type == FinanceJournalSourceType.SAVINGS_DEPOSIT
+    assert unposted_savings_transactions(tenant_id).count() == 0
+    assert bulk_repost_sources(tenant_id=tenant_id, source="savings", actor_user_id=ledger["actor_id"])["success"] == 0
@@ -1,12 +1,15 @@
 import json
 
 import pytest
+from sqlalchemy import event
 
 from app import create_app
 from app.extensions import db
 from app.models import AppConfig, ReportScoreAdjustment, Tenant, User, UserRole
 from app.services.grade_formula_service import (
     GRADE_FORMULA_CONFIG_KEY,
+    REPORT_ADJUSTMENT_SOURCE_TAHFIDZ,
+    GradeFormulaResolver,
     calculate_weighted_final,
     resolve_grade_weights,
 )
@@ -114,3 +117,80 @@ def test_calculate_weighted_final_applies_active_report_adjustment(app):
     )
 
     assert result == 88
+
+
+@pytest.fixture()
+def query_counter(app):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", _count)
+
+
+def _adjustment(tenant, user, student_id, adjusted_score, subject_id=11, class_id=None, source_type="ACADEMIC"):
+    db.session.add(
+        ReportScoreAdjustment(
+            tenant_id=tenant.id,
+            student_id=student_id,
+            class_id=class_id,
+            academic_year_id=7,
+            subject_id=subject_id,
+            source_type=source_type,
+            original_score=70,
+            adjusted_score=adjusted_score,
+            reason="Koreksi",
+            approval_reference=f"BA-{student_id}-{adjusted_score}",
+            approved_by_user_id=user.id,
+            status="ACTIVE",
+        )
+    )
+
+
+def test_resolver_preloads_adjustments_for_many_students(app, query_counter):
+    tenant = _tenant_with_formula({"TUGAS": 50, "UAS": 50})
+    user = User(username="admin", email="admin@example.test", tenant_id=tenant.id, role=UserRole.ADMIN)
+    db.session.add(user)
+    db.session.flush()
+    _adjustment(tenant, user, student_id=10, adjusted_score=91, class_id=3)
+    _adjustment(tenant, user, student_id=11, adjusted_score=60, class_id=4)
+    _adjustment(tenant, user, student_id=12, adjusted_score=85, subject_id=None, source_type=REPORT_ADJUSTMENT_SOURCE_TAHFIDZ)
+    db.session.commit()
+
+    resolver = GradeFormulaResolver(tenant.id)
+    resolver.preload_adjustments([10, 11, 12, 13], [7])
+    resolver.weights(academic_year_id=7, subject_id=11)
+    query_counter.clear()
+
+    results = {
+        student_id: resolver.final_detail(
+            {"TUGAS": 80, "UAS": 90},
+            academic_year_id=7,
+            subject_id=11,
+            student_id=student_id,
+            class_id=3,
+        )["final_score"]
+        for student_id in (10, 11, 13)
+    }
+    tahfidz = resolver.adjustment(student_id=12, academic_year_id=7, source_type=REPORT_ADJUSTMENT_SOURCE_TAHFIDZ)
+
+    assert results == {10: 91, 11: 85, 13: 85}
+    assert tahfidz.adjusted_score == 85
+    assert query_counter == []
+
+
+def test_grade_formula_config_is_cached_until_changed(app, query_counter):
+    tenant = _tenant_with_formula({"TUGAS": 100})
+    assert resolve_grade_weights(tenant_id=tenant.id) == {"TUGAS": 100.0}
+
+    query_counter.clear()
+    assert resolve_grade_weights(tenant_id=tenant.id) == {"TUGAS": 100.0}
+    assert query_counter == []
+
+    row = AppConfig.query.filter_by(tenant_id=tenant.id, key=GRADE_FORMULA_CONFIG_KEY).one()
+    row.value = json.dumps({"UAS": 100})
+    db.session.commit()
+    assert resolve_grade_weights(tenant_id=tenant.id) == {"UAS": 100.0}
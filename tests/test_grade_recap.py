@@ -0,0 +1,231 @@
+import io
+from datetime import timedelta
+
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    AcademicYear,
+    ClassRoom,
+    Grade,
+    GradeType,
+    GroupType,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ReportScoreAdjustment,
+    Student,
+    Subject,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.routes.teacher import _academic_report_payload_for_homeroom
+from app.services.grade_recap_service import build_class_grade_recap
+from app.utils.timezone import utc_now_naive
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def query_counter(app):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", _count)
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+SCORES = {
+    # siswa -> mapel -> [(tipe, nilai)]
+    0: {"MTK": [(GradeType.TUGAS, 80), (GradeType.TUGAS, 90), (GradeType.UAS, 70)], "IPA": [(GradeType.UTS, 60)]},
+    1: {"MTK": [(GradeType.TUGAS, 95), (GradeType.UAS, 95)], "IPA": [(GradeType.UTS, 90), (GradeType.UAS, 80)]},
+    2: {"MTK": [(GradeType.UH, 85)]},
+}
+
+
+@pytest.fixture()
+def leger(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    year = AcademicYear(name="2025/2026", semester="Ganjil", is_active=True)
+    subjects = {code: Subject(code=code, name=name, kkm=75) for code, name in (("MTK", "Matematika"), ("IPA", "IPA"))}
+    db.session.add_all([teacher, year, *subjects.values()])
+    db.session.flush()
+    program = Program(tenant_id=tenant.id, code="UMUM", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="Kelas A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name="Kelas A", program_group_id=group.id, homeroom_teacher_id=teacher.id)
+    db.session.add(class_room)
+    db.session.flush()
+    students = []
+    for index, subject_scores in SCORES.items():
+        student = Student(user_id=_user(tenant, f"siswa{index}", UserRole.SISWA).id, nis=f"S{index}",
+                          full_name=f"Siswa {index}", current_class_id=class_room.id)
+        db.session.add(student)
+        db.session.flush()
+        students.append(student)
+        for code, items in subject_scores.items():
+            for grade_type, score in items:
+                db.session.add(Grade(student_id=student.id, subject_id=subjects[code].id, academic_year_id=year.id,
+                                     teacher_id=teacher.id, type=grade_type, score=score))
+    admin = _user(tenant, "pimpinan", UserRole.PIMPINAN)
+    db.session.add(ReportScoreAdjustment(
+        tenant_id=tenant.id, student_id=students[0].id, class_id=class_room.id, academic_year_id=year.id,
+        subject_id=subjects["IPA"].id, original_score=60, adjusted_score=76, reason="Remedial",
+        approval_reference="BA-01", approved_by_user_id=admin.id, status="ACTIVE",
+    ))
+    db.session.commit()
+    return {"tenant": tenant, "class_room": class_room, "students": students, "year": year, "subjects": subjects}
+
+
+def _recap(leger):
+    return build_class_grade_recap(
+        leger["students"],
+        tenant_id=leger["tenant"].id,
+        academic_year_ids=[leger["year"].id],
+        class_id=leger["class_room"].id,
+    )
+
+
+def test_recap_matches_homeroom_report_finals(leger):
+    recap = _recap(leger)
+    assert [subject["name"] for subject in recap["subjects"]] == ["IPA", "Matematika"]
+
+    for student in leger["students"]:
+        rows = Grade.query.filter_by(student_id=student.id).all()
+        expected = _academic_report_payload_for_homeroom(
+            rows, tenant_id=leger["tenant"].id, student_id=student.id, class_id=leger["class_room"].id,
+        )
+        row = next(item for item in recap["rows"] if item["student_id"] == student.id)
+        finals = {leger["subjects"]["MTK"].id: None, leger["subjects"]["IPA"].id: None}
+        finals.update({subject_id: cell["final_score"] for subject_id, cell in row["scores"].items()})
+        for summary in expected["summary_rows"]:
+            assert finals[summary["subject_id"]] == summary["final_score"]
+        assert row["final_average"] == expected["final_average"]
+
+
+def test_recap_ranks_students_and_averages_class(leger):
+    recap = _recap(leger)
+    by_name = {row["name"]: row for row in recap["rows"]}
+
+    assert [row["name"] for row in recap["rows"]] == ["Siswa 1", "Siswa 2", "Siswa 0"]
+    assert [by_name[name]["rank"] for name in ("Siswa 1", "Siswa 2", "Siswa 0")] == [1, 2, 3]
+    ipa_cell = by_name["Siswa 0"]["scores"][leger["subjects"]["IPA"].id]
+    assert ipa_cell["is_adjusted"] and ipa_cell["final_score"] == 76
+    assert ipa_cell["type_averages"] == {"UTS": 60.0}
+    ipa = next(subject for subject in recap["subjects"] if subject["name"] == "IPA")
+    assert ipa["average"] == round((76 + 85) / 2, 2)
+
+
+def test_recap_uses_year_of_newest_grade_like_homeroom_report(leger):
+    student = leger["students"][2]
+    subject = leger["subjects"]["MTK"]
+    old_year, class_id, tenant_id = leger["year"], leger["class_room"].id, leger["tenant"].id
+    # Tahun dengan id lebih besar, tetapi nilainya lebih lama daripada nilai tahun pertama.
+    new_year = AcademicYear(name="2026/2027", semester="Ganjil", is_active=False)
+    db.session.add(new_year)
+    db.session.flush()
+    db.session.add(Grade(student_id=student.id, subject_id=subject.id, academic_year_id=new_year.id,
+                         teacher_id=Teacher.query.first().id, type=GradeType.UH, score=70,
+                         created_at=utc_now_naive() - timedelta(days=30)))
+    db.session.add(ReportScoreAdjustment(
+        tenant_id=tenant_id, student_id=student.id, class_id=class_id, academic_year_id=old_year.id,
+        subject_id=subject.id, original_score=77.5, adjusted_score=88, reason="Remedial",
+        approval_reference="BA-02", approved_by_user_id=User.query.filter_by(username="pimpinan").one().id,
+        status="ACTIVE",
+    ))
+    db.session.commit()
+
+    recap = build_class_grade_recap(
+        leger["students"], tenant_id=tenant_id, academic_year_ids=[old_year.id, new_year.id], class_id=class_id,
+    )
+    rows = Grade.query.filter_by(student_id=student.id).order_by(Grade.created_at.desc(), Grade.id.desc()).all()
+    expected = _academic_report_payload_for_homeroom(rows, tenant_id=tenant_id, student_id=student.id, class_id=class_id)
+    cell = next(row for row in recap["rows"] if row["student_id"] == student.id)["scores"][subject.id]
+
+    assert cell["is_adjusted"] and cell["final_score"] == 88
+    assert expected["summary_rows"][0]["final_score"] == cell["final_score"]
+
+
+def test_recap_query_count_does_not_grow_with_students(leger, query_counter):
+    students = [student for student in leger["students"] if student.full_name]
+    tenant_id, year_id, class_id = leger["tenant"].id, leger["year"].id, leger["class_room"].id
+    query_counter.clear()
+
+    build_class_grade_recap(students, tenant_id=tenant_id, academic_year_ids=[year_id], class_id=class_id)
+    # Snapshot tenant (2), agregasi nilai, adjustment, dan nama mapel.
+    assert len(query_counter) <= 5
+
+
+def test_teacher_leger_page_and_xlsx_export(app, leger):
+    client = app.test_client()
+    assert client.post("/auth/login", data={"login_id": "guru", "password": PASSWORD}).status_code == 302
+
+    class_id = leger["class_room"].id
+    response = client.get(f"/teacher/leger-nilai?class_id={class_id}")
+    assert response.status_code == 200
+    assert "Siswa 2" in response.get_data(as_text=True)
+
+    export = client.get(f"/teacher/leger-nilai?class_id={class_id}&export=xlsx")
+    assert export.status_code == 200
+    sheet = load_workbook(io.BytesIO(export.data), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("No", "NIS", "Nama", "IPA", "Matematika", "Rata-rata", "Peringkat")
+    assert len(rows) == 1 + len(leger["students"]) + 1
+
+
+def test_leadership_can_open_leger(app, leger):
+    client = app.test_client()
+    assert client.post("/auth/login", data={"login_id": "pimpinan", "password": PASSWORD}).status_code == 302
+    response = client.get("/admin/akademik/leger-nilai")
+    assert response.status_code == 200
+    assert "Leger Nilai Kelas A" in response.get_data(as_text=True)
@@ -0,0 +1,137 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import ClassRoom, FeeType, Invoice, PaymentStatus, ProgramType, Student, Tenant, User, UserRole
+from app.services.invoice_generation_service import generate_fee_invoices
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def billing_context(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+
+    fullday_class = ClassRoom(name="7A", program_type=ProgramType.SEKOLAH_FULLDAY)
+    rqdf_class = ClassRoom(name="RQ-1", program_type=ProgramType.RQDF_SORE)
+    db.session.add_all([fullday_class, rqdf_class])
+    db.session.flush()
+
+    students = []
+    for index in range(6):
+        user = User(
+            tenant_id=tenant.id,
+            username=f"S{index:03d}",
+            email=f"s{index}@example.test",
+            role=UserRole.SISWA,
+            must_change_password=False,
+        )
+        student = Student(
+            user=user,
+            nis=f"S{index:03d}",
+            full_name=f"Santri {index}",
+            current_class_id=rqdf_class.id if index >= 4 else fullday_class.id,
+            custom_spp_fee=75_000 if index == 1 else None,
+        )
+        db.session.add_all([user, student])
+        students.append(student)
+
+    spp = FeeType(tenant_id=tenant.id, name="SPP Bulanan", amount=150_000)
+    db.session.add(spp)
+    db.session.flush()
+    db.session.add(Invoice(
+        invoice_number="INV-LAMA-1",
+        student_id=students[0].id,
+        fee_type_id=spp.id,
+        total_amount=150_000,
+        status=PaymentStatus.UNPAID,
+    ))
+    db.session.commit()
+    return {"tenant": tenant, "students": students, "spp": spp}
+
+
+def _students_query(tenant):
+    return Student.query.join(User, Student.user_id == User.id).filter(User.tenant_id == tenant.id)
+
+
+def test_dry_run_reports_counts_without_writing(billing_context):
+    tenant = billing_context["tenant"]
+    spp = billing_context["spp"]
+
+    result = generate_fee_invoices(
+        tenant_id=tenant.id,
+        fee=spp,
+        student_query=_students_query(tenant),
+        enforce_program_rule=True,
+        dry_run=True,
+    )
+
+    assert (result.total_target, result.created, result.skipped_duplicate, result.skipped_program) == (6, 3, 1, 2)
+    assert [row["total_amount"] for row in result.preview_rows] == [75_000, 150_000, 150_000]
+    assert Invoice.query.count() == 1
+
+
+def test_bulk_generation_inserts_sequenced_numbers_and_skips_duplicates(billing_context):
+    tenant = billing_context["tenant"]
+    spp = billing_context["spp"]
+
+    first = generate_fee_invoices(tenant_id=tenant.id, fee=spp, student_query=_students_query(tenant))
+    db.session.commit()
+    assert (first.created, first.skipped_duplicate) == (5, 1)
+
+    numbers = [
+        invoice.invoice_number
+        for invoice in Invoice.query.filter(Invoice.invoice_number != "INV-LAMA-1").order_by(Invoice.id.asc())
+    ]
+    assert numbers == [f"INV-T{tenant.id}-F{spp.id}-{seq:06d}" for seq in range(1, 6)]
+
+    cancelled = Invoice.query.filter_by(invoice_number=numbers[-1]).one()
+    cancelled.is_deleted = True
+    db.session.commit()
+
+    second = generate_fee_invoices(tenant_id=tenant.id, fee=spp, student_query=_students_query(tenant))
+    db.session.commit()
+    assert (second.created, second.skipped_duplicate) == (1, 5)
+    reissued = Invoice.query.filter_by(student_id=cancelled.student_id).one()
+    assert reissued.invoice_number == f"INV-T{tenant.id}-F{spp.id}-000006"
+    assert reissued.status == PaymentStatus.UNPAID
+
+
+def test_next_sequence_compares_numbers_not_strings(billing_context):
+    tenant = billing_context["tenant"]
+    spp = billing_context["spp"]
+    students = billing_context["students"]
+    prefix = f"INV-T{tenant.id}-F{spp.id}-"
+    for student, suffix in ((students[1], "999999"), (students[2], "1000000")):
+        db.session.add(Invoice(invoice_number=f"{prefix}{suffix}", student_id=student.id, fee_type_id=spp.id,
+                               total_amount=150_000, status=PaymentStatus.UNPAID))
+    db.session.commit()
+
+    result = generate_fee_invoices(tenant_id=tenant.id, fee=spp, student_query=_students_query(tenant))
+    db.session.commit()
+
+    assert result.created == 3
+    new_numbers = sorted(
+        invoice.invoice_number for invoice in Invoice.query.filter(Invoice.student_id.in_(
+            [student.id for student in students[3:]]
+        ))
+    )
+    assert new_numbers == [f"{prefix}{seq}" for seq in (1000001, 1000002, 1000003)]
@@ -0,0 +1,154 @@
+import threading
+from datetime import date
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    FinanceJournal,
+    FinanceJournalSequence,
+    FinanceJournalStatus,
+    FinanceSetting,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.services.journal_number_service import JournalNumberPool, generate_journal_no
+
+
+MARCH = date(2026, 3, 10)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def tenant(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    user = User(tenant_id=tenant.id, username="tu", email="tu@example.test", role=UserRole.TU,
+                must_change_password=False)
+    user.set_password("ValidPass123!")
+    db.session.add(user)
+    db.session.commit()
+    return {"id": tenant.id, "user_id": user.id}
+
+
+def _sequence_value(tenant_id, year_month):
+    return db.session.query(FinanceJournalSequence.last_value).filter_by(
+        tenant_id=tenant_id, year_month=year_month
+    ).scalar()
+
+
+def _journal(tenant, journal_date):
+    journal = FinanceJournal(
+        tenant_id=tenant["id"],
+        journal_no=generate_journal_no(tenant_id=tenant["id"], journal_date=journal_date),
+        journal_date=journal_date,
+        status=FinanceJournalStatus.DRAFT,
+        created_by_user_id=tenant["user_id"],
+    )
+    db.session.add(journal)
+    db.session.flush()
+    return journal
+
+
+def test_in_transaction_numbers_are_sequential(tenant):
+    numbers = [generate_journal_no(tenant_id=tenant["id"], journal_date=MARCH) for _ in range(3)]
+    db.session.commit()
+
+    assert numbers == ["JV-2026-03-0001", "JV-2026-03-0002", "JV-2026-03-0003"]
+    assert _sequence_value(tenant["id"], "2026-03") == 3
+
+
+def test_pool_reserves_blocks_in_committed_transactions(tenant):
+    pool = JournalNumberPool()
+    values = [pool.next_value(tenant["id"], "2026-03", 3) for _ in range(4)]
+
+    assert values == [1, 2, 3, 4]
+    # Dua blok sudah ter-commit meski sesi tidak pernah di-commit.
+    db.session.rollback()
+    assert _sequence_value(tenant["id"], "2026-03") == 6
+
+
+def test_pool_hands_out_unique_numbers_across_threads():
+    reservations = []
+    reserve_lock = threading.Lock()
+    last = {"value": 0}
+
+    def reserve(tenant_id, year_month, size):
+        with reserve_lock:
+            reservations.append(size)
+            start = last["value"] + 1
+            last["value"] += size
+            return start, last["value"]
+
+    pool = JournalNumberPool(reserve_block=reserve)
+    values = []
+
+    def worker():
+        for _ in range(25):
+            values.append(pool.next_value(1, "2026-03", 10))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(values) == list(range(1, 201))
+    assert len(reservations) == 20
+
+
+def test_gapless_tenant_gets_final_numbers_after_commit(tenant):
+    db.session.add(FinanceSetting(tenant_id=tenant["id"], gapless_journal_numbers=True))
+    db.session.commit()
+
+    first = _journal(tenant, MARCH)
+    assert first.journal_no.startswith("TMP-")
+    db.session.commit()
+
+    _journal(tenant, MARCH)
+    db.session.rollback()
+
+    second = _journal(tenant, MARCH)
+    april = _journal(tenant, date(2026, 4, 2))
+    db.session.commit()
+
+    assert first.journal_no == "JV-2026-03-0001"
+    assert second.journal_no == "JV-2026-03-0002"
+    assert april.journal_no == "JV-2026-04-0001"
+    assert _sequence_value(tenant["id"], "2026-03") == 2
+
+
+def test_gapless_numbers_wait_for_outer_commit(tenant):
+    db.session.add(FinanceSetting(tenant_id=tenant["id"], gapless_journal_numbers=True))
+    db.session.commit()
+
+    journal = _journal(tenant, MARCH)
+    with db.session.begin_nested():
+        _journal(tenant, MARCH)
+    assert journal.journal_no.startswith("TMP-")
+    db.session.commit()
+
+    numbers = [row.journal_no for row in FinanceJournal.query.order_by(FinanceJournal.id)]
+    assert numbers == ["JV-2026-03-0001", "JV-2026-03-0002"]
@@ -0,0 +1,221 @@
+from datetime import timedelta
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Announcement,
+    Attendance,
+    AttendanceStatus,
+    ClassRoom,
+    FeeType,
+    Invoice,
+    Parent,
+    ProgramType,
+    Student,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.services import invoice_generation_service
+from app.services.invoice_generation_service import generate_fee_invoices
+from app.utils.timezone import utc_now_naive
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+    MOBILE_SYNC_SETTLE_SECONDS = 0
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def family(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    class_room = ClassRoom(name="7A", program_type=ProgramType.SEKOLAH_FULLDAY)
+    db.session.add(class_room)
+    db.session.flush()
+    parent = Parent(user_id=_user(tenant, "wali", UserRole.WALI_MURID).id, full_name="Bapak Wali", phone="0811")
+    db.session.add(parent)
+    db.session.flush()
+    child = Student(user_id=_user(tenant, "anak", UserRole.SISWA).id, parent_id=parent.id, nis="S1",
+                    full_name="Anak Wali", current_class_id=class_room.id)
+    stranger = Student(user_id=_user(tenant, "lain", UserRole.SISWA).id, nis="S2", full_name="Siswa Lain")
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    db.session.add_all([child, stranger, teacher])
+    db.session.flush()
+    db.session.add_all([
+        Invoice(invoice_number="INV-1", student_id=child.id, total_amount=100000),
+        Invoice(invoice_number="INV-2", student_id=stranger.id, total_amount=70000),
+        Attendance(student_id=child.id, class_id=class_room.id, teacher_id=teacher.id, status=AttendanceStatus.HADIR),
+        Announcement(title="Umum", content="Untuk semua."),
+        Announcement(title="Privat", content="Untuk siswa lain.", target_scope="USER", target_user_id=stranger.user_id),
+    ])
+    db.session.commit()
+    return {"child": child, "class_room": class_room, "teacher": teacher}
+
+
+def _headers(client, username):
+    response = client.post("/api/v1/auth/login", json={"identifier": username, "password": PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.get_json()['data']['access_token']}"}
+
+
+def _sync(client, headers, cursor=None, **params):
+    if cursor:
+        params["cursor"] = cursor
+    response = client.get("/api/v1/sync", headers=headers, query_string=params)
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_initial_sync_returns_only_visible_rows(client, family):
+    data = _sync(client, _headers(client, "wali"))
+
+    changes = data["changes"]
+    assert [row["invoice_number"] for row in changes["invoices"]["upserts"]] == ["INV-1"]
+    assert [row["status"] for row in changes["attendance"]["upserts"]] == ["HADIR"]
+    assert [row["title"] for row in changes["announcements"]["upserts"]] == ["Umum"]
+    assert all(not item["deletes"] for item in changes.values())
+    assert data["student_ids"] == [family["child"].id]
+    assert data["has_more"] is False and data["reset"] is False
+
+
+def test_delta_sync_returns_changes_and_tombstones(client, family):
+    headers = _headers(client, "wali")
+    cursor = _sync(client, headers)["cursor"]
+
+    empty = _sync(client, headers, cursor)
+    assert all(not item["upserts"] and not item["deletes"] for item in empty["changes"].values())
+
+    invoice = Invoice.query.filter_by(invoice_number="INV-1").one()
+    invoice.paid_amount = 40000
+    invoice_id = invoice.id
+    attendance = Attendance.query.one()
+    attendance.is_deleted = True
+    attendance_id = attendance.id
+    db.session.add(Invoice(invoice_number="INV-3", student_id=family["child"].id, total_amount=25000))
+    db.session.commit()
+
+    delta = _sync(client, headers, empty["cursor"])["changes"]
+    assert [(row["id"], row["paid_amount"]) for row in delta["invoices"]["upserts"]][0] == (invoice_id, 40000)
+    assert [row["invoice_number"] for row in delta["invoices"]["upserts"]] == ["INV-1", "INV-3"]
+    assert delta["attendance"] == {"upserts": [], "deletes": [attendance_id]}
+
+
+def test_sync_pages_with_has_more(client, family):
+    headers = _headers(client, "wali")
+    for index in range(3):
+        db.session.add(Invoice(invoice_number=f"INV-X{index}", student_id=family["child"].id, total_amount=1000))
+    db.session.commit()
+
+    first = _sync(client, headers, limit=2)
+    assert first["has_more"] is True
+    assert len(first["changes"]["invoices"]["upserts"]) == 2
+
+    second = _sync(client, headers, first["cursor"], limit=2)
+    third = _sync(client, headers, second["cursor"], limit=2)
+    numbers = [row["invoice_number"] for page in (first, second, third) for row in page["changes"]["invoices"]["upserts"]]
+    assert sorted(numbers) == ["INV-1", "INV-X0", "INV-X1", "INV-X2"]
+    assert third["has_more"] is False
+
+
+def test_cursor_is_signed_and_scope_changes_force_reset(client, family):
+    headers = _headers(client, "wali")
+    response = client.get("/api/v1/sync", headers=headers, query_string={"cursor": "tampered"})
+    assert response.status_code == 400
+    assert response.get_json()["code"] == "invalid_cursor"
+
+    cursor = _sync(client, headers)["cursor"]
+    child = db.session.get(Student, family["child"].id)
+    child.current_class_id = None
+    db.session.commit()
+
+    data = _sync(client, headers, cursor)
+    assert data["reset"] is True
+    assert [row["invoice_number"] for row in data["changes"]["invoices"]["upserts"]] == ["INV-1"]
+
+
+def test_announcement_sync_skips_other_audiences_and_tombstones_deactivated(client, family):
+    headers = _headers(client, "wali")
+    stranger = Student.query.filter_by(nis="S2").one()
+    for index in range(3):
+        db.session.add(Announcement(title=f"Privat {index}", content="Bukan untuk wali.",
+                                    target_scope="USER", target_user_id=stranger.user_id))
+    db.session.commit()
+
+    first = _sync(client, headers, limit=1)
+    assert [row["title"] for row in first["changes"]["announcements"]["upserts"]] == ["Umum"]
+    assert first["has_more"] is False
+
+    announcement = Announcement.query.filter_by(title="Umum").one()
+    announcement.is_active = False
+    db.session.commit()
+
+    delta = _sync(client, headers, first["cursor"], limit=1)
+    assert delta["changes"]["announcements"] == {"upserts": [], "deletes": [announcement.id]}
+
+
+def test_rows_committed_behind_an_advanced_cursor_are_still_synced(client, family, monkeypatch):
+    headers = _headers(client, "wali")
+    cursor = _sync(client, headers)["cursor"]
+    tenant_id = User.query.filter_by(username="wali").one().tenant_id
+    fee = FeeType(tenant_id=tenant_id, name="Seragam", amount=50000)
+    db.session.add(fee)
+    db.session.commit()
+
+    # Job penerbitan tagihan mencap baris jauh sebelum commit-nya; cursor klien sudah lewat cap itu.
+    started_at = utc_now_naive() - timedelta(hours=1)
+    monkeypatch.setattr(invoice_generation_service, "utc_now_naive", lambda: started_at)
+    result = generate_fee_invoices(
+        tenant_id=tenant_id,
+        fee=fee,
+        student_query=Student.query.filter(Student.id == family["child"].id),
+    )
+    db.session.commit()
+
+    assert result.created == 1
+    invoice = Invoice.query.filter_by(fee_type_id=fee.id).one()
+    assert invoice.updated_at > started_at
+    delta = _sync(client, headers, cursor)["changes"]["invoices"]
+    assert [row["id"] for row in delta["upserts"]] == [invoice.id]
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import MobileRevokedToken, Tenant, TenantStatus, User, UserRole
+from app.utils.mobile_api_auth import (
+    REVOKED_TOKEN_CACHE_KEY,
+    TOKEN_TYPE_ACCESS,
+    cleanup_expired_revoked_tokens,
+    mobile_token_hash,
+)
+from app.utils.timezone import utc_now_naive
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+    MOBILE_REVOKED_TOKEN_REFRESH_SECONDS = 60
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def tenant(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    user = User(
+        tenant_id=tenant.id,
+        username="siswa",
+        email="siswa@example.test",
+        role=UserRole.SISWA,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return tenant
+
+
+def login_mobile(client):
+    response = client.post("/api/v1/auth/login", json={"identifier": "siswa", "password": PASSWORD})
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def bearer_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self)
+
+
+def test_authenticated_request_does_not_touch_revocation_table(client, tenant):
+    tokens = login_mobile(client)
+    assert client.get("/api/v1/auth/me", headers=bearer_headers(tokens["access_token"])).status_code == 200
+
+    with StatementRecorder() as recorder:
+        response = client.get("/api/v1/auth/me", headers=bearer_headers(tokens["access_token"]))
+
+    assert response.status_code == 200
+    assert not [sql for sql in recorder.statements if sql.lstrip().upper().startswith("DELETE")]
+    assert not [sql for sql in recorder.statements if "mobile_revoked_tokens" in sql]
+    assert not [sql for sql in recorder.statements if "FROM tenants" in sql]
+    assert len(recorder.statements) <= 2
+
+
+def test_logout_revokes_access_token_immediately(client, tenant):
+    tokens = login_mobile(client)
+    headers = bearer_headers(tokens["access_token"])
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    assert client.post("/api/v1/auth/logout", json={}, headers=headers).status_code == 200
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Token sudah tidak berlaku."
+
+
+def test_revocation_from_another_worker_is_picked_up_on_next_sync(app, client, tenant):
+    tokens = login_mobile(client)
+    headers = bearer_headers(tokens["access_token"])
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    db.session.add(
+        MobileRevokedToken(
+            token_hash=mobile_token_hash(tokens["access_token"]),
+            token_type=TOKEN_TYPE_ACCESS,
+            expires_at=utc_now_naive() + timedelta(hours=1),
+        )
+    )
+    db.session.commit()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    app.extensions[REVOKED_TOKEN_CACHE_KEY]._next_sync = 0
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+
+def test_cleanup_removes_only_expired_revocations(app, tenant):
+    now = utc_now_naive()
+    db.session.add_all([
+        MobileRevokedToken(token_hash="a" * 64, token_type=TOKEN_TYPE_ACCESS, expires_at=now - timedelta(minutes=1)),
+        MobileRevokedToken(token_hash="b" * 64, token_type=TOKEN_TYPE_ACCESS, expires_at=now + timedelta(hours=1)),
+    ])
+    db.session.commit()
+
+    assert cleanup_expired_revoked_tokens() == 1
+    db.session.commit()
+
+    assert [row.token_hash for row in MobileRevokedToken.query.all()] == ["b" * 64]
@@ -0,0 +1,189 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Announcement,
+    BackgroundJob,
+    BackgroundJobStatus,
+    ClassRoom,
+    GroupType,
+    MobileDeviceToken,
+    NotificationQueue,
+    Parent,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ProgramType,
+    Student,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.services.job_queue_service import run_job
+from app.utils.push_notifications import (
+    announcement_push_tokens,
+    get_push_transport,
+    notify_announcement_created,
+)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+    BACKGROUND_JOBS_EAGER = True
+    PUSH_TRANSPORT = "stub"
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role, token=None):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password("ValidPass123!")
+    db.session.add(user)
+    db.session.flush()
+    if token:
+        db.session.add(MobileDeviceToken(user_id=user.id, token=token, platform="android"))
+    return user
+
+
+@pytest.fixture()
+def school(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    author = _user(tenant, "tu", UserRole.TU, token="tok-author")
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU, token="tok-guru").id, nip="G1", full_name="Guru")
+    db.session.add(teacher)
+    db.session.flush()
+
+    program = Program(tenant_id=tenant.id, code="UMUM", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    classes = []
+    for name in ("Kelas A", "Kelas B"):
+        group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name=name, group_type=GroupType.CLASS)
+        db.session.add(group)
+        db.session.flush()
+        class_room = ClassRoom(name=name, program_group_id=group.id, program_type=ProgramType.RQDF_SORE,
+                               homeroom_teacher_id=teacher.id if name == "Kelas A" else None)
+        db.session.add(class_room)
+        db.session.flush()
+        classes.append(class_room)
+
+    for index, class_room in enumerate(classes):
+        parent_user = _user(tenant, f"wali{index}", UserRole.WALI_MURID, token=f"tok-wali{index}")
+        parent = Parent(user_id=parent_user.id, full_name=f"Wali {index}", phone=f"08100000{index}")
+        db.session.add(parent)
+        db.session.flush()
+        student_user = _user(tenant, f"siswa{index}", UserRole.SISWA, token=f"tok-siswa{index}")
+        db.session.add(Student(user_id=student_user.id, nis=f"S{index}", full_name=f"Siswa {index}",
+                               current_class_id=class_room.id, parent_id=parent.id))
+    _user(tenant, "lain", UserRole.SISWA, token="tok-lain")
+    db.session.commit()
+    return {"tenant": tenant, "author": author, "classes": classes}
+
+
+def _announcement(school, **target):
+    announcement = Announcement(title="Libur", content="Sekolah libur besok.", user_id=school["author"].id, **target)
+    db.session.add(announcement)
+    db.session.commit()
+    return announcement
+
+
+def _sent_tokens(transport):
+    return sorted(token for tokens, _ in transport.sent for token in tokens)
+
+
+def test_class_announcement_is_batched_and_delivered(app, school):
+    app.config["PUSH_BATCH_SIZE"] = 2
+    announcement = _announcement(school, target_scope="CLASS", target_class_id=school["classes"][0].id)
+
+    job = notify_announcement_created(announcement)
+
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.result["sent"] == 3
+    assert _sent_tokens(get_push_transport()) == ["tok-guru", "tok-siswa0", "tok-wali0"]
+    batches = NotificationQueue.query.order_by(NotificationQueue.id).all()
+    assert [batch.token_count for batch in batches] == [2, 1]
+    assert {batch.status for batch in batches} == {"SENT"}
+
+
+def test_invalid_tokens_are_deactivated(app, school):
+    transport = get_push_transport()
+    transport.invalid_tokens = {"tok-siswa1", "tok-lain"}
+    announcement = _announcement(school, target_scope="ALL")
+
+    job = notify_announcement_created(announcement)
+
+    assert job.result["invalid"] == 2
+    assert "tok-author" not in _sent_tokens(transport)
+    inactive = {row.token for row in MobileDeviceToken.query.filter_by(is_active=False)}
+    assert inactive == {"tok-siswa1", "tok-lain"}
+    batch = NotificationQueue.query.one()
+    assert (batch.sent_count, batch.invalid_count) == (4, 2)
+
+
+def test_transport_failure_is_retried_without_rematerializing(app, school):
+    transport = get_push_transport()
+    transport.failures = 1
+    announcement = _announcement(school, target_scope="ROLE", target_role=UserRole.WALI_MURID.value)
+
+    job = notify_announcement_created(announcement)
+    assert job.status == BackgroundJobStatus.QUEUED
+    batch = NotificationQueue.query.one()
+    assert (batch.status, batch.attempts) == ("PENDING", 1)
+    assert json.loads(batch.tokens_json) == ["tok-wali0", "tok-wali1"]
+
+    job = db.session.get(BackgroundJob, job.id)
+    job.attempts += 1
+    run_job(job)
+
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert NotificationQueue.query.count() == 1
+    assert NotificationQueue.query.one().status == "SENT"
+    assert _sent_tokens(transport) == ["tok-wali0", "tok-wali1"]
+
+
+def test_program_recipients_resolved_in_one_query(app, school):
+    announcement = _announcement(school, target_scope="PROGRAM", target_program_type=ProgramType.RQDF_SORE.name)
+    tenant_id = school["tenant"].id
+    announcement_id = announcement.id
+    announcement = db.session.get(Announcement, announcement_id)
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    try:
+        tokens = announcement_push_tokens(announcement, tenant_id)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _count)
+
+    assert len(statements) == 1
+    assert sorted(tokens) == ["tok-guru", "tok-siswa0", "tok-siswa1", "tok-wali0", "tok-wali1"]
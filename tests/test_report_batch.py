@@ -0,0 +1,185 @@
+import io
+import zipfile
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    AcademicYear,
+    BackgroundJob,
+    ClassRoom,
+    Grade,
+    GradeType,
+    GroupType,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    Student,
+    Subject,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.routes.teacher import _build_student_report_payload, _StudentReportBatch
+from app.services.job_queue_service import enqueue_job
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+    BACKGROUND_JOBS_EAGER = True
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def homeroom(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    teacher = Teacher(user_id=_user(tenant, "guru", UserRole.GURU).id, nip="G1", full_name="Ustadz Ahmad")
+    year = AcademicYear(name="2025/2026", semester="Ganjil", is_active=True)
+    subject = Subject(code="MTK", name="Matematika")
+    db.session.add_all([teacher, year, subject])
+    db.session.flush()
+    program = Program(tenant_id=tenant.id, code="UMUM", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="Kelas A", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name="Kelas A", program_group_id=group.id, homeroom_teacher_id=teacher.id)
+    db.session.add(class_room)
+    db.session.flush()
+    students = [
+        Student(user_id=_user(tenant, f"siswa{index}", UserRole.SISWA).id, nis=f"S{index}",
+                full_name=f"Siswa Nomor {index}", current_class_id=class_room.id)
+        for index in range(3)
+    ]
+    db.session.add_all(students)
+    db.session.flush()
+    for index, student in enumerate(students):
+        for grade_type, score in ((GradeType.TUGAS, 70 + index), (GradeType.UAS, 80 + index)):
+            db.session.add(Grade(student_id=student.id, subject_id=subject.id, academic_year_id=year.id,
+                                 teacher_id=teacher.id, type=grade_type, score=score))
+    db.session.commit()
+    return {"teacher": teacher, "class_room": class_room, "students": students, "year": year}
+
+
+def _login(app):
+    client = app.test_client()
+    response = client.post("/auth/login", data={"login_id": "guru", "password": PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+def test_batch_payload_matches_single_student_payload(app, homeroom):
+    teacher = homeroom["teacher"]
+    year_id = homeroom["year"].id
+    with app.test_request_context():
+        batch = _StudentReportBatch(teacher, homeroom["students"], academic_year_id_raw=year_id)
+        for student in homeroom["students"]:
+            single = _build_student_report_payload(teacher, student, academic_year_id_raw=year_id)
+            batched = batch.payload_for(student)
+            for key in ("formal_report", "tahfidz_report", "attendance", "behavior", "report_sections"):
+                assert batched[key] == single[key]
+            assert batched["formal_report"]["summary_rows"]
+
+
+def test_class_report_route_renders_all_students(app, homeroom):
+    client = _login(app)
+    class_id = homeroom["class_room"].id
+    response = client.get(f"/teacher/cetak-raport/kelas/{class_id}?academic_year_id={homeroom['year'].id}")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    for student in homeroom["students"]:
+        assert student.full_name in body
+
+
+def test_class_report_zip_contains_one_file_per_student(app, homeroom):
+    client = _login(app)
+    class_id = homeroom["class_room"].id
+    response = client.get(f"/teacher/cetak-raport/kelas/{class_id}?format=zip")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert len(archive.namelist()) == len(homeroom["students"])
+
+
+def test_class_report_background_job_stores_download(app, homeroom):
+    client = _login(app)
+    class_id = homeroom["class_room"].id
+    response = client.get(f"/teacher/cetak-raport/kelas/{class_id}?format=zip&background=1")
+    assert response.status_code == 302
+
+    job = BackgroundJob.query.filter_by(job_type="print_report_batch").one()
+    assert job.has_output
+    assert job.output_filename.endswith(".zip")
+
+    download = client.get(f"/jobs/{job.id}/download")
+    assert download.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(download.data)) as archive:
+        assert len(archive.namelist()) == len(homeroom["students"])
+
+
+def test_class_report_rejects_non_homeroom_class(app, homeroom):
+    homeroom["class_room"].homeroom_teacher_id = None
+    db.session.commit()
+    client = _login(app)
+    response = client.get(f"/teacher/cetak-raport/kelas/{homeroom['class_room'].id}")
+    assert response.status_code == 302
+
+
+def test_class_report_download_is_hidden_from_other_teachers(app, homeroom):
+    tenant_id = homeroom["students"][0].user.tenant_id
+    other = Teacher(user_id=_user(homeroom["students"][0].user.tenant, "guru2", UserRole.GURU).id,
+                    nip="G2", full_name="Ustadz Lain")
+    db.session.add(other)
+    db.session.commit()
+    job = enqueue_job(
+        "print_report_batch",
+        tenant_id=tenant_id,
+        created_by_user_id=homeroom["teacher"].user_id,
+        payload={"teacher_id": homeroom["teacher"].id, "class_id": homeroom["class_room"].id,
+                 "output_format": "zip"},
+    )
+    assert job.has_output
+
+    client = app.test_client()
+    client.post("/auth/login", data={"login_id": "guru2", "password": PASSWORD})
+
+    assert client.get(f"/jobs/{job.id}/download").status_code == 404
+    assert client.get(f"/jobs/{job.id}").status_code == 404
@@ -0,0 +1,176 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    ClassRoom,
+    Gender,
+    GroupType,
+    Parent,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    Student,
+    Tenant,
+    TenantStatus,
+    User,
+    UserRole,
+)
+from app.services.student_directory_service import student_autocomplete, student_directory_page
+
+
+PASSWORD = "ValidPass123!"
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture()
+def directory(app):
+    tenant = Tenant(name="Tenant", slug="tenant", code="TENANT", status=TenantStatus.ACTIVE, is_default=True)
+    other_tenant = Tenant(name="Lain", slug="lain", code="LAIN", status=TenantStatus.ACTIVE)
+    db.session.add_all([tenant, other_tenant])
+    db.session.flush()
+    _user(tenant, "admin", UserRole.ADMIN)
+    _user(tenant, "tu", UserRole.TU)
+
+    program = Program(tenant_id=tenant.id, code="UMUM", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    groups = [
+        ProgramGroup(tenant_id=tenant.id, program_id=program.id, name=name, group_type=GroupType.CLASS)
+        for name in ("Kelas 1 SD", "Kelas 7 SMP")
+    ]
+    db.session.add_all(groups)
+    db.session.flush()
+    class_sd = ClassRoom(name="Kelas 1 SD", grade_level=1, program_group_id=groups[0].id)
+    class_smp = ClassRoom(name="Kelas 7 SMP", grade_level=7, program_group_id=groups[1].id)
+    db.session.add_all([class_sd, class_smp])
+    db.session.flush()
+
+    parent = Parent(user_id=_user(tenant, "wali", UserRole.WALI_MURID).id,
+                    full_name="Bapak Hasan", phone="081234567890")
+    db.session.add(parent)
+    db.session.flush()
+
+    students = []
+    for index in range(7):
+        students.append(Student(
+            user_id=_user(tenant, f"siswa{index}", UserRole.SISWA).id,
+            nis=f"N{index:03d}",
+            full_name=f"Siswa {index}",
+            gender=Gender.L,
+            current_class_id=class_sd.id if index % 2 == 0 else class_smp.id,
+            parent_id=parent.id if index == 3 else None,
+        ))
+    students.append(Student(user_id=_user(other_tenant, "asing", UserRole.SISWA).id,
+                            nis="X001", full_name="Siswa Asing", gender=Gender.P))
+    db.session.add_all(students)
+    db.session.commit()
+    return {
+        "tenant_id": tenant.id,
+        "student_ids": [student.id for student in students[:7]],
+    }
+
+
+def test_keyset_pages_walk_forward_and_back(directory):
+    tenant_id = directory["tenant_id"]
+    expected = sorted(directory["student_ids"], reverse=True)
+
+    first = student_directory_page(tenant_id, page_size=3)
+    assert [student.id for student in first.students] == expected[:3]
+    assert first.has_next and not first.has_prev
+
+    second = student_directory_page(tenant_id, after=first.next_cursor, page_size=3)
+    assert [student.id for student in second.students] == expected[3:6]
+    assert second.has_prev
+
+    last = student_directory_page(tenant_id, after=second.next_cursor, page_size=3)
+    assert [student.id for student in last.students] == expected[6:]
+    assert not last.has_next
+
+    back = student_directory_page(tenant_id, before=second.prev_cursor, page_size=3)
+    assert [student.id for student in back.students] == expected[:3]
+    assert not back.has_prev
+
+
+def test_search_matches_parent_phone_and_escapes_wildcards(directory):
+    tenant_id = directory["tenant_id"]
+    by_phone = student_directory_page(tenant_id, search="+62 812-3456")
+    assert [student.full_name for student in by_phone.students] == ["Siswa 3"]
+
+    by_class = student_directory_page(tenant_id, search="7 SMP")
+    assert {student.full_name for student in by_class.students} == {"Siswa 1", "Siswa 3", "Siswa 5"}
+
+    assert student_directory_page(tenant_id, search="%").students == []
+    assert student_directory_page(tenant_id, search="Asing").students == []
+
+
+def test_category_filter_uses_class_level(directory):
+    page = student_directory_page(directory["tenant_id"], category="sbq_sd")
+    assert {student.full_name for student in page.students} == {"Siswa 0", "Siswa 2", "Siswa 4", "Siswa 6"}
+
+
+def test_autocomplete_pages_are_tenant_scoped(directory):
+    tenant_id = directory["tenant_id"]
+    first = student_autocomplete(tenant_id, "siswa", limit=4)
+    assert len(first["results"]) == 4
+    assert first["pagination"]["more"] is True
+    assert first["results"][0]["class_name"] in {"Kelas 1 SD", "Kelas 7 SMP"}
+
+    rest = student_autocomplete(tenant_id, "siswa", after=first["pagination"]["after"], limit=4)
+    assert len(rest["results"]) == 3
+    assert rest["pagination"] == {"more": False, "after": None}
+
+
+def test_admin_student_list_renders_page(app, directory):
+    client = app.test_client()
+    client.post("/auth/login", data={"login_id": "admin", "password": PASSWORD})
+    response = client.get("/admin/daftar-student?q=Siswa")
+    assert response.status_code == 200
+    assert b"Siswa 6" in response.data
+    assert b"Berikutnya" not in response.data
+
+
+def test_staff_autocomplete_and_invoice_target_lookup(app, directory):
+    client = app.test_client()
+    client.post("/auth/login", data={"login_id": "tu", "password": PASSWORD})
+    response = client.get("/staff/siswa/autocomplete?q=N003")
+    assert response.status_code == 200
+    assert [item["nis"] for item in response.get_json()["results"]] == ["N003"]
+
+    student_id = directory["student_ids"][3]
+    response = client.get(f"/staff/tagihan/kirim?target_scope=STUDENT&target_student_id={student_id}")
+    assert response.status_code == 200
+    assert b"Siswa 3 (N003)" in response.data
@@ -0,0 +1,198 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    ClassRoom,
+    GroupType,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    ProgramType,
+    Schedule,
+    Subject,
+    Teacher,
+    Tenant,
+    User,
+    UserRole,
+)
+from app.routes.teacher import build_teacher_sidebar_groups
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TEACHER_SIDEBAR_CACHE_TTL_SECONDS = 300
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _seed_teaching_context():
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+
+    program = Program(
+        tenant_id=tenant.id,
+        code="SBQ",
+        name="Sekolah Bina Qur'an",
+        category=ProgramCategory.FORMAL,
+        report_schema="formal",
+    )
+    db.session.add(program)
+    db.session.flush()
+
+    classes = []
+    for index in range(3):
+        group = ProgramGroup(
+            tenant_id=tenant.id,
+            program_id=program.id,
+            name=f"Kelas {index + 7}",
+            group_type=GroupType.CLASS,
+        )
+        db.session.add(group)
+        db.session.flush()
+        class_room = ClassRoom(
+            name=f"Kelas {index + 7}",
+            program_group_id=group.id,
+            program_type=ProgramType.SEKOLAH_FULLDAY,
+        )
+        db.session.add(class_room)
+        classes.append(class_room)
+
+    user = User(
+        tenant_id=tenant.id,
+        username="guru",
+        email="guru@example.test",
+        role=UserRole.GURU,
+        must_change_password=False,
+    )
+    teacher = Teacher(user=user, full_name="Guru Satu")
+    subject = Subject(code="MTK", name="Matematika")
+    db.session.add_all([user, teacher, subject])
+    db.session.flush()
+
+    for class_room in classes:
+        db.session.add(Schedule(class_id=class_room.id, subject_id=subject.id, teacher_id=teacher.id, day="Senin"))
+    db.session.commit()
+    return {"teacher": teacher, "classes": classes, "subject": subject}
+
+
+@pytest.fixture()
+def teaching_context(app):
+    return _seed_teaching_context()
+
+
+@pytest.fixture()
+def query_counter(app):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", _count)
+
+
+def _formal_group(groups):
+    return next(group for group in groups if group["key"] == "formal")
+
+
+def test_sidebar_is_served_from_cache_on_repeat_calls(teaching_context, query_counter):
+    teacher = teaching_context["teacher"]
+
+    first = build_teacher_sidebar_groups(teacher)
+    queries_after_build = len(query_counter)
+    second = build_teacher_sidebar_groups(teacher)
+
+    assert _formal_group(first)["subject_count"] == 3
+    assert second == first
+    # Cache hit hanya membaca satu query versi dari database.
+    assert len(query_counter) == queries_after_build + 1
+
+
+def test_sidebar_rebuild_query_count_does_not_grow_with_schedules(teaching_context, query_counter):
+    teacher = teaching_context["teacher"]
+    subject = teaching_context["subject"]
+    program_id = ProgramGroup.query.first().program_id
+
+    db.session.expire_all()
+    build_teacher_sidebar_groups(teacher)
+    queries_for_three_schedules = len(query_counter)
+
+    for index in range(10):
+        group = ProgramGroup(
+            tenant_id=teacher.user.tenant_id,
+            program_id=program_id,
+            name=f"Tambahan {index}",
+            group_type=GroupType.CLASS,
+        )
+        db.session.add(group)
+        db.session.flush()
+        class_room = ClassRoom(
+            name=f"Tambahan {index}",
+            program_group_id=group.id,
+            program_type=ProgramType.SEKOLAH_FULLDAY,
+        )
+        db.session.add(class_room)
+        db.session.flush()
+        db.session.add(Schedule(class_id=class_room.id, subject_id=subject.id, teacher_id=teacher.id, day="Selasa"))
+    db.session.commit()
+    db.session.expire_all()
+    query_counter.clear()
+
+    groups = build_teacher_sidebar_groups(teacher)
+
+    assert _formal_group(groups)["subject_count"] == 13
+    assert len(query_counter) <= queries_for_three_schedules
+
+
+def test_schedule_write_invalidates_cached_sidebar(teaching_context):
+    teacher = teaching_context["teacher"]
+    assert _formal_group(build_teacher_sidebar_groups(teacher))["subject_count"] == 3
+
+    schedule = Schedule.query.filter_by(teacher_id=teacher.id).first()
+    schedule.is_deleted = True
+    db.session.commit()
+
+    assert _formal_group(build_teacher_sidebar_groups(teacher))["subject_count"] == 2
+
+
+def test_write_from_another_worker_invalidates_cached_sidebar(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'sidebar.db'}"
+
+    # Dua instance aplikasi = dua worker dengan cache memori masing-masing, database sama.
+    worker_a = create_app(FileConfig)
+    worker_b = create_app(FileConfig)
+    with worker_a.app_context():
+        db.create_all()
+        teacher = _seed_teaching_context()["teacher"]
+        teacher_id = teacher.id
+        assert _formal_group(build_teacher_sidebar_groups(teacher))["subject_count"] == 3
+        db.session.remove()
+
+    with worker_b.app_context():
+        schedule = Schedule.query.filter_by(teacher_id=teacher_id).first()
+        schedule.is_deleted = True
+        db.session.commit()
+        db.session.remove()
+
+    with worker_a.app_context():
+        teacher = db.session.get(Teacher, teacher_id)
+        assert _formal_group(build_teacher_sidebar_groups(teacher))["subject_count"] == 2
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import AppConfig, Tenant, TenantStatus
+from app.utils.tenant_context import get_cached_tenant_package, get_tenant_snapshot, invalidate_tenant_snapshot
+from app.utils.tenant_modules import PACKAGE_FULL, PACKAGE_SEKOLAH, TENANT_PACKAGE_KEY
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TENANT_CONTEXT_CACHE_TTL_SECONDS = 300
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def tenant(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", status=TenantStatus.ACTIVE, is_default=True)
+    db.session.add(tenant)
+    db.session.flush()
+    db.session.add(AppConfig(tenant_id=tenant.id, key=TENANT_PACKAGE_KEY, value=PACKAGE_SEKOLAH))
+    db.session.commit()
+    return tenant
+
+
+@pytest.fixture()
+def query_counter(app):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+def test_snapshot_is_served_from_cache_after_first_load(tenant, query_counter):
+    first = get_tenant_snapshot(tenant.id)
+    queries_after_first_load = len(query_counter)
+    second = get_tenant_snapshot(tenant.id)
+
+    assert first is second
+    assert first.is_active is True
+    assert first.package == PACKAGE_SEKOLAH
+    assert queries_after_first_load > 0
+    assert len(query_counter) == queries_after_first_load
+
+
+def test_snapshot_is_invalidated_when_tenant_or_config_is_flushed(tenant):
+    assert get_tenant_snapshot(tenant.id).is_active is True
+
+    tenant.status = TenantStatus.SUSPENDED
+    db.session.commit()
+    assert get_tenant_snapshot(tenant.id).is_active is False
+
+    config = AppConfig.query.filter_by(tenant_id=tenant.id, key=TENANT_PACKAGE_KEY).one()
+    config.value = PACKAGE_FULL
+    db.session.commit()
+    assert get_cached_tenant_package(tenant.id) == PACKAGE_FULL
+
+
+def test_explicit_invalidation_reloads_snapshot(tenant):
+    first = get_tenant_snapshot(tenant.id)
+    invalidate_tenant_snapshot(tenant.id)
+
+    assert get_tenant_snapshot(tenant.id) is not first
+    assert get_cached_tenant_package(None) == PACKAGE_FULL
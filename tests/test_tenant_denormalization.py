@@ -0,0 +1,218 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Attendance,
+    AttendanceStatus,
+    ClassRoom,
+    FeeType,
+    Grade,
+    GradeType,
+    GroupType,
+    Invoice,
+    ParticipantType,
+    PaymentStatus,
+    Program,
+    ProgramCategory,
+    ProgramGroup,
+    Student,
+    Teacher,
+    Tenant,
+    TenantStatus,
+    Transaction,
+    User,
+    UserRole,
+)
+from app.scripts.backfill_tenant_ids import backfill_tenant_ids
+from app.services.attendance_write_service import save_class_attendance_sheet
+from app.services.dashboard_metrics_service import compute_daily_metrics
+from app.services.invoice_generation_service import generate_fee_invoices
+
+
+DAY = date(2026, 3, 2)
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTH_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _user(tenant, username, role):
+    user = User(
+        tenant_id=tenant.id,
+        username=username,
+        email=f"{username}@example.test",
+        role=role,
+        must_change_password=False,
+    )
+    user.set_password("ValidPass123!")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _tenant_school(code, index):
+    tenant = Tenant(name=code, slug=code.lower(), code=code, status=TenantStatus.ACTIVE, is_default=index == 0)
+    db.session.add(tenant)
+    db.session.flush()
+    teacher = Teacher(user_id=_user(tenant, f"guru{index}", UserRole.GURU).id, nip=f"G{index}", full_name="Guru")
+    db.session.add(teacher)
+    program = Program(tenant_id=tenant.id, code=f"P{index}", name="Umum",
+                      category=ProgramCategory.NON_FORMAL, report_schema="umum")
+    db.session.add(program)
+    db.session.flush()
+    group = ProgramGroup(tenant_id=tenant.id, program_id=program.id, name="Kelas", group_type=GroupType.CLASS)
+    db.session.add(group)
+    db.session.flush()
+    class_room = ClassRoom(name=f"Kelas {index}", program_group_id=group.id)
+    db.session.add(class_room)
+    db.session.flush()
+    students = [
+        Student(user_id=_user(tenant, f"siswa{index}{n}", UserRole.SISWA).id, nis=f"S{index}{n}",
+                full_name=f"Siswa {index}{n}", current_class_id=class_room.id)
+        for n in range(2)
+    ]
+    db.session.add_all(students)
+    fee = FeeType(tenant_id=tenant.id, name="Seragam", amount=150000)
+    db.session.add(fee)
+    db.session.flush()
+    return {"tenant": tenant, "teacher": teacher, "class_room": class_room, "students": students, "fee": fee}
+
+
+@pytest.fixture()
+def schools(app):
+    first = _tenant_school("SATU", 0)
+    second = _tenant_school("DUA", 1)
+    db.session.commit()
+    return first, second
+
+
+def test_flush_fills_tenant_id_from_owner(schools):
+    school, _ = schools
+    student = school["students"][0]
+    invoice = Invoice(invoice_number="INV-1", student_id=student.id, fee_type_id=school["fee"].id,
+                      total_amount=100000, status=PaymentStatus.UNPAID)
+    # Transaksi dibuat bersamaan dengan invoice-nya (invoice_id belum ada saat flush).
+    invoice.transactions.append(Transaction(amount=50000, method="Tunai"))
+    db.session.add_all([
+        invoice,
+        Attendance(student_id=student.id, participant_type=ParticipantType.STUDENT,
+                   class_id=school["class_room"].id, teacher_id=school["teacher"].id, date=DAY),
+        Grade(student_id=student.id, teacher_id=school["teacher"].id, type=GradeType.TUGAS, score=90),
+    ])
+    db.session.commit()
+
+    tenant_id = school["tenant"].id
+    assert invoice.tenant_id == tenant_id
+    assert invoice.transactions[0].tenant_id == tenant_id
+    assert Attendance.query.one().tenant_id == tenant_id
+    assert Grade.query.one().tenant_id == tenant_id
+
+
+def test_bulk_writers_set_tenant_id(schools):
+    school, other = schools
+    result = save_class_attendance_sheet(
+        teacher_id=school["teacher"].id,
+        class_id=school["class_room"].id,
+        attendance_date=DAY,
+        participants={
+            f"S-{student.id}": {"participant_type": ParticipantType.STUDENT, "student_id": student.id}
+            for student in school["students"]
+        },
+        records=[{"participant_key": f"S-{student.id}", "status": "HADIR"} for student in school["students"]],
+    )
+    generate_fee_invoices(
+        tenant_id=other["tenant"].id,
+        fee=other["fee"],
+        student_query=Student.query.filter(Student.id.in_([student.id for student in other["students"]])),
+    )
+    db.session.commit()
+
+    assert result.saved == 2
+    assert {row.tenant_id for row in Attendance.query.all()} == {school["tenant"].id}
+    assert {row.tenant_id for row in Invoice.query.all()} == {other["tenant"].id}
+
+
+def test_backfill_script_fills_legacy_rows_in_chunks(schools):
+    school, other = schools
+    invoice_ids = []
+    for owner in (school, other):
+        for student in owner["students"]:
+            invoice_ids.append(db.session.execute(Invoice.__table__.insert().values(
+                invoice_number=f"OLD-{student.id}", student_id=student.id, fee_type_id=owner["fee"].id,
+                total_amount=1000, paid_amount=1000, status=PaymentStatus.PAID, is_deleted=False,
+            )).inserted_primary_key[0])
+    db.session.execute(Transaction.__table__.insert(), [
+        {"invoice_id": invoice_id, "amount": 1000, "date": datetime(2026, 3, 2, 9), "is_deleted": False}
+        for invoice_id in invoice_ids
+    ])
+    db.session.execute(Grade.__table__.insert().values(
+        teacher_id=other["teacher"].id, participant_type=ParticipantType.STUDENT, score=80, is_deleted=False,
+    ))
+    db.session.commit()
+
+    stats = backfill_tenant_ids(chunk_size=3)
+
+    assert stats == {"invoices": 4, "transactions": 4, "attendances": 0, "grades": 1}
+    expected = [school["tenant"].id] * 2 + [other["tenant"].id] * 2
+    assert [row.tenant_id for row in Invoice.query.order_by(Invoice.id)] == expected
+    assert [row.tenant_id for row in Transaction.query.order_by(Transaction.id)] == expected
+    assert Grade.query.one().tenant_id == other["tenant"].id
+    assert backfill_tenant_ids(chunk_size=3) == {"invoices": 0, "transactions": 0, "attendances": 0, "grades": 0}
+
+
+def test_daily_metrics_are_scoped_by_denormalized_tenant(schools):
+    school, other = schools
+    for owner, status in ((school, AttendanceStatus.HADIR), (other, AttendanceStatus.SAKIT)):
+        student = owner["students"][0]
+        invoice = Invoice(invoice_number=f"INV-{student.id}", student_id=student.id,
+                          fee_type_id=owner["fee"].id, total_amount=20000, status=PaymentStatus.PAID)
+        invoice.transactions.append(Transaction(amount=20000, method="Tunai", date=datetime(2026, 3, 2, 8)))
+        db.session.add_all([
+            invoice,
+            Attendance(student_id=student.id, participant_type=ParticipantType.STUDENT, status=status,
+                       class_id=owner["class_room"].id, teacher_id=owner["teacher"].id, date=DAY),
+        ])
+    db.session.commit()
+
+    metrics = compute_daily_metrics(school["tenant"].id, DAY, DAY)[DAY]
+    assert (metrics["attendance_hadir"], metrics["attendance_sakit"]) == (1, 0)
+    assert (metrics["payment_count"], metrics["payment_amount"]) == (1, 20000)
+
+
+def test_daily_metrics_skip_rows_of_soft_deleted_students(schools):
+    school, _ = schools
+    kept, removed = school["students"]
+    for student in (kept, removed):
+        invoice = Invoice(invoice_number=f"INV-{student.id}", student_id=student.id,
+                          fee_type_id=school["fee"].id, total_amount=20000, status=PaymentStatus.PAID)
+        invoice.transactions.append(Transaction(amount=20000, method="Tunai", date=datetime(2026, 3, 2, 8)))
+        db.session.add_all([
+            invoice,
+            Attendance(student_id=student.id, participant_type=ParticipantType.STUDENT, status=AttendanceStatus.HADIR,
+                       class_id=school["class_room"].id, teacher_id=school["teacher"].id, date=DAY),
+        ])
+    db.session.flush()
+    removed.is_deleted = True
+    db.session.commit()
+
+    metrics = compute_daily_metrics(school["tenant"].id, DAY, DAY)[DAY]
+    assert metrics["attendance_hadir"] == 1
+    assert (metrics["payment_count"], metrics["payment_amount"]) == (1, 20000)
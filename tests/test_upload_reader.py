@@ -0,0 +1,94 @@
+import types
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+
+from app import create_app
+from app.extensions import db
+from app.models import BackgroundJob, BackgroundJobStatus, Tenant
+from app.services.job_queue_service import enqueue_job, run_worker
+from app.utils.uploads import UploadLimitError, iter_upload_rows, upload_from_bytes
+
+
+class TestConfig:
+    SECRET_KEY = "test-secret"
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    UPLOAD_MAX_ROWS = 3
+    UPLOAD_MAX_BYTES = 64 * 1024
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _xlsx_bytes(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_xlsx_rows_are_streamed_and_blank_rows_skipped(app):
+    data = _xlsx_bytes([
+        ["nip", "nama", "nilai"],
+        ["G001", "Ustadz Ahmad", 87.0],
+        [None, None, None],
+        ["G002", "Ustadzah Aminah", 90.5],
+    ])
+
+    rows = iter_upload_rows(upload_from_bytes(data, "guru.xlsx"))
+
+    assert isinstance(rows, types.GeneratorType)
+    assert list(rows) == [
+        (2, {"nip": "G001", "nama": "Ustadz Ahmad", "nilai": "87"}),
+        (4, {"nip": "G002", "nama": "Ustadzah Aminah", "nilai": "90.5"}),
+    ]
+
+
+def test_csv_rows_and_limits(app):
+    csv_bytes = "nip,nama\nG001,Ahmad\nG002,Bakar\nG003,Chairul\nG004,Dodi\n".encode("utf-8-sig")
+
+    assert [idx for idx, _ in iter_upload_rows(upload_from_bytes(csv_bytes, "guru.csv"), max_rows=0)] == [2, 3, 4, 5]
+
+    rows = iter_upload_rows(upload_from_bytes(csv_bytes, "guru.csv"))
+    assert next(rows) == (2, {"nip": "G001", "nama": "Ahmad"})
+    with pytest.raises(UploadLimitError, match="batas 3"):
+        list(rows)
+
+    with pytest.raises(UploadLimitError, match="Ukuran file"):
+        next(iter_upload_rows(upload_from_bytes(csv_bytes, "guru.csv"), max_bytes=10))
+
+
+def test_import_job_over_row_limit_finishes_without_retry(app):
+    tenant = Tenant(name="Tenant A", slug="tenant-a", code="TA", is_default=True)
+    db.session.add(tenant)
+    db.session.commit()
+    csv_bytes = "nip,nama\n" + "".join(f"G00{i},Guru {i}\n" for i in range(5))
+
+    job = enqueue_job(
+        "import_teachers",
+        tenant_id=tenant.id,
+        input_blob=csv_bytes.encode("utf-8"),
+        input_filename="guru.csv",
+    )
+    job_id = job.id
+    assert run_worker(worker_id="worker-1", once=True) == 1
+
+    job = db.session.get(BackgroundJob, job_id)
+    assert job.status == BackgroundJobStatus.SUCCEEDED
+    assert job.attempts == 1
+    assert job.result["level"] == "danger"
+    assert "batas 3" in job.result["message"]